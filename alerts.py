@@ -0,0 +1,625 @@
+"""
+价格和指标提醒模块
+
+用户通过/alert设置提醒，例如 /alert BTC > 70000、/alert ETH rsi<30 1h。
+提醒按(币种, 字段)分组保存在按阈值排序的数组中，收到某个币种的新价格或新收盘K线时
+只检查该币种的数组：用二分查找定位触发的阈值区间，每次更新耗时O(log n + k)（k为触发的提醒数），
+而不是遍历全部提醒。提醒触发一次后自动删除，数据保存在JSON文件中
+"""
+
+import os
+import re
+import json
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from threading import Lock
+from typing import Dict, Any, List, Optional, Callable
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from metrics import metrics
+from cache_warmer import CRON_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 默认提醒配置（与config.example.json中的alerts一致）
+DEFAULT_ALERT_CONFIG = {
+    'enabled': True,
+    'store_file': 'alerts.json',
+    'max_per_chat': 20,
+    'poll_seconds': 30,
+    'delay_seconds': 5,
+    'default_interval': '15m'
+}
+
+# 支持的字段：price按最新成交价检查，其他字段按所选周期收盘K线的指标值检查
+ALERT_FIELDS = {
+    'price': '价格',
+    'rsi': 'RSI',
+    'macd': 'MACD',
+    'macd_diff': 'MACD柱',
+    'ema5': 'EMA5',
+    'ema13': 'EMA13',
+    'ma20': 'MA20',
+    'ma50': 'MA50',
+    'volume': '成交量'
+}
+
+# 支持的比较运算符
+VALID_OPERATORS = ['>', '>=', '<', '<=']
+
+# 指标提醒支持的K线周期
+VALID_INTERVALS = list(CRON_FIELDS)
+
+# 提醒条件：[字段] 运算符 阈值 [周期]，字段省略时为price
+ALERT_PATTERN = re.compile(
+    r'^(?P<field>[a-z][a-z0-9_]*)?\s*(?P<op>>=|<=|>|<)\s*(?P<threshold>[-+]?\d+(?:\.\d+)?)\s*(?P<interval>\w+)?$'
+)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """把BTC、btcusdt等写法统一为BTC"""
+    symbol = symbol.upper()
+    if symbol.endswith('USDT') and len(symbol) > 4:
+        symbol = symbol[:-4]
+    return symbol
+
+
+def parse_alert(args: List[str], default_interval: str = '15m') -> Dict[str, Any]:
+    """
+    解析/alert命令参数
+
+    Args:
+        args: 命令参数，例如['BTC', '>', '70000']或['ETH', 'rsi<30', '1h']
+        default_interval: 指标提醒默认的K线周期
+
+    Returns:
+        提醒条件{symbol, field, op, threshold, interval}，price提醒的interval为None
+
+    Raises:
+        ValueError: 参数格式错误，异常信息可直接回复给用户
+    """
+    if len(args) < 2:
+        raise ValueError("格式：/alert 交易对 [字段] 运算符 阈值 [周期]")
+    match = ALERT_PATTERN.match(' '.join(args[1:]).lower())
+    if not match:
+        raise ValueError("无法识别提醒条件，示例：/alert BTC > 70000 或 /alert ETH rsi<30 1h")
+
+    field = match.group('field') or 'price'
+    if field not in ALERT_FIELDS:
+        raise ValueError(f"不支持的字段 {field}，可选：{', '.join(ALERT_FIELDS)}")
+    interval = match.group('interval')
+    if field == 'price':
+        if interval:
+            raise ValueError("价格提醒按最新成交价检查，不需要指定周期")
+    else:
+        interval = interval or default_interval
+        if interval not in VALID_INTERVALS:
+            raise ValueError(f"不支持的周期 {interval}，可选：{', '.join(VALID_INTERVALS)}")
+
+    return {
+        'symbol': normalize_symbol(args[0]),
+        'field': field,
+        'op': match.group('op'),
+        'threshold': float(match.group('threshold')),
+        'interval': interval
+    }
+
+
+def field_key(field: str, interval: Optional[str]) -> str:
+    """索引键：price或指标@周期，例如rsi@1h"""
+    return field if interval is None else f"{field}@{interval}"
+
+
+def describe_condition(alert: Dict[str, Any]) -> str:
+    """生成提醒条件文本，例如 BTC 1h RSI < 30"""
+    name = ALERT_FIELDS.get(alert['field'], alert['field'])
+    interval = f" {alert['interval']}" if alert.get('interval') else ''
+    return f"{alert['symbol']}{interval} {name} {alert['op']} {alert['threshold']:g}"
+
+
+class ThresholdIndex:
+    """
+    单个(币种, 字段)的阈值索引
+
+    每个运算符一个按键值升序排列的数组，键值的取法保证触发的提醒总在数组末尾：
+    >、>=存储-阈值（阈值低于当前值时触发），<、<=存储阈值（阈值高于当前值时触发）。
+    检查时二分查找分界点并截掉末尾，耗时O(log n + k)
+    """
+
+    def __init__(self):
+        self._keys = {op: [] for op in VALID_OPERATORS}
+        self._ids = {op: [] for op in VALID_OPERATORS}
+
+    @staticmethod
+    def _key(op: str, threshold: float) -> float:
+        return -threshold if op in ('>', '>=') else threshold
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._ids.values())
+
+    def add(self, alert_id: int, op: str, threshold: float) -> None:
+        """
+        添加提醒
+
+        Args:
+            alert_id: 提醒ID
+            op: 比较运算符
+            threshold: 阈值
+        """
+        key = self._key(op, threshold)
+        position = bisect_right(self._keys[op], key)
+        self._keys[op].insert(position, key)
+        self._ids[op].insert(position, alert_id)
+
+    def remove(self, alert_id: int, op: str, threshold: float) -> bool:
+        """
+        删除提醒
+
+        Args:
+            alert_id: 提醒ID
+            op: 比较运算符
+            threshold: 阈值
+
+        Returns:
+            是否找到并删除
+        """
+        keys, ids = self._keys[op], self._ids[op]
+        key = self._key(op, threshold)
+        position = bisect_left(keys, key)
+        while position < len(keys) and keys[position] == key:
+            if ids[position] == alert_id:
+                del keys[position]
+                del ids[position]
+                return True
+            position += 1
+        return False
+
+    def pop_triggered(self, value: float) -> List[int]:
+        """
+        取出并删除当前值触发的提醒
+
+        Args:
+            value: 最新的价格或指标值
+
+        Returns:
+            触发的提醒ID列表
+        """
+        triggered = []
+        for op in VALID_OPERATORS:
+            keys, ids = self._keys[op], self._ids[op]
+            if not keys:
+                continue
+            # 触发条件改写为 键值 > 分界值（>、<）或 键值 >= 分界值（>=、<=）
+            bound = -value if op in ('>', '>=') else value
+            position = (bisect_right if op in ('>', '<') else bisect_left)(keys, bound)
+            if position < len(keys):
+                triggered.extend(ids[position:])
+                del keys[position:]
+                del ids[position:]
+        return triggered
+
+
+class AlertStore:
+    """
+    提醒数据存储
+
+    保存提醒ID -> 提醒条件，并按币种维护ThresholdIndex，线程安全
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化提醒存储
+
+        Args:
+            path: JSON文件路径，为None时只保存在内存中
+        """
+        self.path = path
+        self._alerts = {}
+        self._indexes = {}
+        self._next_id = 1
+        self._lock = Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """从文件加载提醒并重建索引"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for alert in data.get('alerts', []):
+                self._alerts[alert['id']] = alert
+                self._index_for(alert).add(alert['id'], alert['op'], alert['threshold'])
+            self._next_id = max([data.get('next_id', 1)] + [alert_id + 1 for alert_id in self._alerts])
+            logger.info(f"已加载{len(self._alerts)}个提醒")
+        except Exception as e:
+            logger.error(f"加载提醒数据时出错: {str(e)}")
+
+    def _save(self) -> None:
+        """保存提醒数据到文件（调用方需持有锁）"""
+        if not self.path:
+            return
+        try:
+            data = {'next_id': self._next_id, 'alerts': list(self._alerts.values())}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"保存提醒数据时出错: {str(e)}")
+
+    def _index_for(self, alert: Dict[str, Any]) -> ThresholdIndex:
+        """获取提醒所在的索引（不存在时创建）"""
+        keys = self._indexes.setdefault(alert['symbol'], {})
+        key = field_key(alert['field'], alert.get('interval'))
+        if key not in keys:
+            keys[key] = ThresholdIndex()
+        return keys[key]
+
+    def _unindex(self, alert: Dict[str, Any]) -> None:
+        """从索引中删除提醒，并清理空索引"""
+        keys = self._indexes.get(alert['symbol'], {})
+        key = field_key(alert['field'], alert.get('interval'))
+        index = keys.get(key)
+        if index is None:
+            return
+        index.remove(alert['id'], alert['op'], alert['threshold'])
+        if not len(index):
+            del keys[key]
+            if not keys:
+                del self._indexes[alert['symbol']]
+
+    def add(self, chat_id: int, condition: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        添加提醒
+
+        Args:
+            chat_id: 聊天ID
+            condition: parse_alert返回的提醒条件
+
+        Returns:
+            保存的提醒（包含id）
+        """
+        with self._lock:
+            alert = dict(condition, id=self._next_id, chat_id=chat_id,
+                         created_at=datetime.utcnow().isoformat(timespec='seconds'))
+            self._next_id += 1
+            self._alerts[alert['id']] = alert
+            self._index_for(alert).add(alert['id'], alert['op'], alert['threshold'])
+            self._save()
+            return alert
+
+    def remove(self, chat_id: int, alert_id: Optional[int] = None) -> int:
+        """
+        删除提醒
+
+        Args:
+            chat_id: 聊天ID
+            alert_id: 提醒ID，为None时删除该聊天的全部提醒
+
+        Returns:
+            删除的提醒数
+        """
+        with self._lock:
+            targets = [alert for alert in self._alerts.values() if alert['chat_id'] == chat_id
+                       and (alert_id is None or alert['id'] == alert_id)]
+            for alert in targets:
+                del self._alerts[alert['id']]
+                self._unindex(alert)
+            if targets:
+                self._save()
+            return len(targets)
+
+    def for_chat(self, chat_id: int) -> List[Dict[str, Any]]:
+        """获取聊天的所有提醒（按ID排序）"""
+        with self._lock:
+            return [dict(alert) for alert_id, alert in sorted(self._alerts.items()) if alert['chat_id'] == chat_id]
+
+    def watched(self, interval: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        获取需要检查的币种和字段
+
+        Args:
+            interval: 为None时返回价格提醒，否则返回该周期的指标提醒
+
+        Returns:
+            币种 -> 字段列表
+        """
+        with self._lock:
+            result = {}
+            for symbol, keys in self._indexes.items():
+                fields = [key.split('@')[0] for key in keys
+                          if (interval is None and key == 'price') or key.endswith(f"@{interval}")]
+                if fields:
+                    result[symbol] = fields
+            return result
+
+    def trigger(self, symbol: str, values: Dict[str, float]) -> List[Dict[str, Any]]:
+        """
+        用币种的新数据检查提醒，触发的提醒从存储中删除
+
+        Args:
+            symbol: 币种
+            values: 索引键 -> 最新值，例如{'price': 70100.0}或{'rsi@1h': 28.5}
+
+        Returns:
+            触发的提醒列表（附带触发时的value）
+        """
+        with self._lock:
+            keys = self._indexes.get(symbol)
+            if not keys:
+                return []
+            triggered = []
+            for key, value in values.items():
+                index = keys.get(key)
+                if index is None or value is None or value != value:
+                    continue
+                for alert_id in index.pop_triggered(value):
+                    triggered.append(dict(self._alerts.pop(alert_id), value=value))
+                if not len(index):
+                    del keys[key]
+            if not keys:
+                del self._indexes[symbol]
+            if triggered:
+                self._save()
+            return triggered
+
+
+class AlertManager:
+    """
+    提醒管理器
+
+    后台线程定期批量获取有价格提醒的币种的最新价格，并在K线收盘后检查指标提醒，
+    通过deliver回调把触发消息交给限速发送器
+    """
+
+    def __init__(self, market_data, deliver: Callable[[int, str], None],
+                 config: Optional[Dict[str, Any]] = None, store: Optional[AlertStore] = None):
+        """
+        初始化提醒管理器
+
+        Args:
+            market_data: MarketData实例
+            deliver: 发送回调deliver(chat_id, text)，需要线程安全（例如TelegramSender.enqueue_threadsafe）
+            config: 提醒配置（见config.example.json中的alerts）
+            store: 提醒存储，默认按store_file创建
+        """
+        self.market_data = market_data
+        self.deliver = deliver
+        self.config = dict(DEFAULT_ALERT_CONFIG)
+        self.config.update(config or {})
+        self.store = store or AlertStore(self.config['store_file'])
+        self.stream = None
+        self.scheduler = None
+
+    def _notify(self, triggered: List[Dict[str, Any]]) -> int:
+        """发送触发消息，返回成功加入发送队列的消息数"""
+        sent = 0
+        for alert in triggered:
+            kind = '价格提醒' if alert['field'] == 'price' else '指标提醒'
+            label = '当前' if alert['field'] == 'price' else '收盘值'
+            text = f"🔔 {kind}：{describe_condition(alert)}（{label} {alert['value']:g}）\n该提醒已自动删除"
+            try:
+                self.deliver(alert['chat_id'], text)
+                sent += 1
+            except Exception as e:
+                logger.error(f"发送提醒 #{alert['id']} 到 {alert['chat_id']} 时出错: {str(e)}")
+        if triggered:
+            metrics.inc('alerts_triggered_total', len(triggered))
+            logger.info(f"触发了{len(triggered)}个提醒")
+        return sent
+
+    def on_price(self, symbol: str, price: float) -> int:
+        """
+        处理币种的新成交价
+
+        Args:
+            symbol: 币种
+            price: 最新价格
+
+        Returns:
+            触发的提醒数
+        """
+        triggered = self.store.trigger(normalize_symbol(symbol), {'price': float(price)})
+        self._notify(triggered)
+        return len(triggered)
+
+    def on_candle(self, symbol: str, interval: str, row) -> int:
+        """
+        处理币种新收盘的K线
+
+        Args:
+            symbol: 币种
+            interval: K线周期
+            row: 包含指标列的K线（Series或dict）
+
+        Returns:
+            触发的提醒数
+        """
+        values = {}
+        for field in ALERT_FIELDS:
+            if field != 'price' and field in row:
+                values[field_key(field, interval)] = float(row[field])
+        triggered = self.store.trigger(normalize_symbol(symbol), values)
+        self._notify(triggered)
+        return len(triggered)
+
+    def attach_stream(self, stream) -> None:
+        """
+        由行情流驱动提醒检查：每次K线推送检查价格提醒，K线收盘时检查该周期的指标提醒，
+        行情流关注的币种不再参与定时检查
+
+        Args:
+            stream: MarketStream实例
+        """
+        self.stream = stream
+        stream.add_listener(self.on_stream_event)
+
+    def on_stream_event(self, event: Dict[str, Any]) -> None:
+        """处理行情流事件（在行情流线程中调用）"""
+        if event['type'] != 'kline':
+            return
+        self.on_price(event['symbol'], float(event['row'][4]))
+        if event['closed']:
+            klines = self.stream.get_klines(event['symbol'], event['interval'])
+            if klines is not None:
+                self.on_candle(event['symbol'], event['interval'], klines.iloc[-1])
+
+    def poll_prices(self) -> int:
+        """
+        批量获取有价格提醒的币种的最新价格并检查
+
+        Returns:
+            触发的提醒数
+        """
+        symbols = [symbol for symbol in self.store.watched()
+                   if self.stream is None or not self.stream.covers(symbol)]
+        if not symbols:
+            return 0
+        try:
+            with metrics.span('alerts.prices'):
+                prices = self.market_data.get_latest_prices([f"{symbol}USDT" for symbol in symbols])
+        except Exception as e:
+            logger.error(f"获取提醒币种的最新价格时出错: {str(e)}")
+            return 0
+        return sum(self.on_price(trading_symbol, price) for trading_symbol, price in prices.items())
+
+    def check_candles(self, interval: str) -> int:
+        """
+        K线收盘后检查该周期的指标提醒（K线数据与分析共用缓存）
+
+        Args:
+            interval: K线周期
+
+        Returns:
+            触发的提醒数
+        """
+        triggered = 0
+        for symbol in self.store.watched(interval):
+            if self.stream is not None and self.stream.covers(symbol, interval):
+                continue
+            try:
+                data = self.market_data.get_multi_timeframe_data(f"{symbol}USDT", [interval])
+                if not data or interval not in data or len(data[interval]) < 2:
+                    logger.warning(f"未能获取{symbol}的{interval}周期数据，跳过提醒检查")
+                    continue
+                # 最后一根是刚开始的K线，使用倒数第二根已收盘的K线
+                triggered += self.on_candle(symbol, interval, data[interval].iloc[-2])
+            except Exception as e:
+                logger.error(f"检查{symbol}的{interval}指标提醒时出错: {str(e)}")
+        return triggered
+
+    def handle_alert(self, chat_id: int, args: List[str]) -> str:
+        """
+        处理/alert命令
+
+        Args:
+            chat_id: 聊天ID
+            args: 命令参数：交易对 [字段] 运算符 阈值 [周期]
+
+        Returns:
+            回复文本
+        """
+        if not args:
+            return ("请指定提醒条件，例如：\n"
+                    "/alert BTC > 70000 - 价格高于70000时提醒\n"
+                    "/alert ETH rsi<30 1h - 1小时RSI低于30时提醒（周期默认"
+                    f"{self.config['default_interval']}）\n"
+                    f"可用字段：{', '.join(ALERT_FIELDS)}")
+        try:
+            condition = parse_alert(args, self.config['default_interval'])
+        except ValueError as e:
+            return str(e)
+        # 未上架的交易对每次轮询都会失败，添加前按交易对索引拒绝
+        symbol_index = getattr(self.market_data, 'symbols', None)
+        rejection = symbol_index.reject_message([condition['symbol']]) if symbol_index is not None else None
+        if rejection:
+            return rejection
+        if len(self.store.for_chat(chat_id)) >= self.config['max_per_chat']:
+            return f"每个聊天最多设置{self.config['max_per_chat']}个提醒，请先使用 /unalert 删除部分提醒"
+
+        alert = self.store.add(chat_id, condition)
+        metrics.inc('alerts_changed_total', action='add')
+        logger.info(f"聊天 {chat_id} 添加了提醒 #{alert['id']}: {describe_condition(alert)}")
+        when = "每根K线收盘后检查" if alert['interval'] else f"每{self.config['poll_seconds']}秒检查一次"
+        return f"已添加提醒 #{alert['id']}：{describe_condition(alert)}，{when}，触发一次后自动删除"
+
+    def handle_unalert(self, chat_id: int, args: List[str]) -> str:
+        """
+        处理/unalert命令
+
+        Args:
+            chat_id: 聊天ID
+            args: 命令参数：提醒ID，或all删除全部
+
+        Returns:
+            回复文本
+        """
+        if not args:
+            return "请指定要删除的提醒ID，例如：/unalert 3，或使用 /unalert all 删除全部提醒"
+        if args[0].lower() == 'all':
+            removed = self.store.remove(chat_id)
+        else:
+            try:
+                removed = self.store.remove(chat_id, int(args[0].lstrip('#')))
+            except ValueError:
+                return "提醒ID应为数字，使用 /alerts 查看当前提醒"
+        if not removed:
+            return "没有找到对应的提醒"
+        metrics.inc('alerts_changed_total', removed, action='remove')
+        logger.info(f"聊天 {chat_id} 删除了{removed}个提醒")
+        return f"已删除{removed}个提醒"
+
+    def describe(self, chat_id: int) -> str:
+        """
+        生成提醒列表文本
+
+        Args:
+            chat_id: 聊天ID
+
+        Returns:
+            回复文本
+        """
+        alerts = self.store.for_chat(chat_id)
+        if not alerts:
+            return "当前没有提醒，使用 /alert BTC > 70000 添加提醒"
+        lines = ["当前提醒："]
+        for alert in alerts:
+            lines.append(f"• #{alert['id']} {describe_condition(alert)}")
+        return '\n'.join(lines)
+
+    def start(self) -> bool:
+        """
+        启动后台调度
+
+        Returns:
+            是否已启动
+        """
+        if not self.config['enabled']:
+            logger.info("价格提醒未启用")
+            return False
+
+        self.scheduler = BackgroundScheduler(daemon=True, timezone='UTC')
+        self.scheduler.add_job(
+            self.poll_prices, 'interval', seconds=self.config['poll_seconds'], id='alerts_prices',
+            max_instances=1, coalesce=True
+        )
+        for interval in VALID_INTERVALS:
+            trigger = CronTrigger(second=self.config['delay_seconds'], timezone='UTC', **CRON_FIELDS[interval])
+            self.scheduler.add_job(
+                self.check_candles, trigger, args=[interval], id=f"alerts_{interval}",
+                max_instances=1, coalesce=True, misfire_grace_time=60
+            )
+        self.scheduler.start()
+        logger.info(f"已启动提醒检查，价格每{self.config['poll_seconds']}秒检查一次")
+        return True
+
+    def stop(self) -> None:
+        """停止后台调度"""
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("提醒检查调度已停止")
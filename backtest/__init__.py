@@ -0,0 +1,6 @@
+"""
+信号回测模块
+
+从本地K线文件回放历史数据，对每根K线一次性向量化地计算short/mid/long信号推送报告中的规则，
+并按报告给出的入场区间、止盈和止损模拟交易，输出收益、命中率和最大回撤
+"""
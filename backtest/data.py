@@ -0,0 +1,167 @@
+"""
+回测数据加载
+
+支持以下本地K线文件格式：
+- Binance历史数据CSV（data.binance.vision下载的K线文件，无表头，12列）
+- JSON：K线数组列表（与Client.get_klines返回值相同），或benchmarks/fixtures的录制格式
+- 目录：按文件名顺序拼接目录下的所有CSV/JSON文件（例如按月下载的文件）
+
+高周期K线由基准周期重采样得到，因此每个交易对只需要一份最小周期的数据
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Binance K线字段
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+    'taker_buy_quote', 'ignore'
+]
+
+# 重采样使用的pandas周期（周K线从周一00:00(UTC)开始）
+RESAMPLE_RULES = {
+    '15m': '15min',
+    '1h': '1h',
+    '4h': '4h',
+    '1d': '1D',
+    '3d': '3D',
+    '1w': 'W-MON'
+}
+
+
+def _frame_from_rows(rows: List[list]) -> pd.DataFrame:
+    """把K线数组转换为DataFrame"""
+    df = pd.DataFrame([row[:12] for row in rows])
+    df.columns = KLINE_COLUMNS[:df.shape[1]]
+    return df
+
+
+def _read_file(path: str, interval: Optional[str] = None) -> pd.DataFrame:
+    """读取单个K线文件"""
+    if path.endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            # benchmarks/fixtures的录制格式：{'klines': {周期: K线列表}}
+            klines = data.get('klines', {})
+            if interval not in klines:
+                raise ValueError(f"{path}中没有{interval}周期的K线")
+            data = klines[interval]
+        return _frame_from_rows(data)
+
+    df = pd.read_csv(path, header=None)
+    # 带表头的文件第一行不是数字，前12列按Binance字段命名，之后的列（例如funding_rate）保留表头中的列名
+    if not str(df.iloc[0, 0]).replace('.', '', 1).isdigit():
+        extra = [str(name) for name in df.iloc[0, 12:]]
+        df = df.iloc[1:].reset_index(drop=True)
+        df.columns = KLINE_COLUMNS[:min(df.shape[1], 12)] + extra
+        return df
+    df = df.iloc[:, :12]
+    df.columns = KLINE_COLUMNS[:df.shape[1]]
+    return df
+
+
+def load_klines(path: str, interval: str = '15m') -> pd.DataFrame:
+    """
+    加载本地K线数据
+
+    Args:
+        path: 文件或目录路径
+        interval: K线周期（读取录制格式的JSON时使用）
+
+    Returns:
+        与MarketData.get_historical_data格式一致的DataFrame，按时间排序并去重
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if name.endswith(('.csv', '.json')))
+        if not files:
+            raise ValueError(f"目录{path}中没有K线文件")
+        df = pd.concat([_read_file(name, interval) for name in files], ignore_index=True)
+    else:
+        df = _read_file(path, interval)
+
+    timestamps = df['timestamp'].astype('int64')
+    # 2025年起Binance的现货数据使用微秒时间戳
+    unit = 'us' if timestamps.max() > 10 ** 14 else 'ms'
+    df['timestamp'] = pd.to_datetime(timestamps, unit=unit)
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = df[col].astype(float)
+    df = df.drop_duplicates('timestamp').sort_values('timestamp').reset_index(drop=True)
+    logger.info(f"已加载{len(df)}根K线: {df['timestamp'].iloc[0]} ~ {df['timestamp'].iloc[-1]}")
+    return df
+
+
+def resample_klines(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    将K线重采样为更高的周期
+
+    Args:
+        df: 基准周期K线
+        interval: 目标周期，例如1h、4h、1d、1w
+
+    Returns:
+        重采样后的K线，不完整的最后一根K线会被丢弃
+    """
+    rule = RESAMPLE_RULES[interval]
+    indexed = df.set_index('timestamp')
+    if interval == '1w':
+        resampler = indexed.resample(rule, label='left', closed='left')
+    else:
+        resampler = indexed.resample(rule, origin='epoch')
+    result = resampler.agg({
+        'open': 'first',
+        'high': 'max',
+        'low': 'min',
+        'close': 'last',
+        'volume': 'sum'
+    })
+    counts = resampler['close'].count()
+    # 只保留完整的K线（由足够数量的基准K线组成）
+    base_step = df['timestamp'].diff().median()
+    expected = max(int(pd.Timedelta(rule if interval != '1w' else '7D') / base_step), 1)
+    result = result[counts >= expected].dropna().reset_index()
+    return result
+
+
+def close_times(df: pd.DataFrame, interval: str) -> np.ndarray:
+    """
+    计算每根K线的收盘时间
+
+    Args:
+        df: K线数据
+        interval: K线周期
+
+    Returns:
+        收盘时间数组（datetime64[ns]）
+    """
+    step = pd.Timedelta('7D') if interval == '1w' else pd.Timedelta(RESAMPLE_RULES[interval])
+    return (df['timestamp'] + step).values
+
+
+def load_timeframes(path: str, base_interval: str, intervals: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    加载基准周期数据并重采样出其他周期
+
+    Args:
+        path: K线文件或目录
+        base_interval: 文件中K线的周期
+        intervals: 需要的周期列表
+
+    Returns:
+        周期 -> K线DataFrame
+    """
+    base = load_klines(path, base_interval)
+    data = {base_interval: base}
+    for interval in intervals:
+        if interval not in data:
+            data[interval] = resample_klines(base, interval)
+    return data
@@ -0,0 +1,231 @@
+"""
+向量化交易模拟
+
+对每个信号按报告给出的价格模拟一笔交易：
+1. 信号K线收盘后挂单，之后entry_bars根K线内价格触及入场区间即成交
+   （成交价为开盘价限制在入场区间内）
+2. 成交后max_hold_bars根K线内先触及止盈或止损即平仓，同一根K线同时触及时按止损处理
+   （跳空越过止损时按开盘价平仓），到期未触及则按收盘价平仓
+所有信号的成交和平仓位置通过滑动窗口一次计算，再按时间顺序选取互不重叠的交易计算资金曲线
+"""
+
+import time
+import logging
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from backtest.rules import STRATEGY_TIMEFRAMES, prepare_features, evaluate_signals
+
+logger = logging.getLogger(__name__)
+
+# 默认模拟参数（按基准周期的K线数计算）
+DEFAULT_SIMULATION = {
+    'short': {'entry_bars': 4, 'max_hold_bars': 96, 'fee': 0.0004},
+    'mid': {'entry_bars': 4, 'max_hold_bars': 168, 'fee': 0.0004},
+    'long': {'entry_bars': 3, 'max_hold_bars': 90, 'fee': 0.0004}
+}
+
+# 平仓原因
+EXIT_TAKE_PROFIT = 1
+EXIT_STOP_LOSS = -1
+EXIT_TIMEOUT = 0
+
+
+def _first_hit(hits: np.ndarray) -> np.ndarray:
+    """每行第一个True的位置，没有时为列数"""
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), hits.shape[1])
+
+
+def simulate_trades(features: Dict[str, np.ndarray], signals: Dict[str, np.ndarray],
+                    entry_bars: int, max_hold_bars: int, fee: float = 0.0,
+                    chunk_size: int = 20000) -> Dict[str, np.ndarray]:
+    """
+    模拟所有信号的交易
+
+    Args:
+        features: 包含open/high/low/close的特征
+        signals: evaluate_signals的结果
+        entry_bars: 挂单有效的K线数
+        max_hold_bars: 最长持仓K线数
+        fee: 单边手续费率
+        chunk_size: 每批计算的信号数，限制内存占用
+
+    Returns:
+        已成交交易的数组：signal_index、side、entry_index、entry_price、exit_index、exit_price、
+        exit_reason、return（扣除双边手续费）
+    """
+    open_, high, low, close = features['open'], features['high'], features['low'], features['close']
+    n = len(close)
+    candidates = np.nonzero((signals['side'] != 0) & (np.arange(n) < n - 1))[0]
+    results = {key: [] for key in ['signal_index', 'side', 'entry_index', 'entry_price',
+                                    'exit_index', 'exit_price', 'exit_reason']}
+    entry_offsets = np.arange(1, entry_bars + 1)
+    hold_offsets = np.arange(1, max_hold_bars + 1)
+
+    for start in range(0, len(candidates), chunk_size):
+        index = candidates[start:start + chunk_size]
+        side = signals['side'][index]
+        entry_low = signals['entry_low'][index]
+        entry_high = signals['entry_high'][index]
+
+        # 挂单成交
+        rows = index[:, None] + entry_offsets
+        valid = rows < n
+        rows = np.minimum(rows, n - 1)
+        touched = valid & (low[rows] <= entry_high[:, None]) & (high[rows] >= entry_low[:, None])
+        filled = touched.any(axis=1)
+        index, side, entry_low, entry_high = index[filled], side[filled], entry_low[filled], entry_high[filled]
+        entry_index = rows[filled, touched[filled].argmax(axis=1)]
+        entry_price = np.clip(open_[entry_index], entry_low, entry_high)
+        take_profit = signals['take_profit'][index]
+        stop_loss = signals['stop_loss'][index]
+
+        # 止盈止损
+        rows = entry_index[:, None] + hold_offsets
+        valid = rows < n
+        rows = np.minimum(rows, n - 1)
+        is_long = (side > 0)[:, None]
+        stop_hit = valid & np.where(is_long, low[rows] <= stop_loss[:, None], high[rows] >= stop_loss[:, None])
+        profit_hit = valid & np.where(is_long, high[rows] >= take_profit[:, None], low[rows] <= take_profit[:, None])
+        first_stop = _first_hit(stop_hit)
+        first_profit = _first_hit(profit_hit)
+        last_valid = valid.sum(axis=1) - 1
+
+        stopped = (first_stop <= first_profit) & (first_stop < max_hold_bars)
+        profited = ~stopped & (first_profit < max_hold_bars)
+        offset = np.where(stopped, first_stop, np.where(profited, first_profit, np.maximum(last_valid, 0)))
+        exit_index = np.where(last_valid >= 0, rows[np.arange(len(rows)), offset], entry_index)
+        gap_open = open_[exit_index]
+        stop_price = np.where(side > 0, np.minimum(stop_loss, gap_open), np.maximum(stop_loss, gap_open))
+        exit_price = np.where(stopped, stop_price, np.where(profited, take_profit, close[exit_index]))
+        exit_reason = np.where(stopped, EXIT_STOP_LOSS, np.where(profited, EXIT_TAKE_PROFIT, EXIT_TIMEOUT))
+
+        for key, value in (('signal_index', index), ('side', side), ('entry_index', entry_index),
+                           ('entry_price', entry_price), ('exit_index', exit_index),
+                           ('exit_price', exit_price), ('exit_reason', exit_reason)):
+            results[key].append(value)
+
+    trades = {key: np.concatenate(values) if values else np.array([]) for key, values in results.items()}
+    if len(trades['side']):
+        trades['return'] = trades['side'] * (trades['exit_price'] / trades['entry_price'] - 1) - 2 * fee
+    else:
+        trades['return'] = np.array([])
+    trades['signals'] = len(candidates)
+    return trades
+
+
+def select_sequential(trades: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    按时间顺序选取互不重叠的交易（平仓后才接受新的信号）
+
+    Args:
+        trades: simulate_trades的结果
+
+    Returns:
+        选中交易的下标
+    """
+    signal_index = trades['signal_index']
+    # 每笔交易平仓后可以接受的下一笔交易
+    next_position = np.searchsorted(signal_index, trades['exit_index'], side='left').tolist()
+    count = len(next_position)
+    selected = []
+    position = 0
+    while position < count:
+        selected.append(position)
+        position = next_position[position]
+    return np.array(selected, dtype=int)
+
+
+def summarize_trades(returns: np.ndarray, reasons: np.ndarray) -> Dict[str, float]:
+    """
+    计算交易统计
+
+    Args:
+        returns: 每笔交易的收益率
+        reasons: 平仓原因
+
+    Returns:
+        trades、hit_rate（止盈比例）、win_rate、avg_return、total_return（复利）、
+        max_drawdown、profit_factor
+    """
+    if len(returns) == 0:
+        return {'trades': 0, 'hit_rate': 0.0, 'win_rate': 0.0, 'avg_return': 0.0,
+                'total_return': 0.0, 'max_drawdown': 0.0, 'profit_factor': 0.0}
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    gains = returns[returns > 0].sum()
+    losses = -returns[returns < 0].sum()
+    return {
+        'trades': int(len(returns)),
+        'hit_rate': float(np.mean(reasons == EXIT_TAKE_PROFIT)),
+        'win_rate': float(np.mean(returns > 0)),
+        'avg_return': float(returns.mean()),
+        'total_return': float(equity[-1] - 1),
+        'max_drawdown': float(np.max(1 - equity / peak)),
+        'profit_factor': float(gains / losses) if losses > 0 else float('inf')
+    }
+
+
+def run_backtest(data: Dict[str, pd.DataFrame], strategy: str, params: Optional[Dict[str, Any]] = None,
+                 simulation: Optional[Dict[str, Any]] = None,
+                 features: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """
+    运行回测
+
+    Args:
+        data: 周期 -> K线DataFrame
+        strategy: 策略类型
+        params: 规则参数（见backtest.rules.DEFAULT_PARAMS）
+        simulation: 模拟参数entry_bars、max_hold_bars和fee
+        features: 已计算的特征，提供时跳过指标计算
+
+    Returns:
+        summary: 互不重叠交易的统计（资金曲线）
+        signals: 所有已成交信号的统计（信号质量）
+        trades: 互不重叠交易的明细DataFrame
+    """
+    settings = dict(DEFAULT_SIMULATION[strategy])
+    settings.update(simulation or {})
+
+    started = time.perf_counter()
+    if features is None:
+        features = prepare_features(data, strategy)
+    prepared = time.perf_counter()
+    signals = evaluate_signals(features, strategy, params)
+    trades = simulate_trades(features, signals, settings['entry_bars'], settings['max_hold_bars'], settings['fee'])
+    selected = select_sequential(trades)
+    finished = time.perf_counter()
+
+    timestamps = pd.to_datetime(features['timestamp'], unit='ms')
+    detail = pd.DataFrame({
+        'signal_time': timestamps[trades['signal_index'][selected]] if len(selected) else [],
+        'side': trades['side'][selected],
+        'entry_time': timestamps[trades['entry_index'][selected]] if len(selected) else [],
+        'entry_price': trades['entry_price'][selected],
+        'exit_time': timestamps[trades['exit_index'][selected]] if len(selected) else [],
+        'exit_price': trades['exit_price'][selected],
+        'exit_reason': trades['exit_reason'][selected],
+        'return': trades['return'][selected]
+    })
+
+    summary = summarize_trades(trades['return'][selected], trades['exit_reason'][selected])
+    signal_stats = summarize_trades(trades['return'], trades['exit_reason'])
+    signal_stats['signals'] = int(trades['signals'])
+    signal_stats['fill_rate'] = len(trades['return']) / trades['signals'] if trades['signals'] else 0.0
+    del signal_stats['total_return'], signal_stats['max_drawdown']
+
+    logger.info(f"{strategy}策略回测完成：{len(features['close'])}根{STRATEGY_TIMEFRAMES[strategy][0]}K线，"
+                f"指标计算{prepared - started:.2f}秒，信号和模拟{finished - prepared:.2f}秒")
+    return {
+        'strategy': strategy,
+        'bars': int(len(features['close'])),
+        'start': str(timestamps[0]) if len(timestamps) else None,
+        'end': str(timestamps[-1]) if len(timestamps) else None,
+        'simulation': settings,
+        'summary': summary,
+        'signals': signal_stats,
+        'timing_s': {'features': prepared - started, 'simulation': finished - prepared},
+        'trades': detail
+    }
@@ -0,0 +1,285 @@
+"""
+向量化信号规则
+
+与MarketAnalyzer中三个信号推送报告的规则一致，但一次计算所有K线（short和mid使用与报告相同的rule_engine编译规则）：
+- prepare_features：计算指标并把高周期的最近一根已收盘K线对齐到基准周期（耗时，只需一次）
+- evaluate_signals：按规则参数计算每根K线的推荐方向以及报告给出的入场区间、止盈和止损（很快，可反复调用）
+
+与实时报告的差异：
+- 实时报告使用的是当前未收盘的K线，回测在每根基准K线收盘时评估，高周期使用最近一根已收盘的K线，避免未来数据
+- 历史资金费率和链上数据(MVRV-Z、NVT)不在K线文件中，可以在基准K线中提供funding_rate、mvrv_z、nvt列，
+  缺失时按实时报告取不到数据时的默认值0处理
+- 筹码分布固定使用基准周期最近100根K线计算（实时报告使用第一个获取到的周期）
+"""
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import IndicatorPipeline, VOLUME_PROFILE_BINS
+from rule_engine import DEFAULT_RULES, compile_strategy, trend_direction
+from backtest.data import close_times
+
+# 各策略的基准周期（评估和模拟交易使用的周期）和需要的周期
+STRATEGY_TIMEFRAMES = {
+    'short': ('15m', ['15m']),
+    'mid': ('1h', ['1h', '4h', '1d']),
+    'long': ('1d', ['1d', '1w'])
+}
+
+
+def _rule_params(strategy: str) -> Dict[str, Any]:
+    """把规则引擎中的策略定义展开为回测参数"""
+    definition = DEFAULT_RULES[strategy]
+    return dict(definition['params'], weights=dict(definition['weights']), threshold=definition['threshold'])
+
+
+# 默认规则参数：short和mid来自rule_engine.DEFAULT_RULES（weights、threshold和params展开到同一层）
+DEFAULT_PARAMS = {
+    'short': _rule_params('short'),
+    'mid': _rule_params('mid'),
+    'long': {
+        'range_pct': 0.03,
+        'nvt_low': 20,
+        'nvt_high': 100
+    }
+}
+
+# 影响报告价格（入场区间、止盈、止损）的参数，其他参数只影响推荐方向
+LEVEL_PARAMS = {
+    'short': [],
+    'mid': ['range_pct'],
+    'long': ['range_pct']
+}
+
+# 筹码分布的窗口大小（与MarketData.get_historical_data的默认limit一致）
+VOLUME_PROFILE_WINDOW = 100
+
+
+def merge_params(strategy: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    合并默认参数和自定义参数
+
+    Args:
+        strategy: 策略类型
+        params: 自定义参数，weights可以只提供部分权重
+
+    Returns:
+        完整的参数字典
+    """
+    merged = dict(DEFAULT_PARAMS[strategy])
+    for key, value in (params or {}).items():
+        if key == 'weights':
+            merged['weights'] = dict(merged['weights'], **value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def chip_profit_percentage(close: np.ndarray, volume: np.ndarray, window: int = VOLUME_PROFILE_WINDOW,
+                           chunk_size: int = 5000) -> np.ndarray:
+    """
+    计算每根K线的获利盘比例（与IndicatorPipeline.volume_profile的分箱方式一致）
+
+    最近window根K线的收盘价按最高最低价等分为10个区间（区间边界与报告一样保留6位小数），
+    统计上界不高于当前价格的区间的成交量占比，不落入任何区间的K线不计入总成交量
+
+    Args:
+        close: 收盘价
+        volume: 成交量
+        window: 窗口大小
+        chunk_size: 每批计算的K线数，限制内存占用
+
+    Returns:
+        获利盘比例（%），窗口不足或价格无波动时为NaN
+    """
+    result = np.full(len(close), np.nan)
+    if len(close) < window:
+        return result
+    close_windows = sliding_window_view(close, window)
+    volume_windows = sliding_window_view(volume, window)
+    steps = np.arange(VOLUME_PROFILE_BINS)
+    for start in range(0, len(close_windows), chunk_size):
+        prices = close_windows[start:start + chunk_size]
+        volumes = volume_windows[start:start + chunk_size]
+        low = prices.min(axis=1)[:, None]
+        interval = (prices.max(axis=1)[:, None] - low) / VOLUME_PROFILE_BINS
+        lower = low + steps * interval
+        lower_bounds = np.round(lower, 6)
+        upper_bounds = np.round(lower + interval, 6)
+
+        # 与逐行遍历一致：落入第一个满足 下界 <= 价格 < 上界 的区间
+        matches = (prices[:, :, None] >= lower_bounds[:, None, :]) & (prices[:, :, None] < upper_bounds[:, None, :])
+        in_profile = matches.any(axis=2)
+        bins = matches.argmax(axis=2)
+        profitable = upper_bounds <= prices[:, -1:]
+        below = in_profile & np.take_along_axis(profitable, bins, axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            total = np.where(in_profile, volumes, 0.0).sum(axis=1)
+            profit = np.where(below, volumes, 0.0).sum(axis=1) / total * 100
+        profit[interval[:, 0] == 0] = np.nan
+        result[start + window - 1:start + window - 1 + len(prices)] = profit
+    return result
+
+
+def _align(base_times: np.ndarray, frame: pd.DataFrame, interval: str, columns) -> Dict[str, np.ndarray]:
+    """取每根基准K线收盘时最近一根已收盘的高周期K线的指标"""
+    closes = close_times(frame, interval)
+    index = np.searchsorted(closes, base_times, side='right') - 1
+    valid = index >= 0
+    aligned = {}
+    for column in columns:
+        values = frame[column].to_numpy(dtype=float)
+        aligned[column] = np.where(valid, values[np.clip(index, 0, None)], np.nan)
+    return aligned
+
+
+def _optional_column(df: pd.DataFrame, column: str) -> np.ndarray:
+    if column in df:
+        return df[column].to_numpy(dtype=float)
+    return np.zeros(len(df))
+
+
+def prepare_features(data: Dict[str, pd.DataFrame], strategy: str) -> Dict[str, np.ndarray]:
+    """
+    计算策略规则需要的全部特征
+
+    Args:
+        data: 周期 -> K线DataFrame（至少包含策略需要的周期）
+        strategy: 策略类型
+
+    Returns:
+        特征名 -> 与基准周期K线对齐的数组
+    """
+    base_interval, intervals = STRATEGY_TIMEFRAMES[strategy]
+    frames = {interval: IndicatorPipeline.calculate(data[interval].copy()) for interval in intervals}
+    base = frames[base_interval]
+    features = {column: base[column].to_numpy(dtype=float) for column in ['open', 'high', 'low', 'close']}
+    features['timestamp'] = base['timestamp'].values.astype('datetime64[ms]').astype('int64')
+    base_times = close_times(base, base_interval)
+
+    if strategy == 'short':
+        for column in ['rsi', 'macd', 'macd_signal', 'ema5', 'ema13', 'volume', 'volume_ma20']:
+            features[column] = base[column].to_numpy(dtype=float)
+        features['funding_rate'] = _optional_column(base, 'funding_rate')
+        features['chip_profit'] = chip_profit_percentage(features['close'], features['volume'])
+    elif strategy == 'mid':
+        daily = _align(base_times, frames['1d'], '1d', ['rsi', 'macd', 'macd_signal', 'ema5', 'ema13', 'ma20', 'ma50'])
+        four_hour = _align(base_times, frames['4h'], '4h', ['ema5', 'ema13', 'ma20', 'ma50'])
+        features.update({f"1d_{key}": value for key, value in daily.items()})
+        features.update({f"4h_{key}": value for key, value in four_hour.items()})
+        features['funding_rate'] = _optional_column(base, 'funding_rate')
+    else:
+        weekly = _align(base_times, frames['1w'], '1w', ['ema5', 'ema13', 'ma20', 'ma50'])
+        features.update({f"1w_{key}": value for key, value in weekly.items()})
+        for column in ['ema5', 'ema13', 'ma20', 'ma50']:
+            features[f"1d_{column}"] = base[column].to_numpy(dtype=float)
+        features['mvrv_z'] = _optional_column(base, 'mvrv_z')
+        features['nvt'] = _optional_column(base, 'nvt')
+    return features
+
+
+def _short_signals(f: Dict[str, np.ndarray], p: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """短期策略：_generate_short_term_signal_push的加权信号"""
+    price = f['close']
+    result = compile_strategy('short', p).evaluate(f)
+    direction = result['direction']
+
+    long_side = direction > 0
+    return {
+        'score': result['score'],
+        'direction': direction,
+        'side': direction,
+        'entry_low': price * np.where(long_side, 0.997, 0.998),
+        'entry_high': price * np.where(long_side, 1.002, 1.003),
+        'take_profit': price * np.where(long_side, 1.015, 0.985),
+        'stop_loss': price * np.where(long_side, 0.99, 1.01)
+    }
+
+
+def _mid_signals(f: Dict[str, np.ndarray], p: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """中期策略：_generate_mid_term_signal_push的信号评分"""
+    price = f['close']
+    result = compile_strategy('mid', p).evaluate(f)
+    score = result['score']
+    direction = result['direction']
+    trend_1d, _ = trend_direction(f['1d_ema5'], f['1d_ema13'], f['1d_ma20'], f['1d_ma50'], f['1d_ma50'])
+
+    # 报告中的止盈止损按日线趋势方向给出
+    price_range = price * p['range_pct']
+    bullish = trend_1d == 1
+    take_profit = np.where(bullish, price + price_range * 2, price - price_range * 2)
+    return {
+        'score': score,
+        'direction': direction,
+        'side': np.where(direction != 0, np.where(bullish, 1, -1), 0),
+        'entry_low': price - price_range * 0.5,
+        'entry_high': price + price_range * 0.5,
+        'take_profit': take_profit,
+        'stop_loss': np.where(bullish, price - price_range * 1.5, price + price_range * 1.5)
+    }
+
+
+def _long_signals(f: Dict[str, np.ndarray], p: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """长期策略：_generate_long_term_signal_push的多空信号计数"""
+    price = f['close']
+    mvrv_z = f['mvrv_z']
+    nvt = f['nvt']
+    trend_1w, _ = trend_direction(f['1w_ema5'], f['1w_ema13'], f['1w_ma20'], f['1w_ma50'], f['1w_ma50'])
+    trend_1d, _ = trend_direction(f['1d_ema5'], f['1d_ema13'], f['1d_ma20'], f['1d_ma50'], f['1d_ma50'])
+
+    bullish = (np.select([mvrv_z < -1, mvrv_z < 0], [2, 1], 0) + (nvt < p['nvt_low']) +
+               (trend_1w == 1) + (trend_1d == 1))
+    bearish = (np.select([mvrv_z > 3, mvrv_z > 1], [2, 1], 0) + ((nvt >= p['nvt_low']) & (nvt > p['nvt_high'])) +
+               (trend_1w == -1) + (trend_1d == -1))
+    direction = np.select([bullish >= 3, bearish >= 3, bullish >= 2, bearish >= 2], [1, -1, 1, -1], 0)
+
+    # 报告中的止盈止损按MVRV-Z区域和周线趋势给出
+    price_range = price * p['range_pct']
+    take_profit = np.select(
+        [mvrv_z < -0.5, mvrv_z > 2, trend_1w == 1, trend_1w == -1],
+        [price + price_range * 5, price - price_range * 5, price + price_range * 3, price - price_range * 3],
+        price + price_range * 2
+    )
+    stop_loss = np.select(
+        [mvrv_z < -0.5, mvrv_z > 2, trend_1w == 1, trend_1w == -1],
+        [price - price_range * 1.5, price + price_range * 1.5, price - price_range * 2, price + price_range * 2],
+        price - price_range * 2
+    )
+    return {
+        'score': (bullish - bearish).astype(float),
+        'direction': direction,
+        'side': np.where(direction != 0, np.where(take_profit > price, 1, -1), 0),
+        'entry_low': price - price_range * 0.5,
+        'entry_high': price + price_range * 0.5,
+        'take_profit': take_profit,
+        'stop_loss': stop_loss
+    }
+
+
+SIGNAL_FUNCTIONS = {
+    'short': _short_signals,
+    'mid': _mid_signals,
+    'long': _long_signals
+}
+
+
+def evaluate_signals(features: Dict[str, np.ndarray], strategy: str,
+                     params: Optional[Dict[str, Any]] = None) -> Dict[str, np.ndarray]:
+    """
+    计算每根基准K线的信号
+
+    Args:
+        features: prepare_features的结果
+        strategy: 策略类型
+        params: 规则参数，未提供的使用DEFAULT_PARAMS
+
+    Returns:
+        score: 综合评分
+        direction: 报告的推荐方向（1做多，-1做空，0观望）
+        side: 按报告的止盈止损方向模拟交易的方向（0表示不交易）
+        entry_low/entry_high/take_profit/stop_loss: 报告给出的价格
+    """
+    return SIGNAL_FUNCTIONS[strategy](features, merge_params(strategy, params))
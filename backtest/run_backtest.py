@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+信号回测脚本
+
+从本地K线文件回放历史数据，按short/mid/long信号推送报告的规则和价格模拟交易，
+输出收益、命中率和最大回撤
+
+用法:
+    python -m backtest.run_backtest --data data/BTCUSDT-15m --strategy short
+    python -m backtest.run_backtest --data BTCUSDT-1h.csv --interval 1h --strategy mid --trades trades.csv
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.data import load_timeframes
+from backtest.engine import run_backtest, DEFAULT_SIMULATION
+from backtest.rules import STRATEGY_TIMEFRAMES
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="信号规则离线回测")
+    parser.add_argument('--data', required=True, help="K线文件或目录（Binance CSV或JSON）")
+    parser.add_argument('--interval', default='15m', help="文件中K线的周期，需不大于策略的基准周期")
+    parser.add_argument('--strategy', nargs='+', default=['short'], choices=['short', 'mid', 'long'], help="回测的策略")
+    parser.add_argument('--params', default=None, help="规则参数JSON文件（覆盖默认的权重和阈值）")
+    parser.add_argument('--entry-bars', type=int, default=None, help="挂单有效的K线数")
+    parser.add_argument('--max-hold-bars', type=int, default=None, help="最长持仓K线数")
+    parser.add_argument('--fee', type=float, default=None, help="单边手续费率")
+    parser.add_argument('--trades', default=None, help="交易明细CSV输出路径（多个策略时追加策略名）")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    parser.add_argument('--log-level', default='WARNING', help="日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    params = {}
+    if args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+
+    intervals = sorted({interval for strategy in args.strategy for interval in STRATEGY_TIMEFRAMES[strategy][1]})
+    data = load_timeframes(args.data, args.interval, intervals)
+
+    results = {}
+    for strategy in args.strategy:
+        simulation = {key: value for key, value in (('entry_bars', args.entry_bars),
+                                                    ('max_hold_bars', args.max_hold_bars),
+                                                    ('fee', args.fee)) if value is not None}
+        result = run_backtest(data, strategy, params.get(strategy, params if len(args.strategy) == 1 else None),
+                              dict(DEFAULT_SIMULATION[strategy], **simulation))
+        trades = result.pop('trades')
+        if args.trades:
+            path = args.trades if len(args.strategy) == 1 else args.trades.replace('.csv', f"_{strategy}.csv")
+            trades.to_csv(path, index=False)
+        results[strategy] = result
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+参数搜索脚本
+
+在历史K线上并行搜索信号规则的权重和阈值，输出按指标排序的参数表
+
+用法:
+    python -m backtest.run_sweep --data data/BTCUSDT-15m --strategy short --checkpoint sweep.jsonl --output ranked.csv
+    python -m backtest.run_sweep --data data/BTCUSDT-15m --strategy short --space space.json --mode random --samples 500
+
+space.json示例（参数名中的"."表示嵌套，范围只能用于随机搜索或提供step）:
+    {"weights.rsi": [0.1, 0.15, 0.2], "threshold": {"min": 0.1, "max": 0.5, "step": 0.05},
+     "rsi_oversold": {"min": 20, "max": 40}}
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.data import load_timeframes
+from backtest.rules import STRATEGY_TIMEFRAMES, prepare_features
+from backtest.sweep import DEFAULT_SWEEP_SPACE, generate_combinations, run_sweep, rank_results, to_params
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="信号规则参数搜索")
+    parser.add_argument('--data', required=True, help="K线文件或目录（Binance CSV或JSON）")
+    parser.add_argument('--interval', default='15m', help="文件中K线的周期，需不大于策略的基准周期")
+    parser.add_argument('--strategy', default='short', choices=['short', 'mid', 'long'], help="搜索的策略")
+    parser.add_argument('--space', default=None, help="搜索空间JSON文件，默认使用DEFAULT_SWEEP_SPACE")
+    parser.add_argument('--mode', default='grid', choices=['grid', 'random'], help="网格搜索或随机搜索")
+    parser.add_argument('--samples', type=int, default=200, help="随机搜索的组合数")
+    parser.add_argument('--seed', type=int, default=0, help="随机搜索的随机种子")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数，默认为CPU核数")
+    parser.add_argument('--batch-size', type=int, default=16, help="每个任务包含的组合数")
+    parser.add_argument('--checkpoint', default=None, help="检查点文件（JSONL），中断后使用同一文件继续")
+    parser.add_argument('--entry-bars', type=int, default=None, help="挂单有效的K线数")
+    parser.add_argument('--max-hold-bars', type=int, default=None, help="最长持仓K线数")
+    parser.add_argument('--fee', type=float, default=None, help="单边手续费率")
+    parser.add_argument('--sort', default='total_return', help="排序指标，例如total_return、profit_factor、max_drawdown")
+    parser.add_argument('--min-trades', type=int, default=30, help="交易数少于该值的组合不参与排名")
+    parser.add_argument('--top', type=int, default=20, help="输出到终端的行数")
+    parser.add_argument('--output', default=None, help="完整排名表CSV输出路径")
+    parser.add_argument('--best', default=None, help="最优参数JSON输出路径（可用于run_backtest --params）")
+    parser.add_argument('--log-level', default='INFO', help="日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    space = DEFAULT_SWEEP_SPACE[args.strategy]
+    if args.space:
+        with open(args.space, 'r', encoding='utf-8') as f:
+            space = json.load(f)
+    combos = generate_combinations(space, args.mode, args.samples, args.seed)
+
+    data = load_timeframes(args.data, args.interval, STRATEGY_TIMEFRAMES[args.strategy][1])
+    features = prepare_features(data, args.strategy)
+    simulation = {key: value for key, value in (('entry_bars', args.entry_bars),
+                                                ('max_hold_bars', args.max_hold_bars),
+                                                ('fee', args.fee)) if value is not None}
+
+    results = run_sweep(features, args.strategy, combos, simulation, args.workers, args.batch_size,
+                        args.checkpoint, meta={'data': os.path.abspath(args.data), 'interval': args.interval})
+    table = rank_results(results, args.sort, args.min_trades)
+    if table.empty:
+        print(f"没有交易数不少于{args.min_trades}的参数组合")
+        return
+
+    if args.output:
+        table.to_csv(args.output, index=False)
+    if args.best:
+        with open(args.best, 'w', encoding='utf-8') as f:
+            best = {name: table.loc[0, name] for name in space}
+            json.dump({args.strategy: to_params(best)}, f, ensure_ascii=False, indent=2, default=lambda value: value.item())
+
+    with_columns = ['rank'] + sorted(space) + ['trades', 'total_return', 'max_drawdown', 'profit_factor',
+                                               'hit_rate', 'signal_hit_rate']
+    print(table[with_columns].head(args.top).to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,402 @@
+"""
+并行参数搜索
+
+在历史数据上对信号规则的权重和阈值做网格搜索或随机搜索：
+- 特征只在主进程计算一次，放入共享内存，工作进程直接映射为只读数组，不复制数据
+- 参数组合按批分发到进程池，每批完成后追加写入检查点(JSONL)，中断后重新运行会跳过已完成的组合
+- 工作进程缓存每根K线做多/做空的模拟结果，报告价格相同的组合之间只需重新计算推荐方向
+"""
+
+import os
+import json
+import random
+import logging
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+from backtest.rules import LEVEL_PARAMS, evaluate_signals
+from backtest.engine import DEFAULT_SIMULATION, simulate_trades, select_sequential, summarize_trades
+
+logger = logging.getLogger(__name__)
+
+# 默认搜索空间（参数名中的"."表示嵌套，例如weights.rsi）
+DEFAULT_SWEEP_SPACE = {
+    'short': {
+        'weights.rsi': [0.1, 0.15, 0.2],
+        'weights.macd': [0.15, 0.2, 0.25],
+        'weights.ema': [0.2, 0.25, 0.3],
+        'threshold': [0.2, 0.3, 0.4],
+        'rsi_oversold': [25, 30, 35],
+        'rsi_overbought': [65, 70, 75]
+    },
+    'mid': {
+        'weights.trend_1d': [1, 2, 3],
+        'weights.trend_4h': [0, 1, 2],
+        'rsi_mid': [45, 50, 55],
+        'range_pct': [0.005, 0.01, 0.02]
+    },
+    'long': {
+        'range_pct': [0.02, 0.03, 0.05],
+        'nvt_low': [15, 20, 30],
+        'nvt_high': [80, 100, 150]
+    }
+}
+
+
+def _expand_values(name: str, values: Any) -> List[Any]:
+    """把搜索空间中的一个参数展开为候选值列表（网格搜索使用）"""
+    if isinstance(values, list):
+        return values
+    if isinstance(values, dict) and 'step' in values:
+        count = int(round((values['max'] - values['min']) / values['step'])) + 1
+        return [round(values['min'] + i * values['step'], 10) for i in range(count)]
+    raise ValueError(f"网格搜索的参数{name}需要提供候选值列表或min/max/step")
+
+
+def _sample_value(values: Any, rng: random.Random) -> Any:
+    """从搜索空间中随机取一个参数值（随机搜索使用）"""
+    if isinstance(values, list):
+        return rng.choice(values)
+    low, high = values['min'], values['max']
+    if isinstance(low, int) and isinstance(high, int):
+        return rng.randint(low, high)
+    return round(rng.uniform(low, high), 4)
+
+
+def generate_combinations(space: Dict[str, Any], mode: str = 'grid', samples: int = 100,
+                          seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    生成参数组合
+
+    Args:
+        space: 参数名 -> 候选值列表，或{min, max[, step]}范围
+        mode: grid（全部组合）或random（随机抽样）
+        samples: 随机搜索的组合数
+        seed: 随机种子
+
+    Returns:
+        参数组合列表（参数名为扁平的"a.b"形式），顺序和内容只由输入决定
+    """
+    names = sorted(space)
+    if mode == 'grid':
+        grids = [_expand_values(name, space[name]) for name in names]
+        return [dict(zip(names, values)) for values in itertools.product(*grids)]
+    if mode == 'random':
+        rng = random.Random(seed)
+        combos, seen = [], set()
+        for _ in range(samples * 10):
+            combo = {name: _sample_value(space[name], rng) for name in names}
+            key = combination_key(combo)
+            if key not in seen:
+                seen.add(key)
+                combos.append(combo)
+            if len(combos) >= samples:
+                break
+        return combos
+    raise ValueError(f"不支持的搜索方式: {mode}")
+
+
+def combination_key(combo: Dict[str, Any]) -> str:
+    """参数组合的唯一标识（用于检查点去重）"""
+    return json.dumps(combo, sort_keys=True)
+
+
+def to_params(combo: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把扁平的参数组合转换为evaluate_signals使用的嵌套参数
+
+    Args:
+        combo: 例如{'weights.rsi': 0.2, 'threshold': 0.3}
+
+    Returns:
+        例如{'weights': {'rsi': 0.2}, 'threshold': 0.3}
+    """
+    params = {}
+    for name, value in combo.items():
+        target = params
+        *parents, leaf = name.split('.')
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    return params
+
+
+class SharedArrays:
+    """
+    共享内存中的只读数组集合
+
+    主进程使用create放入数组并把layout传给工作进程，工作进程使用attach映射为numpy数组
+    """
+
+    def __init__(self, blocks: List[shared_memory.SharedMemory], arrays: Dict[str, np.ndarray], owner: bool):
+        self._blocks = blocks
+        self.arrays = arrays
+        self.owner = owner
+        self.layout = {name: (block.name, array.shape, array.dtype.str)
+                       for block, (name, array) in zip(blocks, arrays.items())}
+
+    @classmethod
+    def create(cls, arrays: Dict[str, np.ndarray]) -> 'SharedArrays':
+        """把数组复制到新建的共享内存块"""
+        blocks, shared = [], {}
+        try:
+            for name, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                view[...] = array
+                view.flags.writeable = False
+                shared[name] = view
+        except Exception:
+            for block in blocks:
+                block.close()
+                block.unlink()
+            raise
+        return cls(blocks, shared, owner=True)
+
+    @classmethod
+    def attach(cls, layout: Dict[str, tuple]) -> 'SharedArrays':
+        """在工作进程中映射已有的共享内存块（由创建者负责删除）"""
+        blocks, shared = [], {}
+        for name, (block_name, shape, dtype) in layout.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            view.flags.writeable = False
+            shared[name] = view
+        return cls(blocks, shared, owner=False)
+
+    def close(self):
+        """释放映射，创建者同时删除共享内存块"""
+        self.arrays = {}
+        for block in self._blocks:
+            block.close()
+            if self.owner:
+                block.unlink()
+        self._blocks = []
+
+
+class TradeCache:
+    """
+    按K线缓存模拟结果
+
+    报告价格只由推荐方向和LEVEL_PARAMS中的参数决定，因此同一组价格参数下，
+    每根K线做多/做空的模拟结果可以在不同的权重和阈值组合之间复用
+    """
+
+    FIELDS = ['entry_index', 'entry_price', 'exit_index', 'exit_price', 'exit_reason']
+
+    def __init__(self, features: Dict[str, np.ndarray], simulation: Dict[str, Any]):
+        self.features = features
+        self.simulation = simulation
+        self.bars = len(features['close'])
+        self._tables = {}
+
+    def _table(self, level_key: str, side: int) -> Dict[str, np.ndarray]:
+        key = (level_key, side)
+        if key not in self._tables:
+            self._tables[key] = {
+                'computed': np.zeros(self.bars, dtype=bool),
+                'filled': np.zeros(self.bars, dtype=bool),
+                **{field: np.zeros(self.bars) for field in self.FIELDS}
+            }
+        return self._tables[key]
+
+    def trades(self, signals: Dict[str, np.ndarray], level_key: str) -> Dict[str, np.ndarray]:
+        """
+        获取信号对应的交易，只模拟缓存中没有的K线
+
+        Returns:
+            与simulate_trades格式相同的结果
+        """
+        side = signals['side']
+        parts = []
+        for direction in (1, -1):
+            table = self._table(level_key, direction)
+            index = np.nonzero(side == direction)[0]
+            missing = index[~table['computed'][index]]
+            if len(missing):
+                pending = dict(signals)
+                pending['side'] = np.zeros(self.bars, dtype=int)
+                pending['side'][missing] = direction
+                simulated = simulate_trades(self.features, pending, self.simulation['entry_bars'],
+                                            self.simulation['max_hold_bars'])
+                rows = simulated['signal_index'].astype(int)
+                table['computed'][missing] = True
+                table['filled'][rows] = True
+                for field in self.FIELDS:
+                    table[field][rows] = simulated[field]
+            filled = index[table['filled'][index]]
+            parts.append((filled, direction, table))
+
+        signal_index = np.concatenate([filled for filled, _, _ in parts])
+        order = np.argsort(signal_index, kind='stable')
+        trades = {'signal_index': signal_index[order],
+                  'side': np.concatenate([np.full(len(filled), direction) for filled, direction, _ in parts])[order]}
+        for field in self.FIELDS:
+            trades[field] = np.concatenate([table[field][filled] for filled, _, table in parts])[order]
+        for field in ['entry_index', 'exit_index', 'exit_reason']:
+            trades[field] = trades[field].astype(int)
+        trades['return'] = (trades['side'] * (trades['exit_price'] / trades['entry_price'] - 1)
+                            - 2 * self.simulation['fee']) if len(signal_index) else np.array([])
+        trades['signals'] = int(np.count_nonzero(side))
+        return trades
+
+
+def evaluate_combination(features: Dict[str, np.ndarray], strategy: str, combo: Dict[str, Any],
+                         cache: TradeCache) -> Dict[str, Any]:
+    """
+    评估一组参数
+
+    Returns:
+        参数和统计结果的记录（signal_前缀为所有已成交信号的统计）
+    """
+    params = to_params(combo)
+    signals = evaluate_signals(features, strategy, params)
+    level_key = combination_key({name: combo.get(name) for name in LEVEL_PARAMS[strategy]})
+    trades = cache.trades(signals, level_key)
+    selected = select_sequential(trades)
+
+    record = {'params': combo}
+    record.update(summarize_trades(trades['return'][selected], trades['exit_reason'][selected]))
+    signal_stats = summarize_trades(trades['return'], trades['exit_reason'])
+    record['signal_signals'] = trades['signals']
+    record['signal_fill_rate'] = len(trades['return']) / trades['signals'] if trades['signals'] else 0.0
+    record['signal_hit_rate'] = signal_stats['hit_rate']
+    record['signal_avg_return'] = signal_stats['avg_return']
+    return record
+
+
+# 工作进程状态
+_worker = {}
+
+
+def _init_worker(layout: Dict[str, tuple], strategy: str, simulation: Dict[str, Any]):
+    """工作进程初始化：映射共享内存中的特征"""
+    shared = SharedArrays.attach(layout)
+    _worker['shared'] = shared
+    _worker['strategy'] = strategy
+    _worker['cache'] = TradeCache(shared.arrays, simulation)
+
+
+def _evaluate_batch(combos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """在工作进程中评估一批参数组合"""
+    shared = _worker['shared']
+    return [evaluate_combination(shared.arrays, _worker['strategy'], combo, _worker['cache']) for combo in combos]
+
+
+def _load_checkpoint(path: str, meta: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """读取检查点中已完成的组合，设置不一致时报错"""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 中断时最后一行可能不完整
+                logger.warning(f"忽略检查点{path}第{number + 1}行的不完整记录")
+                continue
+            if 'meta' in record:
+                if record['meta'] != meta:
+                    raise ValueError(f"检查点{path}的回测设置与当前不一致: {record['meta']}")
+                continue
+            done[combination_key(record['params'])] = record
+    return done
+
+
+def run_sweep(features: Dict[str, np.ndarray], strategy: str, combos: Iterable[Dict[str, Any]],
+              simulation: Optional[Dict[str, Any]] = None, workers: Optional[int] = None,
+              batch_size: int = 16, checkpoint: Optional[str] = None,
+              meta: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    并行评估参数组合
+
+    Args:
+        features: prepare_features的结果
+        strategy: 策略类型
+        combos: 参数组合（generate_combinations的结果）
+        simulation: 模拟参数entry_bars、max_hold_bars和fee
+        workers: 工作进程数，默认为CPU核数
+        batch_size: 每个任务包含的组合数
+        checkpoint: 检查点文件路径（JSONL），已存在时跳过其中已完成的组合
+        meta: 写入检查点的回测设置（例如数据文件），恢复时用于校验
+
+    Returns:
+        全部组合（包括检查点中已完成的）的结果记录
+    """
+    settings = dict(DEFAULT_SIMULATION[strategy])
+    settings.update(simulation or {})
+    meta = dict(meta or {}, strategy=strategy, simulation=settings, bars=int(len(features['close'])))
+
+    combos = list(combos)
+    done = _load_checkpoint(checkpoint, meta)
+    pending = [combo for combo in combos if combination_key(combo) not in done]
+    logger.info(f"{strategy}策略参数搜索: 共{len(combos)}组参数，检查点中已完成{len(combos) - len(pending)}组")
+
+    results = [done[combination_key(combo)] for combo in combos if combination_key(combo) in done]
+    if not pending:
+        return results
+
+    writer = None
+    if checkpoint:
+        new_file = not os.path.exists(checkpoint)
+        writer = open(checkpoint, 'a', encoding='utf-8')
+        if new_file:
+            writer.write(json.dumps({'meta': meta}) + '\n')
+            writer.flush()
+
+    shared = SharedArrays.create(features)
+    try:
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        workers = max(1, min(workers or os.cpu_count() or 1, len(batches)))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.layout, strategy, settings)) as executor:
+            futures = [executor.submit(_evaluate_batch, batch) for batch in batches]
+            for completed, future in enumerate(as_completed(futures), 1):
+                records = future.result()
+                results.extend(records)
+                if writer:
+                    writer.write(''.join(json.dumps(record) + '\n' for record in records))
+                    writer.flush()
+                if completed % max(1, len(batches) // 10) == 0 or completed == len(batches):
+                    logger.info(f"参数搜索进度: {len(results)}/{len(combos)}")
+    finally:
+        shared.close()
+        if writer:
+            writer.close()
+    return results
+
+
+def rank_results(results: List[Dict[str, Any]], sort_by: str = 'total_return',
+                 min_trades: int = 0) -> pd.DataFrame:
+    """
+    生成按指标排序的参数表
+
+    Args:
+        results: run_sweep的结果
+        sort_by: 排序指标，max_drawdown按从小到大排序，其他指标从大到小
+        min_trades: 交易数少于该值的组合不参与排名
+
+    Returns:
+        每行一组参数的DataFrame，rank从1开始
+    """
+    rows = [dict(record['params'], **{key: value for key, value in record.items() if key != 'params'})
+            for record in results]
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+    table = table[table['trades'] >= min_trades]
+    table = table.sort_values(sort_by, ascending=(sort_by == 'max_drawdown'), kind='stable')
+    table.insert(0, 'rank', range(1, len(table) + 1))
+    return table.reset_index(drop=True)
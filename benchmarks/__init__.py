@@ -0,0 +1,6 @@
+"""
+性能基准测试模块
+
+提供离线的模拟数据源（模拟Binance客户端和CMC数据源）以及基准测试脚本，
+用于在不访问真实API的情况下测量各处理阶段的耗时，并比较不同提交之间的性能变化
+"""
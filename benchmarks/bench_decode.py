@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线响应体解码基准测试
+
+对100根和1000根K线的原始响应体比较以下解码方式的耗时，结果以JSON输出：
+- legacy: 标准库json（python-binance的response.json()）+ 原来的12列DataFrame和astype(float)
+- stdlib: 标准库json + parse_klines
+- fast: parse_kline_payload（安装了orjson时使用orjson）+ parse_klines
+
+用法:
+    python -m benchmarks.bench_decode --sizes 100 1000 --iterations 200
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_market import summarize, _git_commit
+from benchmarks.bench_klines import legacy_klines_to_frame
+from benchmarks.fakes import synthesize_klines
+from fast_json import HAS_ORJSON
+from market_data import parse_klines, parse_kline_payload
+
+# 参与比较的解码方式
+DECODERS = {
+    'legacy': lambda payload: legacy_klines_to_frame(json.loads(payload)),
+    'stdlib': lambda payload: parse_klines(json.loads(payload)),
+    'fast': parse_kline_payload
+}
+
+
+def run_benchmark(sizes: List[int], iterations: int) -> Dict[str, Any]:
+    """对每种K线数量分别测量各解码方式的耗时"""
+    results = {}
+    for size in sizes:
+        payload = json.dumps(synthesize_klines('BTCUSDT', '1h', limit=size)).encode()
+        samples = {name: [] for name in DECODERS}
+        for _ in range(iterations):
+            for name, decode in DECODERS.items():
+                started = time.perf_counter()
+                decode(payload)
+                samples[name].append(time.perf_counter() - started)
+        stages = {name: summarize(values) for name, values in samples.items()}
+        results[str(size)] = {
+            'payload_bytes': len(payload),
+            'stages': stages,
+            'speedup': round(stages['legacy']['p50_ms'] / stages['fast']['p50_ms'], 2)
+            if stages['fast']['p50_ms'] else None
+        }
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'orjson': HAS_ORJSON,
+        'iterations': iterations,
+        'sizes': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K线响应体解码基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000], help="K线数量")
+    parser.add_argument('--iterations', type=int, default=200, help="重复次数")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.iterations)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+技术指标流水线基准测试
+
+Binance和CMC两个数据源的原始K线都经过IndicatorPipeline计算技术指标和筹码分布，
+本测试分别对两种来源的K线测量以下阶段的耗时，结果以JSON输出：
+- indicators.<来源>: IndicatorPipeline.calculate
+- volume_profile.<来源>: IndicatorPipeline.volume_profile（向量化）
+- volume_profile_legacy.<来源>: 原来逐行遍历、逐个区间解析字符串的筹码分布实现，仅用于对比
+
+用法:
+    python -m benchmarks.bench_indicators --rows 1000 --iterations 20
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_market import summarize, _git_commit
+from benchmarks.fakes import synthesize_klines
+from indicators import IndicatorPipeline
+from market_data import MarketData
+from cmc_data import synthesize_ohlcv, synthetic_seed
+
+
+def legacy_volume_profile(df: pd.DataFrame) -> Dict[str, float]:
+    """原来的筹码分布计算方式（iterrows逐行遍历，逐个区间解析边界），仅用于对比"""
+    prices = df['close'].values
+    min_price = min(prices)
+    max_price = max(prices)
+    interval = (max_price - min_price) / 10
+    volume_profile = {}
+    for i in range(10):
+        lower_bound = min_price + (i * interval)
+        upper_bound = lower_bound + interval
+        volume_profile[f"{lower_bound:.6f}-{upper_bound:.6f}"] = 0
+    for _, row in df.iterrows():
+        close_price = float(row['close'])
+        volume = float(row['volume'])
+        for price_range in volume_profile:
+            lower, upper = map(float, price_range.split('-'))
+            if lower <= close_price < upper:
+                volume_profile[price_range] += volume
+                break
+    return volume_profile
+
+
+def source_frames(rows: int) -> Dict[str, pd.DataFrame]:
+    """两种数据源格式的原始K线：Binance（klines_to_frame）和CMC模拟K线"""
+    binance = MarketData.klines_to_frame(synthesize_klines('BTCUSDT', '1h', limit=rows))
+    ohlcv = synthesize_ohlcv([65000.0], [2.0], [1e9], rows, seeds=[synthetic_seed('BTCUSDT', '1h')])
+    cmc = pd.DataFrame({
+        'timestamp': pd.date_range(end=datetime.now(), periods=rows, freq='H'),
+        **{column: ohlcv[column][0] for column in ['open', 'high', 'low', 'close', 'volume']}
+    })
+    return {'binance': binance, 'cmc': cmc}
+
+
+def run_benchmark(rows: int, iterations: int) -> Dict[str, Any]:
+    """对两种数据源的K线分别测量指标和筹码分布的耗时"""
+    samples = {}
+    for source, raw in source_frames(rows).items():
+        for _ in range(iterations):
+            started = time.perf_counter()
+            df = IndicatorPipeline.calculate(raw.copy())
+            samples.setdefault(f"indicators.{source}", []).append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            IndicatorPipeline.volume_profile(df)
+            samples.setdefault(f"volume_profile.{source}", []).append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            legacy_volume_profile(df)
+            samples.setdefault(f"volume_profile_legacy.{source}", []).append(time.perf_counter() - started)
+
+    stages = {stage: summarize(values) for stage, values in samples.items()}
+    speedup = {}
+    for source in ['binance', 'cmc']:
+        current = stages[f"volume_profile.{source}"]['p50_ms']
+        speedup[source] = round(stages[f"volume_profile_legacy.{source}"]['p50_ms'] / current, 2) if current else None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'rows': rows,
+        'iterations': iterations,
+        'stages': stages,
+        'volume_profile_speedup': speedup
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术指标流水线基准测试")
+    parser.add_argument('--rows', type=int, default=1000, help="K线数量")
+    parser.add_argument('--iterations', type=int, default=20, help="重复次数")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.iterations)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
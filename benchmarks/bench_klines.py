@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线解析基准测试
+
+比较原来的解析方式（12列object DataFrame，只把开高低收和成交量转为float）
+与parse_klines（逐列直接解析为类型化的NumPy数组，丢弃不使用的字段）的耗时，
+以及每个K线窗口占用的内存（含指标列，即缓存中实际保存的内容），结果以JSON输出
+
+用法:
+    python -m benchmarks.bench_klines --rows 1000 --iterations 50
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_market import summarize, _git_commit
+from benchmarks.fakes import synthesize_klines
+from indicators import IndicatorPipeline
+from market_data import KLINE_COLUMNS, parse_klines
+
+
+def legacy_klines_to_frame(klines: List[list]) -> pd.DataFrame:
+    """原来的K线解析方式，仅用于对比"""
+    df = pd.DataFrame(klines, columns=KLINE_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    for col in ['open', 'high', 'low', 'close', 'volume']:
+        df[col] = df[col].astype(float)
+    return df
+
+
+# 参与比较的解析方式
+PARSERS = {
+    'legacy': legacy_klines_to_frame,
+    'typed': lambda klines: parse_klines(klines),
+    'typed_float32': lambda klines: parse_klines(klines, 'float32')
+}
+
+
+def run_benchmark(rows: int, iterations: int) -> Dict[str, Any]:
+    """测量各解析方式的耗时和解析结果（含指标列）的内存占用"""
+    klines = synthesize_klines('BTCUSDT', '1h', limit=rows)
+    samples = {name: [] for name in PARSERS}
+    memory = {}
+    for name, parser in PARSERS.items():
+        for _ in range(iterations):
+            started = time.perf_counter()
+            parser(klines)
+            samples[name].append(time.perf_counter() - started)
+        frame = parser(klines)
+        memory[name] = {
+            'raw_bytes': int(frame.memory_usage(deep=True).sum()),
+            'cached_bytes': int(IndicatorPipeline.calculate(frame).memory_usage(deep=True).sum())
+        }
+
+    stages = {name: summarize(values) for name, values in samples.items()}
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'rows': rows,
+        'iterations': iterations,
+        'stages': stages,
+        'memory': memory,
+        'speedup': round(stages['legacy']['p50_ms'] / stages['typed']['p50_ms'], 2)
+        if stages['typed']['p50_ms'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="K线解析基准测试")
+    parser.add_argument('--rows', type=int, default=1000, help="K线数量")
+    parser.add_argument('--iterations', type=int, default=50, help="重复次数")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.rows, args.iterations)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+市场分析离线基准测试
+
+向MarketData注入模拟的Binance客户端和CMC数据源，测量以下阶段的耗时：
+- fetch.<周期>: get_historical_data获取K线
+- indicators: calculate_indicators计算技术指标
+- volume_profile: calculate_volume_profile计算筹码分布
+- render.<策略>: 信号推送报告渲染
+以及每种策略下analyze_market的端到端吞吐量，结果以JSON输出，便于在不同提交之间比较
+
+用法:
+    python -m benchmarks.bench_market --iterations 20 --latency-ms 0 --output bench.json
+    python -m benchmarks.bench_market --compare baseline.json --output current.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import create_offline_market_data
+
+logger = logging.getLogger(__name__)
+
+# 策略与对应的K线周期（与MarketData.get_multi_timeframe_data的展开规则一致）
+STRATEGY_TIMEFRAMES = {
+    'short': ['15m', '1h', '4h'],
+    'mid': ['1h', '4h', '1d'],
+    'long': ['1d', '3d', '1w']
+}
+
+# 策略对应的信号推送渲染方法
+RENDER_METHODS = {
+    'short': '_generate_short_term_signal_push',
+    'mid': '_generate_mid_term_signal_push',
+    'long': '_generate_long_term_signal_push'
+}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """计算已排序序列的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    汇总耗时样本
+
+    Args:
+        samples: 耗时样本（秒）
+
+    Returns:
+        包含次数、均值和分位数（毫秒）的字典
+    """
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        'count': count,
+        'mean_ms': (sum(ordered) / count * 1000) if count else 0.0,
+        'p50_ms': _percentile(ordered, 50) * 1000,
+        'p95_ms': _percentile(ordered, 95) * 1000,
+        'p99_ms': _percentile(ordered, 99) * 1000,
+        'min_ms': (ordered[0] * 1000) if count else 0.0,
+        'max_ms': (ordered[-1] * 1000) if count else 0.0
+    }
+
+
+def _timed(samples: Dict[str, List[float]], stage: str, func, *args):
+    """执行函数并记录耗时"""
+    start = time.perf_counter()
+    result = func(*args)
+    samples.setdefault(stage, []).append(time.perf_counter() - start)
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    """获取当前提交的哈希"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmark(symbols: List[str], strategies: List[str], iterations: int = 10,
+                  latency: float = 0.0, jitter: float = 0.0,
+                  fixtures_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    Args:
+        symbols: 基础币种列表，例如['BTC', 'ETH']
+        strategies: 策略列表
+        iterations: 每项测量的重复次数
+        latency: 模拟的网络延迟（秒）
+        jitter: 延迟的随机抖动上限（秒）
+        fixtures_dir: 录制数据目录
+
+    Returns:
+        基准测试结果字典
+    """
+    from market_analyzer import MarketAnalyzer
+
+    # 关闭缓存，测量的是每次都完整计算的耗时
+    market_data = create_offline_market_data(fixtures_dir=fixtures_dir, latency=latency, jitter=jitter,
+                                             cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, cache_config={'enabled': False})
+
+    samples = {}
+    end_to_end = {}
+
+    for symbol in symbols:
+        trading_symbol = symbol if symbol.endswith('USDT') else f"{symbol}USDT"
+        timeframes = sorted({tf for strategy in strategies for tf in STRATEGY_TIMEFRAMES[strategy]})
+
+        # 分阶段测量
+        for _ in range(iterations):
+            for tf in timeframes:
+                df = _timed(samples, f"fetch.{tf}", market_data.get_historical_data, trading_symbol, tf)
+                df = _timed(samples, 'indicators', market_data.calculate_indicators, df)
+                _timed(samples, 'volume_profile', market_data.calculate_volume_profile, df)
+
+        # 渲染阶段使用同一份分析数据，只测量报告生成本身
+        for strategy in strategies:
+            analysis_data = market_data.get_market_analysis(symbol, strategy)
+            current_price = float(analysis_data['klines'][STRATEGY_TIMEFRAMES[strategy][0]].iloc[-1]['close'])
+            render = getattr(analyzer, RENDER_METHODS[strategy])
+            for _ in range(iterations):
+                _timed(samples, f"render.{strategy}", render, symbol, analysis_data, current_price)
+
+    # 端到端吞吐量
+    for strategy in strategies:
+        durations = []
+        for _ in range(iterations):
+            for symbol in symbols:
+                start = time.perf_counter()
+                analyzer.analyze_market(symbol, strategy)
+                durations.append(time.perf_counter() - start)
+        total = sum(durations)
+        stats = summarize(durations)
+        stats['throughput_per_s'] = (len(durations) / total) if total > 0 else 0.0
+        end_to_end[strategy] = stats
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'symbols': symbols,
+            'strategies': strategies,
+            'iterations': iterations,
+            'latency_ms': latency * 1000,
+            'jitter_ms': jitter * 1000,
+            'api_calls': dict(market_data.client.calls)
+        },
+        'stages': {stage: summarize(values) for stage, values in sorted(samples.items())},
+        'end_to_end': end_to_end
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10) -> List[str]:
+    """
+    比较两次基准测试结果
+
+    Args:
+        baseline: 基线结果
+        current: 当前结果
+        threshold: 判定为性能退化的相对变化阈值
+
+    Returns:
+        性能退化的测量项列表
+    """
+    regressions = []
+    rows = []
+    for section in ('stages', 'end_to_end'):
+        for name, stats in current.get(section, {}).items():
+            base = baseline.get(section, {}).get(name)
+            if not base or not base.get('mean_ms'):
+                continue
+            change = (stats['mean_ms'] - base['mean_ms']) / base['mean_ms']
+            flag = ''
+            if change > threshold:
+                flag = '  <-- 退化'
+                regressions.append(f"{section}.{name}")
+            rows.append(f"{section + '.' + name:<28} {base['mean_ms']:>10.3f} {stats['mean_ms']:>10.3f} {change * 100:>+8.1f}%{flag}")
+
+    print(f"{'测量项':<26} {'基线(ms)':>9} {'当前(ms)':>9} {'变化':>8}")
+    for row in rows:
+        print(row)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="市场分析离线基准测试")
+    parser.add_argument('--symbols', nargs='+', default=['BTC', 'ETH'], help="基础币种列表")
+    parser.add_argument('--strategies', nargs='+', default=['short', 'mid', 'long'],
+                        choices=list(STRATEGY_TIMEFRAMES.keys()), help="策略列表")
+    parser.add_argument('--iterations', type=int, default=10, help="每项测量的重复次数")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="模拟的网络延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="延迟的随机抖动上限（毫秒）")
+    parser.add_argument('--fixtures-dir', default=None, help="录制数据目录")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    parser.add_argument('--compare', default=None, help="与指定的基线结果JSON比较")
+    parser.add_argument('--threshold', type=float, default=0.10, help="判定性能退化的相对变化阈值")
+    parser.add_argument('--fail-on-regression', action='store_true', help="检测到退化时以非零状态退出")
+    parser.add_argument('--log-level', default='ERROR', help="测试期间的日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger().setLevel(args.log_level)
+
+    result = run_benchmark(
+        [s.upper() for s in args.symbols],
+        args.strategies,
+        iterations=args.iterations,
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        fixtures_dir=args.fixtures_dir
+    )
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, result, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
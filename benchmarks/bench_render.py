@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报告渲染基准测试
+
+对离线数据测量三种策略信号推送报告的生成耗时（取数、规则计算和模板渲染），
+以及价格格式化的耗时（原来逐次拼接字符串的实现与按数量级区间预先确定格式的format_price），
+结果以JSON输出
+
+用法:
+    python -m benchmarks.bench_render --symbols BTC ETH COS --iterations 200
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_market import summarize, _git_commit
+from benchmarks.fakes import create_offline_market_data
+from market_analyzer import MarketAnalyzer
+from report_templates import format_price
+
+# 各策略的信号推送报告生成方法和取当前价格的周期
+STRATEGY_RENDERERS = {
+    'short': ('_generate_short_term_signal_push', '15m'),
+    'mid': ('_generate_mid_term_signal_push', '1h'),
+    'long': ('_generate_long_term_signal_push', '1d')
+}
+
+
+def legacy_format_price(price) -> str:
+    """原来的价格格式化方式，仅用于对比"""
+    try:
+        if price is None:
+            return "N/A"
+        price = float(price)
+        if abs(price) < 0.0000001 and price != 0:
+            return "接近0"
+        if price == 0:
+            return "0"
+        if price < 0.0001:
+            formatted_price = f"{price:.8f}"
+        elif price < 0.01:
+            formatted_price = f"{price:.6f}"
+        elif price < 1:
+            formatted_price = f"{price:.4f}"
+        else:
+            formatted_price = f"{price:.2f}"
+        integer_part, decimal_part = formatted_price.split('.')
+        integer_with_commas = "{:,}".format(int(integer_part))
+        if price < 0.01:
+            decimal_trimmed = decimal_part.rstrip('0')
+            if len(decimal_trimmed) < 4:
+                decimal_trimmed = decimal_part[:4]
+        else:
+            decimal_trimmed = decimal_part
+            if len(decimal_trimmed) > 2 and all(c == '0' for c in decimal_trimmed[2:]):
+                decimal_trimmed = decimal_trimmed[:2]
+        return f"{integer_with_commas}.{decimal_trimmed or '0'}"
+    except Exception:
+        return str(price)
+
+
+# 参与比较的价格格式化方式
+FORMATTERS = {
+    'legacy': legacy_format_price,
+    'bucketed': format_price
+}
+
+
+def run_benchmark(symbols: List[str], iterations: int) -> Dict[str, Any]:
+    """测量各策略报告的生成耗时和价格格式化耗时"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, cache_config={'enabled': False})
+
+    samples = {strategy: [] for strategy in STRATEGY_RENDERERS}
+    prices = []
+    for symbol in symbols:
+        for strategy, (method, interval) in STRATEGY_RENDERERS.items():
+            data = market_data.get_market_analysis(symbol, strategy)
+            price = float(data['klines'][interval]['close'].iloc[-1])
+            # 报告中的入场区间、止盈和止损价格
+            prices.extend(price * factor for factor in (0.985, 0.997, 1.0, 1.002, 1.015))
+            render = getattr(analyzer, method)
+            render(symbol, data, price)
+            for _ in range(iterations):
+                started = time.perf_counter()
+                render(symbol, data, price)
+                samples[strategy].append(time.perf_counter() - started)
+
+    # 折算为每份报告（约10个价格）的格式化耗时
+    format_samples = {name: [] for name in FORMATTERS}
+    for _ in range(iterations):
+        for name, formatter in FORMATTERS.items():
+            started = time.perf_counter()
+            for price in prices:
+                formatter(price)
+            format_samples[name].append((time.perf_counter() - started) / len(prices) * 10)
+
+    formatting = {name: summarize(values) for name, values in format_samples.items()}
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'symbols': symbols,
+        'iterations': iterations,
+        'reports': {strategy: summarize(values) for strategy, values in samples.items()},
+        'format_price_per_report': formatting,
+        'format_speedup': round(formatting['legacy']['p50_ms'] / formatting['bucketed']['p50_ms'], 2)
+        if formatting['bucketed']['p50_ms'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报告渲染基准测试")
+    parser.add_argument('--symbols', nargs='+', default=['BTC', 'ETH', 'COS'], help="币种")
+    parser.add_argument('--iterations', type=int, default=200, help="重复次数")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.symbols, args.iterations)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+机器人冷启动基准测试
+
+在新的子进程中测量bot.py的启动开销：
+- import: 用python -X importtime统计import bot的总耗时和耗时最多的模块，
+  并检查pandas、ta、binance、numpy是否在导入阶段被加载（应在后台加载服务时才导入）
+- first_reply: 从进程启动到/start回复发出的时间（不依赖市场数据）
+- first_analysis: 从进程启动到第一份/analyze报告发出的时间（等待后台加载的服务，
+  市场数据来自benchmarks.fakes的模拟数据源）
+
+Telegram由记录发送时间的模拟Bot代替，整个过程无需网络；任一指标超过目标时以非零状态退出
+
+用法:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --target-import 1.0 --target-first-reply 1.5 --output startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 不应在import bot时加载的重量级模块
+HEAVY_MODULES = ('pandas', 'numpy', 'ta', 'binance', 'psutil')
+
+
+def _child_env(directory: str) -> Dict[str, str]:
+    """子进程环境：模拟的Token，订阅、提醒、缓存快照和PID文件放在临时目录，不启用预热和行情流"""
+    env = dict(os.environ)
+    env.update({
+        'TELEGRAM_BOT_TOKEN': env.get('TELEGRAM_BOT_TOKEN') or '0:startup-benchmark',
+        'SUBSCRIPTIONS_FILE': os.path.join(directory, 'subscriptions.json'),
+        'ALERTS_FILE': os.path.join(directory, 'alerts.json'),
+        'CACHE_SNAPSHOT_FILE': os.path.join(directory, 'cache_snapshot.pkl'),
+        'PID_FILE': os.path.join(directory, 'bot.pid'),
+        'PYTHONDONTWRITEBYTECODE': '1'
+    })
+    for name in ('WARMUP_SYMBOLS', 'STREAM_SYMBOLS', 'REPORT_CHAT_ID', 'METRICS_PORT'):
+        env.pop(name, None)
+    return env
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    解析-X importtime的输出
+
+    Args:
+        output: 子进程的标准错误输出
+
+    Returns:
+        每个模块的{'module', 'self', 'cumulative', 'depth'}，耗时单位为秒
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            modules.append({
+                'module': name.strip(),
+                'self': int(self_us) / 1e6,
+                'cumulative': int(cumulative_us) / 1e6,
+                'depth': (len(name) - len(name.lstrip())) // 2
+            })
+        except ValueError:
+            continue
+    return modules
+
+
+def measure_import(directory: str, top: int = 10) -> Dict[str, Any]:
+    """在子进程中用-X importtime测量import bot"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import bot'],
+        cwd=ROOT, env=_child_env(directory), capture_output=True, text=True, timeout=120
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import bot失败: {result.stderr[-2000:]}")
+    modules = parse_importtime(result.stderr)
+    roots = [item for item in modules if item['depth'] == 0]
+    # bot直接导入的模块（包含其依赖的累计耗时）
+    children = [item for item in modules if item['depth'] == 1]
+    loaded = {item['module'].split('.')[0] for item in modules}
+    return {
+        'total': round(sum(item['cumulative'] for item in roots), 4),
+        'top': [{'module': item['module'], 'cumulative': round(item['cumulative'], 4)}
+                for item in sorted(children, key=lambda item: item['cumulative'], reverse=True)[:top]],
+        'heavy_loaded': sorted(loaded & set(HEAVY_MODULES))
+    }
+
+
+def measure_first_reply(directory: str, timeout: float) -> Dict[str, Any]:
+    """在子进程中测量从进程启动到第一条回复和第一份分析报告的时间"""
+    started = time.time()
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_startup', '--child', '--timeout', str(timeout)],
+        cwd=ROOT, env=_child_env(directory), capture_output=True, text=True, timeout=timeout + 60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"启动测试子进程失败: {result.stderr[-2000:]}")
+    events = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        'imported': round(events['imported'] - started, 4),
+        'first_reply': round(events['first_reply'] - started, 4),
+        'first_analysis': round(events['first_analysis'] - started, 4) if events.get('first_analysis') else None,
+        'services_loaded_in': events.get('services_loaded_in')
+    }
+
+
+def _run_child(timeout: float) -> None:
+    """子进程：导入bot，按main()的顺序开始后台加载，依次处理/start和/analyze"""
+    import asyncio
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+
+    sys.path.insert(0, ROOT)
+    import bot
+    events = {'imported': time.time()}
+
+    from telegram import Update, Message, Chat, User
+    from startup import BackgroundLoader
+
+    def offline_services():
+        from benchmarks.fakes import create_offline_market_data
+        return bot.create_services(create_offline_market_data())
+
+    # 用模拟数据源代替Binance，其余与bot.main()相同
+    bot.services = BackgroundLoader('services', offline_services)
+    bot.services.start()
+
+    sent = []
+
+    class StubBot:
+        defaults = None
+
+        async def send_message(self, chat_id, text, **kwargs):
+            sent.append((time.time(), text))
+
+    stub = StubBot()
+
+    def build_update(update_id, text):
+        message = Message(
+            message_id=update_id,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=1, type=Chat.PRIVATE),
+            from_user=User(id=1, first_name='startup', is_bot=False),
+            text=text
+        )
+        message.set_bot(stub)
+        return Update(update_id=update_id, message=message)
+
+    async def run():
+        bot_data = {}
+        await bot.start_command(build_update(1, '/start'),
+                                SimpleNamespace(args=[], bot_data=bot_data, user_data={}))
+        events['first_reply'] = sent[0][0]
+
+        await bot.analyze_command(build_update(2, '/analyze BTC'),
+                                  SimpleNamespace(args=['BTC'], bot_data=bot_data, user_data={}))
+        # 与start_bot中的消息处理器一致：从消息队列取出回复并发送
+        deadline = time.time() + timeout
+        while len(sent) < 3 and time.time() < deadline:
+            while not bot.message_queue.empty():
+                await bot.message_queue.get()()
+            await asyncio.sleep(0.01)
+        if len(sent) >= 3:
+            events['first_analysis'] = sent[2][0]
+
+    asyncio.run(run())
+    events['services_loaded_in'] = round(bot.services.loaded_in, 4) if bot.services.loaded_in else None
+    print(json.dumps(events))
+    sys.stdout.flush()
+    # 线程池和后台线程不等待退出
+    os._exit(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='机器人冷启动基准测试')
+    parser.add_argument('--target-import', type=float, default=1.0, help='import bot的耗时目标（秒）')
+    parser.add_argument('--target-first-reply', type=float, default=1.5, help='进程启动到/start回复的目标（秒）')
+    parser.add_argument('--target-first-analysis', type=float, default=5.0, help='进程启动到首份分析报告的目标（秒）')
+    parser.add_argument('--timeout', type=float, default=60.0, help='等待分析报告的最长时间（秒）')
+    parser.add_argument('--top', type=int, default=10, help='输出bot直接导入的模块中耗时最多的数量')
+    parser.add_argument('--output', help='结果输出的JSON文件路径')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _run_child(args.timeout)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            'import': measure_import(directory, args.top),
+            'startup': measure_first_reply(directory, args.timeout)
+        }
+
+    first_analysis = results['startup']['first_analysis']
+    results['targets'] = {
+        'import': args.target_import,
+        'first_reply': args.target_first_reply,
+        'first_analysis': args.target_first_analysis
+    }
+    results['passed'] = {
+        'import': results['import']['total'] <= args.target_import and not results['import']['heavy_loaded'],
+        'first_reply': results['startup']['first_reply'] <= args.target_first_reply,
+        'first_analysis': first_analysis is not None and first_analysis <= args.target_first_analysis
+    }
+
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    sys.exit(0 if all(results['passed'].values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
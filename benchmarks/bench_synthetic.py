@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CMC模拟K线生成基准测试
+
+CMC作为备用数据源时，CMCData.get_historical_data按当前报价生成随机漫步的模拟K线。
+本测试比较原来的实现（修改全局随机种子、Python循环逐个追加价格、逐列构造DataFrame）
+与向量化的synthesize_ohlcv（每个币种独立的np.random.Generator、cumprod、预分配数组）
+一次为多个币种生成长序列的耗时，结果以JSON输出
+
+用法:
+    python -m benchmarks.bench_synthetic --symbols 50 --rows 10000 --iterations 5
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_market import summarize, _git_commit
+from cmc_data import synthesize_ohlcv, synthetic_seed
+
+
+def legacy_synthesize(price: float, percent_change: float, volume: float, limit: int) -> pd.DataFrame:
+    """原来的模拟K线生成方式（全局随机种子和逐个追加的Python循环），仅用于对比"""
+    date_range = pd.date_range(end=datetime.now(), periods=limit, freq='15min')
+    volatility = max(abs(percent_change) / 100, 0.01)
+    np.random.seed(42)
+    returns = np.random.normal(0, volatility, size=limit)
+    price_series = [price]
+    for ret in returns:
+        price_series.append(price_series[-1] * (1 + ret))
+    price_series = price_series[1:]
+
+    df = pd.DataFrame(index=date_range)
+    df['close'] = price_series
+    df['high'] = df['close'] * (1 + np.random.uniform(0, 0.02, size=len(df)))
+    df['low'] = df['close'] * (1 - np.random.uniform(0, 0.02, size=len(df)))
+    df['open'] = df['close'].shift(1)
+    df.loc[df.index[0], 'open'] = df.loc[df.index[0], 'close'] * (1 - np.random.uniform(0, 0.01))
+    df['volume'] = np.random.uniform(0.5, 1.5, size=len(df)) * volume / limit
+    df['timestamp'] = df.index
+    return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].reset_index(drop=True)
+
+
+def vectorized_synthesize(prices: List[float], percent_changes: List[float], volumes: List[float],
+                          symbols: List[str], limit: int) -> Dict[str, pd.DataFrame]:
+    """与CMCData.get_historical_data_batch相同的向量化生成方式"""
+    ohlcv = synthesize_ohlcv(prices, percent_changes, volumes, limit,
+                             seeds=[synthetic_seed(symbol, '15m') for symbol in symbols])
+    timestamps = pd.date_range(end=datetime.now(), periods=limit, freq='15min')
+    return {symbol: pd.DataFrame({
+        'timestamp': timestamps,
+        'open': ohlcv['open'][row],
+        'high': ohlcv['high'][row],
+        'low': ohlcv['low'][row],
+        'close': ohlcv['close'][row],
+        'volume': ohlcv['volume'][row]
+    }) for row, symbol in enumerate(symbols)}
+
+
+def run_benchmark(symbol_count: int, rows: int, iterations: int) -> Dict[str, Any]:
+    """分别测量两种实现为symbol_count个币种各生成rows根K线的耗时"""
+    symbols = [f"SYM{index}USDT" for index in range(symbol_count)]
+    prices = [100.0 + index for index in range(symbol_count)]
+    changes = [(index % 7) - 3.0 for index in range(symbol_count)]
+    volumes = [1e6 * (index + 1) for index in range(symbol_count)]
+
+    samples = {'legacy': [], 'vectorized': [], 'ohlcv_arrays': []}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        for price, change, volume in zip(prices, changes, volumes):
+            legacy_synthesize(price, change, volume, rows)
+        samples['legacy'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        vectorized_synthesize(prices, changes, volumes, symbols, rows)
+        samples['vectorized'].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        synthesize_ohlcv(prices, changes, volumes, rows, seeds=[synthetic_seed(symbol, '15m') for symbol in symbols])
+        samples['ohlcv_arrays'].append(time.perf_counter() - started)
+
+    stages = {stage: summarize(values) for stage, values in samples.items()}
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'symbols': symbol_count,
+        'rows': rows,
+        'iterations': iterations,
+        'stages': stages,
+        'speedup': round(stages['legacy']['p50_ms'] / stages['vectorized']['p50_ms'], 2)
+        if stages['vectorized']['p50_ms'] else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CMC模拟K线生成基准测试")
+    parser.add_argument('--symbols', type=int, default=50, help="同时生成的币种数")
+    parser.add_argument('--rows', type=int, default=10000, help="每个币种的K线数量")
+    parser.add_argument('--iterations', type=int, default=5, help="重复次数")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.symbols, args.rows, args.iterations)
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
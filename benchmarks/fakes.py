@@ -0,0 +1,342 @@
+"""
+离线模拟数据源
+
+提供与binance.client.Client和CMCData接口一致的确定性模拟实现，
+数据来自benchmarks/fixtures下录制的JSON文件，缺失时按交易对生成确定性的随机漫步数据，
+并支持配置模拟的网络延迟
+"""
+
+import os
+import json
+import time
+import random
+import zlib
+from collections import Counter
+from threading import Lock
+from typing import Dict, Any, Optional, List
+
+# 默认的录制数据目录
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 各时间周期对应的毫秒数
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000
+}
+
+# 模拟数据的基准价格，未列出的交易对使用默认值
+BASE_PRICES = {
+    'BTCUSDT': 65000.0,
+    'ETHUSDT': 3200.0,
+    'SOLUSDT': 150.0,
+    'BNBUSDT': 580.0,
+    'BCHUSDT': 450.0,
+    'FILUSDT': 5.5,
+    'COSUSDT': 0.0045
+}
+
+# 合成数据的结束时间（固定值以保证结果可复现）
+SYNTHETIC_END_MS = 1735689600000  # 2025-01-01 00:00:00 UTC
+
+
+def _symbol_seed(symbol: str, interval: str = '', seed: int = 0) -> int:
+    """根据交易对和周期生成稳定的随机种子"""
+    return zlib.crc32(f"{symbol}:{interval}:{seed}".encode('utf-8'))
+
+
+def synthesize_klines(symbol: str, interval: str, limit: int = 100, seed: int = 0) -> List[list]:
+    """
+    生成Binance格式的确定性K线数据
+
+    Args:
+        symbol: 交易对，例如BTCUSDT
+        interval: K线周期
+        limit: K线数量
+        seed: 附加随机种子
+
+    Returns:
+        与Client.get_klines返回值格式相同的K线列表
+    """
+    rng = random.Random(_symbol_seed(symbol, interval, seed))
+    step = INTERVAL_MS.get(interval, INTERVAL_MS['1h'])
+    price = BASE_PRICES.get(symbol, 10.0)
+    volatility = 0.004 * (step / INTERVAL_MS['15m']) ** 0.5
+    start = SYNTHETIC_END_MS - step * limit
+
+    klines = []
+    for i in range(limit):
+        open_time = start + i * step
+        open_price = price
+        close_price = max(open_price * (1 + rng.gauss(0, volatility)), 1e-8)
+        high = max(open_price, close_price) * (1 + abs(rng.gauss(0, volatility / 2)))
+        low = min(open_price, close_price) * (1 - abs(rng.gauss(0, volatility / 2)))
+        volume = 1000.0 * (0.5 + rng.random()) * (step / INTERVAL_MS['15m'])
+        taker_base = volume * rng.uniform(0.3, 0.7)
+        klines.append([
+            open_time,
+            f"{open_price:.8f}",
+            f"{high:.8f}",
+            f"{low:.8f}",
+            f"{close_price:.8f}",
+            f"{volume:.8f}",
+            open_time + step - 1,
+            f"{volume * close_price:.8f}",
+            rng.randint(1000, 50000),
+            f"{taker_base:.8f}",
+            f"{taker_base * close_price:.8f}",
+            "0"
+        ])
+        price = close_price
+    return klines
+
+
+def synthesize_futures(symbol: str, seed: int = 0) -> Dict[str, Any]:
+    """生成Binance格式的确定性合约数据"""
+    rng = random.Random(_symbol_seed(symbol, 'futures', seed))
+    return {
+        'open_interest': {
+            'symbol': symbol,
+            'openInterest': f"{rng.uniform(8e5, 1.2e6):.3f}",
+            'time': SYNTHETIC_END_MS
+        },
+        'funding_rate': [{
+            'symbol': symbol,
+            'fundingTime': SYNTHETIC_END_MS,
+            'fundingRate': f"{rng.uniform(-0.0005, 0.0005):.8f}",
+            'markPrice': f"{BASE_PRICES.get(symbol, 10.0):.8f}"
+        }]
+    }
+
+
+def _exchange_symbol(symbol: str) -> Dict[str, Any]:
+    """exchangeInfo中单个交易对的条目（价格精度按基准价格的数量级）"""
+    price = BASE_PRICES.get(symbol, 10.0)
+    tick_size = 0.01 if price >= 1 else 0.0000001
+    return {
+        'symbol': symbol,
+        'status': 'TRADING',
+        'baseAsset': symbol[:-4],
+        'quoteAsset': 'USDT',
+        'filters': [{'filterType': 'PRICE_FILTER', 'tickSize': f"{tick_size:.8f}"}]
+    }
+
+
+def load_fixture(symbol: str, fixtures_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    加载交易对的录制数据
+
+    Args:
+        symbol: 交易对
+        fixtures_dir: 录制数据目录，默认为benchmarks/fixtures
+
+    Returns:
+        录制数据字典，不存在时返回None
+    """
+    path = os.path.join(fixtures_dir or FIXTURES_DIR, f"{symbol}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class FakeBinanceClient:
+    """
+    模拟的Binance客户端
+
+    实现MarketData使用到的binance.client.Client方法，返回录制数据，
+    每次调用按配置的延迟休眠以模拟网络往返
+    """
+
+    def __init__(self, fixtures_dir: Optional[str] = None, latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        """
+        初始化模拟客户端
+
+        Args:
+            fixtures_dir: 录制数据目录
+            latency: 每次调用的模拟延迟（秒）
+            jitter: 延迟的随机抖动上限（秒）
+            seed: 随机种子，保证抖动序列可复现
+        """
+        self.fixtures_dir = fixtures_dir or FIXTURES_DIR
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self._rng = random.Random(seed)
+        self._seed = seed
+        self._fixtures = {}
+        self._lock = Lock()
+
+    def _simulate(self, method: str) -> None:
+        """记录调用次数并模拟网络延迟"""
+        with self._lock:
+            self.calls[method] += 1
+            delay = self.latency
+            if self.jitter:
+                delay += self._rng.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _fixture(self, symbol: str) -> Dict[str, Any]:
+        """获取交易对的录制数据（带缓存）"""
+        if symbol not in self._fixtures:
+            self._fixtures[symbol] = load_fixture(symbol, self.fixtures_dir) or {}
+        return self._fixtures[symbol]
+
+    def ping(self) -> Dict[str, Any]:
+        self._simulate('ping')
+        return {}
+
+    def get_klines(self, **params) -> List[list]:
+        self._simulate('get_klines')
+        symbol = params['symbol']
+        interval = params['interval']
+        limit = int(params.get('limit', 500))
+        recorded = self._fixture(symbol).get('klines', {}).get(interval)
+        if recorded and len(recorded) >= limit:
+            return [list(row) for row in recorded[-limit:]]
+        return synthesize_klines(symbol, interval, limit, self._seed)
+
+    def get_klines_payload(self, **params) -> bytes:
+        """K线接口的原始响应体（与market_data.BinanceClient一致，计入get_klines调用次数）"""
+        return json.dumps(self.get_klines(**params)).encode()
+
+    def get_symbol_ticker(self, **params):
+        self._simulate('get_symbol_ticker')
+        symbols = [params['symbol']] if 'symbol' in params else list(BASE_PRICES)
+        tickers = [{'symbol': symbol, 'price': synthesize_klines(symbol, '1m', 1, self._seed)[-1][4]}
+                   for symbol in symbols]
+        return tickers[0] if 'symbol' in params else tickers
+
+    def get_exchange_info(self) -> Dict[str, Any]:
+        """现货交易对信息（BASE_PRICES中的交易对）"""
+        self._simulate('get_exchange_info')
+        return {'symbols': [_exchange_symbol(symbol) for symbol in BASE_PRICES]}
+
+    def futures_exchange_info(self) -> Dict[str, Any]:
+        """合约交易对信息（BASE_PRICES中的交易对都有永续合约）"""
+        self._simulate('futures_exchange_info')
+        return {'symbols': [dict(_exchange_symbol(symbol), contractType='PERPETUAL') for symbol in BASE_PRICES]}
+
+    def futures_open_interest(self, **params) -> Dict[str, Any]:
+        self._simulate('futures_open_interest')
+        symbol = params['symbol']
+        recorded = self._fixture(symbol).get('futures') or synthesize_futures(symbol, self._seed)
+        return dict(recorded['open_interest'])
+
+    def futures_funding_rate(self, **params) -> List[Dict[str, Any]]:
+        self._simulate('futures_funding_rate')
+        symbol = params['symbol']
+        recorded = self._fixture(symbol).get('futures') or synthesize_futures(symbol, self._seed)
+        return [dict(item) for item in recorded['funding_rate']]
+
+
+class FakeCMCData:
+    """
+    模拟的CoinMarketCap数据源
+
+    接口与CMCData一致，返回确定性的模拟数据
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        初始化模拟CMC数据源
+
+        Args:
+            latency: 每次调用的模拟延迟（秒）
+        """
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = Lock()
+
+    def _simulate(self, method: str) -> None:
+        """记录调用次数并模拟网络延迟"""
+        with self._lock:
+            self.calls[method] += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    @staticmethod
+    def _quote(symbol):
+        trading_symbol = symbol if symbol.endswith('USDT') else f"{symbol}USDT"
+        price = BASE_PRICES.get(trading_symbol, 10.0)
+        return {
+            'price': price,
+            'volume_24h': price * 1e6,
+            'percent_change_1h': 0.1,
+            'percent_change_24h': 1.5,
+            'percent_change_7d': 4.0,
+            'market_cap': price * 2e7,
+            'last_updated': '2025-01-01T00:00:00.000Z'
+        }
+
+    def get_market_data(self, symbol):
+        self._simulate('get_market_data')
+        return self._quote(symbol)
+
+    def get_market_data_batch(self, symbols):
+        self._simulate('get_market_data_batch')
+        codes = [symbol[:-4] if symbol.endswith('USDT') else symbol for symbol in (item.upper() for item in symbols)]
+        return {code: self._quote(code) for code in codes}
+
+    def get_historical_data(self, symbol, interval, limit=100):
+        self._simulate('get_historical_data')
+        from market_data import parse_klines
+
+        return parse_klines(synthesize_klines(symbol, interval, limit))
+
+    def get_futures_data(self, symbol):
+        self._simulate('get_futures_data')
+        futures = synthesize_futures(symbol)
+        return {
+            'open_interest': float(futures['open_interest']['openInterest']),
+            'funding_rate': float(futures['funding_rate'][0]['fundingRate']),
+            'long_short_ratio': None
+        }
+
+    def get_onchain_data(self, symbol):
+        self._simulate('get_onchain_data')
+        return {
+            'mvrv_z': 1.5,
+            'nvt': 65.0,
+            'active_addresses': 950000,
+            'tvl': 5000000000.0,
+            'unlock_schedule': {'2025-05-15': 1000000}
+        }
+
+    def get_project_info(self, symbol):
+        self._simulate('get_project_info')
+        return {
+            'category': '加密货币',
+            'team': ['创始人A', '开发者B'],
+            'investors': ['投资机构X', '投资机构Y']
+        }
+
+
+def create_offline_market_data(fixtures_dir: Optional[str] = None, latency: float = 0.0,
+                               jitter: float = 0.0, seed: int = 0,
+                               cache_config: Optional[Dict[str, Any]] = None):
+    """
+    创建注入了模拟数据源的MarketData实例
+
+    Args:
+        fixtures_dir: 录制数据目录
+        latency: 模拟的网络延迟（秒）
+        jitter: 延迟的随机抖动上限（秒）
+        seed: 随机种子
+        cache_config: K线缓存配置
+
+    Returns:
+        MarketData实例
+    """
+    from market_data import MarketData
+
+    client = FakeBinanceClient(fixtures_dir=fixtures_dir, latency=latency, jitter=jitter, seed=seed)
+    cmc_data = FakeCMCData(latency=latency)
+    return MarketData(client=client, cmc_data=cmc_data, cache_config=cache_config)
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Telegram机器人离线压力测试
+
+构造合成的Update对象，按泊松到达过程模拟大量用户并发发送/analyze命令，
+请求依次经过TelegramTradingBot._analyze_command、线程池和_message_processor，
+由记录发送时间的模拟Bot代替Telegram API，统计：
+- 请求到状态消息、请求到分析报告的延迟分位数(p50/p95/p99)
+- 因用户任务锁被拒绝的请求数和超时未回复的请求数
+- 更新队列、线程池队列和消息队列的峰值深度
+- 进程峰值内存(RSS)
+
+更新默认按python-telegram-bot的默认行为逐个处理（concurrent_updates=False），
+市场数据来自benchmarks.fakes的模拟数据源，整个过程无需网络
+
+用法:
+    python -m benchmarks.load_telegram --requests 2000 --users 1000 --rate 50 --latency-ms 20
+    python -m benchmarks.load_telegram --rate 200 --send-latency-ms 30 --concurrent-updates --output load.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import contextvars
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Dict, Any, List, Optional
+
+import psutil
+from telegram import Update, Message, Chat, User
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.bench_market import summarize, _git_commit
+from telegram_sender import TelegramSender
+
+logger = logging.getLogger(__name__)
+
+# 机器人回复文本的前缀，用于区分回复类型
+STATUS_PREFIX = "🔍"
+REJECTED_PREFIX = "您有一个正在进行的分析任务"
+ERROR_PREFIXES = ("无法获取", "分析 ", "发生未知错误")
+
+# 当前正在由命令处理函数处理的请求（在处理函数内同步发送的消息归属于该请求）
+_current_request = contextvars.ContextVar('current_request', default=None)
+
+
+class StubBot:
+    """
+    模拟的Telegram Bot
+
+    代替telegram.Bot接收Message.reply_text发出的send_message调用，
+    记录每条消息的发送时间，可配置模拟的发送延迟
+    """
+
+    # Message.reply_text会读取bot.defaults，设为None表示不使用默认参数
+    defaults = None
+
+    def __init__(self, on_send, send_latency: float = 0.0):
+        """
+        初始化模拟Bot
+
+        Args:
+            on_send: 消息发送回调，参数为(chat_id, text, sent_at)
+            send_latency: 每次发送的模拟延迟（秒）
+        """
+        self.on_send = on_send
+        self.send_latency = send_latency
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.send_latency > 0:
+            await asyncio.sleep(self.send_latency)
+        self.sent += 1
+        self.on_send(chat_id, text, time.perf_counter())
+        return None
+
+
+class LoadTestRecorder:
+    """记录每个请求的到达时间和回复情况"""
+
+    def __init__(self):
+        self.requests = []
+        # 每个聊天中已发送状态消息、等待分析报告的请求（按发送顺序）
+        # 用户任务锁在报告入队后即释放，同一聊天可能同时有多个请求在等待报告
+        self.in_flight = defaultdict(deque)
+        self.unmatched = 0
+
+    def new_request(self, request_id: int, user_id: int, symbol: str, strategy: str) -> Dict[str, Any]:
+        record = {
+            'id': request_id,
+            'user_id': user_id,
+            'symbol': symbol,
+            'strategy': strategy,
+            'arrival': time.perf_counter(),
+            'handled_at': None,
+            'status_at': None,
+            'reply_at': None,
+            'outcome': None
+        }
+        self.requests.append(record)
+        return record
+
+    def on_send(self, chat_id: int, text: str, sent_at: float) -> None:
+        """根据消息内容和发送上下文将回复归属到请求"""
+        record = _current_request.get()
+        if record is not None:
+            # 命令处理函数内同步发送的消息：状态消息或拒绝消息
+            if text.startswith(REJECTED_PREFIX):
+                record['reply_at'] = sent_at
+                record['outcome'] = 'rejected'
+            elif text.startswith(STATUS_PREFIX):
+                record['status_at'] = sent_at
+                self.in_flight[chat_id].append(record)
+            else:
+                record['reply_at'] = sent_at
+                record['outcome'] = 'error'
+            return
+
+        # 消息处理器发送的分析报告
+        waiting = self.in_flight.get(chat_id)
+        if not waiting:
+            self.unmatched += 1
+            return
+        record = waiting.popleft()
+        record['reply_at'] = sent_at
+        record['outcome'] = 'error' if text.startswith(ERROR_PREFIXES) else 'completed'
+
+    def pending(self) -> int:
+        return sum(1 for record in self.requests if record['outcome'] is None)
+
+
+def _build_update(bot: StubBot, update_id: int, user_id: int, text: str) -> Update:
+    """构造私聊中的/analyze命令更新"""
+    chat = Chat(id=user_id, type=Chat.PRIVATE)
+    user = User(id=user_id, first_name=f"user{user_id}", is_bot=False)
+    message = Message(
+        message_id=update_id,
+        date=datetime.now(timezone.utc),
+        chat=chat,
+        from_user=user,
+        text=text
+    )
+    message.set_bot(bot)
+    return Update(update_id=update_id, message=message)
+
+
+async def _run_load(bot, stub: StubBot, recorder: LoadTestRecorder, total_requests: int, users: int,
+                    rate: float, symbols: List[str], strategy: str, concurrent_updates: bool,
+                    timeout: float, seed: int) -> Dict[str, Any]:
+    """在事件循环中执行压力测试"""
+    rng = random.Random(seed)
+    process = psutil.Process()
+    update_queue = asyncio.Queue()
+    peaks = {'update_queue': 0, 'thread_pool_queue': 0, 'message_queue': 0, 'user_task_locks': 0}
+    peak_rss = process.memory_info().rss
+    sampling = True
+
+    async def handle(update, record):
+        context = SimpleNamespace(args=update.message.text.split()[1:], user_data={})
+        token = _current_request.set(record)
+        try:
+            record['handled_at'] = time.perf_counter()
+            await bot._analyze_command(update, context)
+        finally:
+            _current_request.reset(token)
+
+    async def dispatcher():
+        # 与Application默认行为一致：未开启concurrent_updates时逐个处理更新
+        tasks = set()
+        while True:
+            item = await update_queue.get()
+            if item is None:
+                break
+            if concurrent_updates:
+                task = asyncio.create_task(handle(*item))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                await handle(*item)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def sampler():
+        nonlocal peak_rss
+        while sampling:
+            peaks['update_queue'] = max(peaks['update_queue'], update_queue.qsize())
+            peaks['thread_pool_queue'] = max(peaks['thread_pool_queue'], bot.thread_pool._work_queue.qsize())
+            peaks['message_queue'] = max(peaks['message_queue'], bot.message_queue.qsize())
+            if bot.sender:
+                peaks['sender_queue'] = max(peaks.get('sender_queue', 0), bot.sender.pending())
+            peaks['user_task_locks'] = max(peaks['user_task_locks'], len(bot.user_task_locks))
+            peak_rss = max(peak_rss, process.memory_info().rss)
+            await asyncio.sleep(0.01)
+
+    bot.running = True
+    processor_task = asyncio.create_task(bot._message_processor())
+    sender_task = asyncio.create_task(bot.sender.run()) if bot.sender else None
+    sampler_task = asyncio.create_task(sampler())
+    dispatcher_task = asyncio.create_task(dispatcher())
+
+    # 按泊松过程生成请求
+    start = time.perf_counter()
+    next_arrival = start
+    for i in range(total_requests):
+        if rate > 0:
+            next_arrival += rng.expovariate(rate)
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        user_id = rng.randint(1, users)
+        symbol = rng.choice(symbols)
+        record = recorder.new_request(i + 1, user_id, symbol, strategy)
+        update = _build_update(stub, i + 1, user_id, f"/analyze {symbol} {strategy}")
+        update_queue.put_nowait((update, record))
+    arrivals_done = time.perf_counter()
+    update_queue.put_nowait(None)
+
+    # 等待所有请求得到回复或超时
+    deadline = time.perf_counter() + timeout
+    await dispatcher_task
+    while recorder.pending() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    finished = time.perf_counter()
+
+    bot.running = False
+    sampling = False
+    await asyncio.gather(processor_task, sampler_task)
+    if sender_task:
+        bot.sender.stop()
+        await sender_task
+
+    return {
+        'duration_s': finished - start,
+        'arrival_window_s': arrivals_done - start,
+        'peak_queue_depth': peaks,
+        'peak_rss_mb': peak_rss / (1024 * 1024)
+    }
+
+
+def run_load_test(total_requests: int = 500, users: int = 1000, rate: float = 50.0,
+                  symbols: Optional[List[str]] = None, strategy: str = 'short',
+                  latency: float = 0.0, jitter: float = 0.0, send_latency: float = 0.0,
+                  pool_size: int = 4, concurrent_updates: bool = False, timeout: float = 60.0,
+                  seed: int = 0, fixtures_dir: Optional[str] = None,
+                  log_level: str = 'ERROR', cache: bool = False, sender: bool = False) -> Dict[str, Any]:
+    """
+    运行Telegram机器人压力测试
+
+    Args:
+        total_requests: 请求总数
+        users: 模拟用户数，每个请求随机分配给其中一个用户
+        rate: 平均到达速率（请求/秒），0表示一次性全部到达
+        symbols: 请求分析的币种列表
+        strategy: 分析策略
+        latency: 模拟的数据源网络延迟（秒）
+        jitter: 数据源延迟的随机抖动上限（秒）
+        send_latency: 模拟的Telegram发送延迟（秒）
+        pool_size: 分析线程池大小
+        concurrent_updates: 是否并发处理更新
+        timeout: 到达结束后等待回复的最长时间（秒）
+        seed: 随机种子
+        fixtures_dir: 录制数据目录
+        log_level: 机器人日志级别
+        cache: 是否启用K线和报告缓存
+        sender: 是否通过限速发送器发送报告（关闭消息合并，便于逐条统计）
+
+    Returns:
+        压力测试结果字典
+    """
+    from bots.telegram_bot import TelegramTradingBot
+
+    symbols = symbols or ['BTC', 'ETH']
+    cache_config = {'enabled': cache}
+    market_data = create_offline_market_data(fixtures_dir=fixtures_dir, latency=latency,
+                                             jitter=jitter, seed=seed, cache_config=cache_config)
+    config = {
+        'token': 'load-test',
+        'market_data': {'cache': cache_config},
+        'subscriptions': {'store_file': None},
+        'log_file': os.devnull,
+        'log_level': log_level,
+        'thread_pool_size': pool_size,
+        'default_strategy': strategy
+    }
+    bot = TelegramTradingBot(config, market_data=market_data)
+    bot.logger.setLevel(log_level)
+    recorder = LoadTestRecorder()
+    stub = StubBot(recorder.on_send, send_latency=send_latency)
+    if sender:
+        bot.sender = TelegramSender(stub, {'merge': False})
+
+    try:
+        stats = asyncio.run(_run_load(bot, stub, recorder, total_requests, users, rate, symbols,
+                                      strategy, concurrent_updates, timeout, seed))
+    finally:
+        bot.thread_pool.shutdown(wait=True, cancel_futures=True)
+
+    outcomes = {'completed': 0, 'rejected': 0, 'error': 0, 'timeout': 0}
+    reply_latency = []
+    status_latency = []
+    for record in recorder.requests:
+        outcome = record['outcome'] or 'timeout'
+        outcomes[outcome] += 1
+        if record['status_at'] is not None:
+            status_latency.append(record['status_at'] - record['arrival'])
+        if outcome == 'completed':
+            reply_latency.append(record['reply_at'] - record['arrival'])
+
+    completed = outcomes['completed']
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'requests': total_requests,
+            'users': users,
+            'rate_per_s': rate,
+            'symbols': symbols,
+            'strategy': strategy,
+            'latency_ms': latency * 1000,
+            'jitter_ms': jitter * 1000,
+            'send_latency_ms': send_latency * 1000,
+            'pool_size': pool_size,
+            'concurrent_updates': concurrent_updates,
+            'cache': cache,
+            'api_calls': dict(market_data.client.calls)
+        },
+        'outcomes': outcomes,
+        'unmatched_replies': recorder.unmatched,
+        'reply_latency': summarize(reply_latency),
+        'status_latency': summarize(status_latency),
+        'throughput_per_s': (completed / stats['duration_s']) if stats['duration_s'] > 0 else 0.0,
+        'duration_s': stats['duration_s'],
+        'arrival_window_s': stats['arrival_window_s'],
+        'peak_queue_depth': stats['peak_queue_depth'],
+        'peak_rss_mb': stats['peak_rss_mb'],
+        'messages_sent': stub.sent
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Telegram机器人离线压力测试")
+    parser.add_argument('--requests', type=int, default=500, help="请求总数")
+    parser.add_argument('--users', type=int, default=1000, help="模拟用户数")
+    parser.add_argument('--rate', type=float, default=50.0, help="平均到达速率（请求/秒），0表示一次性全部到达")
+    parser.add_argument('--symbols', nargs='+', default=['BTC', 'ETH'], help="请求分析的币种列表")
+    parser.add_argument('--strategy', default='short', choices=['short', 'mid', 'long'], help="分析策略")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="模拟的数据源网络延迟（毫秒）")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="数据源延迟的随机抖动上限（毫秒）")
+    parser.add_argument('--send-latency-ms', type=float, default=0.0, help="模拟的Telegram发送延迟（毫秒）")
+    parser.add_argument('--pool-size', type=int, default=4, help="分析线程池大小")
+    parser.add_argument('--concurrent-updates', action='store_true', help="并发处理更新")
+    parser.add_argument('--cache', action='store_true', help="启用K线和报告缓存")
+    parser.add_argument('--sender', action='store_true', help="通过限速发送器发送报告")
+    parser.add_argument('--timeout', type=float, default=60.0, help="到达结束后等待回复的最长时间（秒）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--fixtures-dir', default=None, help="录制数据目录")
+    parser.add_argument('--output', default=None, help="结果JSON输出路径，默认输出到标准输出")
+    parser.add_argument('--log-level', default='ERROR', help="测试期间的日志级别")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level)
+    logging.getLogger().setLevel(args.log_level)
+
+    result = run_load_test(
+        total_requests=args.requests,
+        users=args.users,
+        rate=args.rate,
+        symbols=[s.upper() for s in args.symbols],
+        strategy=args.strategy,
+        latency=args.latency_ms / 1000.0,
+        jitter=args.jitter_ms / 1000.0,
+        send_latency=args.send_latency_ms / 1000.0,
+        pool_size=args.pool_size,
+        concurrent_updates=args.concurrent_updates,
+        timeout=args.timeout,
+        seed=args.seed,
+        fixtures_dir=args.fixtures_dir,
+        log_level=args.log_level,
+        cache=args.cache,
+        sender=args.sender
+    )
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制基准测试数据
+
+默认从Binance API录制指定交易对各周期的K线和合约数据；
+使用--synthetic时生成确定性的模拟数据（无需网络）
+
+用法:
+    python -m benchmarks.record_fixtures BTCUSDT ETHUSDT --limit 100
+    python -m benchmarks.record_fixtures BTCUSDT --synthetic
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FIXTURES_DIR, synthesize_klines, synthesize_futures
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 需要录制的时间周期（与MarketData.timeframes一致）
+INTERVALS = ['15m', '1h', '4h', '1d', '3d', '1w']
+
+
+def record_live(symbol, limit):
+    """从Binance API录制数据"""
+    from binance.client import Client
+
+    client = Client()
+    klines = {}
+    for interval in INTERVALS:
+        logger.info(f"正在录制{symbol}的{interval}周期K线...")
+        klines[interval] = client.get_klines(symbol=symbol, interval=interval, limit=limit)
+    futures = {
+        'open_interest': client.futures_open_interest(symbol=symbol),
+        'funding_rate': client.futures_funding_rate(symbol=symbol, limit=1)
+    }
+    return {'symbol': symbol, 'source': 'binance', 'klines': klines, 'futures': futures}
+
+
+def record_synthetic(symbol, limit):
+    """生成确定性的模拟数据"""
+    klines = {interval: synthesize_klines(symbol, interval, limit) for interval in INTERVALS}
+    return {'symbol': symbol, 'source': 'synthetic', 'klines': klines, 'futures': synthesize_futures(symbol)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制基准测试使用的K线和合约数据")
+    parser.add_argument('symbols', nargs='+', help="交易对，例如BTCUSDT")
+    parser.add_argument('--limit', type=int, default=100, help="每个周期录制的K线数量")
+    parser.add_argument('--synthetic', action='store_true', help="生成模拟数据而不访问网络")
+    parser.add_argument('--output-dir', default=FIXTURES_DIR, help="输出目录")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for symbol in args.symbols:
+        symbol = symbol.upper()
+        fixture = record_synthetic(symbol, args.limit) if args.synthetic else record_live(symbol, args.limit)
+        path = os.path.join(args.output_dir, f"{symbol}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, separators=(',', ':'))
+        logger.info(f"已保存{symbol}的录制数据到 {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,15 +4,17 @@ from telegram.request import HTTPXRequest
 import logging
 from datetime import datetime
 import os
+import json
 from dotenv import load_dotenv
 import time
-import psutil
 import sys
 import traceback
 import requests
+from http_session import get_session, get_async_client, close_async_client, telegram_pool_size
 import asyncio
 import concurrent.futures
 from threading import Lock
+from types import SimpleNamespace
 from queue import Queue
 from functools import partial
 import telegram
@@ -37,18 +39,116 @@ app_context = None
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 HTTP_PROXY = os.getenv('HTTP_PROXY')
 HTTPS_PROXY = os.getenv('HTTPS_PROXY')
-
 # 设置系统环境变量
 if HTTP_PROXY:
     os.environ['HTTP_PROXY'] = HTTP_PROXY
     os.environ['HTTPS_PROXY'] = HTTP_PROXY
 
-# 创建市场数据和分析器实例
-from market_data import MarketData
-from market_analyzer import MarketAnalyzer
+from metrics import metrics
+from metrics_server import start_metrics_server, register_bot_gauges
+from telegram_sender import TelegramSender
+from startup import BackgroundLoader
+from supervisor import (DEFAULT_SUPERVISOR_CONFIG, PidFile, stop_running, install_shutdown_signals,
+                        drain_executor, drain_queue, save_caches, load_caches, cache_registry)
+
+# PID文件（保证只有一个实例在轮询）、缓存快照文件和优雅关闭的超时时间
+PID_FILE = os.getenv('PID_FILE', DEFAULT_SUPERVISOR_CONFIG['pid_file'])
+CACHE_SNAPSHOT_FILE = os.getenv('CACHE_SNAPSHOT_FILE', DEFAULT_SUPERVISOR_CONFIG['cache_file'])
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', DEFAULT_SUPERVISOR_CONFIG['drain_timeout']))
+
+def load_config_file():
+    """读取ANALYSIS_CONFIG指定的配置文件（与TelegramTradingBot使用的config.json格式相同），未设置时返回空字典"""
+    path = os.getenv('ANALYSIS_CONFIG')
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"读取配置文件失败: {str(e)}")
+        return {}
+
+def load_rules_config():
+    """读取配置文件中的analysis.strategies（信号规则）"""
+    return (load_config_file().get('analysis') or {}).get('strategies')
+
+def load_admin_ids():
+    """读取管理员ID列表：配置文件中的telegram.admin_ids，未配置时使用环境变量ADMIN_IDS（逗号分隔）"""
+    config = load_config_file()
+    admin_ids = (config.get('telegram') or {}).get('admin_ids') or config.get('admin_ids')
+    if not admin_ids and os.getenv('ADMIN_IDS'):
+        admin_ids = [item.strip() for item in os.getenv('ADMIN_IDS').split(',') if item.strip()]
+    return {int(admin_id) for admin_id in (admin_ids or [])}
+
+# 管理员ID列表（/stats命令仅对管理员开放），与TelegramTradingBot使用同一份配置
+ADMIN_IDS = load_admin_ids()
+
+# 限速消息发送器，在main()中创建应用后初始化
+telegram_sender = None
+# PID文件锁，在main()中停止旧实例后获取
+pid_file = None
+
+def deliver_subscription(chat_id, text):
+    """把订阅推送和提醒交给限速发送器（在调度线程中调用）"""
+    telegram_sender.enqueue_threadsafe(chat_id, text)
+
+def create_services(market_data=None):
+    """
+    创建市场数据、分析器和后台任务（在后台线程中调用）
+
+    pandas、ta、binance在这里才导入，Binance客户端的创建和连接测试也在这里进行，
+    不阻塞Telegram连接的建立
+
+    Args:
+        market_data: 外部注入的MarketData（例如启动基准测试中的离线数据源），默认创建Binance数据源
 
-market_data = MarketData()
-market_analyzer = MarketAnalyzer(market_data)
+    Returns:
+        包含market_data、market_analyzer、cache_warmer、subscription_manager、alert_manager、market_stream的命名空间
+    """
+    from market_data import MarketData
+    from market_analyzer import MarketAnalyzer
+    from cache_warmer import CacheWarmer
+    from subscriptions import SubscriptionManager
+    from alerts import AlertManager
+    from market_stream import MarketStream
+
+    # KLINE_VOLUME_DTYPE=float32时缓存的K线成交量使用float32
+    market_data = market_data if market_data is not None else MarketData(
+        kline_config={'volume_dtype': os.getenv('KLINE_VOLUME_DTYPE', 'float64')})
+    market_analyzer = MarketAnalyzer(market_data, rules_config=load_rules_config())
+    # 加载上一个实例退出时保存的K线和报告缓存
+    load_caches(CACHE_SNAPSHOT_FILE, cache_registry(market_data, market_analyzer))
+    # 注册Binance已用权重等运行时指标
+    register_bot_gauges(thread_pool, message_queue, market_data.client)
+
+    return SimpleNamespace(
+        market_data=market_data,
+        market_analyzer=market_analyzer,
+        # 热门币种缓存预热（设置WARMUP_SYMBOLS时启用，逗号分隔）
+        cache_warmer=CacheWarmer(market_analyzer, {
+            'enabled': bool(os.getenv('WARMUP_SYMBOLS')),
+            'symbols': [item.strip() for item in os.getenv('WARMUP_SYMBOLS', '').split(',') if item.strip()]
+        }),
+        # 信号订阅推送（REPORT_CHAT_ID和REPORT_SYMBOLS配置固定推送目标，对应chat_id_for_reports）
+        subscription_manager=SubscriptionManager(market_analyzer, deliver_subscription, {
+            'store_file': os.getenv('SUBSCRIPTIONS_FILE', 'subscriptions.json'),
+            'report_chat_id': int(os.getenv('REPORT_CHAT_ID')) if os.getenv('REPORT_CHAT_ID') else None,
+            'report_symbols': [item.strip() for item in os.getenv('REPORT_SYMBOLS', '').split(',') if item.strip()]
+        }),
+        # 价格和指标提醒
+        alert_manager=AlertManager(market_data, deliver_subscription, {
+            'store_file': os.getenv('ALERTS_FILE', 'alerts.json')
+        }),
+        # 行情流（设置STREAM_SYMBOLS时启用，逗号分隔；STREAM_REPLAY_FILE用录制文件代替WebSocket）
+        market_stream=MarketStream(market_data, config={
+            'enabled': bool(os.getenv('STREAM_SYMBOLS')),
+            'symbols': [item.strip() for item in os.getenv('STREAM_SYMBOLS', '').split(',') if item.strip()],
+            'replay_file': os.getenv('STREAM_REPLAY_FILE')
+        })
+    )
+
+# 市场数据和后台任务在main()开始时于后台加载，首次使用时等待加载完成
+services = BackgroundLoader('services', create_services)
 
 # 创建线程池以处理并行请求
 thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)  # 根据性能测试结果，设置为最优值
@@ -71,11 +171,14 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
         # 检查命令是否已处理
         if command_id in context.bot_data['processed_commands']:
+            metrics.cache_access('processed_commands', hit=True)
             logger.info(f"Command {command_id} already processed, ignoring")
             return
         
         # 标记命令为已处理
         context.bot_data['processed_commands'].add(command_id)
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command=command_id.split('_')[0])
         
         # 清理过大的命令集合
         if len(context.bot_data['processed_commands']) > 1000:
@@ -130,11 +233,14 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             
         # 检查命令是否已处理
         if command_id in context.bot_data['processed_commands']:
+            metrics.cache_access('processed_commands', hit=True)
             logger.info(f"Command {command_id} already processed, ignoring")
             return
         
         # 标记命令为已处理
         context.bot_data['processed_commands'].add(command_id)
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command=command_id.split('_')[0])
         
         # 清理过大的命令集合
         if len(context.bot_data['processed_commands']) > 1000:
@@ -153,6 +259,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
   /analyze BTC short - 短期策略分析（15分钟-1小时）
   /analyze BTC mid   - 中期策略分析（1-7天）
   /analyze BTC long  - 长期策略分析（1-4周）
+  /analyze BTC ETH SOL mid - 一次分析多个交易对，返回汇总报告
+/compare [交易对...] - 多个交易对的短期指标对比表
+  例如：/compare BTC ETH SOL BNB
 
 🔄 *策略切换*
 /strategy [策略类型] - 切换分析策略
@@ -161,6 +270,18 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
   /strategy mid   - 切换到中期策略
   /strategy long  - 切换到长期策略
 
+🔔 *信号订阅*
+/subscribe [交易对] [策略类型] [close|change] - 订阅信号推送
+  close：每根K线收盘推送（默认）；change：推荐方向变化时推送
+/unsubscribe [交易对] [策略类型] - 取消订阅（all取消全部）
+/subscriptions - 查看当前订阅
+
+⏰ *价格提醒*
+/alert [交易对] [字段] [运算符] [阈值] [周期] - 添加提醒
+  例如：/alert BTC > 70000、/alert ETH rsi<30 1h
+/alerts - 查看当前提醒
+/unalert [提醒ID] - 删除提醒（all删除全部）
+
 📈 *策略说明*
 1. 短期策略（short）
    - 时间周期：15分钟-1小时
@@ -192,54 +313,72 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         logger.error(f"Error in help command: {str(e)}")
         await update.message.reply_text("处理命令时发生错误，请稍后重试")
 
+def send_reply_from_thread(message_obj, text):
+    """从后台线程回复消息：优先交给限速发送器，发送器未启动时放入消息队列"""
+    if telegram_sender is not None and telegram_sender.loop is not None:
+        # 在群组中回复到发起命令的消息下；命令消息已被删除时照常发送
+        telegram_sender.enqueue_threadsafe(message_obj.chat_id, text, reply_to_message_id=message_obj.message_id,
+                                           allow_sending_without_reply=True)
+        return
+    
+    async def send_message():
+        try:
+            await message_obj.reply_text(text)
+        except Exception as e:
+            logger.error(f"发送消息时出错: {str(e)}")
+    
+    # 将消息放入队列，由主线程的协程处理
+    message_queue.put(send_message)
+
 # 后台线程函数，用于处理市场数据获取和分析
 def analyze_market_data_task(symbol, strategy, user_id, update_obj, context_obj, message_obj, command_type):
     """后台线程任务，处理市场数据分析"""
+    metrics.add('analysis_workers_busy', 1)
     try:
         logger.info(f"后台线程开始分析 {symbol} 的 {strategy} 策略数据")
         
         # 生成分析报告
-        report = market_analyzer.analyze_market(symbol, strategy)
+        report = services.get().market_analyzer.analyze_market(symbol, strategy)
         
         if not report:
-            # 使用消息队列发送回主线程
-            async def send_error_message():
-                try:
-                    await message_obj.reply_text(f"无法获取 {symbol} 的市场数据，请稍后再试。")
-                    logger.info(f"发送了无法获取 {symbol} 市场数据的消息")
-                except Exception as e:
-                    logger.error(f"发送消息时出错: {str(e)}")
-            
-            # 将消息放入队列，由主线程的协程处理
-            message_queue.put(send_error_message)
+            send_reply_from_thread(message_obj, f"无法获取 {symbol} 的市场数据，请稍后再试。")
             logger.info(f"已将'无法获取{symbol}市场数据'的消息加入队列")
             return
         
         # 发送分析结果
-        async def send_report():
-            try:
-                await message_obj.reply_text(report)
-                logger.info(f"成功发送 {symbol} 的 {strategy} 分析报告")
-            except Exception as e:
-                logger.error(f"发送分析报告时出错: {str(e)}")
-        
-        message_queue.put(send_report)
+        send_reply_from_thread(message_obj, report)
         logger.info(f"成功完成 {symbol} 的 {strategy} 策略分析，报告已加入发送队列")
         
     except Exception as e:
         logger.error(f"线程分析 {symbol} 时发生错误: {str(e)}")
         traceback.print_exc()
         
-        async def send_error():
-            try:
-                await message_obj.reply_text(f"分析 {symbol} 时发生错误，请稍后再试。")
-                logger.info(f"发送了分析 {symbol} 错误的消息")
-            except Exception as ex:
-                logger.error(f"发送错误消息时出错: {str(ex)}")
-        
-        message_queue.put(send_error)
+        send_reply_from_thread(message_obj, f"分析 {symbol} 时发生错误，请稍后再试。")
         logger.info(f"已将'分析{symbol}错误'的消息加入队列")
     finally:
+        metrics.add('analysis_workers_busy', -1)
+        # 释放用户任务锁
+        with user_task_locks_mutex:
+            if user_id in user_task_locks:
+                del user_task_locks[user_id]
+                logger.info(f"用户 {user_id} 的任务锁已释放")
+
+def analyze_batch_task(symbols, strategy, user_id, message_obj):
+    """后台线程任务，一次分析多个交易对并发送汇总报告"""
+    metrics.add('analysis_workers_busy', 1)
+    symbols_desc = '、'.join(symbols)
+    try:
+        logger.info(f"后台线程开始分析 {symbols_desc} 的 {strategy} 策略数据")
+        report = services.get().market_analyzer.analyze_batch(symbols, strategy)
+        send_reply_from_thread(message_obj, report)
+        logger.info(f"成功完成 {symbols_desc} 的 {strategy} 策略分析，汇总报告已加入发送队列")
+        
+    except Exception as e:
+        logger.error(f"线程分析 {symbols_desc} 时发生错误: {str(e)}")
+        traceback.print_exc()
+        send_reply_from_thread(message_obj, f"分析 {symbols_desc} 时发生错误，请稍后再试。")
+    finally:
+        metrics.add('analysis_workers_busy', -1)
         # 释放用户任务锁
         with user_task_locks_mutex:
             if user_id in user_task_locks:
@@ -259,11 +398,14 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             
         # 如果已处理过，直接返回
         if command_id in context.bot_data['processed_commands']:
+            metrics.cache_access('processed_commands', hit=True)
             logger.info(f"Command {command_id} already processed, ignoring")
             return
         
         # 标记为已处理
         context.bot_data['processed_commands'].add(command_id)
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command=command_id.split('_')[0])
         
         # 获取用户ID
         user_id = update.effective_user.id
@@ -287,16 +429,32 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await update.message.reply_text("请指定要分析的交易对，例如：/analyze BTC")
             return
             
-        # 获取交易对
-        symbol = args[0].upper()
-        strategy_param = args[1].lower() if len(args) > 1 else 'short'  # 默认为短期策略
-        
-        # 验证策略类型
+        # 获取交易对和策略类型：最后一个参数是有效的策略类型时作为策略，其余参数都是交易对
         valid_strategies = ['short', 'mid', 'long']
-        is_valid_strategy = strategy_param in valid_strategies
+        if len(args) > 1 and args[-1].lower() in valid_strategies:
+            symbol_args, strategy = args[:-1], args[-1].lower()
+        else:
+            symbol_args, strategy = args, 'short'  # 默认为短期策略
+        symbols = list(dict.fromkeys(item.upper() for item in symbol_args))
+        symbol = symbols[0]
+        
+        loaded = await services.wait()
+        max_symbols = loaded.market_analyzer.batch_config['max_symbols']
+        # 未上架的交易对按交易对索引直接拒绝
+        rejection = loaded.market_data.symbols.reject_message(symbols)
+        # 没有指定策略且最后一个参数未上架时，可能是拼错的策略类型
+        if rejection and len(symbol_args) == len(args) > 1 and not loaded.market_data.symbols.is_listed(args[-1]):
+            rejection += f"\n（如果'{args[-1]}'是策略类型，可用：short/mid/long）"
+        if len(symbols) > max_symbols or rejection:
+            with user_task_locks_mutex:
+                if user_id in user_task_locks:
+                    del user_task_locks[user_id]
+            await update.message.reply_text(
+                rejection or f"一次最多分析{max_symbols}个交易对，请减少交易对数量后重试。")
+            return
+        for item in symbols:
+            metrics.record_request(item)
         
-        # 使用有效的策略类型
-        strategy = strategy_param if is_valid_strategy else 'short'
         strategy_desc = "短期" if strategy == 'short' else "中期" if strategy == 'mid' else "长期"
             
         # 保存交易对和策略类型
@@ -304,15 +462,17 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         context.user_data['last_strategy'] = strategy
         
         # 构建统一的状态消息
-        if not is_valid_strategy:
-            status_msg = f"🔍 '{strategy_param}'不是有效的策略类型（可用：short/mid/long），将使用短期策略分析 {symbol}..."
-        else:
-            status_msg = f"🔍 正在分析 {symbol} 的{strategy_desc}市场数据，请稍候..."
+        status_msg = f"🔍 正在分析 {'、'.join(symbols)} 的{strategy_desc}市场数据，请稍候..."
         
         # 发送单一状态消息
         status_message = await update.message.reply_text(status_msg)
         logger.info(f"已发送分析状态消息：{status_msg}")
         
+        # 多个交易对作为一个任务分析，返回一条汇总报告
+        if len(symbols) > 1:
+            thread_pool.submit(analyze_batch_task, symbols, strategy, user_id, update.message)
+            return
+        
         # 在线程池中异步执行分析
         thread_pool.submit(
             analyze_market_data_task,
@@ -334,6 +494,97 @@ async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             if user_id in user_task_locks:
                 del user_task_locks[user_id]
 
+def compare_task(symbols, user_id, message_obj):
+    """后台线程任务，生成多币种对比表并发送"""
+    metrics.add('analysis_workers_busy', 1)
+    symbols_desc = '、'.join(symbols)
+    try:
+        send_reply_from_thread(message_obj, services.get().market_analyzer.compare(symbols))
+        logger.info(f"{symbols_desc} 的对比表已加入发送队列")
+    except Exception as e:
+        logger.error(f"生成 {symbols_desc} 的对比表时发生错误: {str(e)}")
+        traceback.print_exc()
+        send_reply_from_thread(message_obj, f"对比 {symbols_desc} 时发生错误，请稍后再试。")
+    finally:
+        metrics.add('analysis_workers_busy', -1)
+        # 释放用户任务锁
+        with user_task_locks_mutex:
+            if user_id in user_task_locks:
+                del user_task_locks[user_id]
+                logger.info(f"用户 {user_id} 的任务锁已释放")
+
+async def compare_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理对比命令"""
+    user_id = None
+    try:
+        # 检查消息ID，避免重复处理
+        message_id = update.message.message_id
+        command_id = f"compare_{message_id}"
+        
+        # 初始化处理过的命令集合
+        if 'processed_commands' not in context.bot_data:
+            context.bot_data['processed_commands'] = set()
+            
+        # 如果已处理过，直接返回
+        if command_id in context.bot_data['processed_commands']:
+            metrics.cache_access('processed_commands', hit=True)
+            logger.info(f"Command {command_id} already processed, ignoring")
+            return
+        
+        # 标记为已处理
+        context.bot_data['processed_commands'].add(command_id)
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command='compare')
+        
+        # 获取用户ID
+        user_id = update.effective_user.id
+        logger.info(f"处理用户 {user_id} 的对比命令")
+        
+        # 检查用户是否已经有正在执行的任务（对比与分析共用任务锁）
+        with user_task_locks_mutex:
+            if user_id in user_task_locks:
+                user_id = None
+                await update.message.reply_text("您有一个正在进行的分析任务，请等待其完成后再发起新的请求。")
+                return
+            else:
+                # 为用户添加任务锁
+                user_task_locks[user_id] = True
+        
+        symbols = list(dict.fromkeys(item.upper() for item in context.args or []))
+        if not symbols:
+            with user_task_locks_mutex:
+                if user_id in user_task_locks:
+                    del user_task_locks[user_id]
+            await update.message.reply_text("请指定要对比的交易对，例如：/compare BTC ETH SOL BNB")
+            return
+        
+        loaded = await services.wait()
+        max_symbols = loaded.market_analyzer.batch_config['max_compare_symbols']
+        # 未上架的交易对按交易对索引直接拒绝
+        rejection = loaded.market_data.symbols.reject_message(symbols)
+        if len(symbols) > max_symbols or rejection:
+            with user_task_locks_mutex:
+                if user_id in user_task_locks:
+                    del user_task_locks[user_id]
+            await update.message.reply_text(
+                f"一次最多对比{max_symbols}个交易对，请减少交易对数量后重试。" if len(symbols) > max_symbols
+                else rejection)
+            return
+        for symbol in symbols:
+            metrics.record_request(symbol)
+        
+        # 未缓存的交易对需要获取数据，在线程池中执行，任务结束时释放任务锁
+        thread_pool.submit(compare_task, symbols, user_id, update.message)
+        
+    except Exception as e:
+        logger.error(f"处理对比命令时发生错误: {str(e)}")
+        traceback.print_exc()
+        await update.message.reply_text("发生未知错误，请稍后再试。")
+        # 确保释放用户任务锁
+        with user_task_locks_mutex:
+            if user_id in user_task_locks:
+                del user_task_locks[user_id]
+
 async def strategy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理策略切换命令"""
     try:
@@ -347,11 +598,14 @@ async def strategy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             
         # 如果已处理过，直接返回
         if command_id in context.bot_data['processed_commands']:
+            metrics.cache_access('processed_commands', hit=True)
             logger.info(f"Command {command_id} already processed, ignoring")
             return
         
         # 标记为已处理
         context.bot_data['processed_commands'].add(command_id)
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command=command_id.split('_')[0])
         
         # 获取用户ID
         user_id = update.effective_user.id
@@ -423,6 +677,80 @@ async def strategy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             if user_id in user_task_locks:
                 del user_task_locks[user_id]
 
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理运行状态命令（仅管理员可用）"""
+    try:
+        user_id = update.effective_user.id
+        if user_id not in ADMIN_IDS:
+            logger.warning(f"非管理员用户 {user_id} 尝试使用stats命令")
+            await update.message.reply_text("该命令仅限管理员使用。")
+            return
+        
+        metrics.inc('commands_total', command='stats')
+        await update.message.reply_text(metrics.render_summary())
+        logger.info(f"已向管理员 {user_id} 发送运行状态")
+    except Exception as e:
+        logger.error(f"处理stats命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def subscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理订阅命令"""
+    try:
+        metrics.inc('commands_total', command='subscribe')
+        reply = (await services.wait()).subscription_manager.handle_subscribe(update.effective_chat.id, context.args or [])
+        await update.message.reply_text(reply)
+    except Exception as e:
+        logger.error(f"处理subscribe命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def unsubscribe_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理取消订阅命令"""
+    try:
+        metrics.inc('commands_total', command='unsubscribe')
+        reply = (await services.wait()).subscription_manager.handle_unsubscribe(update.effective_chat.id, context.args or [])
+        await update.message.reply_text(reply)
+    except Exception as e:
+        logger.error(f"处理unsubscribe命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def subscriptions_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理订阅列表命令"""
+    try:
+        metrics.inc('commands_total', command='subscriptions')
+        await update.message.reply_text((await services.wait()).subscription_manager.describe(update.effective_chat.id))
+    except Exception as e:
+        logger.error(f"处理subscriptions命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def alert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理添加提醒命令"""
+    try:
+        metrics.inc('commands_total', command='alert')
+        reply = (await services.wait()).alert_manager.handle_alert(update.effective_chat.id, context.args or [])
+        await update.message.reply_text(reply)
+    except Exception as e:
+        logger.error(f"处理alert命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def unalert_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理删除提醒命令"""
+    try:
+        metrics.inc('commands_total', command='unalert')
+        reply = (await services.wait()).alert_manager.handle_unalert(update.effective_chat.id, context.args or [])
+        await update.message.reply_text(reply)
+    except Exception as e:
+        logger.error(f"处理unalert命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
+async def alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """处理提醒列表命令"""
+    try:
+        metrics.inc('commands_total', command='alerts')
+        await update.message.reply_text((await services.wait()).alert_manager.describe(update.effective_chat.id))
+    except Exception as e:
+        logger.error(f"处理alerts命令时出错: {str(e)}")
+        await update.message.reply_text("处理命令时发生错误，请稍后重试")
+
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """处理错误"""
     try:
@@ -449,9 +777,8 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                 try:
                     # 重置连接 - 删除webhook并清除所有待处理更新
                     delete_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/deleteWebhook?drop_pending_updates=true"
-                    async with telegram.request.HTTPXRequest().get(delete_url) as response:
-                        result = await response.json()
-                        logger.info(f"重置连接结果: {result}")
+                    response = await get_async_client().get(delete_url)
+                    logger.info(f"重置连接结果: {response.json()}")
                     
                     # 等待连接冷却
                     logger.info("等待20秒让API冷却...")
@@ -480,9 +807,14 @@ async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             logger.error(f"Telegram API错误: {error_str}")
             
             # 处理特定类型的错误
-            if "Too Many Requests" in error_str:
-                logger.warning("API限流，将暂停请求一段时间")
-                # 可以在这里添加等待逻辑
+            if isinstance(error, telegram.error.RetryAfter) or "Too Many Requests" in error_str:
+                # 按服务器返回的retry_after暂停限速发送器
+                retry_after = getattr(error, 'retry_after', 5)
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                logger.warning(f"API限流，暂停发送{retry_after}秒")
+                if telegram_sender is not None:
+                    telegram_sender.pause(retry_after)
             elif "Not Found" in error_str:
                 logger.error("API资源未找到，可能是Token无效或API点已更改")
             elif "Unauthorized" in error_str:
@@ -505,25 +837,26 @@ def main():
         start_time = datetime.now()
         logger.info(f"=== 机器人启动 | {start_time.strftime('%Y-%m-%d %H:%M:%S')} ===")
         
-        # 彻底清理所有Python进程
+        # 优雅停止旧实例：发送SIGTERM，旧实例处理完进行中的任务、保存缓存后退出，超时才强制终止
         try:
-            import subprocess
-            logger.info("尝试终止所有现有的bot实例...")
-            # 尝试多种方式终止进程
-            subprocess.run("pkill -9 -f 'python.*bot.py'", shell=True)
-            subprocess.run("ps aux | grep 'python.*bot.py' | grep -v grep | awk '{print $2}' | xargs -I{} kill -9 {}", shell=True)
-            # 等待进程终止
-            time.sleep(5)
-            # 验证进程已终止
-            result = subprocess.run("ps aux | grep 'python.*bot.py' | grep -v grep", shell=True, capture_output=True, text=True)
-            if result.stdout.strip():
-                logger.warning(f"仍有bot进程在运行: {result.stdout.strip()}")
-            else:
-                logger.info("已确认所有bot进程已终止")
+            logger.info("尝试停止现有的bot实例...")
+            stopped = stop_running(PID_FILE)
+            if stopped:
+                logger.info(f"已停止bot实例: {stopped}")
         except Exception as e:
-            logger.error(f"终止现有进程时出错: {str(e)}")
+            logger.error(f"停止现有实例时出错: {str(e)}")
             logger.error(traceback.format_exc())
         
+        # 持有PID文件锁直到退出，防止多个实例同时轮询
+        global pid_file
+        pid_file = PidFile(PID_FILE)
+        if not pid_file.acquire():
+            logger.error(f"另一个bot实例仍持有 {PID_FILE}，中止启动")
+            return
+        
+        # 在后台加载市场数据和分析器（包括旧实例保存的缓存），与删除webhook和连接Telegram并行
+        services.start()
+        
         # 确保不存在锁文件
         lock_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.lock')
         if os.path.exists(lock_file_path):
@@ -540,7 +873,6 @@ def main():
             return
         
         try:
-            import requests
             # 设置代理（如果有）
             proxies = {}
             http_proxy = os.getenv('HTTP_PROXY')
@@ -554,7 +886,7 @@ def main():
             logger.info("获取当前webhook信息...")
             webhook_info_url = f"https://api.telegram.org/bot{bot_token}/getWebhookInfo"
             try:
-                response = requests.get(webhook_info_url, proxies=proxies if proxies else None, timeout=15)
+                response = get_session().get(webhook_info_url, proxies=proxies if proxies else None, timeout=15)
                 webhook_info = response.json()
                 if webhook_info.get('ok'):
                     webhook_url = webhook_info.get('result', {}).get('url', '')
@@ -573,7 +905,7 @@ def main():
             max_retries = 3
             for retry in range(max_retries):
                 try:
-                    response = requests.get(url, proxies=proxies if proxies else None, timeout=15)
+                    response = get_session().get(url, proxies=proxies if proxies else None, timeout=15)
                     result = response.json()
                     
                     if result.get('ok'):
@@ -590,24 +922,28 @@ def main():
                         logger.info(f"等待5秒后重试...")
                         time.sleep(5)
             
-            # 等待Telegram API完全处理请求
-            logger.info("等待Telegram API完全处理请求 (10秒)...")
-            time.sleep(10)
-            
-            # 验证webhook已被删除
-            try:
-                response = requests.get(webhook_info_url, proxies=proxies if proxies else None, timeout=15)
-                webhook_info = response.json()
-                if webhook_info.get('ok'):
-                    webhook_url = webhook_info.get('result', {}).get('url', '')
-                    if not webhook_url:
-                        logger.info("验证成功: webhook已被完全删除")
+            # 等待Telegram API完全处理请求：轮询webhook状态直到删除生效（最多10秒）
+            logger.info("等待Telegram API完全处理请求 (最多10秒)...")
+            deadline = time.time() + 10
+            webhook_url = None
+            while True:
+                try:
+                    response = get_session().get(webhook_info_url, proxies=proxies if proxies else None, timeout=15)
+                    webhook_info = response.json()
+                    if webhook_info.get('ok'):
+                        webhook_url = webhook_info.get('result', {}).get('url', '')
+                        if not webhook_url:
+                            logger.info("验证成功: webhook已被完全删除")
+                            break
                     else:
+                        logger.warning(f"验证webhook删除状态失败: {webhook_info}")
+                except Exception as e:
+                    logger.error(f"验证webhook删除状态时出错: {str(e)}")
+                if time.time() >= deadline:
+                    if webhook_url:
                         logger.warning(f"webhook未完全删除，当前URL仍为: {webhook_url}")
-                else:
-                    logger.warning(f"验证webhook删除状态失败: {webhook_info}")
-            except Exception as e:
-                logger.error(f"验证webhook删除状态时出错: {str(e)}")
+                    break
+                time.sleep(1)
             
         except Exception as e:
             logger.error(f"处理webhook时出错: {str(e)}")
@@ -617,7 +953,8 @@ def main():
         try:
             logger.info("正在配置代理设置...")
             proxy_url = os.getenv('HTTP_PROXY')
-            request = HTTPXRequest(proxy_url=proxy_url) if proxy_url else None
+            # 连接池大小由TELEGRAM_POOL_SIZE配置（对应telegram.connection_pool_size），并发发送时不必等待连接
+            request = HTTPXRequest(connection_pool_size=telegram_pool_size(), proxy_url=proxy_url)
             logger.info(f"代理配置完成: {'使用代理' if proxy_url else '不使用代理'}")
         except Exception as e:
             logger.error(f"配置代理时出错: {str(e)}")
@@ -652,6 +989,9 @@ def main():
                 'loop': loop
             }
             logger.info("全局应用上下文设置完成")
+            
+            global telegram_sender
+            telegram_sender = TelegramSender(application.bot)
         except Exception as e:
             logger.error(f"创建Telegram应用时出错: {str(e)}")
             traceback.print_exc()
@@ -667,7 +1007,15 @@ def main():
             application.add_handler(CommandHandler("start", start_command))
             application.add_handler(CommandHandler("help", help_command))
             application.add_handler(CommandHandler("analyze", analyze_command))
+            application.add_handler(CommandHandler("compare", compare_command))
             application.add_handler(CommandHandler("strategy", strategy_command))
+            application.add_handler(CommandHandler("stats", stats_command))
+            application.add_handler(CommandHandler("subscribe", subscribe_command))
+            application.add_handler(CommandHandler("unsubscribe", unsubscribe_command))
+            application.add_handler(CommandHandler("subscriptions", subscriptions_command))
+            application.add_handler(CommandHandler("alert", alert_command))
+            application.add_handler(CommandHandler("unalert", unalert_command))
+            application.add_handler(CommandHandler("alerts", alerts_command))
             logger.info("命令处理器添加完成")
     
             # 添加错误处理器
@@ -687,7 +1035,8 @@ def main():
                         if not message_queue.empty():
                             task = message_queue.get()
                             try:
-                                await task()
+                                with metrics.span('telegram.send'):
+                                    await task()
                             except Exception as e:
                                 logger.error(f"执行消息任务时出错: {str(e)}")
                             finally:
@@ -696,6 +1045,25 @@ def main():
                 except Exception as e:
                     logger.error(f"消息处理器异常: {str(e)}")
             
+            async def start_services():
+                """等待服务加载完成后启动后台任务，加载失败时每30秒重试"""
+                while True:
+                    try:
+                        loaded = await services.wait()
+                        break
+                    except Exception as e:
+                        logger.error(f"服务加载失败，30秒后重试: {str(e)}")
+                        await asyncio.sleep(30)
+                
+                # 启动行情流，提醒改为由推送驱动
+                if loaded.market_stream.start():
+                    loaded.alert_manager.attach_stream(loaded.market_stream)
+                # 启动热门币种缓存预热、订阅推送和提醒检查
+                loaded.cache_warmer.start()
+                loaded.subscription_manager.start()
+                loaded.alert_manager.start()
+                logger.info(f"后台服务已启动，加载耗时{services.loaded_in:.2f}秒")
+            
             # 创建一个异步任务来处理消息队列
             async def start_bot():
                 """启动机器人和消息处理器"""
@@ -704,11 +1072,24 @@ def main():
                     # 创建并启动消息处理任务
                     message_task = asyncio.create_task(message_processor())
                     logger.info("消息处理任务已创建")
+                    
                 except Exception as e:
                     logger.error(f"创建消息处理任务时出错: {str(e)}")
                     traceback.print_exc()
                     raise
                 
+                # 设置了METRICS_PORT时在同一事件循环中启动Prometheus指标端点
+                metrics_port = os.getenv('METRICS_PORT')
+                if metrics_port:
+                    try:
+                        await start_metrics_server(os.getenv('METRICS_HOST', '127.0.0.1'), int(metrics_port))
+                    except Exception as e:
+                        logger.error(f"启动指标端点时出错: {str(e)}")
+                
+                # 启动限速发送器；行情流、缓存预热、订阅推送和提醒检查在服务加载完成后启动
+                sender_task = asyncio.create_task(telegram_sender.run())
+                services_task = asyncio.create_task(start_services())
+                
                 try:
                     # 启动机器人
                     logger.info("正在初始化应用...")
@@ -767,7 +1148,7 @@ def main():
                                             # 重置连接
                                             try:
                                                 delete_url = f"https://api.telegram.org/bot{bot_token}/deleteWebhook?drop_pending_updates=true"
-                                                requests.get(delete_url)
+                                                await get_async_client().get(delete_url)
                                                 logger.info("已尝试重置连接")
                                                 # 重置错误计数
                                                 error_count = 0
@@ -801,26 +1182,18 @@ def main():
                     traceback.print_exc()
                     raise
                 
-                # 保持机器人运行，直到被中断
+                # 保持机器人运行，直到收到SIGTERM/SIGINT
+                shutdown_event = install_shutdown_signals(asyncio.get_running_loop())
                 try:
                     logger.info("机器人已启动并正在运行...")
-                    # 保持应用程序运行，直到按下Ctrl+C或发生其他中断
-                    while True:
-                        await asyncio.sleep(1)
+                    await shutdown_event.wait()
+                    logger.info("机器人正在关闭: 收到停止信号")
                 except (KeyboardInterrupt, asyncio.CancelledError) as e:
                     # 正常关闭
                     logger.info(f"机器人正在关闭: {type(e).__name__}")
                 finally:
                     logger.info("开始清理资源...")
-                    # 停止消息处理任务
-                    try:
-                        message_task.cancel()
-                        await asyncio.wait_for(asyncio.shield(message_task), timeout=2)
-                        logger.info("消息处理任务已取消")
-                    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
-                        logger.info(f"等待消息处理任务取消时超时或被取消: {type(e).__name__}")
-                    
-                    # 关闭机器人
+                    # 先停止接收新的更新，已收到的命令继续处理
                     try:
                         if 'polling_task_instance' in locals() and polling_task_instance:
                             logger.info("正在停止手动轮询任务...")
@@ -835,13 +1208,53 @@ def main():
                             logger.info("正在停止updater...")
                             await application.updater.stop()
                             logger.info("updater已停止")
-                        
+                    except Exception as e:
+                        logger.error(f"停止轮询时出错: {str(e)}")
+                    
+                    # 停止订阅推送、提醒检查和缓存预热的定时任务
+                    services_task.cancel()
+                    loaded = services.get() if services.ready else None
+                    if loaded:
+                        loaded.subscription_manager.stop()
+                        loaded.alert_manager.stop()
+                        loaded.cache_warmer.stop()
+                    
+                    # 等待进行中的分析任务完成，并把它们的回复发送出去
+                    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+                    if not await drain_executor(thread_pool, SHUTDOWN_TIMEOUT):
+                        logger.warning(f"{SHUTDOWN_TIMEOUT}秒内仍有分析任务未完成")
+                    if not await drain_queue(message_queue, max(0.0, deadline - time.monotonic())):
+                        logger.warning(f"消息队列中仍有{message_queue.unfinished_tasks}条消息未发送")
+                    try:
+                        message_task.cancel()
+                        await asyncio.wait_for(asyncio.shield(message_task), timeout=2)
+                        logger.info("消息处理任务已取消")
+                    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                        logger.info(f"等待消息处理任务取消时超时或被取消: {type(e).__name__}")
+                    
+                    # 等待已排队的推送发送完
+                    telegram_sender.stop()
+                    try:
+                        await asyncio.wait_for(asyncio.shield(sender_task),
+                                               timeout=max(2.0, deadline - time.monotonic()))
+                        logger.info("限速发送器已停止")
+                    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                        logger.info(f"等待限速发送器停止时超时或被取消: {type(e).__name__}")
+                    
+                    # 停止行情流，保存缓存供下一个实例加载
+                    if loaded:
+                        loaded.market_stream.stop()
+                        save_caches(CACHE_SNAPSHOT_FILE, cache_registry(loaded.market_data, loaded.market_analyzer))
+                    
+                    # 关闭机器人
+                    try:
                         logger.info("正在停止应用...")
                         await application.stop()
                         logger.info("应用已停止")
                         
                         logger.info("正在关闭应用...")
                         await application.shutdown()
+                        await close_async_client()
                         logger.info("应用已关闭")
                     except Exception as e:
                         logger.error(f"关闭应用时出错: {str(e)}")
@@ -877,4 +1290,6 @@ if __name__ == '__main__':
     finally:
         # 确保线程池被关闭
         thread_pool.shutdown(wait=False)
+        if pid_file:
+            pid_file.release()
         logger.info("Bot shutdown complete") 
\ No newline at end of file
@@ -8,17 +8,16 @@ import os
 import sys
 import time
 import logging
-import signal
 import traceback
-import psutil
 import subprocess
 from typing import Dict, Any, Optional, Type, List
 from dotenv import load_dotenv
-import requests
+from http_session import get_session
 
 from .trading_bot import TradingBot
 from .telegram_bot import TelegramTradingBot
 from .simple_bot import SimpleTelegramBot
+from supervisor import DEFAULT_SUPERVISOR_CONFIG, stop_running, find_bot_processes, wait_until
 
 class BotManager:
     """
@@ -219,76 +218,22 @@ class BotManager:
     
     def kill_existing_bots(self) -> bool:
         """
-        强制终止所有可能正在运行的bot进程
+        优雅停止所有可能正在运行的bot进程（SIGTERM，超时后才SIGKILL）
         
         Returns:
             操作是否成功
         """
-        self.logger.info("正在检查并终止所有可能的bot实例...")
+        self.logger.info("正在检查并停止所有可能的bot实例...")
         
-        # 方法1: 使用psutil查找和终止所有包含"bot.py"或"simple_bot.py"的Python进程
-        killed_processes = []
-        current_pid = os.getpid()  # 获取当前进程的PID，避免终止自身
+        # 旧实例收到SIGTERM后处理完进行中的任务并保存缓存，退出后立即返回，不再固定等待
+        stopped = stop_running(os.getenv('PID_FILE', DEFAULT_SUPERVISOR_CONFIG['pid_file']))
+        if stopped:
+            self.logger.info(f"已停止bot进程: {stopped}")
         
-        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-            try:
-                # 跳过当前进程
-                if proc.info['pid'] == current_pid:
-                    continue
-                    
-                # 检查命令行参数中是否包含bot.py或simple_bot.py
-                if proc.info['cmdline'] and any(bot_file in ' '.join(proc.info['cmdline']) 
-                                            for bot_file in ['bot.py', 'simple_bot.py']):
-                    self.logger.info(f"发现bot进程: PID={proc.info['pid']}, CMD={' '.join(proc.info['cmdline'])}")
-                    # 发送SIGKILL信号强制终止进程
-                    try:
-                        os.kill(proc.info['pid'], signal.SIGKILL)
-                        killed_processes.append(proc.info['pid'])
-                        self.logger.info(f"已终止进程 {proc.info['pid']}")
-                    except Exception as e:
-                        self.logger.error(f"终止进程 {proc.info['pid']} 时出错: {str(e)}")
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        
-        # 方法2: 使用shell命令查找和终止进程
-        try:
-            # 查找并杀死所有python中包含bot.py的进程
-            subprocess.run("pkill -9 -f 'python.*bot\.py'", shell=True)
-            # 再次使用killall确保Python进程被终止
-            subprocess.run("killall -9 python python3 | true", shell=True)
-            self.logger.info("已执行额外的进程终止命令")
-        except Exception as e:
-            self.logger.error(f"执行shell终止命令时出错: {str(e)}")
-        
-        # 等待进程完全终止
-        if killed_processes:
-            self.logger.info(f"等待10秒确保所有进程已完全终止...")
-            time.sleep(10)
-            
-            # 验证进程是否已终止
-            still_running = []
-            for pid in killed_processes:
-                try:
-                    # 如果进程仍然存在，os.kill将不会引发异常
-                    os.kill(pid, 0)
-                    still_running.append(pid)
-                except OSError:
-                    # 进程不存在，正常情况
-                    pass
-            
-            if still_running:
-                self.logger.warning(f"以下进程仍在运行: {still_running}")
-                # 再次尝试终止
-                for pid in still_running:
-                    try:
-                        os.kill(pid, signal.SIGKILL)
-                        self.logger.info(f"再次尝试终止进程 {pid}")
-                    except Exception:
-                        pass
-                # 最后等待一次
-                time.sleep(5)
-        else:
-            self.logger.info("未发现正在运行的bot进程")
+        still_running = find_bot_processes()
+        if still_running:
+            self.logger.warning(f"以下进程仍在运行: {still_running}")
+            return False
         
         return True
     
@@ -327,7 +272,7 @@ class BotManager:
             
             for i in range(max_retries):
                 try:
-                    response = requests.get(delete_webhook_url, proxies=proxies if proxies else None, timeout=30)
+                    response = get_session().get(delete_webhook_url, proxies=proxies if proxies else None, timeout=30)
                     
                     if response.status_code == 200:
                         result = response.json()
@@ -357,9 +302,20 @@ class BotManager:
                 self.logger.error("删除webhook失败，达到最大重试次数")
                 return False
             
-            # 等待API完全处理请求
-            self.logger.info("等待30秒确保Telegram API完全处理请求...")
-            time.sleep(30)
+            # 轮询webhook状态，删除生效后立即返回（最多30秒）
+            webhook_info_url = f"https://api.telegram.org/bot{bot_token}/getWebhookInfo"
+            
+            def webhook_deleted():
+                try:
+                    response = get_session().get(webhook_info_url, proxies=proxies if proxies else None, timeout=30)
+                    webhook_info = response.json() if response.status_code == 200 else {}
+                    return webhook_info.get('ok', False) and not webhook_info.get('result', {}).get('url', '')
+                except Exception as e:
+                    self.logger.error(f"验证webhook删除状态时出错: {str(e)}")
+                    return False
+            
+            if not wait_until(webhook_deleted, 30, interval=2):
+                self.logger.warning("webhook在30秒内未完全删除")
             
             return True
             
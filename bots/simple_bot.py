@@ -10,7 +10,7 @@ import time
 import logging
 from typing import Dict, Any, Optional
 import traceback
-import requests
+from http_session import get_session
 import telegram
 from telegram.ext import Application, CommandHandler, ContextTypes
 from telegram import Update
@@ -89,7 +89,7 @@ class SimpleTelegramBot(TradingBot):
             
             # 使用直接HTTP请求删除webhook
             delete_webhook_url = f"https://api.telegram.org/bot{self.token}/deleteWebhook?drop_pending_updates=true"
-            response = requests.get(delete_webhook_url, timeout=30)
+            response = get_session().get(delete_webhook_url, timeout=30)
             if response.status_code == 200:
                 result = response.json()
                 if result.get('ok'):
@@ -165,7 +165,7 @@ class SimpleTelegramBot(TradingBot):
                 try:
                     # 强制删除webhook并清除所有待处理更新
                     delete_url = f"https://api.telegram.org/bot{self.token}/deleteWebhook?drop_pending_updates=true"
-                    response = requests.get(delete_url, timeout=30)
+                    response = get_session().get(delete_url, timeout=30)
                     
                     if response.status_code == 200:
                         result = response.json()
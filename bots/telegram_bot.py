@@ -12,18 +12,24 @@ from threading import Lock
 from queue import Queue
 from typing import Dict, Any, Optional, List, Callable
 from functools import partial
+from types import SimpleNamespace
 import telegram
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 from telegram.request import HTTPXRequest
 from dotenv import load_dotenv
 import requests
+import http_session
+from http_session import get_session
 import time
-import psutil
 
 from .trading_bot import TradingBot
-from market_data import MarketData
-from market_analyzer import MarketAnalyzer
+from metrics import metrics
+from metrics_server import start_metrics_server, register_bot_gauges
+from startup import BackgroundLoader
+from telegram_sender import TelegramSender
+from supervisor import (DEFAULT_SUPERVISOR_CONFIG, PidFile, stop_running, install_shutdown_signals,
+                        drain_executor, drain_queue, save_caches, load_caches, cache_registry)
 
 class TelegramTradingBot(TradingBot):
     """
@@ -32,12 +38,13 @@ class TelegramTradingBot(TradingBot):
     通过Telegram机器人API实现与用户的交互，提供市场分析和交易信号
     """
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], market_data=None):
         """
         初始化Telegram交易机器人
         
         Args:
             config: 机器人配置信息
+            market_data: 市场数据实例，不提供时自动创建（可注入离线数据源用于压测）
         """
         super().__init__(config)
         
@@ -49,10 +56,21 @@ class TelegramTradingBot(TradingBot):
         if not self.token:
             raise ValueError("未找到Telegram Bot Token，请检查配置或环境变量")
         
+        # 管理员ID列表（/stats等管理命令仅对管理员开放）
+        admin_ids = config.get('telegram', {}).get('admin_ids') or config.get('admin_ids')
+        if not admin_ids and os.getenv('ADMIN_IDS'):
+            admin_ids = [item.strip() for item in os.getenv('ADMIN_IDS').split(',') if item.strip()]
+        self.admin_ids = {int(admin_id) for admin_id in (admin_ids or [])}
+        
         # 设置代理
         self.http_proxy = config.get('http_proxy', os.getenv('HTTP_PROXY'))
         self.https_proxy = config.get('https_proxy', os.getenv('HTTPS_PROXY'))
         
+        # 共享HTTP会话的连接池大小和代理（webhook管理、CMC等请求复用连接）
+        http_config = http_session.http_config_from(config)
+        http_config.setdefault('proxy', self.https_proxy or self.http_proxy)
+        http_session.configure(http_config)
+        
         # 线程池和消息队列
         self.thread_pool = concurrent.futures.ThreadPoolExecutor(
             max_workers=config.get('thread_pool_size', 4)
@@ -68,12 +86,109 @@ class TelegramTradingBot(TradingBot):
         self.processed_commands = set()
         self.command_processors = {}
         
-        # 市场数据和分析器
-        self.market_data = MarketData()
-        self.market_analyzer = MarketAnalyzer(self.market_data)
+        # 市场数据、分析器和后台任务在后台线程中创建（pandas、binance等在这里才导入），
+        # run()开始加载，/start、/help不等待；需要市场数据的命令在首次使用时等待加载完成
+        self.sender_config = config.get('telegram', {}).get('rate_limits') or {}
+        self.sender = None
+        self.services = BackgroundLoader('services', partial(self._create_services, market_data))
+        
+        # PID文件（保证只有一个实例在轮询）、缓存快照文件和优雅关闭的超时时间，与bot.py使用相同的环境变量
+        self.pid_file = PidFile(os.getenv('PID_FILE', DEFAULT_SUPERVISOR_CONFIG['pid_file']))
+        self.cache_snapshot_file = os.getenv('CACHE_SNAPSHOT_FILE', DEFAULT_SUPERVISOR_CONFIG['cache_file'])
+        self.shutdown_timeout = float(os.getenv('SHUTDOWN_TIMEOUT', DEFAULT_SUPERVISOR_CONFIG['drain_timeout']))
+        self.shutdown_event = None
+        self.loop = None
+        
+        # 阶段耗时统计配置
+        self.metrics_config = config.get('performance', {}).get('metrics') or {}
+        metrics.configure(self.metrics_config)
         
         self.logger.info(f"Telegram交易机器人初始化完成: {self.token[:5]}...{self.token[-5:]}")
     
+    def _create_services(self, market_data=None) -> SimpleNamespace:
+        """
+        创建市场数据、分析器和后台任务（在后台线程中调用）
+        
+        Args:
+            market_data: 外部注入的MarketData（可注入离线数据源用于压测），默认按配置创建
+            
+        Returns:
+            包含market_data、market_analyzer、cache_warmer、subscription_manager、alert_manager、market_stream的命名空间
+        """
+        from market_data import MarketData
+        from market_analyzer import MarketAnalyzer
+        from cache_warmer import CacheWarmer
+        from subscriptions import SubscriptionManager
+        from alerts import AlertManager
+        from market_stream import MarketStream
+        
+        config = self.config
+        market_data_config = config.get('market_data', {})
+        cache_config = market_data_config.get('cache') or {}
+        market_data = market_data if market_data is not None else MarketData(
+            cache_config=cache_config, cmc_quote_config=market_data_config.get('cmc_quotes'),
+            kline_config=market_data_config.get('klines'), symbol_index_config=market_data_config.get('symbol_index'))
+        # analysis.strategies中的信号规则在创建时编译一次
+        analysis_config = config.get('analysis') or {}
+        market_analyzer = MarketAnalyzer(market_data, cache_config, analysis_config.get('strategies'),
+                                         analysis_config.get('batch'))
+        # 加载上一个实例退出时保存的K线和报告缓存
+        load_caches(self.cache_snapshot_file, cache_registry(market_data, market_analyzer))
+        
+        # 热门币种缓存预热
+        warmup_config = dict(cache_config.get('warmup') or {})
+        throttling = market_data_config.get('request_throttling') or {}
+        if throttling.get('enabled') and 'requests_per_minute' in throttling:
+            warmup_config.setdefault('requests_per_minute', throttling['requests_per_minute'])
+        
+        # 信号订阅推送，chat_id_for_reports作为固定推送目标
+        subscription_config = dict(config.get('subscriptions') or {})
+        subscription_config.setdefault('report_chat_id', config.get('telegram', {}).get('chat_id_for_reports'))
+        
+        # 注册Binance已用权重等运行时指标
+        register_bot_gauges(self.thread_pool, self.message_queue, getattr(market_data, 'client', None))
+        
+        return SimpleNamespace(
+            market_data=market_data,
+            market_analyzer=market_analyzer,
+            cache_warmer=CacheWarmer(market_analyzer, warmup_config, cache_config.get('ttl_seconds', 3600)),
+            subscription_manager=SubscriptionManager(market_analyzer, self._deliver_subscription,
+                                                     subscription_config),
+            alert_manager=AlertManager(market_data, self._deliver_subscription, config.get('alerts')),
+            # 行情流：关注的币种从推送中维护K线，报告不再请求REST
+            market_stream=MarketStream(market_data, config=market_data_config.get('stream'))
+        )
+    
+    @property
+    def market_data(self):
+        """市场数据（等待后台加载完成）"""
+        return self.services.get().market_data
+    
+    @property
+    def market_analyzer(self):
+        """市场分析器（等待后台加载完成）"""
+        return self.services.get().market_analyzer
+    
+    @property
+    def cache_warmer(self):
+        """热门币种缓存预热（等待后台加载完成）"""
+        return self.services.get().cache_warmer
+    
+    @property
+    def subscription_manager(self):
+        """信号订阅推送（等待后台加载完成）"""
+        return self.services.get().subscription_manager
+    
+    @property
+    def alert_manager(self):
+        """价格和指标提醒（等待后台加载完成）"""
+        return self.services.get().alert_manager
+    
+    @property
+    def market_stream(self):
+        """行情流（等待后台加载完成）"""
+        return self.services.get().market_stream
+    
     def initialize(self) -> bool:
         """
         初始化Telegram交易机器人
@@ -110,7 +225,15 @@ class TelegramTradingBot(TradingBot):
             'start': self._start_command,
             'help': self._help_command,
             'analyze': self._analyze_command,
-            'strategy': self._strategy_command
+            'compare': self._compare_command,
+            'strategy': self._strategy_command,
+            'stats': self._stats_command,
+            'subscribe': self._subscribe_command,
+            'unsubscribe': self._unsubscribe_command,
+            'subscriptions': self._subscriptions_command,
+            'alert': self._alert_command,
+            'unalert': self._unalert_command,
+            'alerts': self._alerts_command
         }
     
     def _delete_webhook(self) -> bool:
@@ -119,7 +242,7 @@ class TelegramTradingBot(TradingBot):
             self.logger.info("正在删除Telegram webhook...")
             
             delete_url = f"https://api.telegram.org/bot{self.token}/deleteWebhook?drop_pending_updates=true"
-            response = requests.get(delete_url, timeout=30)
+            response = get_session().get(delete_url, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -193,6 +316,9 @@ class TelegramTradingBot(TradingBot):
   /analyze BTC short - 短期策略分析（15分钟-1小时）
   /analyze BTC mid   - 中期策略分析（1-7天）
   /analyze BTC long  - 长期策略分析（1-4周）
+  /analyze BTC ETH SOL mid - 一次分析多个交易对，返回汇总报告
+/compare [交易对...] - 多个交易对的短期指标对比表
+  例如：/compare BTC ETH SOL BNB
 
 🔄 *策略切换*
 /strategy [策略类型] - 切换分析策略
@@ -201,6 +327,18 @@ class TelegramTradingBot(TradingBot):
   /strategy mid   - 切换到中期策略
   /strategy long  - 切换到长期策略
 
+🔔 *信号订阅*
+/subscribe [交易对] [策略类型] [close|change] - 订阅信号推送
+  close：每根K线收盘推送（默认）；change：推荐方向变化时推送
+/unsubscribe [交易对] [策略类型] - 取消订阅（all取消全部）
+/subscriptions - 查看当前订阅
+
+⏰ *价格提醒*
+/alert [交易对] [字段] [运算符] [阈值] [周期] - 添加提醒
+  例如：/alert BTC > 70000、/alert ETH rsi<30 1h
+/alerts - 查看当前提醒
+/unalert [提醒ID] - 删除提醒（all删除全部）
+
 📈 *策略说明*
 1. 短期策略（short）
    - 时间周期：15分钟-1小时
@@ -262,16 +400,33 @@ class TelegramTradingBot(TradingBot):
                 await update.message.reply_text("请指定要分析的交易对，例如：/analyze BTC")
                 return
                 
-            # 获取交易对
-            symbol = args[0].upper()
-            strategy_param = args[1].lower() if len(args) > 1 else self.strategy  # 使用当前策略
-            
-            # 验证策略类型
+            # 获取交易对和策略类型：最后一个参数是有效的策略类型时作为策略，其余参数都是交易对
             valid_strategies = ['short', 'mid', 'long']
-            is_valid_strategy = strategy_param in valid_strategies
+            if len(args) > 1 and args[-1].lower() in valid_strategies:
+                symbol_args, strategy = args[:-1], args[-1].lower()
+            else:
+                symbol_args, strategy = args, self.strategy  # 使用当前策略
+            symbols = list(dict.fromkeys(item.upper() for item in symbol_args))
+            symbol = symbols[0]
+            
+            # 首次使用时等待市场数据和分析器加载完成
+            loaded = await self.services.wait()
+            max_symbols = loaded.market_analyzer.batch_config['max_symbols']
+            # 未上架的交易对按交易对索引直接拒绝
+            rejection = loaded.market_data.symbols.reject_message(symbols)
+            # 没有指定策略且最后一个参数未上架时，可能是拼错的策略类型
+            if rejection and len(symbol_args) == len(args) > 1 and not loaded.market_data.symbols.is_listed(args[-1]):
+                rejection += f"\n（如果'{args[-1]}'是策略类型，可用：short/mid/long）"
+            if len(symbols) > max_symbols or rejection:
+                with self.user_task_locks_mutex:
+                    if user_id in self.user_task_locks:
+                        del self.user_task_locks[user_id]
+                await update.message.reply_text(
+                    rejection or f"一次最多分析{max_symbols}个交易对，请减少交易对数量后重试。")
+                return
+            for item in symbols:
+                metrics.record_request(item)
             
-            # 使用有效的策略类型
-            strategy = strategy_param if is_valid_strategy else self.strategy
             strategy_desc = "短期" if strategy == 'short' else "中期" if strategy == 'mid' else "长期"
                 
             # 保存用户的分析参数
@@ -281,15 +436,23 @@ class TelegramTradingBot(TradingBot):
             context.user_data['last_strategy'] = strategy
             
             # 构建统一的状态消息
-            if not is_valid_strategy:
-                status_msg = f"🔍 '{strategy_param}'不是有效的策略类型（可用：short/mid/long），将使用{strategy_desc}策略分析 {symbol}..."
-            else:
-                status_msg = f"🔍 正在分析 {symbol} 的{strategy_desc}市场数据，请稍候..."
+            status_msg = f"🔍 正在分析 {'、'.join(symbols)} 的{strategy_desc}市场数据，请稍候..."
             
             # 发送状态消息
             await update.message.reply_text(status_msg)
             self.logger.info(f"已发送分析状态消息：{status_msg}")
             
+            # 多个交易对作为一个任务分析，返回一条汇总报告
+            if len(symbols) > 1:
+                self.thread_pool.submit(
+                    self._analyze_batch_task,
+                    symbols,
+                    strategy,
+                    user_id,
+                    update.message
+                )
+                return
+            
             # 在线程池中异步执行分析
             self.thread_pool.submit(
                 self._analyze_market_data_task,
@@ -308,6 +471,61 @@ class TelegramTradingBot(TradingBot):
                 if user_id in self.user_task_locks:
                     del self.user_task_locks[user_id]
     
+    async def _compare_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/compare命令"""
+        user_id = None
+        try:
+            if not self._should_process_command('compare', update):
+                return
+            
+            # 获取用户ID
+            user_id = update.effective_user.id
+            self.logger.info(f"处理用户 {user_id} 的对比命令")
+            
+            # 检查用户是否已经有正在执行的任务（对比与分析共用任务锁）
+            with self.user_task_locks_mutex:
+                if user_id in self.user_task_locks:
+                    user_id = None
+                    await update.message.reply_text("您有一个正在进行的分析任务，请等待其完成后再发起新的请求。")
+                    return
+                else:
+                    # 为用户添加任务锁
+                    self.user_task_locks[user_id] = True
+            
+            symbols = list(dict.fromkeys(item.upper() for item in context.args or []))
+            if not symbols:
+                with self.user_task_locks_mutex:
+                    if user_id in self.user_task_locks:
+                        del self.user_task_locks[user_id]
+                await update.message.reply_text("请指定要对比的交易对，例如：/compare BTC ETH SOL BNB")
+                return
+            
+            loaded = await self.services.wait()
+            max_symbols = loaded.market_analyzer.batch_config['max_compare_symbols']
+            # 未上架的交易对按交易对索引直接拒绝
+            rejection = loaded.market_data.symbols.reject_message(symbols)
+            if len(symbols) > max_symbols or rejection:
+                with self.user_task_locks_mutex:
+                    if user_id in self.user_task_locks:
+                        del self.user_task_locks[user_id]
+                await update.message.reply_text(
+                    f"一次最多对比{max_symbols}个交易对，请减少交易对数量后重试。" if len(symbols) > max_symbols
+                    else rejection)
+                return
+            for symbol in symbols:
+                metrics.record_request(symbol)
+            
+            # 未缓存的交易对需要获取数据，在线程池中执行，任务结束时释放任务锁
+            self.thread_pool.submit(self._compare_task, symbols, user_id, update.message)
+            
+        except Exception as e:
+            self.logger.error(f"处理compare命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+            # 确保释放用户任务锁
+            with self.user_task_locks_mutex:
+                if user_id in self.user_task_locks:
+                    del self.user_task_locks[user_id]
+    
     async def _strategy_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """处理/strategy命令"""
         try:
@@ -363,6 +581,115 @@ class TelegramTradingBot(TradingBot):
                 if user_id in self.user_task_locks:
                     del self.user_task_locks[user_id]
     
+    async def _stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/stats命令（仅管理员可用）"""
+        try:
+            if not self._should_process_command('stats', update):
+                return
+            
+            user_id = update.effective_user.id
+            if user_id not in self.admin_ids:
+                self.logger.warning(f"非管理员用户 {user_id} 尝试使用stats命令")
+                await update.message.reply_text("该命令仅限管理员使用。")
+                return
+            
+            await update.message.reply_text(metrics.render_summary())
+            self.logger.info(f"已向管理员 {user_id} 发送运行状态")
+            
+        except Exception as e:
+            self.logger.error(f"处理stats命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _subscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/subscribe命令"""
+        try:
+            if not self._should_process_command('subscribe', update):
+                return
+            
+            reply = (await self.services.wait()).subscription_manager.handle_subscribe(update.effective_chat.id, context.args or [])
+            await update.message.reply_text(reply)
+            
+        except Exception as e:
+            self.logger.error(f"处理subscribe命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _unsubscribe_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/unsubscribe命令"""
+        try:
+            if not self._should_process_command('unsubscribe', update):
+                return
+            
+            reply = (await self.services.wait()).subscription_manager.handle_unsubscribe(update.effective_chat.id, context.args or [])
+            await update.message.reply_text(reply)
+            
+        except Exception as e:
+            self.logger.error(f"处理unsubscribe命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _subscriptions_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/subscriptions命令"""
+        try:
+            if not self._should_process_command('subscriptions', update):
+                return
+            
+            loaded = await self.services.wait()
+            await update.message.reply_text(loaded.subscription_manager.describe(update.effective_chat.id))
+            
+        except Exception as e:
+            self.logger.error(f"处理subscriptions命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _alert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/alert命令"""
+        try:
+            if not self._should_process_command('alert', update):
+                return
+            
+            reply = (await self.services.wait()).alert_manager.handle_alert(update.effective_chat.id, context.args or [])
+            await update.message.reply_text(reply)
+            
+        except Exception as e:
+            self.logger.error(f"处理alert命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _unalert_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/unalert命令"""
+        try:
+            if not self._should_process_command('unalert', update):
+                return
+            
+            reply = (await self.services.wait()).alert_manager.handle_unalert(update.effective_chat.id, context.args or [])
+            await update.message.reply_text(reply)
+            
+        except Exception as e:
+            self.logger.error(f"处理unalert命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    async def _alerts_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """处理/alerts命令"""
+        try:
+            if not self._should_process_command('alerts', update):
+                return
+            
+            loaded = await self.services.wait()
+            await update.message.reply_text(loaded.alert_manager.describe(update.effective_chat.id))
+            
+        except Exception as e:
+            self.logger.error(f"处理alerts命令时出错: {str(e)}")
+            await update.message.reply_text("处理命令时发生错误，请稍后重试")
+    
+    def _deliver_subscription(self, chat_id: int, text: str) -> None:
+        """
+        把订阅推送和提醒交给限速发送器（在调度线程中调用）
+        
+        Args:
+            chat_id: 聊天ID
+            text: 报告文本
+        """
+        if self.sender is None:
+            raise RuntimeError("限速发送器尚未创建")
+        self.sender.enqueue_threadsafe(chat_id, text)
+    
     def _should_process_command(self, command_name: str, update: Update) -> bool:
         """
         检查命令是否应该被处理（避免重复处理）
@@ -379,10 +706,13 @@ class TelegramTradingBot(TradingBot):
         
         # 检查命令是否已处理
         if command_id in self.processed_commands:
+            metrics.cache_access('processed_commands', hit=True)
             self.logger.info(f"命令 {command_id} 已处理，跳过")
             return False
         
         # 标记命令为已处理
+        metrics.cache_access('processed_commands', hit=False)
+        metrics.inc('commands_total', command=command_name)
         self.processed_commands.add(command_id)
         
         # 清理过大的命令集合
@@ -394,6 +724,29 @@ class TelegramTradingBot(TradingBot):
         
         return True
     
+    def _send_reply_from_thread(self, message_obj, text: str) -> None:
+        """
+        从后台线程回复消息：优先交给限速发送器，发送器未启动时放入消息队列
+        
+        Args:
+            message_obj: Telegram消息对象
+            text: 回复文本
+        """
+        if self.sender is not None and self.sender.loop is not None:
+            # 在群组中回复到发起命令的消息下；命令消息已被删除时照常发送
+            self.sender.enqueue_threadsafe(message_obj.chat_id, text, reply_to_message_id=message_obj.message_id,
+                                           allow_sending_without_reply=True)
+            return
+        
+        async def send_message():
+            try:
+                await message_obj.reply_text(text)
+            except Exception as e:
+                self.logger.error(f"发送消息时出错: {str(e)}")
+        
+        # 将消息放入队列，由主线程的协程处理
+        self.message_queue.put(send_message)
+    
     def _analyze_market_data_task(self, symbol: str, strategy: str, user_id: int, message_obj) -> None:
         """
         后台线程任务，处理市场数据分析
@@ -404,6 +757,7 @@ class TelegramTradingBot(TradingBot):
             user_id: 用户ID
             message_obj: Telegram消息对象
         """
+        metrics.add('analysis_workers_busy', 1)
         try:
             self.logger.info(f"后台线程开始分析 {symbol} 的 {strategy} 策略数据")
             
@@ -411,44 +765,79 @@ class TelegramTradingBot(TradingBot):
             report = self.analyze(symbol, strategy)
             
             if not report:
-                # 使用消息队列发送回主线程
-                async def send_error_message():
-                    try:
-                        await message_obj.reply_text(f"无法获取 {symbol} 的市场数据，请稍后再试。")
-                        self.logger.info(f"发送了无法获取 {symbol} 市场数据的消息")
-                    except Exception as e:
-                        self.logger.error(f"发送消息时出错: {str(e)}")
-                
-                # 将消息放入队列，由主线程的协程处理
-                self.message_queue.put(send_error_message)
+                self._send_reply_from_thread(message_obj, f"无法获取 {symbol} 的市场数据，请稍后再试。")
                 self.logger.info(f"已将'无法获取{symbol}市场数据'的消息加入队列")
                 return
             
             # 发送分析结果
-            async def send_report():
-                try:
-                    await message_obj.reply_text(report)
-                    self.logger.info(f"成功发送 {symbol} 的 {strategy} 分析报告")
-                except Exception as e:
-                    self.logger.error(f"发送分析报告时出错: {str(e)}")
-            
-            self.message_queue.put(send_report)
+            self._send_reply_from_thread(message_obj, report)
             self.logger.info(f"成功完成 {symbol} 的 {strategy} 策略分析，报告已加入发送队列")
             
         except Exception as e:
             self.logger.error(f"线程分析 {symbol} 时发生错误: {str(e)}")
             traceback.print_exc()
             
-            async def send_error():
-                try:
-                    await message_obj.reply_text(f"分析 {symbol} 时发生错误，请稍后再试。")
-                    self.logger.info(f"发送了分析 {symbol} 错误的消息")
-                except Exception as ex:
-                    self.logger.error(f"发送错误消息时出错: {str(ex)}")
-            
-            self.message_queue.put(send_error)
+            self._send_reply_from_thread(message_obj, f"分析 {symbol} 时发生错误，请稍后再试。")
             self.logger.info(f"已将'分析{symbol}错误'的消息加入队列")
         finally:
+            metrics.add('analysis_workers_busy', -1)
+            # 释放用户任务锁
+            with self.user_task_locks_mutex:
+                if user_id in self.user_task_locks:
+                    del self.user_task_locks[user_id]
+                    self.logger.info(f"用户 {user_id} 的任务锁已释放")
+    
+    def _analyze_batch_task(self, symbols: List[str], strategy: str, user_id: int, message_obj) -> None:
+        """
+        后台线程任务，一次分析多个交易对并发送汇总报告
+        
+        Args:
+            symbols: 交易对符号列表
+            strategy: 策略类型
+            user_id: 用户ID
+            message_obj: Telegram消息对象
+        """
+        metrics.add('analysis_workers_busy', 1)
+        symbols_desc = '、'.join(symbols)
+        try:
+            self.logger.info(f"后台线程开始分析 {symbols_desc} 的 {strategy} 策略数据")
+            report = self.market_analyzer.analyze_batch(symbols, strategy)
+            self._send_reply_from_thread(message_obj, report)
+            self.logger.info(f"成功完成 {symbols_desc} 的 {strategy} 策略分析，汇总报告已加入发送队列")
+            
+        except Exception as e:
+            self.logger.error(f"线程分析 {symbols_desc} 时发生错误: {str(e)}")
+            traceback.print_exc()
+            self._send_reply_from_thread(message_obj, f"分析 {symbols_desc} 时发生错误，请稍后再试。")
+        finally:
+            metrics.add('analysis_workers_busy', -1)
+            # 释放用户任务锁
+            with self.user_task_locks_mutex:
+                if user_id in self.user_task_locks:
+                    del self.user_task_locks[user_id]
+                    self.logger.info(f"用户 {user_id} 的任务锁已释放")
+    
+    def _compare_task(self, symbols: List[str], user_id: int, message_obj) -> None:
+        """
+        后台线程任务，生成多币种对比表并发送
+        
+        Args:
+            symbols: 交易对符号列表
+            user_id: 用户ID
+            message_obj: Telegram消息对象
+        """
+        metrics.add('analysis_workers_busy', 1)
+        symbols_desc = '、'.join(symbols)
+        try:
+            self._send_reply_from_thread(message_obj, self.market_analyzer.compare(symbols))
+            self.logger.info(f"{symbols_desc} 的对比表已加入发送队列")
+            
+        except Exception as e:
+            self.logger.error(f"生成 {symbols_desc} 的对比表时发生错误: {str(e)}")
+            traceback.print_exc()
+            self._send_reply_from_thread(message_obj, f"对比 {symbols_desc} 时发生错误，请稍后再试。")
+        finally:
+            metrics.add('analysis_workers_busy', -1)
             # 释放用户任务锁
             with self.user_task_locks_mutex:
                 if user_id in self.user_task_locks:
@@ -498,9 +887,14 @@ class TelegramTradingBot(TradingBot):
                 self.logger.error(f"Telegram API错误: {error_str}")
                 
                 # 处理特定类型的错误
-                if "Too Many Requests" in error_str:
-                    self.logger.warning("API限流，将暂停请求一段时间")
-                    # 可以在这里添加等待逻辑
+                if isinstance(error, telegram.error.RetryAfter) or "Too Many Requests" in error_str:
+                    # 按服务器返回的retry_after暂停限速发送器
+                    retry_after = getattr(error, 'retry_after', 5)
+                    if hasattr(retry_after, 'total_seconds'):
+                        retry_after = retry_after.total_seconds()
+                    self.logger.warning(f"API限流，暂停发送{retry_after}秒")
+                    if self.sender is not None:
+                        self.sender.pause(retry_after)
                 elif "Not Found" in error_str:
                     self.logger.error("API资源未找到，可能是Token无效或API点已更改")
                 elif "Unauthorized" in error_str:
@@ -529,7 +923,8 @@ class TelegramTradingBot(TradingBot):
                     message_func = self.message_queue.get()
                     
                     # 执行消息处理函数
-                    await message_func()
+                    with metrics.span('telegram.send'):
+                        await message_func()
                     
                     # 标记任务完成
                     self.message_queue.task_done()
@@ -585,6 +980,29 @@ class TelegramTradingBot(TradingBot):
             traceback.print_exc()
             self.running = False
             
+    async def _start_services(self) -> None:
+        """
+        等待服务加载完成后启动后台任务，加载失败时每30秒重试
+        """
+        while self.running:
+            try:
+                loaded = await self.services.wait()
+                break
+            except Exception as e:
+                self.logger.error(f"服务加载失败，30秒后重试: {str(e)}")
+                await asyncio.sleep(30)
+        else:
+            return
+        
+        # 启动行情流，提醒改为由推送驱动
+        if loaded.market_stream.start():
+            loaded.alert_manager.attach_stream(loaded.market_stream)
+        # 启动热门币种缓存预热、订阅推送和提醒检查
+        loaded.cache_warmer.start()
+        loaded.subscription_manager.start()
+        loaded.alert_manager.start()
+        self.logger.info(f"后台服务已启动，加载耗时{self.services.loaded_in:.2f}秒")
+    
     async def _start_bot(self) -> None:
         """
         启动机器人
@@ -595,10 +1013,9 @@ class TelegramTradingBot(TradingBot):
             # 创建应用实例
             builder = Application.builder().token(self.token)
             
-            # 如果设置了代理，配置请求对象
-            if self.http_proxy:
-                request = HTTPXRequest(proxy=self.http_proxy)
-                builder = builder.request(request)
+            # 连接池大小取telegram.connection_pool_size，设置了代理时通过代理连接
+            request = HTTPXRequest(connection_pool_size=http_session.telegram_pool_size(), proxy=self.http_proxy)
+            builder = builder.request(request)
             
             self.application = builder.build()
             
@@ -609,20 +1026,94 @@ class TelegramTradingBot(TradingBot):
             # 注册错误处理器
             self.application.add_error_handler(self._error_handler)
             
-            # 创建任务
-            tasks = [
-                asyncio.create_task(self._message_processor()),
-                asyncio.create_task(self._polling_task())
-            ]
+            # 启动Prometheus指标端点（配置了端口时）
+            if self.metrics_config.get('port'):
+                try:
+                    await start_metrics_server(
+                        self.metrics_config.get('host', '127.0.0.1'),
+                        int(self.metrics_config['port'])
+                    )
+                except Exception as e:
+                    self.logger.error(f"启动指标端点时出错: {str(e)}")
+            
+            # 限速发送器；行情流、缓存预热、订阅推送和提醒检查在服务加载完成后启动
+            self.sender = TelegramSender(self.application.bot, self.sender_config)
             
-            # 等待任务完成或者直到机器人停止运行
-            self.logger.info("Telegram机器人启动成功，等待任务完成")
-            await asyncio.gather(*tasks, return_exceptions=True)
+            # 收到SIGTERM/SIGINT或调用stop()时开始优雅关闭
+            self.loop = asyncio.get_running_loop()
+            self.shutdown_event = install_shutdown_signals(self.loop)
+            
+            # 创建任务
+            tasks = {
+                'message': asyncio.create_task(self._message_processor()),
+                'sender': asyncio.create_task(self.sender.run()),
+                'services': asyncio.create_task(self._start_services()),
+                'polling': asyncio.create_task(self._polling_task())
+            }
             
         except Exception as e:
             self.logger.error(f"启动机器人时出错: {str(e)}")
             traceback.print_exc()
             self.running = False
+            return
+        
+        # 保持机器人运行，直到收到停止信号
+        try:
+            self.logger.info("Telegram机器人启动成功，等待停止信号")
+            await self.shutdown_event.wait()
+            self.logger.info("机器人正在关闭: 收到停止信号")
+        except asyncio.CancelledError:
+            self.logger.info("机器人正在关闭: 任务被取消")
+        finally:
+            await self._shutdown(tasks)
+    
+    async def _shutdown(self, tasks: Dict[str, asyncio.Task]) -> None:
+        """
+        优雅关闭：停止接收更新，等待进行中的分析任务和待发送消息，最后保存缓存
+        
+        Args:
+            tasks: _start_bot创建的任务
+        """
+        self.logger.info("开始清理资源...")
+        # 先停止接收新的更新，已收到的命令继续处理
+        tasks['polling'].cancel()
+        updater = getattr(self.application, 'updater', None)
+        if updater is not None and getattr(updater, 'running', False):
+            try:
+                await updater.stop()
+            except Exception as e:
+                self.logger.error(f"停止轮询时出错: {str(e)}")
+        
+        # 停止订阅推送、提醒检查和缓存预热的定时任务
+        tasks['services'].cancel()
+        loaded = self.services.get() if self.services.ready else None
+        if loaded:
+            loaded.subscription_manager.stop()
+            loaded.alert_manager.stop()
+            loaded.cache_warmer.stop()
+        
+        # 等待进行中的分析任务完成，并把它们的回复发送出去
+        deadline = time.monotonic() + self.shutdown_timeout
+        if not await drain_executor(self.thread_pool, self.shutdown_timeout):
+            self.logger.warning(f"{self.shutdown_timeout}秒内仍有分析任务未完成")
+        if not await drain_queue(self.message_queue, max(0.0, deadline - time.monotonic())):
+            self.logger.warning(f"消息队列中仍有{self.message_queue.unfinished_tasks}条消息未发送")
+        self.running = False
+        tasks['message'].cancel()
+        
+        # 等待已排队的推送发送完
+        self.sender.stop()
+        try:
+            await asyncio.wait_for(asyncio.shield(tasks['sender']), timeout=max(2.0, deadline - time.monotonic()))
+            self.logger.info("限速发送器已停止")
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self.logger.info(f"等待限速发送器停止时超时或被取消: {type(e).__name__}")
+        
+        # 停止行情流，保存缓存供下一个实例加载
+        if loaded:
+            loaded.market_stream.stop()
+            save_caches(self.cache_snapshot_file, cache_registry(loaded.market_data, loaded.market_analyzer))
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
     
     def run(self) -> None:
         """
@@ -630,6 +1121,21 @@ class TelegramTradingBot(TradingBot):
         """
         super().run()
         
+        # 优雅停止旧实例（BotManager.start_bot已停止过时立即返回），持有PID文件锁直到退出
+        try:
+            stopped = stop_running(self.pid_file.path)
+            if stopped:
+                self.logger.info(f"已停止bot实例: {stopped}")
+        except Exception as e:
+            self.logger.error(f"停止现有实例时出错: {str(e)}")
+        if not self.pid_file.acquire():
+            self.logger.error(f"另一个bot实例仍持有 {self.pid_file.path}，中止启动")
+            self.running = False
+            return
+        
+        # 在后台加载市场数据和分析器（包括旧实例保存的缓存），与连接Telegram并行
+        self.services.start()
+        
         # 创建事件循环并运行
         try:
             self.logger.info("开始运行Telegram机器人")
@@ -639,6 +1145,8 @@ class TelegramTradingBot(TradingBot):
             traceback.print_exc()
             self.running = False
         finally:
+            self.loop = None
+            self.pid_file.release()
             self.logger.info("Telegram机器人已停止运行")
     
     def stop(self) -> None:
@@ -646,7 +1154,26 @@ class TelegramTradingBot(TradingBot):
         停止机器人
         """
         self.logger.info("正在停止Telegram机器人...")
+        
+        # 事件循环运行中时触发优雅关闭，由_shutdown排空任务并保存缓存
+        loop = self.loop
+        if loop is not None and self.shutdown_event is not None:
+            try:
+                loop.call_soon_threadsafe(self.shutdown_event.set)
+                return
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+        
         self.running = False
+        loaded = self.services.get() if self.services.ready else None
+        if loaded:
+            loaded.cache_warmer.stop()
+            loaded.subscription_manager.stop()
+            loaded.alert_manager.stop()
+            loaded.market_stream.stop()
+        if self.sender:
+            self.sender.stop()
         
         # 关闭线程池
         self.thread_pool.shutdown(wait=False)
@@ -0,0 +1,209 @@
+"""
+缓存预热调度模块
+
+使用apscheduler在后台维护一组热门币种（配置的币种加上按请求次数统计出的热门币种），
+在各策略基准K线收盘后重新获取K线、计算指标并生成short/mid/long报告写入缓存，
+刷新任务通过令牌桶按请求额度分散执行，避免超过Binance的请求频率限制
+"""
+
+import time
+import logging
+from threading import Event, Lock
+from typing import Dict, Any, List, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from metrics import metrics
+from market_cache import INTERVAL_SECONDS, STRATEGY_BASE_INTERVAL, DEFAULT_CACHE_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 默认预热配置
+DEFAULT_WARMUP_CONFIG = {
+    'enabled': False,
+    'symbols': [],
+    'learn_top_n': 5,
+    'max_symbols': 20,
+    'strategies': ['short', 'mid', 'long'],
+    'requests_per_minute': 30,
+    'budget_fraction': 0.5,
+    'calls_per_refresh': 8,
+    'delay_seconds': 5
+}
+
+# 刷新周期对应的cron参数（收盘后delay_seconds秒触发）
+CRON_FIELDS = {
+    '15m': {'minute': '*/15'},
+    '1h': {'minute': 0},
+    '4h': {'hour': '*/4', 'minute': 0},
+    '1d': {'hour': 0, 'minute': 0}
+}
+
+
+class RateBudget:
+    """
+    令牌桶请求额度
+
+    按每分钟请求数匀速补充令牌，acquire在额度不足时等待，可被stop事件中断
+    """
+
+    def __init__(self, requests_per_minute: float, burst: float, stop_event: Optional[Event] = None):
+        """
+        初始化请求额度
+
+        Args:
+            requests_per_minute: 每分钟允许的请求数
+            burst: 令牌桶容量
+            stop_event: 停止事件，设置后acquire立即返回False
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.stop_event = stop_event or Event()
+        self._lock = Lock()
+
+    def acquire(self, cost: float) -> bool:
+        """
+        获取请求额度
+
+        Args:
+            cost: 需要的令牌数
+
+        Returns:
+            是否获取成功（停止时返回False）
+        """
+        cost = min(cost, self.capacity)
+        while not self.stop_event.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return True
+                wait = (cost - self.tokens) / self.rate if self.rate > 0 else 1.0
+            self.stop_event.wait(wait)
+        return False
+
+
+class CacheWarmer:
+    """
+    缓存预热调度器
+
+    在后台线程中按K线收盘时间刷新热门币种的分析报告缓存
+    """
+
+    def __init__(self, analyzer, config: Optional[Dict[str, Any]] = None,
+                 cache_ttl: float = DEFAULT_CACHE_CONFIG['ttl_seconds']):
+        """
+        初始化预热调度器
+
+        Args:
+            analyzer: MarketAnalyzer实例
+            config: 预热配置（见config.example.json中的market_data.cache.warmup）
+            cache_ttl: 缓存有效期上限（秒），刷新周期不超过该值
+        """
+        self.analyzer = analyzer
+        self.config = dict(DEFAULT_WARMUP_CONFIG)
+        self.config.update(config or {})
+        self.cache_ttl = cache_ttl
+        self.stop_event = Event()
+        self.budget = RateBudget(
+            self.config['requests_per_minute'] * self.config['budget_fraction'],
+            self.config['calls_per_refresh'],
+            self.stop_event
+        )
+        self.scheduler = None
+
+    def hot_symbols(self) -> List[str]:
+        """
+        获取当前的热门币种
+
+        Returns:
+            配置的币种加上请求次数最多的币种（去重，最多max_symbols个）
+        """
+        symbols = [symbol.upper() for symbol in self.config['symbols']]
+        if self.config['learn_top_n']:
+            symbols.extend(symbol for symbol, _ in metrics.top_symbols(self.config['learn_top_n']))
+        unique = []
+        for symbol in symbols:
+            if symbol not in unique:
+                unique.append(symbol)
+        return unique[:self.config['max_symbols']]
+
+    def refresh_interval(self, strategy: str) -> str:
+        """
+        计算策略的刷新周期：基准K线周期，但不超过缓存有效期
+
+        Args:
+            strategy: 策略类型
+
+        Returns:
+            刷新周期，例如15m
+        """
+        base = STRATEGY_BASE_INTERVAL.get(strategy, '1h')
+        candidates = [interval for interval in CRON_FIELDS
+                      if INTERVAL_SECONDS[interval] <= min(INTERVAL_SECONDS[base], self.cache_ttl)]
+        return candidates[-1] if candidates else '15m'
+
+    def refresh(self, strategy: str) -> int:
+        """
+        刷新所有热门币种指定策略的报告缓存
+
+        Args:
+            strategy: 策略类型
+
+        Returns:
+            成功刷新的币种数
+        """
+        refreshed = 0
+        for symbol in self.hot_symbols():
+            if not self.budget.acquire(self.config['calls_per_refresh']):
+                break
+            try:
+                with metrics.span('warmup', strategy=strategy, symbol=symbol):
+                    self.analyzer.analyze_market(symbol, strategy)
+                refreshed += 1
+            except Exception as e:
+                logger.error(f"预热{symbol}的{strategy}报告时出错: {str(e)}")
+        metrics.inc('cache_warmup_total', refreshed, strategy=strategy)
+        logger.info(f"已预热{refreshed}个币种的{strategy}报告")
+        return refreshed
+
+    def start(self) -> bool:
+        """
+        启动后台调度
+
+        Returns:
+            是否已启动
+        """
+        if not self.config['enabled']:
+            logger.info("缓存预热未启用")
+            return False
+
+        self.stop_event.clear()
+        self.scheduler = BackgroundScheduler(daemon=True, timezone='UTC')
+        for strategy in self.config['strategies']:
+            interval = self.refresh_interval(strategy)
+            trigger = CronTrigger(second=self.config['delay_seconds'], timezone='UTC', **CRON_FIELDS[interval])
+            self.scheduler.add_job(
+                self.refresh, trigger, args=[strategy], id=f"warmup_{strategy}",
+                max_instances=1, coalesce=True, misfire_grace_time=60
+            )
+            logger.info(f"已添加{strategy}报告预热任务，刷新周期: {interval}")
+        self.scheduler.start()
+
+        # 启动后立即预热一次
+        for strategy in self.config['strategies']:
+            self.scheduler.add_job(self.refresh, args=[strategy], id=f"warmup_{strategy}_initial")
+        return True
+
+    def stop(self) -> None:
+        """停止后台调度"""
+        self.stop_event.set()
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("缓存预热调度已停止")
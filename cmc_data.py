@@ -2,10 +2,16 @@ import logging
 import time
 import os
 from datetime import datetime
-import requests
+from http_session import get_session
+from fast_json import response_json
 import pandas as pd
 from dotenv import load_dotenv
 import random
+import zlib
+import numpy as np
+
+from cmc_quotes import QuoteBatcher, cmc_symbol
+from indicators import IndicatorPipeline, dummy_volume_profile
 
 # 加载环境变量
 load_dotenv()
@@ -14,11 +20,94 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 模拟K线周期对应的pandas频率
+SYNTHETIC_FREQ = {
+    '15m': '15min',
+    '1h': 'H',
+    '4h': '4H',
+    '1d': 'D',
+    '3d': '3D',
+    '1w': 'W'
+}
+
+
+def synthetic_seed(symbol, interval):
+    """
+    模拟K线的随机种子（按币种和周期固定，同一输入每次生成相同的数据）
+    
+    Args:
+        symbol: 交易对
+        interval: K线周期
+        
+    Returns:
+        非负整数种子
+    """
+    return zlib.crc32(f"{symbol.upper()}:{interval}".encode('utf-8'))
+
+
+def synthesize_ohlcv(prices, percent_changes, volumes, limit, seeds):
+    """
+    向量化生成多个币种的模拟OHLCV数据
+    
+    每个币种使用独立的np.random.Generator（不修改全局随机状态，可在多个线程中同时调用），
+    收盘价为以当前价格为起点的随机漫步：close[i] = price * prod(1 + r[0..i])，r ~ N(0, 波动率)，
+    波动率为24小时涨跌幅的绝对值（不低于1%）
+    
+    Args:
+        prices: 各币种的当前价格
+        percent_changes: 各币种的24小时涨跌幅（%）
+        volumes: 各币种的24小时成交量
+        limit: 每个币种生成的K线数量
+        seeds: 各币种的随机种子
+        
+    Returns:
+        包含open、high、low、close、volume的字典，每项为(币种数, limit)的数组
+    """
+    count = len(prices)
+    volatility = np.maximum(np.abs(np.asarray(percent_changes, dtype=float)) / 100, 0.01)
+    
+    # 预分配(币种数, limit)数组，每个币种的随机数直接写入对应的行
+    returns = np.empty((count, limit))
+    high_noise = np.empty((count, limit))
+    low_noise = np.empty((count, limit))
+    volume_noise = np.empty((count, limit))
+    open_noise = np.empty(count)
+    for row, seed in enumerate(seeds):
+        rng = np.random.default_rng(seed)
+        rng.standard_normal(out=returns[row])
+        rng.random(out=high_noise[row])
+        rng.random(out=low_noise[row])
+        rng.random(out=volume_noise[row])
+        open_noise[row] = rng.random()
+    
+    returns *= volatility[:, None]
+    returns += 1.0
+    close = np.cumprod(returns, axis=1, out=returns)
+    close *= np.asarray(prices, dtype=float)[:, None]
+    
+    high = close * (1 + 0.02 * high_noise)
+    low = close * (1 - 0.02 * low_noise)
+    open_ = np.empty_like(close)
+    open_[:, 1:] = close[:, :-1]
+    open_[:, 0] = close[:, 0] * (1 - 0.01 * open_noise)
+    volume = (0.5 + volume_noise) * (np.asarray(volumes, dtype=float) / limit)[:, None]
+    return {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+
 class CMCData:
     """CoinMarketCap数据获取类，作为币安API的备用数据源"""
     
-    def __init__(self):
-        """初始化CoinMarketCap数据类"""
+    def __init__(self, quote_config=None, indicators=None):
+        """
+        初始化CoinMarketCap数据类
+        
+        Args:
+            quote_config: 报价批量请求配置（见config.example.json中的cmc.quotes）
+            indicators: 技术指标流水线，由MarketData传入以共用指标缓存，未提供时单独创建
+        """
+        # 报价批量请求器和共享报价缓存
+        self.quotes = QuoteBatcher(self._fetch_quotes, quote_config)
+        self.indicators = indicators if indicators is not None else IndicatorPipeline()
         try:
             # 尝试从环境变量获取API密钥
             self.api_key = os.getenv('CMC_API_KEY')
@@ -46,71 +135,89 @@ class CMCData:
             logger.error(f"初始化CoinMarketCap数据类失败: {str(e)}")
             
     def get_market_data(self, symbol):
-        """获取币种的市场数据"""
+        """获取币种的市场数据（与其他线程的请求合并为批量请求，结果在报价缓存中共享）"""
         try:
             logger.info(f"从CoinMarketCap获取{symbol}的市场数据")
-            
-            url = f"{self.base_url}/cryptocurrency/quotes/latest"
-            params = {
-                'symbol': symbol.replace('USDT', ''),
-                'convert': 'USD'
-            }
-            
-            # 设置重试次数和等待时间
-            max_retries = 3
-            retry_count = 0
-            wait_time = 1  # 初始等待时间（秒）
-            
-            while retry_count < max_retries:
-                try:
-                    response = requests.get(
-                        url, 
-                        headers=self.headers, 
-                        params=params,
-                        proxies=self.proxies if self.proxies else None,
-                        timeout=10
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        # 检查数据格式
-                        if 'data' in data and symbol.replace('USDT', '') in data['data']:
-                            coin_data = data['data'][symbol.replace('USDT', '')]
-                            quote = coin_data['quote']['USD']
-                            
-                            market_data = {
-                                'price': quote['price'],
-                                'volume_24h': quote['volume_24h'],
-                                'percent_change_1h': quote['percent_change_1h'],
-                                'percent_change_24h': quote['percent_change_24h'],
-                                'percent_change_7d': quote['percent_change_7d'],
-                                'market_cap': quote['market_cap'],
-                                'last_updated': quote['last_updated']
-                            }
-                            
-                            logger.info(f"成功获取{symbol}的CoinMarketCap市场数据")
-                            return market_data
-                        else:
-                            logger.warning(f"CoinMarketCap返回数据格式不正确: {data}")
-                    else:
-                        logger.warning(f"CoinMarketCap API请求失败，状态码: {response.status_code}, 返回: {response.text}")
-                        
-                    retry_count += 1
-                    time.sleep(wait_time)
-                    wait_time *= 2  # 指数退避
-                    
-                except Exception as e:
-                    logger.error(f"获取{symbol}的CoinMarketCap市场数据时出错: {str(e)}")
-                    retry_count += 1
-                    time.sleep(wait_time)
-                    wait_time *= 2
-                    
-            logger.error(f"获取{symbol}的CoinMarketCap市场数据失败，已达到最大重试次数")
-            return None
+            market_data = self.quotes.get(symbol)
+            if market_data is None:
+                logger.error(f"获取{symbol}的CoinMarketCap市场数据失败")
+            return market_data
             
         except Exception as e:
             logger.error(f"获取{symbol}的CoinMarketCap市场数据时发生异常: {str(e)}")
             return None
+    
+    def get_market_data_batch(self, symbols):
+        """
+        批量获取多个币种的市场数据（每max_symbols个币种一次请求）
+        
+        Args:
+            symbols: 币种或交易对列表
+            
+        Returns:
+            币种代码（例如BTC）到市场数据的映射，获取失败的币种为None
+        """
+        try:
+            return self.quotes.get_many(symbols)
+        except Exception as e:
+            logger.error(f"批量获取CoinMarketCap市场数据时发生异常: {str(e)}")
+            return {}
+    
+    def _fetch_quotes(self, symbols):
+        """
+        请求/cryptocurrency/quotes/latest，一次获取多个币种的报价
+        
+        Args:
+            symbols: 币种代码列表，例如['BTC', 'ETH']
+            
+        Returns:
+            响应中的data（币种代码到条目的映射），失败时返回None
+        """
+        url = f"{self.base_url}/cryptocurrency/quotes/latest"
+        params = {
+            'symbol': ','.join(symbols),
+            'convert': 'USD',
+            # 无效的币种代码不导致整个批量请求失败
+            'skip_invalid': 'true'
+        }
+        
+        # 设置重试次数和等待时间
+        max_retries = 3
+        retry_count = 0
+        wait_time = 1  # 初始等待时间（秒）
+        
+        while retry_count < max_retries:
+            try:
+                response = get_session().get(
+                    url, 
+                    headers=self.headers, 
+                    params=params,
+                    proxies=self.proxies if self.proxies else None,
+                    timeout=10
+                )
+                
+                if response.status_code == 200:
+                    data = response_json(response)
+                    # 检查数据格式
+                    if isinstance(data.get('data'), dict):
+                        logger.info(f"成功获取{len(data['data'])}个币种的CoinMarketCap报价")
+                        return data['data']
+                    logger.warning(f"CoinMarketCap返回数据格式不正确: {data}")
+                else:
+                    logger.warning(f"CoinMarketCap API请求失败，状态码: {response.status_code}, 返回: {response.text}")
+                    
+                retry_count += 1
+                time.sleep(wait_time)
+                wait_time *= 2  # 指数退避
+                
+            except Exception as e:
+                logger.error(f"获取CoinMarketCap报价时出错: {str(e)}")
+                retry_count += 1
+                time.sleep(wait_time)
+                wait_time *= 2
+                
+        logger.error(f"获取{','.join(symbols)}的CoinMarketCap报价失败，已达到最大重试次数")
+        return None
             
     def get_historical_data(self, symbol, interval, limit=100):
         """获取历史价格数据
@@ -132,70 +239,21 @@ class CMCData:
             
             # 生成模拟的历史数据
             # 注意：这些是模拟数据，仅供系统正常运行，不应用于实际交易决策
-            end_date = datetime.now()
-            
-            # 根据时间间隔确定数据粒度
-            if interval == '15m':
-                freq = '15min'
-            elif interval == '1h':
-                freq = 'H'
-            elif interval == '4h':
-                freq = '4H'
-            elif interval == '1d':
-                freq = 'D'
-            elif interval == '3d':
-                freq = '3D'
-            elif interval == '1w':
-                freq = 'W'
-            else:
-                freq = 'D'  # 默认为日线数据
-                
-            # 创建时间索引
-            date_range = pd.date_range(end=end_date, periods=limit, freq=freq)
-            date_range = date_range.sort_values()
             
             # 使用市场数据的涨跌幅来模拟历史价格波动
             percent_change = market_data.get('percent_change_24h', 0) or 0
-            volatility = abs(percent_change) / 100
-            if volatility < 0.01:
-                volatility = 0.01  # 设置最小波动率
-                
-            # 使用随机漫步模型生成价格
-            import numpy as np
-            np.random.seed(42)  # 使用固定的种子以便生成一致的结果
-            
-            returns = np.random.normal(0, volatility, size=limit)
-            price_series = [current_price]
-            
-            for ret in returns:
-                price_series.append(price_series[-1] * (1 + ret))
-                
-            price_series = price_series[1:]  # 移除第一个初始价格
-            
-            # 确保价格序列长度与日期范围一致
-            if len(price_series) > len(date_range):
-                price_series = price_series[:len(date_range)]
-            
-            # 生成OHLCV数据
-            df = pd.DataFrame(index=date_range)
-            df['close'] = price_series
-            df['high'] = df['close'] * (1 + np.random.uniform(0, 0.02, size=len(df)))
-            df['low'] = df['close'] * (1 - np.random.uniform(0, 0.02, size=len(df)))
-            df['open'] = df['close'].shift(1)
-            df.loc[df.index[0], 'open'] = df.loc[df.index[0], 'close'] * (1 - np.random.uniform(0, 0.01))
-            
-            # 模拟成交量
             volume = market_data.get('volume_24h', 1000000) or 1000000
-            df['volume'] = np.random.uniform(0.5, 1.5, size=len(df)) * volume / limit
-            
-            # 添加时间戳列
-            df['timestamp'] = df.index
-            
-            # 重新排序列
-            df = df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
-            
-            # 重置索引
-            df = df.reset_index(drop=True)
+            ohlcv = synthesize_ohlcv([current_price], [percent_change], [volume], limit,
+                                     seeds=[synthetic_seed(symbol, interval)])
+            
+            df = pd.DataFrame({
+                'timestamp': pd.date_range(end=datetime.now(), periods=limit, freq=SYNTHETIC_FREQ.get(interval, 'D')),
+                'open': ohlcv['open'][0],
+                'high': ohlcv['high'][0],
+                'low': ohlcv['low'][0],
+                'close': ohlcv['close'][0],
+                'volume': ohlcv['volume'][0]
+            })
             
             logger.info(f"已生成{symbol}的模拟历史{interval}数据，共{len(df)}条记录")
             return df
@@ -204,6 +262,50 @@ class CMCData:
             logger.error(f"获取{symbol}的历史数据时发生异常: {str(e)}")
             return None
             
+    def get_historical_data_batch(self, symbols, interval, limit=100):
+        """
+        一次生成多个币种的模拟历史数据（报价通过一次批量请求获取）
+        
+        Args:
+            symbols: 交易对列表
+            interval: K线周期
+            limit: 每个币种的K线数量
+            
+        Returns:
+            交易对到DataFrame的映射，无法获取报价的币种不包含在内
+        """
+        try:
+            quotes = self.get_market_data_batch(symbols)
+            available = [symbol for symbol in symbols if quotes.get(cmc_symbol(symbol))]
+            if not available:
+                return {}
+            
+            market_data = [quotes[cmc_symbol(symbol)] for symbol in available]
+            ohlcv = synthesize_ohlcv(
+                [item['price'] for item in market_data],
+                [item.get('percent_change_24h', 0) or 0 for item in market_data],
+                [item.get('volume_24h', 1000000) or 1000000 for item in market_data],
+                limit,
+                seeds=[synthetic_seed(symbol, interval) for symbol in available]
+            )
+            timestamps = pd.date_range(end=datetime.now(), periods=limit, freq=SYNTHETIC_FREQ.get(interval, 'D'))
+            result = {}
+            for row, symbol in enumerate(available):
+                result[symbol] = pd.DataFrame({
+                    'timestamp': timestamps,
+                    'open': ohlcv['open'][row],
+                    'high': ohlcv['high'][row],
+                    'low': ohlcv['low'][row],
+                    'close': ohlcv['close'][row],
+                    'volume': ohlcv['volume'][row]
+                })
+            logger.info(f"已生成{len(result)}个币种的模拟历史{interval}数据，每个{limit}条记录")
+            return result
+            
+        except Exception as e:
+            logger.error(f"批量生成历史数据时发生异常: {str(e)}")
+            return {}
+            
     def get_futures_data(self, symbol):
         """使用CMC API获取合约数据"""
         try:
@@ -218,7 +320,7 @@ class CMCData:
                 url = f"https://api.coinmarketcap.com/data-api/v3/cryptocurrency/detail/holders/symbol?symbol={symbol_clean}"
                 
                 # 调用 CMC API (这里仅作模拟)
-                # 实际实现应该使用 requests.get(url, headers=self.headers) 等
+                # 实际实现应该使用 get_session().get(url, headers=self.headers) 等
                 
                 # 解析响应数据
                 # 此处应该解析真实的API响应
@@ -346,7 +448,7 @@ class CMCData:
             
             while retry_count < max_retries:
                 try:
-                    response = requests.get(
+                    response = get_session().get(
                         url, 
                         headers=self.headers, 
                         params=params,
@@ -355,7 +457,7 @@ class CMCData:
                     )
                     
                     if response.status_code == 200:
-                        data = response.json()
+                        data = response_json(response)
                         # 检查数据格式
                         if 'data' in data and symbol.replace('USDT', '') in data['data']:
                             coin_data = data['data'][symbol.replace('USDT', '')]
@@ -438,47 +540,14 @@ class CMCData:
             klines_data = {}
             for tf in timeframes_to_get:
                 try:
+                    cached = self.indicators.cached(trading_symbol, tf)
+                    if cached is not None:
+                        klines_data[tf] = cached
+                        continue
                     klines = self.get_historical_data(trading_symbol, tf)
                     if klines is not None and not klines.empty:
                         # 计算技术指标
-                        import ta
-                        # RSI
-                        klines['rsi'] = ta.momentum.RSIIndicator(klines['close']).rsi()
-                        
-                        # MACD
-                        macd = ta.trend.MACD(klines['close'])
-                        klines['macd'] = macd.macd()  # DIF
-                        klines['macd_signal'] = macd.macd_signal()  # DEA
-                        klines['macd_diff'] = macd.macd_diff()  # MACD柱
-                        
-                        # EMA
-                        klines['ema5'] = ta.trend.EMAIndicator(klines['close'], window=5).ema_indicator()
-                        klines['ema13'] = ta.trend.EMAIndicator(klines['close'], window=13).ema_indicator()
-                        
-                        # 布林带
-                        bollinger = ta.volatility.BollingerBands(klines['close'])
-                        klines['bb_upper'] = bollinger.bollinger_hband()
-                        klines['bb_middle'] = bollinger.bollinger_mavg()
-                        klines['bb_lower'] = bollinger.bollinger_lband()
-                        
-                        # 计算成交量变化
-                        klines['volume_ma5'] = klines['volume'].rolling(window=5).mean()
-                        klines['volume_ma20'] = klines['volume'].rolling(window=20).mean()
-                        
-                        # 中期指标
-                        # MA20和MA50
-                        klines['ma20'] = ta.trend.SMAIndicator(klines['close'], window=20).sma_indicator()
-                        klines['ma50'] = ta.trend.SMAIndicator(klines['close'], window=50).sma_indicator()
-                        
-                        # OBV
-                        klines['obv'] = ta.volume.OnBalanceVolumeIndicator(klines['close'], klines['volume']).on_balance_volume()
-                        klines['obv_ma20'] = klines['obv'].rolling(window=20).mean()
-                        
-                        # 箱体结构
-                        klines['box_high'] = klines['high'].rolling(window=20).max()
-                        klines['box_low'] = klines['low'].rolling(window=20).min()
-                        
-                        klines_data[tf] = klines
+                        klines_data[tf] = self.indicators.process(trading_symbol, tf, klines)
                     else:
                         logger.warning(f"未能获取{trading_symbol}的{tf}周期数据")
                 except Exception as e:
@@ -491,8 +560,8 @@ class CMCData:
             # 获取合约数据
             futures_data = self.get_futures_data(trading_symbol)
             
-            # 计算筹码分布（简化模拟）
-            volume_profile = self._generate_volume_profile(klines_data[timeframes_to_get[0]])
+            # 计算筹码分布
+            volume_profile = self.indicators.volume_profile(klines_data[timeframes_to_get[0]])
             
             # 获取链上数据
             onchain_data = self.get_onchain_data(trading_symbol)
@@ -517,66 +586,9 @@ class CMCData:
             logger.error(f"获取{symbol}的{timeframe}周期市场分析数据时发生异常: {str(e)}")
             return None
             
-    def _generate_volume_profile(self, klines_df):
-        """生成简化的筹码分布模拟数据"""
-        try:
-            if klines_df is None or klines_df.empty:
-                return self._get_dummy_volume_profile()
-                
-            # 获取价格范围
-            prices = klines_df['close'].values
-            volumes = klines_df['volume'].values
-            
-            if len(prices) == 0:
-                return self._get_dummy_volume_profile()
-                
-            min_price = min(prices)
-            max_price = max(prices)
-            
-            if min_price == max_price:
-                return self._get_dummy_volume_profile(min_price)
-            
-            # 将价格范围分成10个区间
-            price_range = max_price - min_price
-            interval = price_range / 10
-            
-            # 初始化每个价格区间的成交量
-            volume_profile = {}
-            for i in range(10):
-                lower_bound = min_price + (i * interval)
-                upper_bound = lower_bound + interval
-                price_range = f"{lower_bound:.6f}-{upper_bound:.6f}"
-                volume_profile[price_range] = 0
-            
-            # 计算每个价格区间的成交量
-            for idx, close_price in enumerate(prices):
-                volume = volumes[idx]
-                
-                # 找到对应的价格区间
-                for price_range in volume_profile:
-                    lower, upper = map(float, price_range.split('-'))
-                    if lower <= close_price < upper:
-                        volume_profile[price_range] += volume
-                        break
-            
-            return volume_profile
-        except Exception as e:
-            logger.error(f"生成筹码分布失败: {str(e)}")
-            return self._get_dummy_volume_profile()
-            
     def _get_dummy_volume_profile(self, base_price=50000.0):
         """生成模拟的筹码分布数据"""
-        volume_profile = {}
-        interval = 1000.0
-        for i in range(10):
-            lower_bound = base_price - (5 * interval) + (i * interval)
-            upper_bound = lower_bound + interval
-            price_range = f"{lower_bound:.6f}-{upper_bound:.6f}"
-            # 生成一个以当前价格为中心的正态分布
-            dist_from_center = abs(i - 5)
-            volume = 1000.0 * (10 - dist_from_center) / 10.0
-            volume_profile[price_range] = volume
-        return volume_profile
+        return dummy_volume_profile(base_price)
 
 if __name__ == "__main__":
     # 简单测试
@@ -0,0 +1,194 @@
+"""
+CoinMarketCap报价批量请求模块
+
+/cryptocurrency/quotes/latest支持在symbol参数中传入逗号分隔的多个币种，一次请求只消耗一次调用额度。
+QuoteBatcher在短时间窗口内收集各线程的报价请求，合并为一次批量请求（每次最多max_symbols个币种），
+结果写入共享的报价缓存，市场扫描或大量并发的备用数据请求只需要一次HTTP请求
+"""
+
+import logging
+from concurrent.futures import Future
+from threading import Lock, Timer
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from market_cache import TTLCache
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认报价批量请求配置（与config.example.json中cmc.quotes一致）
+DEFAULT_QUOTE_CONFIG = {
+    # 收集请求的时间窗口（秒），窗口结束或达到max_symbols时发出请求
+    'window_seconds': 0.05,
+    # 每次请求的最大币种数
+    'max_symbols': 100,
+    # 报价缓存有效期（秒）
+    'ttl_seconds': 60,
+    'max_items': 5000,
+    # 调用方等待报价的最长时间（秒）
+    'timeout': 30
+}
+
+
+def cmc_symbol(symbol: str) -> str:
+    """
+    转换为CMC使用的币种代码
+
+    Args:
+        symbol: 币种或交易对，例如btc、BTCUSDT
+
+    Returns:
+        币种代码，例如BTC
+    """
+    symbol = symbol.strip().upper()
+    return symbol[:-4] if symbol.endswith('USDT') and len(symbol) > 4 else symbol
+
+
+def parse_quote(coin_data: Any) -> Optional[Dict[str, Any]]:
+    """
+    解析quotes/latest返回的单个币种数据
+
+    Args:
+        coin_data: data中该币种的条目（v1为对象，同一代码对应多个币种时为列表，取第一个）
+
+    Returns:
+        市场数据字典，格式与CMCData.get_market_data一致，无法解析时返回None
+    """
+    if isinstance(coin_data, list):
+        coin_data = coin_data[0] if coin_data else None
+    try:
+        quote = coin_data['quote']['USD']
+        return {
+            'price': quote['price'],
+            'volume_24h': quote['volume_24h'],
+            'percent_change_1h': quote['percent_change_1h'],
+            'percent_change_24h': quote['percent_change_24h'],
+            'percent_change_7d': quote['percent_change_7d'],
+            'market_cap': quote['market_cap'],
+            'last_updated': quote['last_updated']
+        }
+    except (KeyError, TypeError):
+        return None
+
+
+class QuoteBatcher:
+    """
+    报价批量请求器
+
+    get()和get_many()可在任意线程中调用：先查共享缓存，未命中的币种加入待请求集合，
+    同一币种的并发请求共享同一个结果，窗口结束后由定时线程统一请求
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], Optional[Dict[str, Any]]],
+                 config: Optional[Dict[str, Any]] = None):
+        """
+        初始化报价批量请求器
+
+        Args:
+            fetch: 批量请求函数，参数为币种代码列表，返回quotes/latest响应中的data（币种代码到条目的映射），
+                失败时返回None或抛出异常
+            config: 批量请求配置，见DEFAULT_QUOTE_CONFIG
+        """
+        settings = dict(DEFAULT_QUOTE_CONFIG)
+        settings.update(config or {})
+        self.fetch = fetch
+        self.window_seconds = settings['window_seconds']
+        self.max_symbols = settings['max_symbols']
+        self.timeout = settings['timeout']
+        self.cache = TTLCache('cmc_quotes', ttl_seconds=settings['ttl_seconds'], max_items=settings['max_items'])
+        self.requests = 0
+        self._pending = {}
+        self._timer = None
+        self._lock = Lock()
+
+    def get(self, symbol: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取单个币种的报价
+
+        Args:
+            symbol: 币种或交易对
+            timeout: 最长等待时间（秒），默认为配置中的timeout
+
+        Returns:
+            市场数据字典，获取失败时返回None
+        """
+        return self.get_many([symbol], timeout).get(cmc_symbol(symbol))
+
+    def get_many(self, symbols: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        获取多个币种的报价（未缓存的币种与其他线程的请求合并发出）
+
+        Args:
+            symbols: 币种或交易对列表
+            timeout: 最长等待时间（秒），默认为配置中的timeout
+
+        Returns:
+            币种代码到市场数据的映射，获取失败的币种为None
+        """
+        results = {}
+        waiting = {}
+        for symbol in dict.fromkeys(cmc_symbol(item) for item in symbols):
+            cached = self.cache.get(symbol)
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                waiting[symbol] = None
+        if not waiting:
+            return results
+
+        flush_now = False
+        with self._lock:
+            for symbol in waiting:
+                future = self._pending.get(symbol)
+                if future is None:
+                    future = self._pending[symbol] = Future()
+                waiting[symbol] = future
+            if len(self._pending) >= self.max_symbols or self.window_seconds <= 0:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = Timer(self.window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self.flush()
+
+        timeout = self.timeout if timeout is None else timeout
+        for symbol, future in waiting.items():
+            try:
+                results[symbol] = future.result(timeout)
+            except Exception as e:
+                logger.error(f"等待{symbol}的CMC报价失败: {str(e)}")
+                results[symbol] = None
+        return results
+
+    def flush(self) -> None:
+        """立即请求所有待请求的币种（每次最多max_symbols个）"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        symbols = list(pending)
+        for start in range(0, len(symbols), self.max_symbols):
+            self._request({symbol: pending[symbol] for symbol in symbols[start:start + self.max_symbols]})
+
+    def _request(self, batch: Dict[str, Future]) -> None:
+        """发出一次批量请求并设置各币种的结果"""
+        data = None
+        try:
+            with metrics.span('cmc.quotes'):
+                self.requests += 1
+                metrics.inc('cmc_quote_requests_total')
+                data = self.fetch(list(batch))
+        except Exception as e:
+            logger.error(f"批量获取CMC报价失败: {str(e)}")
+        data = data or {}
+        succeeded = 0
+        for symbol, future in batch.items():
+            quote = parse_quote(data.get(symbol))
+            if quote is not None:
+                self.cache.set(symbol, quote)
+                succeeded += 1
+            future.set_result(quote)
+        logger.info(f"批量获取CMC报价: 请求{len(batch)}个币种，成功{succeeded}个")
@@ -0,0 +1,48 @@
+"""
+快速JSON解码模块
+
+Binance的K线和CMC的报价响应体较大，解码是获取数据时CPU占用的主要部分：
+- loads(): 安装了orjson时使用orjson解码（约快一倍），否则回退到标准库json
+- response_json(): 解码HTTP响应体（代替response.json()）
+"""
+
+import json
+import logging
+from typing import Any, Union
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    orjson = None
+    HAS_ORJSON = False
+
+logger = logging.getLogger(__name__)
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    解码JSON
+
+    Args:
+        data: JSON文本或字节串
+
+    Returns:
+        解码后的对象
+    """
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def response_json(response) -> Any:
+    """
+    解码HTTP响应体
+
+    Args:
+        response: requests或httpx的响应
+
+    Returns:
+        解码后的对象
+    """
+    return loads(response.content)
@@ -0,0 +1,258 @@
+"""
+共享HTTP会话模块
+
+项目中所有对外的HTTP请求（CoinMarketCap、Telegram Bot API的webhook管理等）通过这里的会话发出，
+复用keep-alive连接，避免每次请求都经过代理重新建立TCP和TLS连接：
+- get_session(): 线程安全的同步会话（requests.Session），连接池按主机划分
+- mount_shared_pool(): 在其他库自己创建的会话上挂载共享会话的连接池（Binance REST客户端）
+- get_async_client(): 当前事件循环中的异步客户端（httpx.AsyncClient），按主机限制并发连接数
+- telegram_pool_size(): 从telegram.connection_pool_size读取python-telegram-bot自身的连接池大小
+
+连接池大小取telegram.connection_pool_size，代理取配置或HTTP_PROXY/HTTPS_PROXY环境变量
+"""
+
+import os
+import asyncio
+import logging
+from threading import Lock
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# 默认连接池配置
+DEFAULT_HTTP_CONFIG = {
+    # 每个主机保持的最大连接数（默认取telegram.connection_pool_size）
+    'pool_size': 8,
+    # 同步会话最多为多少个主机保留连接池
+    'max_hosts': 10,
+    # 异步客户端对单个主机的最大并发请求数
+    'per_host_limit': 8,
+    # 空闲连接的保留时间（秒，仅异步客户端）
+    'keepalive_expiry': 60,
+    # 默认超时（秒）
+    'timeout': 30,
+    # 代理地址，默认读取HTTP_PROXY/HTTPS_PROXY环境变量
+    'proxy': None
+}
+
+_config = dict(DEFAULT_HTTP_CONFIG)
+_session = None
+_async_clients = {}
+_lock = Lock()
+
+
+def http_config_from(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    从机器人配置中提取连接池配置
+
+    Args:
+        config: 完整配置（见config.example.json），读取telegram.connection_pool_size和telegram.proxy
+
+    Returns:
+        连接池配置，可传给configure()
+    """
+    telegram_config = (config or {}).get('telegram') or {}
+    settings = {}
+    if telegram_config.get('connection_pool_size'):
+        settings['pool_size'] = settings['per_host_limit'] = int(telegram_config['connection_pool_size'])
+    proxy = telegram_config.get('proxy') or {}
+    if isinstance(proxy, dict) and proxy.get('enabled') and (proxy.get('https_proxy') or proxy.get('http_proxy')):
+        settings['proxy'] = proxy.get('https_proxy') or proxy.get('http_proxy')
+    return settings
+
+
+def configure(config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    设置连接池配置，已创建的会话会在下次使用时按新配置重建
+
+    Args:
+        config: 连接池配置，见DEFAULT_HTTP_CONFIG
+    """
+    global _session
+    with _lock:
+        _config.clear()
+        _config.update(DEFAULT_HTTP_CONFIG)
+        _config.update({key: value for key, value in (config or {}).items() if value is not None})
+        if _session is not None:
+            _session.close()
+            _session = None
+        # 异步客户端绑定在各自的事件循环上，只能在其事件循环中关闭，这里只丢弃引用
+        _async_clients.clear()
+
+
+def _proxy() -> Optional[str]:
+    return _config['proxy'] or os.getenv('HTTPS_PROXY') or os.getenv('HTTP_PROXY')
+
+
+def telegram_pool_size(default: int = DEFAULT_HTTP_CONFIG['pool_size']) -> int:
+    """
+    获取python-telegram-bot的HTTPXRequest连接池大小
+
+    Args:
+        default: 未配置时的默认值
+
+    Returns:
+        连接池大小（TELEGRAM_POOL_SIZE环境变量优先）
+    """
+    try:
+        return int(os.getenv('TELEGRAM_POOL_SIZE') or _config.get('pool_size') or default)
+    except ValueError:
+        return default
+
+
+class _TimeoutSession(requests.Session):
+    """未指定timeout的请求使用默认超时，避免连接被永久占用"""
+
+    def __init__(self, timeout: float):
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+def get_session() -> requests.Session:
+    """
+    获取共享的同步会话（可在多个线程中同时使用）
+
+    Returns:
+        requests.Session，每个主机最多保留pool_size个keep-alive连接
+    """
+    global _session
+    session = _session
+    if session is not None:
+        return session
+    with _lock:
+        if _session is None:
+            session = _TimeoutSession(_config['timeout'])
+            adapter = HTTPAdapter(pool_connections=_config['max_hosts'], pool_maxsize=_config['pool_size'])
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            proxy = _proxy()
+            if proxy:
+                session.proxies.update({'http': proxy, 'https': proxy})
+            _session = session
+            logger.info(f"已创建共享HTTP会话，每个主机最多{_config['pool_size']}个连接，"
+                        f"{'使用代理' if proxy else '不使用代理'}")
+        return _session
+
+
+def mount_shared_pool(session: requests.Session) -> requests.Session:
+    """
+    在其他库自己创建的会话上挂载共享会话的连接池
+
+    python-binance的会话带有API key请求头，不能直接换成共享会话（请求头会随CMC和Telegram的请求发出），
+    这里只共享连接池，请求头、代理和超时（python-binance对每个请求设置REQUEST_TIMEOUT）仍由该会话决定
+
+    Args:
+        session: 要挂载连接池的会话
+
+    Returns:
+        传入的会话
+    """
+    adapter = get_session().get_adapter('https://')
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class AsyncHTTPClient:
+    """
+    异步HTTP客户端
+
+    包装httpx.AsyncClient，总连接数不超过pool_size * max_hosts，
+    同一主机的并发请求数不超过per_host_limit
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化异步客户端（需在事件循环中创建）
+
+        Args:
+            config: 连接池配置
+        """
+        import httpx
+
+        limits = httpx.Limits(max_connections=config['pool_size'] * config['max_hosts'],
+                              max_keepalive_connections=config['pool_size'] * config['max_hosts'],
+                              keepalive_expiry=config['keepalive_expiry'])
+        options = {'limits': limits, 'timeout': config['timeout']}
+        proxy = _proxy()
+        if proxy:
+            # httpx 0.26起使用proxy参数，之前的版本为proxies
+            try:
+                self.client = httpx.AsyncClient(proxy=proxy, **options)
+            except TypeError:
+                self.client = httpx.AsyncClient(proxies=proxy, **options)
+        else:
+            self.client = httpx.AsyncClient(**options)
+        self.per_host_limit = config['per_host_limit']
+        self._host_limits = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return limit
+
+    async def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求
+
+        Args:
+            method: HTTP方法
+            url: 地址
+            **kwargs: 传给httpx.AsyncClient.request的参数（params、json、headers、timeout等）
+
+        Returns:
+            httpx.Response
+        """
+        async with self._host_limit(url):
+            return await self.client.request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def get_async_client() -> AsyncHTTPClient:
+    """
+    获取当前事件循环中共享的异步客户端（需在事件循环中调用）
+
+    Returns:
+        AsyncHTTPClient
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = _async_clients[loop] = AsyncHTTPClient(dict(_config))
+        return client
+
+
+async def close_async_client() -> None:
+    """关闭当前事件循环中的异步客户端（事件循环结束前调用）"""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def close_session() -> None:
+    """关闭共享的同步会话"""
+    global _session
+    with _lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,213 @@
+"""
+技术指标流水线模块
+
+Binance（MarketData）和CoinMarketCap备用数据源（CMCData）获取的原始OHLCV K线
+都通过这里的IndicatorPipeline计算技术指标和筹码分布，并共用一个按K线收盘时间失效的缓存：
+- calculate(): 计算RSI、MACD、EMA、布林带、均线、OBV、箱体等技术指标
+- volume_profile(): 按收盘价把成交量分配到10个价格区间（向量化，结果与逐行遍历一致）
+- cached()/process(): 读取或计算并缓存某个币种某个周期带指标的K线
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import ta
+
+from metrics import metrics
+from market_cache import TTLCache, next_candle_close
+
+logger = logging.getLogger(__name__)
+
+# 筹码分布的价格区间数
+VOLUME_PROFILE_BINS = 10
+
+
+def dummy_volume_profile(base_price: float = 50000.0) -> Dict[str, float]:
+    """
+    生成模拟的筹码分布数据（数据不足时使用）
+
+    Args:
+        base_price: 中心价格
+
+    Returns:
+        以base_price为中心的10个价格区间及其成交量
+    """
+    volume_profile = {}
+    interval = 1000.0
+    for i in range(VOLUME_PROFILE_BINS):
+        lower_bound = base_price - (5 * interval) + (i * interval)
+        upper_bound = lower_bound + interval
+        price_range = f"{lower_bound:.6f}-{upper_bound:.6f}"
+        # 生成一个以当前价格为中心的正态分布
+        dist_from_center = abs(i - 5)
+        volume = 1000.0 * (10 - dist_from_center) / 10.0
+        volume_profile[price_range] = volume
+    return volume_profile
+
+
+class IndicatorPipeline:
+    """
+    技术指标流水线
+
+    原始OHLCV K线 -> 技术指标 -> 缓存（在对应周期收盘时失效），
+    MarketData创建的CMCData与其共用同一个实例
+    """
+
+    def __init__(self, cache_config: Optional[Dict[str, Any]] = None):
+        """
+        初始化流水线
+
+        Args:
+            cache_config: K线缓存配置（见config.example.json中的market_data.cache）
+        """
+        self.cache = TTLCache.from_config('klines', cache_config, align_ttl=True)
+
+    @staticmethod
+    @metrics.timed('indicators')
+    def calculate(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        计算技术指标（回测模块和行情流复用同一套指标）
+
+        Args:
+            df: 包含open、high、low、close、volume列的K线，指标列直接写入其中
+
+        Returns:
+            添加了指标列的DataFrame，计算失败时原样返回
+        """
+        try:
+            close = df['close']
+            volume = df['volume']
+
+            # 短期指标
+            # RSI
+            df['rsi'] = ta.momentum.RSIIndicator(close).rsi()
+
+            # MACD
+            macd = ta.trend.MACD(close)
+            df['macd'] = macd.macd()  # DIF
+            df['macd_signal'] = macd.macd_signal()  # DEA
+            df['macd_diff'] = macd.macd_diff()  # MACD柱
+
+            # EMA
+            df['ema5'] = ta.trend.EMAIndicator(close, window=5).ema_indicator()
+            df['ema13'] = ta.trend.EMAIndicator(close, window=13).ema_indicator()
+
+            # 布林带
+            try:
+                bollinger = ta.volatility.BollingerBands(close)
+                df['bb_upper'] = bollinger.bollinger_hband()
+                df['bb_middle'] = bollinger.bollinger_mavg()
+                df['bb_lower'] = bollinger.bollinger_lband()
+            except Exception as e:
+                logger.warning(f"计算布林带指标时出错: {e}，使用SMA代替")
+                df['bb_middle'] = ta.trend.SMAIndicator(close, window=20).sma_indicator()
+                df['bb_upper'] = df['bb_middle'] + close.std() * 2
+                df['bb_lower'] = df['bb_middle'] - close.std() * 2
+
+            # 计算成交量变化
+            df['volume_ma5'] = volume.rolling(window=5).mean()
+            df['volume_ma20'] = volume.rolling(window=20).mean()
+
+            # 中期指标
+            # MA20和MA50
+            df['ma20'] = ta.trend.SMAIndicator(close, window=20).sma_indicator()
+            df['ma50'] = ta.trend.SMAIndicator(close, window=50).sma_indicator()
+
+            # OBV
+            df['obv'] = ta.volume.OnBalanceVolumeIndicator(close, volume).on_balance_volume()
+            df['obv_ma20'] = df['obv'].rolling(window=20).mean()
+
+            # 箱体结构
+            df['box_high'] = df['high'].rolling(window=20).max()
+            df['box_low'] = df['low'].rolling(window=20).min()
+
+            return df
+
+        except Exception as e:
+            logger.error(f"计算技术指标失败: {str(e)}")
+            return df
+
+    @staticmethod
+    @metrics.timed('volume_profile')
+    def volume_profile(df: pd.DataFrame) -> Dict[str, float]:
+        """
+        计算筹码分布
+
+        收盘价范围等分为10个区间（区间边界保留6位小数作为键），
+        每根K线的成交量计入第一个满足 下界 <= 收盘价 < 上界 的区间，
+        最高价所在的K线不落入任何区间（与原来逐行遍历的结果一致）
+
+        Args:
+            df: 包含close和volume列的K线
+
+        Returns:
+            {"下界-上界": 成交量}，数据为空时返回模拟数据
+        """
+        try:
+            # 确保数据不为空
+            if df is None or df.empty:
+                logger.error("数据为空，无法计算筹码分布")
+                return dummy_volume_profile()
+
+            prices = df['close'].to_numpy(dtype=float)
+            volumes = df['volume'].to_numpy(dtype=float)
+            min_price = prices.min()
+            max_price = prices.max()
+
+            # 如果最小价格等于最大价格，无法计算区间
+            if min_price == max_price:
+                logger.warning("价格范围为零，无法划分区间")
+                return dummy_volume_profile(float(min_price))
+
+            # 将价格范围分成10个区间
+            interval = (max_price - min_price) / VOLUME_PROFILE_BINS
+            keys = []
+            bounds = np.empty((2, VOLUME_PROFILE_BINS))
+            for i in range(VOLUME_PROFILE_BINS):
+                lower_bound = min_price + (i * interval)
+                upper_bound = lower_bound + interval
+                key = f"{lower_bound:.6f}-{upper_bound:.6f}"  # 使用6位小数
+                keys.append(key)
+                bounds[:, i] = [float(value) for value in key.split('-')]
+
+            # 每根K线落入的第一个区间，按K线顺序累加成交量
+            matches = (prices[:, None] >= bounds[0]) & (prices[:, None] < bounds[1])
+            in_profile = matches.any(axis=1)
+            bins = matches.argmax(axis=1)[in_profile]
+            totals = np.bincount(bins, weights=volumes[in_profile], minlength=VOLUME_PROFILE_BINS)
+
+            return {key: float(total) for key, total in zip(keys, totals)}
+        except Exception as e:
+            logger.error(f"计算筹码分布失败: {str(e)}")
+            return dummy_volume_profile()
+
+    def cached(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        """
+        获取缓存的带指标K线
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+
+        Returns:
+            未过期的DataFrame，不存在时返回None
+        """
+        return self.cache.get((symbol, interval))
+
+    def process(self, symbol: str, interval: str, klines: pd.DataFrame) -> pd.DataFrame:
+        """
+        计算原始K线的技术指标并缓存到该周期下一根K线收盘
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+            klines: 原始OHLCV K线（任一数据源）
+
+        Returns:
+            带指标的DataFrame
+        """
+        klines = self.calculate(klines)
+        self.cache.set((symbol, interval), klines, next_candle_close(interval))
+        return klines
@@ -46,22 +46,25 @@ class TechnicalAnalysisRules:
 
     # 动量指标规则
     @staticmethod
-    def analyze_momentum(rsi: float, macd: float, macd_signal: float) -> Tuple[TrendDirection, SignalStrength]:
+    def analyze_momentum(rsi: float, macd: float, macd_signal: float,
+                         oversold: float = 30, overbought: float = 70) -> Tuple[TrendDirection, SignalStrength]:
         """
         分析动量指标
         :param rsi: RSI值
         :param macd: MACD值
         :param macd_signal: MACD信号线值
+        :param oversold: RSI超卖阈值（analysis.strategies.short.rsi_thresholds.oversold）
+        :param overbought: RSI超买阈值（analysis.strategies.short.rsi_thresholds.overbought）
         :return: (趋势方向, 信号强度)
         """
         signals = []
         
         # RSI分析
-        if rsi < 30:
+        if rsi < oversold:
             signals.append((TrendDirection.BULLISH, SignalStrength.STRONG))
-        elif rsi > 70:
+        elif rsi > overbought:
             signals.append((TrendDirection.BEARISH, SignalStrength.STRONG))
-        elif 30 <= rsi <= 70:
+        elif oversold <= rsi <= overbought:
             signals.append((TrendDirection.NEUTRAL, SignalStrength.WEAK))
             
         # MACD分析
@@ -2,7 +2,12 @@ from market_data import MarketData
 import logging
 import logging.handlers
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from market_analysis_rules import TechnicalAnalysisRules, TrendDirection, SignalStrength
+from metrics import metrics
+from market_cache import TTLCache, next_candle_close, STRATEGY_BASE_INTERVAL
+from rule_engine import RuleEngine
+from report_templates import format_price, get_renderer
 
 # 创建日志格式化器
 formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -24,13 +29,238 @@ console_handler.setFormatter(formatter)
 logging.basicConfig(level=logging.INFO, handlers=[file_handler, console_handler])
 logger = logging.getLogger(__name__)
 
+# 多币种分析的默认配置（analysis.batch）
+DEFAULT_BATCH_CONFIG = {
+    'max_symbols': 5,     # 一条命令最多分析的币种数
+    'max_workers': 4,     # 并发获取数据的线程数
+    'max_compare_symbols': 10  # /compare一次最多对比的币种数
+}
+
 class MarketAnalyzer:
-    def __init__(self, market_data):
+    def __init__(self, market_data, cache_config=None, rules_config=None, batch_config=None):
         self.market_data = market_data
         self.analysis_rules = TechnicalAnalysisRules()
+        # 按analysis.strategies配置编译的信号规则
+        self.rule_engine = RuleEngine(rules_config)
+        self.momentum_thresholds = self.rule_engine.momentum_thresholds('short')
+        # 已生成报告的缓存，在策略基准周期收盘时失效
+        self.report_cache = TTLCache.from_config('reports', cache_config, align_ttl=True)
+        # 各币种短期规则输入特征的快照（多币种对比使用），在下一根15分钟K线收盘时失效
+        self.snapshot_cache = TTLCache.from_config('snapshots', cache_config, align_ttl=True)
+        # 预编译的报告模板，各报告只计算结构化的结果后填入模板
+        self.renderer = get_renderer()
+        # 多币种分析配置
+        self.batch_config = dict(DEFAULT_BATCH_CONFIG)
+        self.batch_config.update(batch_config or {})
+        # 各策略信号推送报告的结构化结果计算方法
+        self.signal_values = {
+            'short': self._short_term_values,
+            'mid': self._mid_term_values,
+            'long': self._long_term_values
+        }
         
     def analyze_market(self, symbol, timeframe='1h'):
         """分析市场数据"""
+        cached = self.report_cache.get((symbol, timeframe))
+        if cached is not None:
+            logger.info(f"使用缓存的{symbol}的{timeframe}周期分析报告")
+            return cached
+        
+        # 为本次分析内的各阶段计时设置策略和币种标签
+        with metrics.context(strategy=timeframe, symbol=symbol), metrics.span('analyze_market'):
+            return self._analyze_market(symbol, timeframe)
+    
+    def _cache_report(self, symbol, timeframe, report, values=None):
+        """缓存成功生成的报告（以及报告的结构化结果）到下一根基准K线收盘"""
+        if report:
+            interval = STRATEGY_BASE_INTERVAL.get(timeframe, timeframe)
+            expires_at = next_candle_close(interval)
+            self.report_cache.set((symbol, timeframe), report, expires_at)
+            if values is not None:
+                self.report_cache.set((symbol, timeframe, 'values'), values, expires_at)
+        return report
+
+    def analyze_signal(self, symbol, strategy):
+        """
+        生成信号推送报告，同时返回报告的结构化结果
+
+        订阅推送按结构化结果中的direction措辞键（例如short.direction.cautious_long）判断方向，
+        不从报告文本中解析，报告的语言和措辞不影响判断
+
+        Args:
+            symbol: 币种
+            strategy: 策略类型（short、mid、long）
+
+        Returns:
+            (结构化结果, 报告文本)，获取数据或计算失败时为(None, None)
+        """
+        report = self.report_cache.get((symbol, strategy))
+        values = self.report_cache.get((symbol, strategy, 'values'))
+        if report is not None and values is not None:
+            logger.info(f"使用缓存的{symbol}的{strategy}周期分析报告")
+            return values, report
+        return self._signal_result(symbol, strategy)
+
+    def analyze_batch(self, symbols, strategy='short'):
+        """
+        一次分析多个币种，返回合并的简要报告
+
+        各币种的数据在线程池中并发获取（CMC报价先合并为一次批量请求），
+        完整报告同时写入报告缓存，之后单独分析其中某个币种时直接返回
+
+        Args:
+            symbols: 币种列表
+            strategy: 策略类型（short、mid、long）
+
+        Returns:
+            合并的简要报告文本
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        if strategy not in self.signal_values:
+            raise ValueError(f"无效的策略类型: {strategy}")
+
+        with metrics.context(strategy=strategy), metrics.span('analyze_batch'):
+            # 预先批量获取所有币种的CMC报价，各币种的链上数据和项目信息从报价缓存中读取
+            cmc_data = getattr(self.market_data, 'cmc_data', None)
+            if cmc_data is not None and hasattr(cmc_data, 'get_market_data_batch'):
+                cmc_data.get_market_data_batch(symbols)
+
+            workers = max(1, min(len(symbols), self.batch_config['max_workers']))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda symbol: self._signal_result(symbol, strategy)[0], symbols))
+
+            rows = []
+            for symbol, values in zip(symbols, results):
+                if values is None:
+                    rows.append(self.renderer.render('batch_failed', {'symbol': symbol}))
+                else:
+                    rows.append(self.renderer.render('batch_row', dict(values, symbol=symbol)))
+            return self.renderer.render('batch', {
+                'strategy': f"strategy.{strategy}",
+                'current_time': datetime.now().strftime("%Y-%m-%d %H:%M"),
+                'rows': '\n'.join(rows)
+            })
+
+    def _signal_result(self, symbol, strategy):
+        """获取单个币种的数据，计算报告的结构化结果并渲染、缓存完整报告（失败时返回(None, None)）"""
+        try:
+            with metrics.context(strategy=strategy, symbol=symbol):
+                market_data = self.market_data.get_market_analysis(symbol, strategy)
+                if market_data is None:
+                    logger.error(f"获取{symbol}的{strategy}周期市场数据失败")
+                    return None, None
+                current_price = self._current_price(market_data)
+                if current_price is None:
+                    logger.warning(f"无法获取{symbol}的当前价格")
+                    return None, None
+                self._cache_snapshot(symbol, market_data, current_price)
+                values = self.signal_values[strategy](market_data, current_price)
+                if values is None:
+                    return None, None
+                report = self.renderer.render(strategy, values)
+                return values, self._cache_report(symbol, strategy, report, values)
+        except Exception as e:
+            logger.error(f"分析{symbol}的{strategy}周期市场数据时发生异常: {str(e)}")
+            return None, None
+
+    def compare(self, symbols):
+        """
+        多币种对比：每个币种一行RSI、MACD、EMA交叉、资金费率、多空比和短期评分
+
+        每个币种只读取一次快照缓存（生成报告时写入），未命中的币种并发获取15分钟K线和合约数据；
+        所有币种的短期信号用编译后的规则一次向量化计算，不再逐个生成报告
+
+        Args:
+            symbols: 币种列表
+
+        Returns:
+            对比表文本
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        with metrics.context(strategy='short'), metrics.span('compare'):
+            snapshots = {symbol: self.snapshot_cache.get(symbol) for symbol in symbols}
+            missing = [symbol for symbol, snapshot in snapshots.items() if snapshot is None]
+            if missing:
+                workers = max(1, min(len(missing), self.batch_config['max_workers']))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    snapshots.update(zip(missing, pool.map(self._fetch_snapshot, missing)))
+
+            available = [symbol for symbol in symbols if snapshots[symbol] is not None]
+            rules = self.rule_engine.strategy('short')
+            evaluations = dict(zip(available, rules.evaluate_rows([snapshots[symbol] for symbol in available])))
+
+            rows = []
+            for symbol in symbols:
+                if symbol not in evaluations:
+                    rows.append(self.renderer.render('batch_failed', {'symbol': symbol}))
+                    continue
+                snapshot, evaluation = snapshots[symbol], evaluations[symbol]
+                ratio = snapshot['long_short_ratio']
+                rows.append(self.renderer.render('compare_row', {
+                    'symbol': symbol,
+                    'current_price': snapshot['price'],
+                    'rsi': snapshot['rsi'],
+                    'macd': 'cross.golden' if evaluation['values']['macd'] > 0 else 'cross.dead',
+                    'ema': 'cross.golden' if evaluation['values']['ema'] > 0 else 'cross.dead',
+                    'funding_rate': snapshot['funding_rate'] * 100,
+                    'long_short_ratio': ('compare.ratio', {'ratio': ratio}) if ratio is not None else 'compare.ratio_missing',
+                    'score': evaluation['score'],
+                    'direction': f"short.direction.{self._short_direction(rules, evaluation)}"
+                }))
+            return self.renderer.render('compare', {
+                'current_time': datetime.now().strftime("%Y-%m-%d %H:%M"),
+                'rows': '\n'.join(rows)
+            })
+
+    def _fetch_snapshot(self, symbol):
+        """获取单个币种的15分钟K线和合约数据并写入快照缓存（失败时返回None）"""
+        try:
+            with metrics.context(symbol=symbol):
+                trading_symbol = symbol if symbol.endswith('USDT') else f"{symbol}USDT"
+                klines_data = self.market_data.get_multi_timeframe_data(trading_symbol, ['15m'])
+                if not klines_data or '15m' not in klines_data:
+                    logger.error(f"获取{symbol}的15m周期数据失败")
+                    return None
+                with metrics.span('fetch.futures'):
+                    futures_data = self.market_data.get_futures_data(trading_symbol)
+                market_data = {
+                    'klines': klines_data,
+                    'futures_data': futures_data,
+                    'volume_profile': self.market_data.calculate_volume_profile(klines_data['15m'])
+                }
+                return self._cache_snapshot(symbol, market_data, self._current_price(market_data))
+        except Exception as e:
+            logger.error(f"获取{symbol}的对比数据时发生异常: {str(e)}")
+            return None
+
+    def _cache_snapshot(self, symbol, market_data, current_price):
+        """从包含15分钟K线的市场数据提取短期规则的输入特征，缓存到下一根15分钟K线收盘"""
+        try:
+            klines_data = market_data.get('klines') or {}
+            if '15m' not in klines_data or klines_data['15m'].empty:
+                return None
+            futures_data = market_data.get('futures_data') or {}
+            _, _, profit_percentage = self._chip_summary(market_data.get('volume_profile'), current_price)
+            snapshot = dict(self._short_term_features(market_data, profit_percentage),
+                            price=current_price,
+                            long_short_ratio=futures_data.get('long_short_ratio'))
+            self.snapshot_cache.set(symbol, snapshot, next_candle_close('15m'))
+            return snapshot
+        except Exception as e:
+            logger.error(f"缓存{symbol}的快照时发生异常: {str(e)}")
+            return None
+
+    @staticmethod
+    def _current_price(market_data):
+        """最短周期K线的最新收盘价，没有K线时返回None"""
+        klines_data = market_data.get('klines') or {}
+        for tf in ['1m', '5m', '15m', '1h', '4h', '1d']:
+            if tf in klines_data and not klines_data[tf].empty:
+                return float(klines_data[tf].iloc[-1]['close'])
+        return None
+
+    def _analyze_market(self, symbol, timeframe):
+        """分析市场数据（实现）"""
         try:
             logger.info(f"开始分析{symbol}的{timeframe}周期市场数据...")
             
@@ -44,17 +274,13 @@ class MarketAnalyzer:
                 return "获取市场数据失败，请稍后重试"
             
             # 获取当前价格
-            current_price = None
-            if 'klines' in market_data and market_data['klines']:
-                klines_data = market_data['klines']
-                for tf in ['1m', '5m', '15m', '1h', '4h', '1d']:
-                    if tf in klines_data and not klines_data[tf].empty:
-                        current_price = float(klines_data[tf].iloc[-1]['close'])
-                        break
+            current_price = self._current_price(market_data)
             
             if current_price is None:
                 logger.warning(f"无法获取{symbol}的当前价格")
                 current_price = 0.0
+            else:
+                self._cache_snapshot(symbol, market_data, current_price)
             
             # 根据策略类型选择分析方法
             if timeframe == 'short':
@@ -142,48 +368,29 @@ class MarketAnalyzer:
             # 获取当前时间
             current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
             
-            # 格式化当前价格
-            current_price_str = self._format_price(current_price)
-                
             # 生成分析报告
-            report = f"""
-{symbol} {timeframe}周期市场分析报告
---------------------------------
-📅 分析时间: {current_time}
-💰 当前价格: ${current_price_str}
---------------------------------
-1. 策略分析:
-{strategy_analysis}
-
-2. 价格趋势分析:
-{price_trend}
-
-3. 成交量分析:
-{volume_analysis}
-
-4. 合约持仓分析:
-{futures_analysis}
-
-5. 筹码分布分析:
-{chip_distribution}
-
-6. 长期投资分析:
-{long_term_analysis}
-
-7. 交易建议:
-{trading_suggestion}
-
-8. 长期投资建议:
-{long_term_suggestion}
---------------------------------
-"""
+            report = self.renderer.render('market', {
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'current_time': current_time,
+                'current_price': current_price,
+                'strategy_analysis': strategy_analysis,
+                'price_trend': price_trend,
+                'volume_analysis': volume_analysis,
+                'futures_analysis': futures_analysis,
+                'chip_distribution': chip_distribution,
+                'long_term_analysis': long_term_analysis,
+                'trading_suggestion': trading_suggestion,
+                'long_term_suggestion': long_term_suggestion
+            })
             logger.info(f"{symbol}的{timeframe}周期市场分析报告生成完成")
-            return report
+            return self._cache_report(symbol, timeframe, report)
             
         except Exception as e:
             logger.error(f"分析{symbol}的{timeframe}周期市场数据时发生异常: {str(e)}")
             return f"分析{symbol}的{timeframe}周期市场数据时发生错误，请稍后重试"
             
+    @metrics.timed('analyze.price_trend')
     def analyze_price_trend(self, market_data):
         """分析价格趋势"""
         try:
@@ -218,7 +425,8 @@ class MarketAnalyzer:
             momentum_direction, momentum_strength = self.analysis_rules.analyze_momentum(
                 float(latest['rsi']),
                 float(latest['macd']),
-                float(latest['macd_signal'])
+                float(latest['macd_signal']),
+                **self.momentum_thresholds
             )
             
             # 分析成交量指标
@@ -267,6 +475,7 @@ class MarketAnalyzer:
             logger.error(f"分析价格趋势失败: {str(e)}")
             return "价格趋势分析失败"
             
+    @metrics.timed('analyze.volume')
     def analyze_volume(self, market_data):
         """分析成交量"""
         try:
@@ -317,6 +526,7 @@ class MarketAnalyzer:
             logger.error(f"分析成交量失败: {str(e)}")
             return "成交量分析失败"
             
+    @metrics.timed('analyze.futures')
     def analyze_futures(self, market_data):
         """分析合约持仓"""
         try:
@@ -354,6 +564,7 @@ class MarketAnalyzer:
             logger.error(f"分析合约持仓失败: {str(e)}")
             return "合约持仓分析失败"
             
+    @metrics.timed('analyze.chip_distribution')
     def analyze_chip_distribution(self, market_data):
         """分析筹码分布"""
         try:
@@ -420,6 +631,7 @@ class MarketAnalyzer:
             logger.error(f"分析筹码分布失败: {str(e)}")
             return "筹码分布分析失败"
             
+    @metrics.timed('analyze.short_term')
     def analyze_short_term(self, market_data):
         """分析短期波段机会"""
         try:
@@ -458,7 +670,8 @@ class MarketAnalyzer:
             momentum_direction, momentum_strength = self.analysis_rules.analyze_momentum(
                 float(latest_15m['rsi']),
                 float(latest_15m['macd']),
-                float(latest_15m['macd_signal'])
+                float(latest_15m['macd_signal']),
+                **self.momentum_thresholds
             )
             
             # 分析成交量指标
@@ -482,6 +695,7 @@ class MarketAnalyzer:
             logger.error(f"分析短期波段机会失败: {str(e)}")
             return "短期波段分析失败"
             
+    @metrics.timed('analyze.mid_term')
     def analyze_mid_term(self, market_data):
         """分析中期趋势机会"""
         try:
@@ -520,7 +734,8 @@ class MarketAnalyzer:
             momentum_direction, momentum_strength = self.analysis_rules.analyze_momentum(
                 float(latest_1h['rsi']),
                 float(latest_1h['macd']),
-                float(latest_1h['macd_signal'])
+                float(latest_1h['macd_signal']),
+                **self.momentum_thresholds
             )
             
             # 分析成交量指标
@@ -544,6 +759,7 @@ class MarketAnalyzer:
             logger.error(f"分析中期趋势机会失败: {str(e)}")
             return "中期趋势分析失败"
             
+    @metrics.timed('analyze.long_term')
     def analyze_long_term(self, market_data):
         """分析长期投资机会"""
         try:
@@ -602,6 +818,7 @@ NVT比率: {nvt_str} - {nvt_analysis}
             logger.error(f"分析长期投资机会失败: {str(e)}")
             return "长期投资分析失败"
             
+    @metrics.timed('suggestion.trading')
     def generate_trading_suggestion(self, price_trend, volume_analysis, futures_analysis, chip_distribution, strategy_analysis):
         """生成交易建议"""
         try:
@@ -668,6 +885,7 @@ NVT比率: {nvt_str} - {nvt_analysis}
         else:
             return "震荡行情，建议观望"
             
+    @metrics.timed('suggestion.long_term')
     def generate_long_term_suggestion(self, long_term_analysis):
         """生成长期投资建议"""
         try:
@@ -717,63 +935,8 @@ NVT比率: {nvt_str} - {nvt_analysis}
             return "市场处于平衡状态，建议保持观望"
             
     def _format_price(self, price):
-        """格式化价格显示"""
-        try:
-            # 处理None和零值
-            if price is None:
-                return "N/A"
-            
-            # 确保price是浮点数
-            price = float(price)
-            
-            # 针对非常接近0的值，但实际不为0的情况
-            if abs(price) < 0.0000001 and price != 0:
-                return "接近0"
-                
-            # 如果是0，直接返回0
-            if price == 0:
-                return "0"
-            
-            # 根据价格范围动态调整精度
-            if price < 0.0001:  # 极小值，像COS这样的代币
-                formatted_price = f"{price:.8f}"
-            elif price < 0.01:  # 小于1分钱
-                formatted_price = f"{price:.6f}"
-            elif price < 1:     # 小于1元
-                formatted_price = f"{price:.4f}"
-            elif price < 10000: # 普通价格
-                formatted_price = f"{price:.2f}"
-            else:              # 高价格
-                formatted_price = f"{price:.2f}"
-            
-            # 分离整数部分和小数部分
-            integer_part, decimal_part = formatted_price.split('.')
-            
-            # 为整数部分添加千位分隔符
-            integer_with_commas = "{:,}".format(int(integer_part))
-            
-            # 移除小数部分末尾的0，但至少保留两位小数（对于小值保留更多）
-            if price < 0.01:
-                # 对于小值，保留足够的小数位但去除末尾的0
-                decimal_trimmed = decimal_part.rstrip('0')
-                if len(decimal_trimmed) < 4:  # 确保至少有4位小数
-                    decimal_trimmed = decimal_part[:4]
-            else:
-                # 对于较大的值，至少保留2位小数
-                decimal_trimmed = decimal_part
-                if len(decimal_trimmed) > 2:
-                    if all(c == '0' for c in decimal_trimmed[2:]):
-                        decimal_trimmed = decimal_trimmed[:2]
-            
-            # 确保至少有一位小数
-            if not decimal_trimmed:
-                decimal_trimmed = '0'
-                
-            # 组合结果
-            return f"{integer_with_commas}.{decimal_trimmed}"
-        except Exception as e:
-            logger.error(f"价格格式化失败: {str(e)}")
-            return str(price)
+        """格式化价格显示（按数量级区间确定精度，见report_templates.format_price）"""
+        return format_price(price)
             
     def _safe_float(self, data, key, default=0):
         """安全获取浮点数值"""
@@ -787,743 +950,581 @@ NVT比率: {nvt_str} - {nvt_analysis}
         # 这里简单地返回True，你可以添加更复杂的逻辑
         return True
         
+    @metrics.timed('render.short')
     def _generate_short_term_signal_push(self, symbol, market_data, current_price):
         """生成短期波段策略信号推送报告"""
         try:
-            # 获取当前时间
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            
-            # 获取K线数据
-            klines_data = market_data['klines']
-            latest_15m = klines_data['15m'].iloc[-1]
-            latest_1h = klines_data['1h'].iloc[-1]
-            latest_4h = klines_data['4h'].iloc[-1]
-            
-            # 获取技术指标数据
-            rsi = float(latest_15m['rsi'])
-            macd = float(latest_15m['macd'])
-            macd_signal = float(latest_15m['macd_signal'])
-            ema5 = float(latest_15m['ema5'])
-            ema13 = float(latest_15m['ema13'])
-            volume = float(latest_15m['volume'])
-            volume_ma20 = float(latest_15m['volume_ma20'])
-            
-            # 获取合约数据
-            futures_data = market_data.get('futures_data', {})
-            funding_rate = float(futures_data.get('funding_rate', 0)) * 100  # 转为百分比
-            long_short_ratio = futures_data.get('long_short_ratio', None)  # 允许None值
-            
-            # 获取筹码分布数据
-            chip_data = market_data.get('volume_profile', {})
-            if chip_data:
-                total_volume = sum(chip_data.values())
-                # 找到成交量最大的价格区间
-                max_volume_range = max(chip_data.items(), key=lambda x: x[1])
-                max_volume_price_range = max_volume_range[0]
-                max_volume_percentage = (max_volume_range[1] / total_volume) * 100
-                
-                # 计算获利盘比例
-                volume_below_current = 0
-                for price_range, volume in chip_data.items():
-                    lower, upper = map(float, price_range.split('-'))
-                    if upper <= current_price:
-                        volume_below_current += volume
-                
-                profit_percentage = (volume_below_current / total_volume) * 100
-            else:
-                max_volume_price_range = "N/A"
-                max_volume_percentage = 0
-                profit_percentage = 0
-            
-            # 判断RSI区域
-            rsi_zone = "中性区域"
-            rsi_signal = "中性"
-            if rsi > 70:
-                rsi_zone = "超买区域"
-                rsi_signal = "看空"
-            elif rsi < 30:
-                rsi_zone = "超卖区域"
-                rsi_signal = "看多"
-            
-            # 判断MACD情况
-            macd_signal_trend = "中性"
-            if macd > macd_signal:
-                macd_status = "金叉（短期动能转向多头）"
-                macd_signal_trend = "看多"
-            else:
-                macd_status = "死叉（短期动能转向空头）"
-                macd_signal_trend = "看空"
-            
-            # 判断EMA趋势
-            ema_signal = "中性"
-            if ema5 > ema13:
-                ema_trend = "EMA5 > EMA13（金叉，短期趋势向上）"
-                ema_signal = "看多"
-            else:
-                ema_trend = "EMA5 < EMA13（死叉，短期趋势向下）"
-                ema_signal = "看空"
-            
-            # 判断成交量情况
-            volume_signal = "中性"
-            volume_change = (volume / volume_ma20 - 1) * 100
-            if volume_change > 30 and latest_15m['close'] > latest_15m['open']:
-                volume_status = "放量上涨"
-                volume_signal = "看多"
-            elif volume_change > 30 and latest_15m['close'] < latest_15m['open']:
-                volume_status = "放量下跌"
-                volume_signal = "看空"
-            elif volume_change < -30 and latest_15m['close'] > latest_15m['open']:
-                volume_status = "缩量上涨"
-                volume_signal = "中性偏空"
-            elif volume_change < -30 and latest_15m['close'] < latest_15m['open']:
-                volume_status = "缩量下跌"
-                volume_signal = "中性偏多"
-            else:
-                volume_status = "成交量正常"
-            
-            # 判断资金费率情况
-            funding_signal = "中性"
-            if funding_rate > 0.01:
-                funding_status = "多头略占优"
-                funding_signal = "看空"
-            elif funding_rate < -0.01:
-                funding_status = "空头略占优"
-                funding_signal = "看多"
-            else:
-                funding_status = "多空平衡"
-            
-            # 判断多空比情况
-            if long_short_ratio is None:
-                long_short_status = "多空平衡"
-            elif long_short_ratio > 1.1:
-                long_short_status = "多头占优"
-            elif long_short_ratio < 0.9:
-                long_short_status = "空头占优"
-            else:
-                long_short_status = "多空平衡"
-            
-            # 判断价格相对重要均线位置
-            price_ma_position = []
-            if current_price > float(latest_1h['ma20']):
-                price_ma_position.append("价格位于1小时MA20均线上方")
-            else:
-                price_ma_position.append("价格位于1小时MA20均线下方")
-                
-            if current_price > float(latest_1h['ma50']):
-                price_ma_position.append("价格位于1小时MA50均线上方")
-            else:
-                price_ma_position.append("价格位于1小时MA50均线下方")
-                
-            if current_price > float(latest_4h['ma20']):
-                price_ma_position.append("价格位于4小时MA20均线上方")
-            else:
-                price_ma_position.append("价格位于4小时MA20均线下方")
-            
-            # 判断筹码分布情况
-            chip_signal = "中性"
-            if profit_percentage > 70:
-                chip_signal = "看空"
-            elif profit_percentage < 30:
-                chip_signal = "看多"
-            
-            # 计算总体信号
-            signal_weights = {
-                'rsi': 0.15,
-                'macd': 0.20,
-                'ema': 0.25,
-                'volume': 0.15,
-                'funding': 0.10,
-                'chip': 0.15
-            }
-            
-            signal_values = {
-                '看多': 1,
-                '中性偏多': 0.5,
-                '中性': 0,
-                '中性偏空': -0.5,
-                '看空': -1
-            }
-            
-            # 计算加权平均信号
-            total_signal = (
-                signal_weights['rsi'] * signal_values.get(rsi_signal, 0) +
-                signal_weights['macd'] * signal_values.get(macd_signal_trend, 0) +
-                signal_weights['ema'] * signal_values.get(ema_signal, 0) +
-                signal_weights['volume'] * signal_values.get(volume_signal, 0) +
-                signal_weights['funding'] * signal_values.get(funding_signal, 0) +
-                signal_weights['chip'] * signal_values.get(chip_signal, 0)
-            )
-            
-            # 确定最终交易方向
-            if total_signal > 0.3:
-                direction = "📈 做多"
-                direction_explanation = "短期技术指标整体偏多，以EMA和MACD指标最为突出"
-            elif total_signal < -0.3:
-                direction = "📉 做空"
-                direction_explanation = "短期技术指标整体偏空，以EMA和RSI指标最为突出"
-            else:
-                if ema_signal == "看多":
-                    direction = "📈 谨慎做多"
-                    direction_explanation = "短期趋势指标偏多，但其他指标信号不强，建议轻仓操作"
-                elif ema_signal == "看空":
-                    direction = "📉 谨慎做空"
-                    direction_explanation = "短期趋势指标偏空，但其他指标信号不强，建议轻仓操作"
-                else:
-                    direction = "⚖️ 观望"
-                    direction_explanation = "技术指标呈中性状态，无明显交易优势，建议暂时观望"
-            
-            # 计算入场区间、止盈目标和止损建议
-            volatility = float(latest_1h['high']) - float(latest_1h['low'])
-            
-            if direction == "⚖️ 观望":
-                entry_low = current_price * 0.995
-                entry_high = current_price * 1.005
-                take_profit = current_price * 1.01
-                stop_loss = current_price * 0.99
-            elif "做多" in direction:
-                entry_low = current_price * 0.997
-                entry_high = current_price * 1.002
-                take_profit = current_price * 1.015
-                stop_loss = current_price * 0.99
-            else:  # 做空
-                entry_low = current_price * 0.998
-                entry_high = current_price * 1.003
-                take_profit = current_price * 0.985
-                stop_loss = current_price * 1.01
-            
-            # 风险提示
-            risk_notes = []
-            if abs(funding_rate) > 0.03:
-                risk_notes.append("当前资金费率异常，可能面临剧烈波动")
-            
-            if max_volume_percentage > 30:
-                risk_notes.append("筹码高度集中，价格可能在此区间震荡")
-            
-            if volume_change > 50:
-                risk_notes.append("成交量剧增，可能存在爆仓风险")
-                
-            if rsi > 75 or rsi < 25:
-                risk_notes.append(f"RSI值处于极端区域({rsi:.1f})，可能面临短期反转")
-            
-            if not risk_notes:
-                if "做空" in direction:
-                    risk_notes.append("当前为技术回调，建议快进快出")
-                    risk_notes.append("注意低位杀跌风险，适合短期交易者")
-                elif "做多" in direction:
-                    risk_notes.append("当前为技术反弹，建议快进快出")
-                    risk_notes.append("注意高位套牢风险，适合短期交易者")
-                else:
-                    risk_notes.append("市场缺乏明确方向，建议轻仓操作或观望")
-            
-            # 将风险提示转换为字符串
-            risk_warning = ""
-            for note in risk_notes:
-                risk_warning += f"- {note}；\n"
-            
-            # 策略模式解释
-            strategy_mode_explanation = """本策略基于短线交易思路，重点关注价格与关键移动平均线的关系、动量指标变化和成交量特征。策略信号来源于以下几个方面：
-1. 均线系统：主要通过EMA5与EMA13的交叉关系判断短期趋势
-2. 动量指标：使用RSI判断超买超卖，MACD判断动能变化
-3. 成交量分析：关注成交量与价格的配合关系
-4. 筹码分布：评估主力筹码集中度和获利盘比例
-5. 资金费率：监控合约市场中的资金费率变化
-通过对以上因素的综合加权评估，形成最终交易信号和建议。"""
-            
-            # 生成筹码分布情况描述
-            if chip_data:
-                chip_situation = f"主力筹码集中在 {max_volume_price_range} 区间，占比 {max_volume_percentage:.2f}%\n- 获利盘比例: {profit_percentage:.2f}%"
-            else:
-                chip_situation = "筹码分布数据不足"
-            
-            # 格式化价格显示
-            current_price_str = self._format_price(current_price)
-            entry_low_str = self._format_price(entry_low)
-            entry_high_str = self._format_price(entry_high)
-            take_profit_str = self._format_price(take_profit)
-            stop_loss_str = self._format_price(stop_loss)
-            
-            # 生成分析权重表格
-            analysis_summary = f"""分析因素权重表:
-RSI ({rsi:.2f}): {rsi_signal} [权重: {signal_weights['rsi']*100:.0f}%]
-MACD: {macd_signal_trend} [权重: {signal_weights['macd']*100:.0f}%]
-EMA趋势: {ema_signal} [权重: {signal_weights['ema']*100:.0f}%]
-成交量: {volume_signal} [权重: {signal_weights['volume']*100:.0f}%]
-资金费率: {funding_signal} [权重: {signal_weights['funding']*100:.0f}%]
-筹码分布: {chip_signal} [权重: {signal_weights['chip']*100:.0f}%]
-综合信号值: {total_signal:.2f}"""
-            
-            # 生成报告
-            report = f"""📊【短期波段策略信号推送】
-
-🕐 时间：{current_time}（系统自动分析）
-💰 当前价格：${current_price_str}
-
-🔹 策略模式：短线波段交易策略（均线动量体系）
-🔸 推荐方向：{direction}
-   * {direction_explanation}
-
-🎯 推荐操作（{direction}）：
-- 入场区间：${entry_low_str} ~ ${entry_high_str}
-- 止盈目标：${take_profit_str}
-- 止损建议：${stop_loss_str}
-- 建议仓位：控制在总资金的 {'20~30%' if abs(total_signal) > 0.5 else '10~15%' if abs(total_signal) > 0.2 else '5~10%'}
-
-📊 详细指标分析：
-📈 RSI(14)：{rsi:.2f}（{rsi_zone}）
-📉 MACD(12,26,9)：{macd:.2f}，信号线：{macd_signal:.2f}，{macd_status}
-📊 EMA：EMA5={self._format_price(ema5)}，EMA13={self._format_price(ema13)}，{ema_trend}
-📦 成交量：当前={self._format_price(volume)}，MA20={self._format_price(volume_ma20)}，变化={volume_change:.2f}%，{volume_status}
-💰 Funding Rate：{funding_rate:.6f}%（{funding_status}）
-
-📈 移动均线详情：
-- MA20(1H)：{self._format_price(float(latest_1h['ma20']))}，{price_ma_position[0]}
-- MA50(1H)：{self._format_price(float(latest_1h['ma50']))}，{price_ma_position[1]}
-- MA20(4H)：{self._format_price(float(latest_4h['ma20']))}，{price_ma_position[2]}
-
-📊 合约情况：
-- 多空比：{long_short_ratio if long_short_ratio is not None else 1.00}（{long_short_status}）
-- 资金费率：{funding_rate:.6f}%（{funding_status}）
-
-📈 筹码分布：
-- 主力筹码集中在 {max_volume_price_range} 区间，占比 {max_volume_percentage:.2f}%
-- 获利盘比例: {profit_percentage:.2f}%（{'大部分持仓盈利' if profit_percentage > 50 else '大部分持仓亏损'}）
-
-⚠️ 风险提示：
-{risk_warning}
-
-📬 如需切换至中期或长期策略，输入：
-/strategy mid 或 /strategy long"""
-            
-            return report
+            values = self._short_term_values(market_data, current_price)
+            return self._cache_report(symbol, 'short', self.renderer.render('short', values), values)
             
         except Exception as e:
             logger.error(f"生成短期波段策略信号推送失败: {str(e)}")
             return f"生成短期波段策略信号推送失败: {str(e)}"
 
-    def _generate_mid_term_signal_push(self, symbol, market_data, current_price):
-        """生成中期趋势策略信号推送报告"""
-        try:
-            # 获取当前时间
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            
-            # 获取K线数据
-            klines_data = market_data['klines']
-            latest_1h = klines_data['1h'].iloc[-1]
-            latest_4h = klines_data['4h'].iloc[-1]
-            latest_1d = klines_data['1d'].iloc[-1]
-            
-            # 获取技术指标数据
-            rsi = float(latest_1d['rsi'])
-            macd = float(latest_1d['macd'])
-            macd_signal = float(latest_1d['macd_signal'])
-            
-            # 判断RSI区域
-            rsi_zone = "中性区域"
-            if rsi > 70:
-                rsi_zone = "超买区域"
-            elif rsi < 30:
-                rsi_zone = "超卖区域"
-                
-            # 判断MACD情况
-            if macd > macd_signal:
-                macd_status = "金叉（中期动能转向多头）"
-            else:
-                macd_status = "死叉（中期动能转向空头）"
-            
-            # 分析趋势指标
-            # 准备日线EMA数据
-            ema_data_1d = {
-                'ema5': float(latest_1d['ema5']),
-                'ema13': float(latest_1d['ema13']),
-                'ema20': float(latest_1d['ma20']),
-                'ema50': float(latest_1d['ma50']),
-                'ema100': float(latest_1d['ma50'])
-            }
-            
-            # 准备4小时EMA数据
-            ema_data_4h = {
-                'ema5': float(latest_4h['ema5']),
-                'ema13': float(latest_4h['ema13']),
-                'ema20': float(latest_4h['ma20']),
-                'ema50': float(latest_4h['ma50']),
-                'ema100': float(latest_4h['ma50'])
-            }
-            
-            # 日线趋势分析
-            trend_1d_direction, trend_1d_strength = self.analysis_rules.analyze_trend(ema_data_1d)
-            
-            # 4小时趋势分析
-            trend_4h_direction, trend_4h_strength = self.analysis_rules.analyze_trend(ema_data_4h)
-            
-            # 获取合约数据
-            futures_data = market_data.get('futures_data', {})
-            funding_rate = float(futures_data.get('funding_rate', 0)) * 100  # 转为百分比
-            long_short_ratio = futures_data.get('long_short_ratio', None)  # 允许None值
-            
-            # 判断资金费率情况
-            if funding_rate > 0.01:
-                funding_status = "多头略占优"
-            elif funding_rate < -0.01:
-                funding_status = "空头略占优"
-            else:
-                funding_status = "多空平衡"
-                
-            # 判断多空比情况
-            if long_short_ratio is None:
-                long_short_status = "多空平衡"
-            elif long_short_ratio > 1.1:
-                long_short_status = "多头占优"
-            elif long_short_ratio < 0.9:
-                long_short_status = "空头占优"
-            else:
-                long_short_status = "多空平衡"
-            
-            # 获取筹码分布数据
-            chip_data = market_data.get('volume_profile', {})
-            if chip_data:
-                # 处理筹码分布数据
-                pass
-            
-            # 计算波动区间
-            price_range = current_price * 0.01  # 默认波动区间为当前价格的1%
-            
-            # 计算入场区间
-            entry_low = current_price - price_range * 0.5
-            entry_high = current_price + price_range * 0.5
-            
-            # 计算止盈止损
-            take_profit = current_price + price_range * 2 if trend_1d_direction == TrendDirection.BULLISH else current_price - price_range * 2
-            stop_loss = current_price - price_range * 1.5 if trend_1d_direction == TrendDirection.BULLISH else current_price + price_range * 1.5
-            
-            # 综合信号评分 (1-7)
-            signal_strength = 0
+    def _short_term_values(self, market_data, current_price):
+        """计算短期波段策略信号推送报告的结构化结果（数值和措辞键）"""
+        # 获取当前时间
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        
+        # 获取K线数据
+        klines_data = market_data['klines']
+        latest_1h = klines_data['1h'].iloc[-1]
+        latest_4h = klines_data['4h'].iloc[-1]
+        
+        # 获取合约数据
+        futures_data = market_data.get('futures_data', {})
+        funding_rate = float(futures_data.get('funding_rate', 0)) * 100  # 转为百分比
+        long_short_ratio = futures_data.get('long_short_ratio', None)  # 允许None值
+        
+        # 获取筹码分布数据
+        max_volume_price_range, max_volume_percentage, profit_percentage = self._chip_summary(
+            market_data.get('volume_profile', {}), current_price)
+        
+        # 按编译后的规则计算各信号
+        features = self._short_term_features(market_data, profit_percentage)
+        rsi = features['rsi']
+        macd = features['macd']
+        macd_signal = features['macd_signal']
+        ema5 = features['ema5']
+        ema13 = features['ema13']
+        volume = features['volume']
+        volume_ma20 = features['volume_ma20']
+        volume_change = (volume / volume_ma20 - 1) * 100
+        rules = self.rule_engine.strategy('short')
+        evaluation = rules.evaluate_row(features)
+        labels = evaluation['labels']
+        rsi_zone = labels['rsi']
+        macd_status = labels['macd']
+        ema_trend = labels['ema']
+        volume_status = labels['volume']
+        funding_status = labels['funding']
+        total_signal = evaluation['score']
+        
+        # 判断多空比情况
+        if long_short_ratio is None:
+            long_short_status = 'long_short.balanced'
+        elif long_short_ratio > 1.1:
+            long_short_status = 'long_short.long'
+        elif long_short_ratio < 0.9:
+            long_short_status = 'long_short.short'
+        else:
+            long_short_status = 'long_short.balanced'
+        
+        # 确定最终交易方向
+        direction = self._short_direction(rules, evaluation)
+        
+        # 计算入场区间、止盈目标和止损建议
+        if direction == 'neutral':
+            entry_low = current_price * 0.995
+            entry_high = current_price * 1.005
+            take_profit = current_price * 1.01
+            stop_loss = current_price * 0.99
+        elif direction in ('long', 'cautious_long'):
+            entry_low = current_price * 0.997
+            entry_high = current_price * 1.002
+            take_profit = current_price * 1.015
+            stop_loss = current_price * 0.99
+        else:  # 做空
+            entry_low = current_price * 0.998
+            entry_high = current_price * 1.003
+            take_profit = current_price * 0.985
+            stop_loss = current_price * 1.01
+        
+        # 风险提示
+        risk_notes = []
+        if abs(funding_rate) > 0.03:
+            risk_notes.append('short.risk.funding')
+        
+        if max_volume_percentage > 30:
+            risk_notes.append('short.risk.chip_concentrated')
+        
+        if volume_change > 50:
+            risk_notes.append('short.risk.volume_surge')
             
-            # 根据趋势信号增加评分
-            if trend_1d_direction == TrendDirection.BULLISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                signal_strength += 2
-            elif trend_1d_direction == TrendDirection.BEARISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                signal_strength -= 2
-                
-            if trend_4h_direction == TrendDirection.BULLISH and trend_4h_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                signal_strength += 1
-            elif trend_4h_direction == TrendDirection.BEARISH and trend_4h_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                signal_strength -= 1
-                
-            # 根据MACD信号增加评分
-            if macd > macd_signal:
-                signal_strength += 1
-            else:
-                signal_strength -= 1
-                
-            # 根据RSI增加评分
-            if rsi > 50:
-                signal_strength += 1
-            else:
-                signal_strength -= 1
-                
-            # 根据资金费率增加评分
-            if funding_rate > 0.01:  # 多头略占优
-                signal_strength += 1
-                
-            # 确定最终交易方向
-            if signal_strength > 0:
-                direction = "📈 做多"
-                direction_explanation = f"综合多项技术指标，信号强度：{abs(signal_strength)}/7"
-            elif signal_strength < 0:
-                direction = "📉 做空"
-                direction_explanation = f"综合多项技术指标，信号强度：{abs(signal_strength)}/7"
-            else:
-                direction = "⏹ 观望"
-                direction_explanation = "技术指标分歧，无明确信号"
-                
-            # 计算建议仓位
-            if abs(signal_strength) >= 5:
-                position_recommendation = "30~50%"
-            elif abs(signal_strength) >= 3:
-                position_recommendation = "20~30%"
+        if rsi > 75 or rsi < 25:
+            risk_notes.append(('short.risk.rsi_extreme', {'rsi': rsi}))
+        
+        if not risk_notes:
+            if direction in ('short', 'cautious_short'):
+                risk_notes += ['short.risk.pullback', 'short.risk.pullback_trap']
+            elif direction in ('long', 'cautious_long'):
+                risk_notes += ['short.risk.rebound', 'short.risk.rebound_trap']
             else:
-                position_recommendation = "10~20%"
-                
-            # 风险提示
-            risk_notes = []
-            risk_notes.append("筹码分布分散，价格波动可能较大；")
-            risk_notes.append("套牢盘比例较高，存在解套反弹可能；")
-            
-            # 格式化价格显示
-            current_price_str = self._format_price(current_price)
-            entry_low_str = self._format_price(entry_low)
-            entry_high_str = self._format_price(entry_high)
-            take_profit_str = self._format_price(take_profit)
-            stop_loss_str = self._format_price(stop_loss)
-            
-            # 生成信号推送报告
-            report = f"""📊【中期趋势策略信号推送】
-
-🕐 时间：{current_time}（系统自动分析）
-💰 当前价格：${current_price_str}
-
-🔹 策略模式：中期趋势策略（3-7日线）
-🔸 推荐方向：{direction}
-   * {direction_explanation}
-
-🎯 推荐操作（{direction}）：
-- 入场区间：${entry_low_str} ~ ${entry_high_str}
-- 止盈目标：${take_profit_str}
-- 止损建议：${stop_loss_str}
-- 建议仓位：控制在总资金的 {position_recommendation}
+                risk_notes.append('short.risk.no_direction')
+        
+        # 均线位置
+        ma20_1h = float(latest_1h['ma20'])
+        ma50_1h = float(latest_1h['ma50'])
+        ma20_4h = float(latest_4h['ma20'])
+        
+        return {
+            'current_time': current_time,
+            'current_price': current_price,
+            'direction': f"short.direction.{direction}",
+            'direction_explanation': f"short.explanation.{direction}",
+            'entry_low': entry_low,
+            'entry_high': entry_high,
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'position': '20~30%' if abs(total_signal) > 0.5 else '10~15%' if abs(total_signal) > 0.2 else '5~10%',
+            'rsi': rsi,
+            'rsi_zone': rsi_zone,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_status': macd_status,
+            'ema5': ema5,
+            'ema13': ema13,
+            'ema_trend': ema_trend,
+            'volume': volume,
+            'volume_ma20': volume_ma20,
+            'volume_change': volume_change,
+            'volume_status': volume_status,
+            'funding_rate': funding_rate,
+            'funding_status': funding_status,
+            'ma20_1h': ma20_1h,
+            'ma20_1h_side': 'above' if current_price > ma20_1h else 'below',
+            'ma50_1h': ma50_1h,
+            'ma50_1h_side': 'above' if current_price > ma50_1h else 'below',
+            'ma20_4h': ma20_4h,
+            'ma20_4h_side': 'above' if current_price > ma20_4h else 'below',
+            'long_short_ratio': long_short_ratio if long_short_ratio is not None else 1.00,
+            'long_short_status': long_short_status,
+            'max_volume_price_range': max_volume_price_range,
+            'max_volume_percentage': max_volume_percentage,
+            'profit_percentage': profit_percentage,
+            'profit_status': 'profit.majority' if profit_percentage > 50 else 'loss.majority',
+            'risk_notes': risk_notes
+        }
 
-📊 详细指标分析：
-📈 RSI(14)：{rsi:.2f}（{rsi_zone}）
-📉 MACD(12,26,9)：{macd:.2f}，信号线：{macd_signal:.2f}，{macd_status}
-📊 趋势：日线={trend_1d_direction.value}({trend_1d_strength.name})，4小时={trend_4h_direction.value}({trend_4h_strength.name})
-💰 Funding Rate：{funding_rate:.6f}%（{funding_status}）
+    @staticmethod
+    def _short_term_features(market_data, profit_percentage):
+        """短期规则的输入特征：15分钟K线的最新指标、资金费率和获利盘比例（报告和多币种对比共用）"""
+        latest_15m = market_data['klines']['15m'].iloc[-1]
+        futures_data = market_data.get('futures_data') or {}
+        return {
+            'rsi': float(latest_15m['rsi']),
+            'macd': float(latest_15m['macd']),
+            'macd_signal': float(latest_15m['macd_signal']),
+            'ema5': float(latest_15m['ema5']),
+            'ema13': float(latest_15m['ema13']),
+            'volume': float(latest_15m['volume']),
+            'volume_ma20': float(latest_15m['volume_ma20']),
+            'open': float(latest_15m['open']),
+            'close': float(latest_15m['close']),
+            'funding_rate': float(futures_data.get('funding_rate', 0)),
+            'chip_profit': profit_percentage
+        }
 
-📈 移动均线详情：
-- MA20(1D)：{self._format_price(float(latest_1d['ma20']))}，价格位于日线MA20均线{'上方' if current_price > float(latest_1d['ma20']) else '下方'}
-- MA50(1D)：{self._format_price(float(latest_1d['ma50']))}，价格位于日线MA50均线{'上方' if current_price > float(latest_1d['ma50']) else '下方'}
-- MA20(4H)：{self._format_price(float(latest_4h['ma20']))}，价格位于4小时MA20均线{'上方' if current_price > float(latest_4h['ma20']) else '下方'}
+    @staticmethod
+    def _chip_summary(chip_data, current_price):
+        """
+        筹码分布摘要
 
-📊 合约情况：
-- 多空比：{long_short_ratio if long_short_ratio is not None else 1.00}（{long_short_status}）
-- 资金费率：{funding_rate:.6f}%（{funding_status}）
+        Args:
+            chip_data: 筹码分布（{"下界-上界": 成交量}）
+            current_price: 当前价格
 
-📈 筹码分布：
-- 主力筹码集中在 未知 区间，占比 0.00%
-- 获利盘比例: 0.00%（大部分持仓亏损）
+        Returns:
+            (成交量最大的价格区间, 该区间的成交量占比, 获利盘比例)，没有数据时为("N/A", 0, 0)
+        """
+        if not chip_data:
+            return "N/A", 0, 0
+        total_volume = sum(chip_data.values())
+        # 找到成交量最大的价格区间
+        max_volume_range = max(chip_data.items(), key=lambda x: x[1])
+        max_volume_percentage = (max_volume_range[1] / total_volume) * 100
+        
+        # 计算获利盘比例
+        volume_below_current = 0
+        for price_range, range_volume in chip_data.items():
+            lower, upper = map(float, price_range.split('-'))
+            if upper <= current_price:
+                volume_below_current += range_volume
+        
+        return max_volume_range[0], max_volume_percentage, (volume_below_current / total_volume) * 100
 
-⚠️ 风险提示：
-- {risk_notes[0]}
-- {risk_notes[1]}
+    @staticmethod
+    def _short_direction(rules, evaluation):
+        """短期规则的评分超过阈值时做多/做空，否则按fallback信号谨慎做多/做空或观望"""
+        if evaluation['score'] > rules.threshold:
+            return 'long'
+        if evaluation['score'] < -rules.threshold:
+            return 'short'
+        if evaluation['direction'] > 0:
+            return 'cautious_long'
+        if evaluation['direction'] < 0:
+            return 'cautious_short'
+        return 'neutral'
 
-📬 如需切换至短期或长期策略，输入：
-/strategy short 或 /strategy long"""
-            
-            return report
+    @metrics.timed('render.mid')
+    def _generate_mid_term_signal_push(self, symbol, market_data, current_price):
+        """生成中期趋势策略信号推送报告"""
+        try:
+            values = self._mid_term_values(market_data, current_price)
+            return self._cache_report(symbol, 'mid', self.renderer.render('mid', values), values)
         
         except Exception as e:
             logger.error(f"生成中期信号推送失败: {str(e)}")
             return f"生成{symbol}的中期信号推送失败: {str(e)}"
 
+    def _mid_term_values(self, market_data, current_price):
+        """计算中期趋势策略信号推送报告的结构化结果（数值和措辞键）"""
+        # 获取当前时间
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        
+        # 获取K线数据
+        klines_data = market_data['klines']
+        latest_1h = klines_data['1h'].iloc[-1]
+        latest_4h = klines_data['4h'].iloc[-1]
+        latest_1d = klines_data['1d'].iloc[-1]
+        
+        # 获取技术指标数据
+        rsi = float(latest_1d['rsi'])
+        macd = float(latest_1d['macd'])
+        macd_signal = float(latest_1d['macd_signal'])
+        
+        # 判断RSI区域
+        thresholds = self.rule_engine.momentum_thresholds('mid')
+        rsi_zone = 'mid.rsi.neutral'
+        if rsi > thresholds['overbought']:
+            rsi_zone = 'mid.rsi.overbought'
+        elif rsi < thresholds['oversold']:
+            rsi_zone = 'mid.rsi.oversold'
+            
+        # 判断MACD情况
+        if macd > macd_signal:
+            macd_status = 'mid.macd.golden'
+        else:
+            macd_status = 'mid.macd.dead'
+        
+        # 分析趋势指标
+        # 准备日线EMA数据
+        ema_data_1d = {
+            'ema5': float(latest_1d['ema5']),
+            'ema13': float(latest_1d['ema13']),
+            'ema20': float(latest_1d['ma20']),
+            'ema50': float(latest_1d['ma50']),
+            'ema100': float(latest_1d['ma50'])
+        }
+        
+        # 准备4小时EMA数据
+        ema_data_4h = {
+            'ema5': float(latest_4h['ema5']),
+            'ema13': float(latest_4h['ema13']),
+            'ema20': float(latest_4h['ma20']),
+            'ema50': float(latest_4h['ma50']),
+            'ema100': float(latest_4h['ma50'])
+        }
+        
+        # 日线趋势分析
+        trend_1d_direction, trend_1d_strength = self.analysis_rules.analyze_trend(ema_data_1d)
+        
+        # 4小时趋势分析
+        trend_4h_direction, trend_4h_strength = self.analysis_rules.analyze_trend(ema_data_4h)
+        
+        # 获取合约数据
+        futures_data = market_data.get('futures_data', {})
+        funding_rate = float(futures_data.get('funding_rate', 0)) * 100  # 转为百分比
+        long_short_ratio = futures_data.get('long_short_ratio', None)  # 允许None值
+        
+        # 判断资金费率情况
+        if funding_rate > 0.01:
+            funding_status = 'mid.funding.long'
+        elif funding_rate < -0.01:
+            funding_status = 'mid.funding.short'
+        else:
+            funding_status = 'mid.funding.balanced'
+            
+        # 判断多空比情况
+        if long_short_ratio is None:
+            long_short_status = 'long_short.balanced'
+        elif long_short_ratio > 1.1:
+            long_short_status = 'long_short.long'
+        elif long_short_ratio < 0.9:
+            long_short_status = 'long_short.short'
+        else:
+            long_short_status = 'long_short.balanced'
+        
+        # 获取筹码分布数据
+        chip_data = market_data.get('volume_profile', {})
+        if chip_data:
+            # 处理筹码分布数据
+            pass
+        
+        # 计算波动区间
+        price_range = current_price * self.rule_engine.strategy('mid').params.get('range_pct', 0.01)  # 默认为当前价格的1%
+        
+        # 计算入场区间
+        entry_low = current_price - price_range * 0.5
+        entry_high = current_price + price_range * 0.5
+        
+        # 计算止盈止损
+        take_profit = current_price + price_range * 2 if trend_1d_direction == TrendDirection.BULLISH else current_price - price_range * 2
+        stop_loss = current_price - price_range * 1.5 if trend_1d_direction == TrendDirection.BULLISH else current_price + price_range * 1.5
+        
+        # 综合信号评分（按编译后的规则加权，默认权重下为-6~6）
+        rules = self.rule_engine.strategy('mid')
+        evaluation = rules.evaluate_row({
+            '1d_ema5': ema_data_1d['ema5'],
+            '1d_ema13': ema_data_1d['ema13'],
+            '1d_ma20': ema_data_1d['ema20'],
+            '1d_ma50': ema_data_1d['ema50'],
+            '4h_ema5': ema_data_4h['ema5'],
+            '4h_ema13': ema_data_4h['ema13'],
+            '4h_ma20': ema_data_4h['ema20'],
+            '4h_ma50': ema_data_4h['ema50'],
+            '1d_macd': macd,
+            '1d_macd_signal': macd_signal,
+            '1d_rsi': rsi,
+            'funding_rate': funding_rate / 100
+        })
+        signal_strength = evaluation['score']
+        
+        # 确定最终交易方向
+        if evaluation['direction'] > 0:
+            direction = 'mid.direction.long'
+            direction_explanation = ('mid.explanation.signal', {'strength': abs(signal_strength)})
+        elif evaluation['direction'] < 0:
+            direction = 'mid.direction.short'
+            direction_explanation = ('mid.explanation.signal', {'strength': abs(signal_strength)})
+        else:
+            direction = 'mid.direction.neutral'
+            direction_explanation = 'mid.explanation.neutral'
+            
+        # 计算建议仓位
+        if abs(signal_strength) >= 5:
+            position_recommendation = "30~50%"
+        elif abs(signal_strength) >= 3:
+            position_recommendation = "20~30%"
+        else:
+            position_recommendation = "10~20%"
+        
+        # 均线位置
+        ma20_1d = float(latest_1d['ma20'])
+        ma50_1d = float(latest_1d['ma50'])
+        ma20_4h = float(latest_4h['ma20'])
+        
+        return {
+            'current_time': current_time,
+            'current_price': current_price,
+            'direction': direction,
+            'direction_explanation': direction_explanation,
+            'entry_low': entry_low,
+            'entry_high': entry_high,
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'position': position_recommendation,
+            'rsi': rsi,
+            'rsi_zone': rsi_zone,
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_status': macd_status,
+            'trend_1d': trend_1d_direction.value,
+            'trend_1d_strength': trend_1d_strength.name,
+            'trend_4h': trend_4h_direction.value,
+            'trend_4h_strength': trend_4h_strength.name,
+            'funding_rate': funding_rate,
+            'funding_status': funding_status,
+            'ma20_1d': ma20_1d,
+            'ma20_1d_side': 'above' if current_price > ma20_1d else 'below',
+            'ma50_1d': ma50_1d,
+            'ma50_1d_side': 'above' if current_price > ma50_1d else 'below',
+            'ma20_4h': ma20_4h,
+            'ma20_4h_side': 'above' if current_price > ma20_4h else 'below',
+            'long_short_ratio': long_short_ratio if long_short_ratio is not None else 1.00,
+            'long_short_status': long_short_status
+        }
+
+    @metrics.timed('render.long')
     def _generate_long_term_signal_push(self, symbol, market_data, current_price):
         """生成长期投资策略信号推送报告"""
         try:
-            # 获取当前时间
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            
-            # 获取K线数据
-            klines_data = market_data['klines']
-            if '1d' not in klines_data or '1w' not in klines_data:
-                logger.error(f"缺少生成长期投资分析所需的K线数据")
+            values = self._long_term_values(market_data, current_price)
+            if values is None:
                 return "缺少生成长期投资分析所需的K线数据"
-                
-            try:
-                latest_1d = klines_data['1d'].iloc[-1]
-                latest_1w = klines_data['1w'].iloc[-1]
-            except Exception as e:
-                logger.error(f"获取K线数据失败: {str(e)}")
-                latest_1d = None
-                latest_1w = None
-            
-            # 获取链上数据
-            onchain_data = market_data.get('onchain_data', {})
-            mvrv_z = self._safe_float(onchain_data, 'mvrv_z', 0)
-            nvt = self._safe_float(onchain_data, 'nvt', 0)
-            
-            # 格式化价格显示
-            current_price_str = self._format_price(current_price)
-            mvrv_z_str = self._format_price(mvrv_z)
-            nvt_str = self._format_price(nvt)
-            
-            # 计算趋势方向
-            trend_1w_direction = TrendDirection.NEUTRAL
-            trend_1w_strength = SignalStrength.WEAK
-            trend_1d_direction = TrendDirection.NEUTRAL
-            trend_1d_strength = SignalStrength.WEAK
-            
-            if latest_1w is not None:
-                trend_1w_direction, trend_1w_strength = self.analysis_rules.analyze_trend({
-                    'ema5': float(latest_1w['ema5']) if 'ema5' in latest_1w else 0,
-                    'ema13': float(latest_1w['ema13']) if 'ema13' in latest_1w else 0,
-                    'ema20': float(latest_1w['ma20']) if 'ma20' in latest_1w else 0,
-                    'ema50': float(latest_1w['ma50']) if 'ma50' in latest_1w else 0,
-                    'ema100': float(latest_1w['ma50']) if 'ma50' in latest_1w else 0  # 使用ma50代替
-                })
-            
-            if latest_1d is not None:
-                trend_1d_direction, trend_1d_strength = self.analysis_rules.analyze_trend({
-                    'ema5': float(latest_1d['ema5']) if 'ema5' in latest_1d else 0,
-                    'ema13': float(latest_1d['ema13']) if 'ema13' in latest_1d else 0,
-                    'ema20': float(latest_1d['ma20']) if 'ma20' in latest_1d else 0,
-                    'ema50': float(latest_1d['ma50']) if 'ma50' in latest_1d else 0,
-                    'ema100': float(latest_1d['ma50']) if 'ma50' in latest_1d else 0  # 使用ma50代替
-                })
-            
-            # 计算建议入场、止盈和止损价格
-            price_range = current_price * 0.03  # 以当前价格的3%作为长期波动区间
-            entry_low = current_price - price_range * 0.5
-            entry_high = current_price + price_range * 0.5
-            
-            # 根据MVRV-Z和趋势确定止盈止损
-            if mvrv_z < -0.5:  # 低估区域
-                take_profit = current_price + price_range * 5  # 长期目标更远
-                stop_loss = current_price - price_range * 1.5
-            elif mvrv_z > 2:  # 高估区域
-                take_profit = current_price - price_range * 5
-                stop_loss = current_price + price_range * 1.5
-            else:  # 中性区域
-                # 根据趋势确定
-                if trend_1w_direction == TrendDirection.BULLISH:
-                    take_profit = current_price + price_range * 3
-                    stop_loss = current_price - price_range * 2
-                elif trend_1w_direction == TrendDirection.BEARISH:
-                    take_profit = current_price - price_range * 3
-                    stop_loss = current_price + price_range * 2
-                else:
-                    take_profit = current_price + price_range * 2
-                    stop_loss = current_price - price_range * 2
-            
-            # 格式化价格字符串
-            entry_low_str = self._format_price(entry_low)
-            entry_high_str = self._format_price(entry_high)
-            take_profit_str = self._format_price(take_profit)
-            stop_loss_str = self._format_price(stop_loss)
-            
-            # 确定总体趋势方向
-            overall_direction = "观望"
-            direction_emoji = "⏳"
-            position_size = "10~20%"
-            
-            bullish_signals = 0
-            bearish_signals = 0
-            
-            # MVRV-Z信号（最重要的长期指标）
-            if mvrv_z < -1:
-                bullish_signals += 2  # 权重加倍
-            elif mvrv_z < 0:
-                bullish_signals += 1
-            elif mvrv_z > 3:
-                bearish_signals += 2  # 权重加倍
-            elif mvrv_z > 1:
-                bearish_signals += 1
-                
-            # NVT信号
-            if nvt < 20:
-                bullish_signals += 1
-            elif nvt > 100:
-                bearish_signals += 1
-                
-            # 周线趋势信号
-            if trend_1w_direction == TrendDirection.BULLISH and trend_1w_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                bullish_signals += 1
-            elif trend_1w_direction == TrendDirection.BEARISH and trend_1w_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                bearish_signals += 1
-                
-            # 日线趋势信号
-            if trend_1d_direction == TrendDirection.BULLISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                bullish_signals += 1
-            elif trend_1d_direction == TrendDirection.BEARISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
-                bearish_signals += 1
-                
-            # 确定最终方向
-            if bullish_signals >= 3:
-                overall_direction = "长期做多"
-                direction_emoji = "📈"
-                position_size = "30~50%"
-            elif bearish_signals >= 3:
-                overall_direction = "长期做空"
-                direction_emoji = "📉"
-                position_size = "30~50%"
-            elif bullish_signals >= 2:
-                overall_direction = "谨慎做多"
-                direction_emoji = "📈"
-                position_size = "20~30%"
-            elif bearish_signals >= 2:
-                overall_direction = "谨慎做空"
-                direction_emoji = "📉"
-                position_size = "20~30%"
-                
-            # 生成MVRV-Z状态描述
-            mvrv_status = "合理"
-            if mvrv_z < -1:
-                mvrv_status = "严重低估"
-                mvrv_interpretation = "-2~0区间为买入区"
-                value_suggestion = "当前处于长期价值低估区域，适合分批布局，建立长期头寸；"
-            elif mvrv_z < 0:
-                mvrv_status = "略低估"
-                mvrv_interpretation = "-1~0区间为低估区"
-                value_suggestion = "当前处于价值低估区域，适合轻仓布局；"
-            elif mvrv_z > 3:
-                mvrv_status = "严重高估"
-                mvrv_interpretation = "3以上为危险区"
-                value_suggestion = "当前处于价值高估区域，不建议开仓，可考虑减持；"
-            elif mvrv_z > 1:
-                mvrv_status = "略高估" 
-                mvrv_interpretation = "1~3区间为谨慎区"
-                value_suggestion = "当前处于价值略高估区域，建议减少仓位，谨慎操作；"
-            else:
-                mvrv_interpretation = "0~1区间为中性区"
-                value_suggestion = "当前处于价值合理区域，可考虑轻仓参与；"
-                
-            # 生成NVT状态描述
-            nvt_status = "合理"
-            if nvt < 20:
-                nvt_status = "活跃（低估）"
-                nvt_interpretation = "<30表示链上活动活跃，价值低估"
-                chain_activity_suggestion = "链上活动活跃，长期价值支撑良好；"
-            elif nvt > 100:
-                nvt_status = "不活跃（高估）"
-                nvt_interpretation = ">90表示链上活动不足，价值高估"
-                chain_activity_suggestion = "链上活动不足，长期价值支撑不足；"
-            else:
-                nvt_interpretation = "30~90表示合理区间"
-                chain_activity_suggestion = "链上活动处于正常水平；"
-            
-            # 生成报告
-            report = f"""📊【长期投资策略信号推送】
-
-🕐 时间：{current_time}（系统自动分析）
-💰 当前价格：${current_price_str}
-
-🔹 策略模式：长期投资策略（月度周期）
-🔸 推荐方向：{direction_emoji} {overall_direction}
-   * 基于价值评估和长期趋势，信号强度：{bullish_signals+bearish_signals}/5
-
-🎯 推荐操作（{direction_emoji} {overall_direction}）：
-- 入场区间：${entry_low_str} ~ ${entry_high_str}
-- 止盈目标：${take_profit_str}
-- 止损建议：${stop_loss_str}
-- 建议仓位：控制在总资金的 {position_size}
-
-📊 详细指标分析：
-📈 MVRV-Z评分：{self._format_price(mvrv_z)}（{mvrv_status}）
-📉 NVT比率：{self._format_price(nvt)}（{nvt_status}）
-📊 趋势：周线={trend_1w_direction.value}({trend_1w_strength.name})，日线={trend_1d_direction.value}({trend_1d_strength.name})
-
-📈 长期价值评估：
-- MVRV-Z评分：{self._format_price(mvrv_z)}（市值相对于实现价值的Z分数）
-  * {mvrv_interpretation}
-- NVT比率：{self._format_price(nvt)}（网络价值与交易量比率）
-  * {nvt_interpretation}
-
-📈 移动均线详情：
-- MA50(1W)：{self._format_price(float(latest_1w['ma50']) if latest_1w is not None and 'ma50' in latest_1w else 0)}，价格位于周线MA50均线{'上方' if current_price > (float(latest_1w['ma50']) if latest_1w is not None and 'ma50' in latest_1w else 0) else '下方'}
-- MA200(1D)：{self._format_price(float(latest_1d['ma200']) if 'ma200' in latest_1d else 0)}，价格位于日线MA200均线{'上方' if current_price > (float(latest_1d['ma200']) if 'ma200' in latest_1d else 0) else '下方'}
-- MA50(1D)：{self._format_price(float(latest_1d['ma50']))}，价格位于日线MA50均线{'上方' if current_price > float(latest_1d['ma50']) else '下方'}
-
-⚠️ 投资建议：
-- {value_suggestion}
-- {chain_activity_suggestion}
-- 长期投资应注重价值评估，避免追高杀低，建议采用定投策略。
-
-📬 如需切换至短期或中期策略，输入：
-/strategy short 或 /strategy mid"""
-            
-            return report
+            report = self.renderer.render('long', values)
+            return self._cache_report(symbol, 'long', report, values)
             
         except Exception as e:
             logger.error(f"生成长期投资策略信号推送失败: {str(e)}")
             return f"生成长期投资策略信号推送失败: {str(e)}"
 
+    def _long_term_values(self, market_data, current_price):
+        """计算长期投资策略信号推送报告的结构化结果（数值和措辞键），缺少K线数据时返回None"""
+        # 获取当前时间
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        
+        # 获取K线数据
+        klines_data = market_data['klines']
+        if '1d' not in klines_data or '1w' not in klines_data:
+            logger.error(f"缺少生成长期投资分析所需的K线数据")
+            return None
+            
+        try:
+            latest_1d = klines_data['1d'].iloc[-1]
+            latest_1w = klines_data['1w'].iloc[-1]
+        except Exception as e:
+            logger.error(f"获取K线数据失败: {str(e)}")
+            latest_1d = None
+            latest_1w = None
+        
+        # 获取链上数据
+        onchain_data = market_data.get('onchain_data', {})
+        mvrv_z = self._safe_float(onchain_data, 'mvrv_z', 0)
+        nvt = self._safe_float(onchain_data, 'nvt', 0)
+        
+        # 计算趋势方向
+        trend_1w_direction = TrendDirection.NEUTRAL
+        trend_1w_strength = SignalStrength.WEAK
+        trend_1d_direction = TrendDirection.NEUTRAL
+        trend_1d_strength = SignalStrength.WEAK
+        
+        if latest_1w is not None:
+            trend_1w_direction, trend_1w_strength = self.analysis_rules.analyze_trend({
+                'ema5': float(latest_1w['ema5']) if 'ema5' in latest_1w else 0,
+                'ema13': float(latest_1w['ema13']) if 'ema13' in latest_1w else 0,
+                'ema20': float(latest_1w['ma20']) if 'ma20' in latest_1w else 0,
+                'ema50': float(latest_1w['ma50']) if 'ma50' in latest_1w else 0,
+                'ema100': float(latest_1w['ma50']) if 'ma50' in latest_1w else 0  # 使用ma50代替
+            })
+        
+        if latest_1d is not None:
+            trend_1d_direction, trend_1d_strength = self.analysis_rules.analyze_trend({
+                'ema5': float(latest_1d['ema5']) if 'ema5' in latest_1d else 0,
+                'ema13': float(latest_1d['ema13']) if 'ema13' in latest_1d else 0,
+                'ema20': float(latest_1d['ma20']) if 'ma20' in latest_1d else 0,
+                'ema50': float(latest_1d['ma50']) if 'ma50' in latest_1d else 0,
+                'ema100': float(latest_1d['ma50']) if 'ma50' in latest_1d else 0  # 使用ma50代替
+            })
+        
+        # 计算建议入场、止盈和止损价格
+        price_range = current_price * 0.03  # 以当前价格的3%作为长期波动区间
+        entry_low = current_price - price_range * 0.5
+        entry_high = current_price + price_range * 0.5
+        
+        # 根据MVRV-Z和趋势确定止盈止损
+        if mvrv_z < -0.5:  # 低估区域
+            take_profit = current_price + price_range * 5  # 长期目标更远
+            stop_loss = current_price - price_range * 1.5
+        elif mvrv_z > 2:  # 高估区域
+            take_profit = current_price - price_range * 5
+            stop_loss = current_price + price_range * 1.5
+        else:  # 中性区域
+            # 根据趋势确定
+            if trend_1w_direction == TrendDirection.BULLISH:
+                take_profit = current_price + price_range * 3
+                stop_loss = current_price - price_range * 2
+            elif trend_1w_direction == TrendDirection.BEARISH:
+                take_profit = current_price - price_range * 3
+                stop_loss = current_price + price_range * 2
+            else:
+                take_profit = current_price + price_range * 2
+                stop_loss = current_price - price_range * 2
+        
+        # 确定总体趋势方向
+        overall_direction = 'neutral'
+        position_size = "10~20%"
+        
+        bullish_signals = 0
+        bearish_signals = 0
+        
+        # MVRV-Z信号（最重要的长期指标）
+        if mvrv_z < -1:
+            bullish_signals += 2  # 权重加倍
+        elif mvrv_z < 0:
+            bullish_signals += 1
+        elif mvrv_z > 3:
+            bearish_signals += 2  # 权重加倍
+        elif mvrv_z > 1:
+            bearish_signals += 1
+            
+        # NVT信号
+        if nvt < 20:
+            bullish_signals += 1
+        elif nvt > 100:
+            bearish_signals += 1
+            
+        # 周线趋势信号
+        if trend_1w_direction == TrendDirection.BULLISH and trend_1w_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
+            bullish_signals += 1
+        elif trend_1w_direction == TrendDirection.BEARISH and trend_1w_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
+            bearish_signals += 1
+            
+        # 日线趋势信号
+        if trend_1d_direction == TrendDirection.BULLISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
+            bullish_signals += 1
+        elif trend_1d_direction == TrendDirection.BEARISH and trend_1d_strength in [SignalStrength.MEDIUM, SignalStrength.STRONG]:
+            bearish_signals += 1
+            
+        # 确定最终方向
+        if bullish_signals >= 3:
+            overall_direction = 'long'
+            position_size = "30~50%"
+        elif bearish_signals >= 3:
+            overall_direction = 'short'
+            position_size = "30~50%"
+        elif bullish_signals >= 2:
+            overall_direction = 'cautious_long'
+            position_size = "20~30%"
+        elif bearish_signals >= 2:
+            overall_direction = 'cautious_short'
+            position_size = "20~30%"
+            
+        # MVRV-Z估值区间（决定状态描述、区间解读和价值建议）
+        if mvrv_z < -1:
+            mvrv_level = 'deep_undervalued'
+        elif mvrv_z < 0:
+            mvrv_level = 'undervalued'
+        elif mvrv_z > 3:
+            mvrv_level = 'deep_overvalued'
+        elif mvrv_z > 1:
+            mvrv_level = 'overvalued'
+        else:
+            mvrv_level = 'fair'
+            
+        # NVT链上活跃度（决定状态描述、区间解读和链上活动建议）
+        if nvt < 20:
+            nvt_level = 'active'
+        elif nvt > 100:
+            nvt_level = 'inactive'
+        else:
+            nvt_level = 'fair'
+        
+        # 均线位置（周线MA50缺失时按0处理）
+        ma50_1w = float(latest_1w['ma50']) if latest_1w is not None and 'ma50' in latest_1w else 0
+        ma200_1d = float(latest_1d['ma200']) if 'ma200' in latest_1d else 0
+        ma50_1d = float(latest_1d['ma50'])
+        
+        return {
+            'current_time': current_time,
+            'current_price': current_price,
+            'direction': f"long.direction.{overall_direction}",
+            'signal_count': bullish_signals + bearish_signals,
+            'entry_low': entry_low,
+            'entry_high': entry_high,
+            'take_profit': take_profit,
+            'stop_loss': stop_loss,
+            'position': position_size,
+            'mvrv_z': mvrv_z,
+            'mvrv_status': f"long.mvrv.{mvrv_level}",
+            'mvrv_interpretation': f"long.mvrv_interpretation.{mvrv_level}",
+            'value_suggestion': f"long.value.{mvrv_level}",
+            'nvt': nvt,
+            'nvt_status': f"long.nvt.{nvt_level}",
+            'nvt_interpretation': f"long.nvt_interpretation.{nvt_level}",
+            'chain_activity_suggestion': f"long.chain.{nvt_level}",
+            'trend_1w': trend_1w_direction.value,
+            'trend_1w_strength': trend_1w_strength.name,
+            'trend_1d': trend_1d_direction.value,
+            'trend_1d_strength': trend_1d_strength.name,
+            'ma50_1w': ma50_1w,
+            'ma50_1w_side': 'above' if current_price > ma50_1w else 'below',
+            'ma200_1d': ma200_1d,
+            'ma200_1d_side': 'above' if current_price > ma200_1d else 'below',
+            'ma50_1d': ma50_1d,
+            'ma50_1d_side': 'above' if current_price > ma50_1d else 'below'
+        }
+
 if __name__ == "__main__":
     # 测试分析器
     analyzer = MarketAnalyzer()
@@ -0,0 +1,222 @@
+"""
+市场数据缓存模块
+
+提供线程安全的TTL缓存（LRU淘汰），以及按K线收盘时间计算过期时间的工具函数，
+命中情况通过metrics.cache_access记录，可在/stats和Prometheus端点查看
+"""
+
+import time
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 各K线周期的秒数
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1d': 24 * 60 * 60,
+    '3d': 3 * 24 * 60 * 60,
+    '1w': 7 * 24 * 60 * 60
+}
+
+# 周K线从周一00:00(UTC)开始，1970-01-01是周四，需要偏移4天
+WEEK_OFFSET = 4 * 24 * 60 * 60
+
+# 各策略报告对应的基准K线周期（报告在该周期收盘后失效）
+STRATEGY_BASE_INTERVAL = {
+    'short': '15m',
+    'mid': '1h',
+    'long': '1d'
+}
+
+# 默认缓存配置（与config.example.json中market_data.cache一致）
+DEFAULT_CACHE_CONFIG = {
+    'enabled': True,
+    'ttl_seconds': 3600,
+    'max_items': 1000
+}
+
+
+def next_candle_close(interval: str, now: Optional[float] = None) -> float:
+    """
+    计算指定周期下一根K线的收盘时间
+
+    Args:
+        interval: K线周期，例如15m、1h、1w
+        now: 当前时间戳（秒），默认为当前时间
+
+    Returns:
+        下一次收盘的时间戳（秒）
+    """
+    now = time.time() if now is None else now
+    step = INTERVAL_SECONDS.get(interval, INTERVAL_SECONDS['1h'])
+    offset = WEEK_OFFSET if interval == '1w' else 0
+    return ((now - offset) // step + 1) * step + offset
+
+
+class TTLCache:
+    """
+    线程安全的TTL缓存
+
+    每个条目有独立的过期时间，超过max_items时淘汰最久未使用的条目
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 3600, max_items: int = 1000, enabled: bool = True,
+                 align_ttl: bool = False):
+        """
+        初始化缓存
+
+        Args:
+            name: 缓存名称，用于统计命中率
+            ttl_seconds: 默认有效期（秒），也是单个条目有效期的上限
+            max_items: 最大条目数
+            enabled: 是否启用，未启用时get总是未命中且set不保存
+            align_ttl: 有效期上限是否对齐到ttl_seconds的整数倍时间点（与按收盘时间调度的刷新任务保持一致）
+        """
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.enabled = enabled
+        self.align_ttl = align_ttl
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    @classmethod
+    def from_config(cls, name: str, config: Optional[Dict[str, Any]] = None, align_ttl: bool = False) -> 'TTLCache':
+        """
+        根据配置创建缓存
+
+        Args:
+            name: 缓存名称
+            config: 缓存配置，支持enabled、ttl_seconds和max_items
+            align_ttl: 有效期上限是否对齐到整数倍时间点
+
+        Returns:
+            缓存实例
+        """
+        settings = dict(DEFAULT_CACHE_CONFIG)
+        settings.update(config or {})
+        return cls(name, ttl_seconds=settings['ttl_seconds'], max_items=settings['max_items'],
+                   enabled=settings['enabled'], align_ttl=align_ttl)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        获取缓存值
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            未过期的缓存值，不存在或已过期时返回None
+        """
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[0] > now:
+                self._items.move_to_end(key)
+                value = item[1]
+            else:
+                if item is not None:
+                    del self._items[key]
+                value = None
+        metrics.cache_access(self.name, hit=value is not None)
+        return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        保存缓存值
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            expires_at: 过期时间戳（秒），不晚于有效期上限
+        """
+        if not self.enabled:
+            return
+        now = time.time()
+        if self.align_ttl:
+            limit = (now // self.ttl_seconds + 1) * self.ttl_seconds
+        else:
+            limit = now + self.ttl_seconds
+        expires_at = limit if expires_at is None else min(expires_at, limit)
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        """
+        获取条目的过期时间
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            过期时间戳，不存在时返回None
+        """
+        with self._lock:
+            item = self._items.get(key)
+            return item[0] if item is not None else None
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """
+        删除缓存条目
+
+        Args:
+            key: 缓存键，为None时清空整个缓存
+        """
+        with self._lock:
+            if key is None:
+                self._items.clear()
+            else:
+                self._items.pop(key, None)
+
+    def snapshot(self) -> List[Tuple[Hashable, float, Any]]:
+        """
+        导出未过期的条目（用于重启时保存到磁盘）
+
+        Returns:
+            (键, 过期时间戳, 值)列表，按最久未使用到最近使用排列
+        """
+        now = time.time()
+        with self._lock:
+            return [(key, item[0], item[1]) for key, item in self._items.items() if item[0] > now]
+
+    def restore(self, items: List[Tuple[Hashable, float, Any]]) -> int:
+        """
+        导入snapshot()导出的条目，跳过已过期的条目，过期时间保持不变
+
+        Args:
+            items: (键, 过期时间戳, 值)列表
+
+        Returns:
+            导入的条目数
+        """
+        if not self.enabled:
+            return 0
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for key, expires_at, value in items:
+                if expires_at <= now or key in self._items:
+                    continue
+                self._items[key] = (expires_at, value)
+                restored += 1
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+        return restored
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
@@ -1,11 +1,14 @@
 from binance.client import Client
+from binance.exceptions import BinanceAPIException
+import numpy as np
 import pandas as pd
-import ta
-from datetime import datetime
 import logging
 import time
-from requests.exceptions import RequestException
-import os
+from metrics import metrics
+from indicators import IndicatorPipeline, dummy_volume_profile
+from symbol_index import SymbolIndex
+from fast_json import loads
+from http_session import mount_shared_pool
 
 # 尝试导入CMC数据源
 try:
@@ -18,12 +21,112 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Binance K线字段
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_volume', 'trades', 'taker_buy_base',
+    'taker_buy_quote', 'ignore'
+]
+
+# 分析使用的K线字段，其余字段在解析时丢弃
+KLINE_FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# 默认K线解析配置（与config.example.json中market_data.klines一致）
+DEFAULT_KLINE_CONFIG = {
+    # 成交量的数据类型，float32使每根K线再少占4字节（约7位有效数字）
+    'volume_dtype': 'float64',
+    # 是否直接解码K线接口的响应体（安装了orjson时使用orjson），关闭时使用python-binance的response.json()
+    'fast_decode': True
+}
+
+
+def parse_klines(klines, volume_dtype='float64'):
+    """
+    把Binance格式的K线列表直接解析为类型化的列
+
+    逐列从原始行中读取并转换为NumPy数组，不经过12列的object DataFrame，
+    close_time、quote_volume、trades、taker_buy_*和ignore不保留
+
+    Args:
+        klines: REST接口或行情流返回的K线列表（价格和成交量为字符串）
+        volume_dtype: 成交量的数据类型，float64或float32
+
+    Returns:
+        DataFrame，timestamp为由int64毫秒时间戳换算的datetime64，open、high、low、close为float64
+    """
+    count = len(klines)
+    timestamps = np.fromiter((row[0] for row in klines), dtype=np.int64, count=count)
+    columns = {'timestamp': timestamps.astype('datetime64[ms]').astype('datetime64[ns]')}
+    for index, name in enumerate(KLINE_FIELDS[1:], start=1):
+        dtype = volume_dtype if name == 'volume' else np.float64
+        columns[name] = np.fromiter((row[index] for row in klines), dtype=dtype, count=count)
+    return pd.DataFrame(columns)
+
+
+def parse_kline_payload(payload, volume_dtype='float64'):
+    """
+    解码K线接口的原始响应体并解析为类型化的DataFrame
+
+    Args:
+        payload: 响应体（JSON字节串）
+        volume_dtype: 成交量的数据类型
+
+    Returns:
+        与parse_klines相同的DataFrame
+    """
+    return parse_klines(loads(payload), volume_dtype)
+
+
+# get_klines_payload使用的python-binance内部接口（requirements.txt中固定了python-binance的版本）
+_RAW_KLINES_ATTRIBUTES = ('_create_api_uri', 'REQUEST_TIMEOUT', 'PUBLIC_API_VERSION')
+
+
+class BinanceClient(Client):
+    """在python-binance客户端的基础上增加返回原始响应体的K线接口，请求通过共享连接池发出"""
+
+    # 当前安装的python-binance是否提供get_klines_payload需要的内部接口
+    RAW_KLINES_SUPPORTED = all(hasattr(Client, name) for name in _RAW_KLINES_ATTRIBUTES)
+
+    def _init_session(self):
+        """python-binance的会话（带API key请求头）挂载共享会话的连接池"""
+        return mount_shared_pool(super()._init_session())
+
+    def get_klines_payload(self, **params):
+        """
+        获取K线接口的原始响应体（不经过response.json()）
+
+        Args:
+            **params: 与get_klines相同的参数（symbol、interval、limit等）
+
+        Returns:
+            响应体字节串；python-binance缺少需要的内部接口时返回None，调用方改用get_klines
+        """
+        if not self.RAW_KLINES_SUPPORTED:
+            return None
+        kwargs = {'timeout': self.REQUEST_TIMEOUT}
+        kwargs.update(getattr(self, '_requests_params', None) or {})
+        response = self.session.get(self._create_api_uri('klines', False, self.PUBLIC_API_VERSION),
+                                    params=params, **kwargs)
+        if not (200 <= response.status_code < 300):
+            raise BinanceAPIException(response, response.status_code, response.text)
+        return response.content
+
+
 class MarketData:
-    def __init__(self, symbol='BTCUSDT'):
-        """初始化市场数据类"""
+    def __init__(self, symbol='BTCUSDT', client=None, cmc_data=None, cache_config=None, cmc_quote_config=None,
+                 kline_config=None, symbol_index_config=None):
+        """初始化市场数据类
+
+        client和cmc_data可由外部注入（例如基准测试中的离线模拟客户端），
+        未提供时分别创建Binance客户端和CMC数据源；
+        cache_config为K线缓存配置（见config.example.json中的market_data.cache），
+        cmc_quote_config为CMC报价批量请求配置（market_data.cmc_quotes），
+        kline_config为K线解析配置（market_data.klines），
+        symbol_index_config为交易对索引配置（market_data.symbol_index）
+        """
         try:
             logger.info("正在初始化Binance客户端...")
-            self.client = Client()
+            self.client = client if client is not None else BinanceClient()
             self.symbol = symbol
             self.timeframes = {
                 '15m': '15m',    # 15分钟
@@ -34,11 +137,24 @@ class MarketData:
                 '1w': '1w'       # 1周
             }
             
+            # 技术指标流水线（与CMC数据源共用），已计算指标的K线缓存在对应周期收盘时失效
+            self.indicators = IndicatorPipeline(cache_config)
+            self.kline_cache = self.indicators.cache
+            
+            # K线解析配置
+            kline_settings = dict(DEFAULT_KLINE_CONFIG)
+            kline_settings.update(kline_config or {})
+            self.volume_dtype = kline_settings['volume_dtype']
+            self.fast_decode = kline_settings['fast_decode']
+            
+            # 行情流（MarketStream.start()时设置），关注的币种优先读取流中的K线、价格和资金费率
+            self.stream = None
+            
             # 初始化CMC数据源（如果可用）
-            self.cmc_data = None
-            if HAS_CMC:
+            self.cmc_data = cmc_data
+            if self.cmc_data is None and HAS_CMC:
                 try:
-                    self.cmc_data = CMCData()
+                    self.cmc_data = CMCData(quote_config=cmc_quote_config, indicators=self.indicators)
                     logger.info("已初始化CMC数据源作为备用")
                 except Exception as e:
                     logger.warning(f"初始化CMC数据源失败: {str(e)}")
@@ -51,6 +167,9 @@ class MarketData:
             except Exception as e:
                 logger.error(f"Binance API连接失败: {str(e)}")
                 raise
+            
+            # 交易对索引（一次exchangeInfo请求，定期刷新），未上架的交易对不再请求Binance
+            self.symbols = SymbolIndex(self.client, symbol_index_config)
                 
         except Exception as e:
             logger.error(f"初始化市场数据类失败: {str(e)}")
@@ -61,37 +180,25 @@ class MarketData:
         try:
             logger.info(f"开始获取{symbol}的{interval}周期历史数据...")
             
-            # 设置重试次数和等待时间
-            max_retries = 3
+            # 设置重试次数和等待时间（未在Binance现货上架的交易对不请求，直接使用CMC数据源）
+            max_retries = 3 if self.symbols.has_spot(symbol) else 0
+            if not max_retries:
+                logger.warning(f"{symbol}未在Binance现货上架，跳过Binance K线接口")
             retry_count = 0
             wait_time = 1  # 初始等待时间（秒）
             
             while retry_count < max_retries:
                 try:
-                    # 测试API连接
-                    self.client.ping()
-                    
-                    # 获取K线数据
-                    klines = self.client.get_klines(
-                        symbol=symbol,
-                        interval=interval,
-                        limit=limit
-                    )
+                    # 获取K线数据并转换为DataFrame（连接已在初始化时测试，请求失败时按下面的方式重试）
+                    df = self._fetch_klines(symbol, interval, limit)
                     
-                    if not klines:
+                    if df.empty:
                         logger.warning(f"获取{symbol}的{interval}周期数据为空，重试中...")
                         retry_count += 1
                         time.sleep(wait_time)
                         wait_time *= 2  # 指数退避
                         continue
                         
-                    # 转换为DataFrame
-                    df = pd.DataFrame(klines, columns=[
-                        'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                        'close_time', 'quote_volume', 'trades', 'taker_buy_base',
-                        'taker_buy_quote', 'ignore'
-                    ])
-                    
                     # 验证数据完整性
                     if len(df) < limit * 0.8:  # 如果获取的数据少于预期的80%
                         logger.warning(f"获取{symbol}的{interval}周期数据不完整，重试中...")
@@ -100,11 +207,6 @@ class MarketData:
                         wait_time *= 2
                         continue
                         
-                    # 转换数据类型
-                    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                    for col in ['open', 'high', 'low', 'close', 'volume']:
-                        df[col] = df[col].astype(float)
-                        
                     # 验证数据有效性
                     if df['close'].isnull().any() or df['volume'].isnull().any():
                         logger.warning(f"获取{symbol}的{interval}周期数据包含无效值，重试中...")
@@ -148,119 +250,66 @@ class MarketData:
                     logger.error(f"从CMC获取{symbol}的{interval}周期数据也失败: {str(cmc_error)}")
                     
             return None
-            
-    def calculate_indicators(self, df):
-        """计算技术指标"""
+
+    def _fetch_klines(self, symbol, interval, limit):
+        """请求K线接口（启用fast_decode且客户端支持时直接解码原始响应体）"""
+        params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+        if self.fast_decode and hasattr(self.client, 'get_klines_payload'):
+            payload = self.client.get_klines_payload(**params)
+            if payload is not None:
+                return parse_kline_payload(payload, self.volume_dtype)
+        return self.klines_to_frame(self.client.get_klines(**params), self.volume_dtype)
+
+    @staticmethod
+    def klines_to_frame(klines, volume_dtype='float64'):
+        """把Binance格式的K线列表转换为只包含时间戳和OHLCV的类型化DataFrame（见parse_klines）"""
+        return parse_klines(klines, volume_dtype)
+
+    def get_latest_prices(self, symbols):
+        """批量获取最新成交价（多个交易对时只请求一次全部行情）"""
         try:
-            # 短期指标
-            # RSI
-            df['rsi'] = ta.momentum.RSIIndicator(df['close']).rsi()
-            
-            # MACD
-            macd = ta.trend.MACD(df['close'])
-            df['macd'] = macd.macd()  # DIF
-            df['macd_signal'] = macd.macd_signal()  # DEA
-            df['macd_diff'] = macd.macd_diff()  # MACD柱
-            
-            # EMA
-            df['ema5'] = ta.trend.EMAIndicator(df['close'], window=5).ema_indicator()
-            df['ema13'] = ta.trend.EMAIndicator(df['close'], window=13).ema_indicator()
-            
-            # 布林带
-            try:
-                bollinger = ta.volatility.BollingerBands(df['close'])
-                df['bb_upper'] = bollinger.bollinger_hband()
-                df['bb_middle'] = bollinger.bollinger_mavg()
-                df['bb_lower'] = bollinger.bollinger_lband()
-            except Exception as e:
-                logger.warning(f"计算布林带指标时出错: {e}，使用SMA代替")
-                df['bb_middle'] = ta.trend.SMAIndicator(df['close'], window=20).sma_indicator()
-                df['bb_upper'] = df['bb_middle'] + df['close'].std() * 2
-                df['bb_lower'] = df['bb_middle'] - df['close'].std() * 2
-            
-            # 计算成交量变化
-            df['volume_ma5'] = df['volume'].rolling(window=5).mean()
-            df['volume_ma20'] = df['volume'].rolling(window=20).mean()
-            
-            # 中期指标
-            # MA20和MA50
-            df['ma20'] = ta.trend.SMAIndicator(df['close'], window=20).sma_indicator()
-            df['ma50'] = ta.trend.SMAIndicator(df['close'], window=50).sma_indicator()
-            
-            # OBV
-            df['obv'] = ta.volume.OnBalanceVolumeIndicator(df['close'], df['volume']).on_balance_volume()
-            df['obv_ma20'] = df['obv'].rolling(window=20).mean()
-            
-            # 箱体结构
-            df['box_high'] = df['high'].rolling(window=20).max()
-            df['box_low'] = df['low'].rolling(window=20).min()
-            
-            return df
-            
+            prices = {}
+            if self.stream is not None:
+                for symbol in symbols:
+                    price = self.stream.latest_price(symbol)
+                    if price is not None:
+                        prices[symbol] = price
+                symbols = [symbol for symbol in symbols if symbol not in prices]
+            if not symbols:
+                return prices
+            if len(symbols) == 1:
+                tickers = [self.client.get_symbol_ticker(symbol=symbols[0])]
+            else:
+                tickers = self.client.get_symbol_ticker()
+            wanted = set(symbols)
+            prices.update({item['symbol']: float(item['price']) for item in tickers if item['symbol'] in wanted})
+            return prices
         except Exception as e:
-            logger.error(f"计算技术指标失败: {str(e)}")
-            return df
+            logger.error(f"获取最新价格时发生错误: {str(e)}")
+            return {}
+
+    @staticmethod
+    def calculate_indicators(df):
+        """计算技术指标（静态方法，委托给IndicatorPipeline，回测模块复用同一套指标）"""
+        return IndicatorPipeline.calculate(df)
             
     def calculate_volume_profile(self, df):
-        """计算筹码分布"""
-        try:
-            # 确保数据不为空
-            if df is None or df.empty:
-                logger.error("数据为空，无法计算筹码分布")
-                return self._get_dummy_volume_profile()
-                
-            # 获取价格范围
-            prices = df['close'].values  # 直接使用DataFrame的close列
-            if len(prices) == 0:
-                logger.error("价格数据为空")
-                return self._get_dummy_volume_profile()
-                
-            min_price = min(prices)
-            max_price = max(prices)
-            
-            # 如果最小价格等于最大价格，无法计算区间
-            if min_price == max_price:
-                logger.warning("价格范围为零，无法划分区间")
-                return self._get_dummy_volume_profile(min_price)
-            
-            # 将价格范围分成10个区间
-            price_range = max_price - min_price
-            interval = price_range / 10
-            
-            # 初始化每个价格区间的成交量
-            volume_profile = {}
-            for i in range(10):
-                lower_bound = min_price + (i * interval)
-                upper_bound = lower_bound + interval
-                price_range = f"{lower_bound:.6f}-{upper_bound:.6f}"  # 使用6位小数
-                volume_profile[price_range] = 0
-            
-            # 计算每个价格区间的成交量
-            for _, row in df.iterrows():
-                close_price = float(row['close'])
-                volume = float(row['volume'])
-                
-                # 找到对应的价格区间
-                for price_range in volume_profile:
-                    lower, upper = map(float, price_range.split('-'))
-                    if lower <= close_price < upper:
-                        volume_profile[price_range] += volume
-                        break
-            
-            return volume_profile
-        except Exception as e:
-            logger.error(f"计算筹码分布失败: {str(e)}")
-            return self._get_dummy_volume_profile()
+        """计算筹码分布（委托给IndicatorPipeline）"""
+        return IndicatorPipeline.volume_profile(df)
             
     def get_futures_data(self, symbol):
         """获取合约数据"""
         try:
             logger.info(f"开始获取{symbol}的合约数据...")
             
-            # 检查是否支持所需方法
-            if not (hasattr(self.client, 'futures_open_interest') and 
-                    hasattr(self.client, 'futures_funding_rate')):
-                logger.warning(f"Binance客户端不支持所需的futures API方法")
+            # 检查是否支持所需方法，以及交易对是否有永续合约
+            has_futures_api = (hasattr(self.client, 'futures_open_interest') and 
+                               hasattr(self.client, 'futures_funding_rate'))
+            if not has_futures_api or not self.symbols.has_futures(symbol):
+                if has_futures_api:
+                    logger.info(f"{symbol}没有永续合约，跳过Binance合约接口")
+                else:
+                    logger.warning(f"Binance客户端不支持所需的futures API方法")
                 
                 # 尝试从CMC获取数据
                 if self.cmc_data:
@@ -292,8 +341,12 @@ class MarketData:
                         time.sleep(1)
                         continue
                         
-                    # 获取资金费率
-                    funding_rate = self.client.futures_funding_rate(symbol=symbol)
+                    # 获取资金费率（关注的币种使用行情流推送的资金费率）
+                    streamed = self.stream.funding_rate(symbol) if self.stream is not None else None
+                    if streamed is not None:
+                        funding_rate = [{'fundingRate': streamed}]
+                    else:
+                        funding_rate = self.client.futures_funding_rate(symbol=symbol)
                     if not funding_rate:
                         logger.warning(f"获取{symbol}的资金费率失败，重试中...")
                         retry_count += 1
@@ -654,11 +707,24 @@ class MarketData:
             data = {}
             for tf in valid_timeframes:
                 try:
+                    streamed = self.stream.get_klines(symbol, tf) if self.stream is not None else None
+                    if streamed is not None:
+                        data[tf] = streamed
+                        logger.info(f"使用行情流中{symbol}的{tf}周期数据")
+                        continue
+                    
+                    cached = self.indicators.cached(symbol, tf)
+                    if cached is not None:
+                        data[tf] = cached
+                        logger.info(f"使用缓存的{symbol}的{tf}周期数据")
+                        continue
+                    
                     logger.info(f"正在获取{symbol}的{tf}周期数据...")
-                    klines = self.get_historical_data(symbol, tf)
+                    with metrics.span(f"fetch.{tf}"):
+                        klines = self.get_historical_data(symbol, tf)
                     if klines is not None and not klines.empty:
                         # 计算技术指标
-                        klines = self.calculate_indicators(klines)
+                        klines = self.indicators.process(symbol, tf, klines)
                         data[tf] = klines
                         logger.info(f"成功获取{symbol}的{tf}周期数据")
                     else:
@@ -721,7 +787,8 @@ class MarketData:
             # 获取合约数据
             try:
                 logger.info(f"正在获取{trading_symbol}的合约数据...")
-                futures_data = self.get_futures_data(trading_symbol)
+                with metrics.span('fetch.futures'):
+                    futures_data = self.get_futures_data(trading_symbol)
                 if futures_data:
                     logger.info(f"成功获取{trading_symbol}的合约数据")
                 else:
@@ -751,7 +818,8 @@ class MarketData:
             # 获取链上数据
             try:
                 logger.info(f"正在获取{symbol}的链上数据...")
-                onchain_data = self.get_onchain_data(trading_symbol)
+                with metrics.span('fetch.onchain'):
+                    onchain_data = self.get_onchain_data(trading_symbol)
                 if onchain_data:
                     logger.info(f"成功获取{symbol}的链上数据")
                 else:
@@ -763,7 +831,8 @@ class MarketData:
             # 获取项目信息
             try:
                 logger.info(f"正在获取{symbol}的项目信息...")
-                project_info = self.get_project_info(trading_symbol)
+                with metrics.span('fetch.project'):
+                    project_info = self.get_project_info(trading_symbol)
                 if project_info:
                     logger.info(f"成功获取{symbol}的项目信息")
                 else:
@@ -791,17 +860,7 @@ class MarketData:
 
     def _get_dummy_volume_profile(self, base_price=50000.0):
         """生成模拟的筹码分布数据"""
-        volume_profile = {}
-        interval = 1000.0
-        for i in range(10):
-            lower_bound = base_price - (5 * interval) + (i * interval)
-            upper_bound = lower_bound + interval
-            price_range = f"{lower_bound:.6f}-{upper_bound:.6f}"
-            # 生成一个以当前价格为中心的正态分布
-            dist_from_center = abs(i - 5)
-            volume = 1000.0 * (10 - dist_from_center) / 10.0
-            volume_profile[price_range] = volume
-        return volume_profile
+        return dummy_volume_profile(base_price)
 
 if __name__ == "__main__":
     # 测试数据获取
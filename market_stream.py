@@ -0,0 +1,527 @@
+"""
+行情流接入模块
+
+通过WebSocket订阅关注币种的K线和标记价格推送，在内存中维护各(交易对, 周期)最近的K线，
+MarketData在生成报告时直接读取内存中的K线，不再发起REST请求。
+只在连接建立（包括断线重连）和发现K线缺口时用REST补齐一次数据，REST请求量固定。
+
+数据源通过StreamSource抽象：BinanceStreamSource连接Binance组合流，
+ReplayStreamSource从JSONL文件回放录制的消息，用于离线测试和复现问题
+"""
+
+import time
+import random
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from threading import Lock, Thread
+from typing import Dict, Any, List, Optional, Callable
+
+from metrics import metrics
+from fast_json import loads
+from market_cache import INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 默认行情流配置（与config.example.json中market_data.stream一致）
+DEFAULT_STREAM_CONFIG = {
+    'enabled': False,
+    'symbols': [],
+    'intervals': ['15m', '1h', '4h', '1d'],
+    'buffer_size': 100,
+    'mark_price': True,
+    'stale_seconds': 120,
+    'reseed_seconds': 60,
+    'spot_url': 'wss://stream.binance.com:9443/stream',
+    'futures_url': 'wss://fstream.binance.com/stream',
+    'reconnect_delay': 1.0,
+    'max_reconnect_delay': 60.0,
+    'record_file': None,
+    'replay_file': None,
+    'replay_speed': 0.0
+}
+
+
+def trading_symbol(symbol: str) -> str:
+    """把BTC、btcusdt等写法统一为BTCUSDT"""
+    symbol = symbol.upper()
+    return symbol if symbol.endswith('USDT') else f"{symbol}USDT"
+
+
+def kline_stream(symbol: str, interval: str) -> str:
+    """K线流名称，例如btcusdt@kline_15m"""
+    return f"{trading_symbol(symbol).lower()}@kline_{interval}"
+
+
+def mark_price_stream(symbol: str) -> str:
+    """标记价格流名称（每秒推送，包含资金费率）"""
+    return f"{trading_symbol(symbol).lower()}@markPrice@1s"
+
+
+def kline_message(symbol: str, interval: str, row: list, closed: bool = True) -> Dict[str, Any]:
+    """
+    把REST格式的K线转换为组合流的K线消息（用于生成回放文件）
+
+    Args:
+        symbol: 交易对
+        interval: K线周期
+        row: Client.get_klines格式的一行K线
+        closed: K线是否已收盘
+
+    Returns:
+        与Binance组合流格式相同的消息
+    """
+    return {
+        'stream': kline_stream(symbol, interval),
+        'data': {
+            'e': 'kline',
+            'E': int(row[6]) if closed else int(row[0]),
+            's': trading_symbol(symbol),
+            'k': {
+                't': int(row[0]), 'T': int(row[6]), 's': trading_symbol(symbol), 'i': interval,
+                'o': row[1], 'h': row[2], 'l': row[3], 'c': row[4], 'v': row[5],
+                'n': row[8], 'x': closed, 'q': row[7], 'V': row[9], 'Q': row[10]
+            }
+        }
+    }
+
+
+def parse_message(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    解析组合流消息
+
+    Args:
+        message: {'stream': ..., 'data': ...}格式的消息
+
+    Returns:
+        kline事件{type, symbol, interval, row, closed, event_time}或
+        mark_price事件{type, symbol, mark_price, funding_rate, event_time}，无法识别时返回None
+    """
+    data = message.get('data', message)
+    event = data.get('e')
+    if event == 'kline':
+        k = data['k']
+        row = [int(k['t']), k['o'], k['h'], k['l'], k['c'], k['v'], int(k['T']), k['q'], k['n'], k['V'], k['Q'], '0']
+        return {'type': 'kline', 'symbol': data['s'], 'interval': k['i'], 'row': row,
+                'closed': bool(k['x']), 'event_time': data.get('E')}
+    if event == 'markPriceUpdate':
+        return {'type': 'mark_price', 'symbol': data['s'], 'mark_price': float(data['p']),
+                'funding_rate': float(data['r']) if data.get('r') not in (None, '') else None,
+                'event_time': data.get('E')}
+    return None
+
+
+class StreamSource(ABC):
+    """
+    行情流数据源
+
+    run()在调用线程中阻塞运行，每次建立连接时调用on_connect(streams)，
+    收到消息时调用on_message(message)，stop()可从其他线程调用
+    """
+
+    @abstractmethod
+    def run(self, streams: List[str], on_message: Callable[[Dict[str, Any]], None],
+            on_connect: Callable[[List[str]], None]) -> None:
+        """
+        订阅并处理消息，直到stop()被调用
+
+        Args:
+            streams: 流名称列表
+            on_message: 消息回调
+            on_connect: 连接建立回调，参数为该连接订阅的流
+        """
+
+    @abstractmethod
+    def stop(self) -> None:
+        """停止接收消息"""
+
+
+class BinanceStreamSource(StreamSource):
+    """
+    Binance组合流数据源
+
+    K线流连接现货地址，标记价格流连接合约地址，断线后按指数退避加随机抖动重连，
+    可选把收到的原始消息追加写入record_file，供ReplayStreamSource回放
+    """
+
+    def __init__(self, spot_url: str = DEFAULT_STREAM_CONFIG['spot_url'],
+                 futures_url: str = DEFAULT_STREAM_CONFIG['futures_url'],
+                 reconnect_delay: float = 1.0, max_reconnect_delay: float = 60.0,
+                 record_file: Optional[str] = None):
+        """
+        初始化Binance数据源
+
+        Args:
+            spot_url: 现货组合流地址
+            futures_url: 合约组合流地址
+            reconnect_delay: 首次重连等待时间（秒）
+            max_reconnect_delay: 重连等待时间上限（秒）
+            record_file: 录制文件路径（JSONL）
+        """
+        self.spot_url = spot_url
+        self.futures_url = futures_url
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.record_file = record_file
+        self._loop = None
+        self._sockets = set()
+        self._stopped = False
+
+    def run(self, streams, on_message, on_connect) -> None:
+        self._stopped = False
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run_all(streams, on_message, on_connect))
+        finally:
+            self._loop.close()
+            self._loop = None
+
+    async def _run_all(self, streams, on_message, on_connect) -> None:
+        groups = [
+            (self.spot_url, [name for name in streams if '@markPrice' not in name]),
+            (self.futures_url, [name for name in streams if '@markPrice' in name])
+        ]
+        await asyncio.gather(*[self._connection(url, names, on_message, on_connect)
+                               for url, names in groups if names])
+
+    async def _connection(self, url: str, streams: List[str], on_message, on_connect) -> None:
+        """维持一个组合流连接，断线后重连"""
+        import websockets
+
+        record = open(self.record_file, 'a', encoding='utf-8') if self.record_file else None
+        delay = self.reconnect_delay
+        try:
+            while not self._stopped:
+                try:
+                    async with websockets.connect(f"{url}?streams={'/'.join(streams)}", ping_interval=20) as ws:
+                        self._sockets.add(ws)
+                        try:
+                            logger.info(f"已连接行情流 {url}，订阅{len(streams)}个流")
+                            delay = self.reconnect_delay
+                            on_connect(streams)
+                            async for raw in ws:
+                                if record:
+                                    record.write(raw if raw.endswith('\n') else f"{raw}\n")
+                                on_message(loads(raw))
+                        finally:
+                            self._sockets.discard(ws)
+                    if self._stopped:
+                        break
+                    raise ConnectionError("服务端关闭了连接")
+                except Exception as e:
+                    if self._stopped:
+                        break
+                    logger.warning(f"行情流 {url} 连接断开: {str(e)}，{delay:.1f}秒后重连")
+                    metrics.inc('stream_reconnects_total')
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+                    delay = min(delay * 2, self.max_reconnect_delay)
+        finally:
+            if record:
+                record.close()
+
+    def stop(self) -> None:
+        self._stopped = True
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            for ws in list(self._sockets):
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+
+
+class ReplayStreamSource(StreamSource):
+    """
+    回放数据源
+
+    按顺序回放JSONL文件中录制的组合流消息（BinanceStreamSource的record_file或kline_message生成），
+    只回放订阅的流；speed大于0时按消息时间间隔除以speed等待，0表示不等待
+    """
+
+    def __init__(self, path: str, speed: float = 0.0):
+        """
+        初始化回放数据源
+
+        Args:
+            path: 录制文件路径
+            speed: 回放倍速，0表示尽快回放
+        """
+        self.path = path
+        self.speed = speed
+        self._stopped = False
+
+    def run(self, streams, on_message, on_connect) -> None:
+        self._stopped = False
+        wanted = set(streams)
+        on_connect(list(streams))
+        last_event_time = None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if self._stopped:
+                    break
+                if not line.strip():
+                    continue
+                message = loads(line)
+                if message.get('stream') not in wanted:
+                    continue
+                event_time = message.get('data', {}).get('E')
+                if self.speed > 0 and event_time and last_event_time:
+                    time.sleep(max(0.0, (event_time - last_event_time) / 1000 / self.speed))
+                last_event_time = event_time or last_event_time
+                on_message(message)
+        logger.info(f"行情回放完成: {self.path}")
+
+    def stop(self) -> None:
+        self._stopped = True
+
+
+class KlineBuffer:
+    """
+    单个(交易对, 周期)的K线缓冲区
+
+    保存最近size根K线（REST格式），未收盘的K线随推送原地更新；
+    带指标的DataFrame在读取时按需计算，数据变化前重复读取直接返回上次的结果
+    """
+
+    def __init__(self, interval: str, size: int):
+        self.interval = interval
+        self.size = size
+        self.step_ms = INTERVAL_SECONDS.get(interval, 3600) * 1000
+        self.rows = []
+        self.ready = False
+        self.updated_at = 0.0
+        self.seeded_at = 0.0
+        self._frame = None
+        self._lock = Lock()
+
+    def seed(self, rows: List[list]) -> None:
+        """用REST获取的K线重置缓冲区"""
+        with self._lock:
+            self.rows = [list(row) for row in rows[-self.size:]]
+            self.ready = bool(self.rows)
+            self.updated_at = self.seeded_at = time.time()
+            self._frame = None
+
+    def update(self, row: list) -> bool:
+        """
+        用推送的K线更新缓冲区
+
+        Args:
+            row: REST格式的K线
+
+        Returns:
+            是否连续（False表示中间缺少K线，需要重新用REST补齐）
+        """
+        with self._lock:
+            self.updated_at = time.time()
+            if not self.ready:
+                return False
+            last_open = self.rows[-1][0]
+            if row[0] == last_open:
+                self.rows[-1] = row
+            elif row[0] == last_open + self.step_ms:
+                self.rows.append(row)
+                if len(self.rows) > self.size:
+                    del self.rows[0]
+            elif row[0] < last_open:
+                return True
+            else:
+                self.ready = False
+                return False
+            self._frame = None
+            return True
+
+    def frame(self, market_data):
+        """获取带指标的DataFrame（计算结果缓存到下一次更新）"""
+        with self._lock:
+            if self._frame is None and self.rows:
+                self._frame = market_data.calculate_indicators(
+                    market_data.klines_to_frame(self.rows, market_data.volume_dtype))
+            return self._frame
+
+
+class MarketStream:
+    """
+    行情流管理器
+
+    在后台线程中运行StreamSource，维护关注币种的K线缓冲区和标记价格，
+    启动后MarketData.get_multi_timeframe_data、get_latest_prices和get_futures_data优先读取这里的数据
+    """
+
+    def __init__(self, market_data, source: Optional[StreamSource] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        """
+        初始化行情流管理器
+
+        Args:
+            market_data: MarketData实例（用于REST补齐数据和计算指标）
+            source: 数据源，默认按配置创建（replay_file不为空时回放文件）
+            config: 行情流配置（见config.example.json中的market_data.stream）
+        """
+        self.market_data = market_data
+        self.config = dict(DEFAULT_STREAM_CONFIG)
+        self.config.update(config or {})
+        self.source = source or self._create_source()
+        self.symbols = [trading_symbol(symbol) for symbol in self.config['symbols']]
+        self.buffers = {(symbol, interval): KlineBuffer(interval, self.config['buffer_size'])
+                        for symbol in self.symbols for interval in self.config['intervals']}
+        self.marks = {}
+        self.listeners = []
+        self.thread = None
+        self._lock = Lock()
+
+    def _create_source(self) -> StreamSource:
+        """按配置创建数据源"""
+        if self.config['replay_file']:
+            return ReplayStreamSource(self.config['replay_file'], self.config['replay_speed'])
+        return BinanceStreamSource(self.config['spot_url'], self.config['futures_url'],
+                                   self.config['reconnect_delay'], self.config['max_reconnect_delay'],
+                                   self.config['record_file'])
+
+    def streams(self) -> List[str]:
+        """订阅的流名称"""
+        names = [kline_stream(symbol, interval) for symbol, interval in self.buffers]
+        if self.config['mark_price']:
+            names.extend(mark_price_stream(symbol) for symbol in self.symbols)
+        return names
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        添加事件监听器（在行情流线程中调用，K线事件到达时缓冲区已更新）
+
+        Args:
+            listener: listener(event)，event为parse_message返回的事件
+        """
+        self.listeners.append(listener)
+
+    def covers(self, symbol: str, interval: Optional[str] = None) -> bool:
+        """是否关注该交易对（及周期）"""
+        symbol = trading_symbol(symbol)
+        if interval is None:
+            return symbol in self.symbols
+        return (symbol, interval) in self.buffers
+
+    def _fresh(self, updated_at: float) -> bool:
+        return time.time() - updated_at <= self.config['stale_seconds']
+
+    def seed(self, symbol: str, interval: str) -> bool:
+        """
+        用REST补齐一个缓冲区
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+
+        Returns:
+            是否成功
+        """
+        buffer = self.buffers[(symbol, interval)]
+        try:
+            with metrics.span('stream.seed'):
+                rows = self.market_data.client.get_klines(symbol=symbol, interval=interval,
+                                                          limit=self.config['buffer_size'])
+            buffer.seed(rows)
+            metrics.inc('stream_seeds_total')
+            return buffer.ready
+        except Exception as e:
+            logger.error(f"补齐{symbol}的{interval}周期K线时出错: {str(e)}")
+            return False
+
+    def _on_connect(self, streams: List[str]) -> None:
+        """连接建立后补齐K线（断线期间可能漏掉推送）"""
+        for symbol, interval in self.buffers:
+            if kline_stream(symbol, interval) in streams:
+                self.seed(symbol, interval)
+        logger.info(f"行情流已连接，已补齐{len([name for name in streams if '@kline_' in name])}个K线缓冲区")
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        """处理一条推送消息"""
+        try:
+            event = parse_message(message)
+            if event is None:
+                return
+            metrics.inc('stream_messages_total', type=event['type'])
+            if event['type'] == 'kline':
+                buffer = self.buffers.get((event['symbol'], event['interval']))
+                if buffer is None:
+                    return
+                if not buffer.update(event['row']):
+                    # 同一缓冲区每reseed_seconds秒最多补齐一次，期间MarketData回退到REST和缓存
+                    if time.time() - buffer.seeded_at < self.config['reseed_seconds']:
+                        return
+                    logger.warning(f"{event['symbol']}的{event['interval']}周期K线不连续，使用REST补齐")
+                    if not self.seed(event['symbol'], event['interval']) or not buffer.update(event['row']):
+                        return
+            elif event['type'] == 'mark_price':
+                with self._lock:
+                    self.marks[event['symbol']] = dict(event, updated_at=time.time())
+            for listener in self.listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"行情事件监听器出错: {str(e)}")
+        except Exception as e:
+            logger.error(f"处理行情消息时出错: {str(e)}")
+
+    def get_klines(self, symbol: str, interval: str):
+        """
+        获取带指标的K线
+
+        Args:
+            symbol: 交易对
+            interval: K线周期
+
+        Returns:
+            DataFrame，未关注、未补齐或超过stale_seconds没有推送时返回None
+        """
+        buffer = self.buffers.get((trading_symbol(symbol), interval))
+        hit = buffer is not None and buffer.ready and self._fresh(buffer.updated_at)
+        if buffer is not None:
+            metrics.cache_access('stream', hit)
+        return buffer.frame(self.market_data) if hit else None
+
+    def latest_price(self, symbol: str) -> Optional[float]:
+        """最近推送的成交价（最近更新的缓冲区中最后一根K线的收盘价）"""
+        buffers = [self.buffers.get((trading_symbol(symbol), interval)) for interval in self.config['intervals']]
+        buffers = [buffer for buffer in buffers if buffer is not None and buffer.ready
+                   and self._fresh(buffer.updated_at)]
+        if not buffers:
+            return None
+        return float(max(buffers, key=lambda buffer: buffer.updated_at).rows[-1][4])
+
+    def funding_rate(self, symbol: str) -> Optional[float]:
+        """最近推送的资金费率"""
+        with self._lock:
+            mark = self.marks.get(trading_symbol(symbol))
+        if mark is None or not self._fresh(mark['updated_at']):
+            return None
+        return mark['funding_rate']
+
+    def _run(self) -> None:
+        try:
+            self.source.run(self.streams(), self._on_message, self._on_connect)
+        except Exception as e:
+            logger.error(f"行情流线程异常退出: {str(e)}")
+
+    def start(self) -> bool:
+        """
+        启动行情流线程，并让MarketData读取流中的数据
+
+        Returns:
+            是否已启动
+        """
+        if not self.config['enabled'] or not self.symbols:
+            logger.info("行情流未启用")
+            return False
+        self.market_data.stream = self
+        self.thread = Thread(target=self._run, name='market-stream', daemon=True)
+        self.thread.start()
+        logger.info(f"已启动行情流: {', '.join(self.symbols)}，周期: {', '.join(self.config['intervals'])}")
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """停止行情流线程"""
+        if getattr(self.market_data, 'stream', None) is self:
+            self.market_data.stream = None
+        self.source.stop()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+            logger.info("行情流已停止")
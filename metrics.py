@@ -0,0 +1,612 @@
+"""
+分阶段耗时统计模块
+
+提供轻量的计时接口（上下文管理器和装饰器），把各阶段耗时记录到内存中的
+HDR风格对数直方图，按(阶段, 策略, 币种层级)分组。
+未启用或未被采样时span()直接返回共享的空操作对象，可以在生产环境常开。
+另外维护计数器和瞬时值（队列深度、线程池占用等），供metrics_server导出
+"""
+
+import time
+import random
+import logging
+import contextvars
+from collections import Counter, deque
+from functools import wraps
+from threading import Lock
+from typing import Dict, Any, Optional, Tuple, List
+
+
+logger = logging.getLogger(__name__)
+
+# 每个2的幂区间划分的子桶数（相对误差约1/16）
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+LINEAR_LIMIT = SUB_BUCKETS * 2
+
+# 币种层级，未列出的币种归为other
+DEFAULT_TIERS = {
+    'major': ['BTC', 'ETH'],
+    'large': ['BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'TRX', 'TON', 'AVAX', 'LINK', 'DOT', 'BCH', 'LTC']
+}
+
+# 统计每分钟请求数的时间窗口（秒）
+RATE_WINDOW = 60
+
+# 当前分析上下文中的策略和币种，供嵌套的span继承
+_current_labels = contextvars.ContextVar('metrics_labels', default=(None, None))
+
+
+def _bucket_index(value: int) -> int:
+    """计算微秒值所在的桶序号"""
+    if value < LINEAR_LIMIT:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return LINEAR_LIMIT + (shift - 1) * SUB_BUCKETS + (value >> shift) - SUB_BUCKETS
+
+
+def _bucket_upper(index: int) -> int:
+    """计算桶的上界（微秒）"""
+    if index < LINEAR_LIMIT:
+        return index
+    shift = (index - LINEAR_LIMIT) // SUB_BUCKETS + 1
+    mantissa = (index - LINEAR_LIMIT) % SUB_BUCKETS + SUB_BUCKETS
+    return ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    HDR风格的对数直方图
+
+    以微秒为单位记录耗时，小于32µs时精确记录，之后每个2的幂区间划分16个子桶，
+    内存占用与样本数无关
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self._lock = Lock()
+
+    def record(self, seconds: float) -> None:
+        """
+        记录一次耗时
+
+        Args:
+            seconds: 耗时（秒）
+        """
+        value = int(seconds * 1000000)
+        if value < 0:
+            value = 0
+        index = _bucket_index(value)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + 1
+            self.count += 1
+            self.total += value
+            if self.min is None or value < self.min:
+                self.min = value
+            if value > self.max:
+                self.max = value
+
+    def percentile(self, pct: float) -> float:
+        """
+        计算分位数
+
+        Args:
+            pct: 百分位，例如99
+
+        Returns:
+            分位数对应的耗时（毫秒），取所在桶的上界且不超过最大值
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(round(pct / 100.0 * self.count + 0.5)))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(_bucket_upper(index), self.max) / 1000.0
+            return self.max / 1000.0
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """
+        合并另一个直方图的数据
+
+        Args:
+            other: 要合并的直方图
+        """
+        with other._lock:
+            counts = dict(other.counts)
+            count, total, minimum, maximum = other.count, other.total, other.min, other.max
+        with self._lock:
+            for index, value in counts.items():
+                self.counts[index] = self.counts.get(index, 0) + value
+            self.count += count
+            self.total += total
+            if minimum is not None and (self.min is None or minimum < self.min):
+                self.min = minimum
+            self.max = max(self.max, maximum)
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        返回按上界排序的(上界毫秒, 计数)列表
+
+        Returns:
+            非空桶列表
+        """
+        with self._lock:
+            return [(_bucket_upper(index) / 1000.0, self.counts[index]) for index in sorted(self.counts)]
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        汇总统计
+
+        Returns:
+            包含次数、均值、分位数和极值（毫秒）的字典
+        """
+        return {
+            'count': self.count,
+            'mean_ms': (self.total / self.count / 1000.0) if self.count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p90_ms': self.percentile(90),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'min_ms': (self.min or 0) / 1000.0,
+            'max_ms': self.max / 1000.0
+        }
+
+
+class _NoopSpan:
+    """未启用或未采样时使用的空操作计时器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    """记录一次阶段耗时"""
+
+    __slots__ = ('registry', 'key', 'start')
+
+    def __init__(self, registry, key):
+        self.registry = registry
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.record(self.key, time.perf_counter() - self.start)
+        return False
+
+
+class _LabelContext:
+    """为嵌套的span设置策略和币种"""
+
+    __slots__ = ('labels', 'token')
+
+    def __init__(self, labels):
+        self.labels = labels
+
+    def __enter__(self):
+        self.token = _current_labels.set(self.labels)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_labels.reset(self.token)
+        return False
+
+
+class MetricsRegistry:
+    """
+    阶段耗时注册表
+
+    按(阶段, 策略, 币种层级)维护LatencyHistogram，
+    通过configure()按配置开关和设置采样率
+    """
+
+    def __init__(self, enabled: bool = True, sample_rate: float = 1.0):
+        """
+        初始化注册表
+
+        Args:
+            enabled: 是否启用计时
+            sample_rate: 采样率，0到1之间
+        """
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.histograms = {}
+        self.counters = {}
+        self.values = {}
+        self.gauges = {}
+        self.symbol_requests = Counter()
+        self.started_at = time.time()
+        self._recent_requests = deque()
+        self._lock = Lock()
+        self._tiers = {}
+        self.set_tiers(DEFAULT_TIERS)
+
+    def configure(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """
+        应用配置
+
+        Args:
+            config: 配置字典，支持enabled、sample_rate和tiers
+        """
+        config = config or {}
+        self.enabled = bool(config.get('enabled', self.enabled))
+        self.sample_rate = float(config.get('sample_rate', self.sample_rate))
+        if config.get('tiers'):
+            self.set_tiers(config['tiers'])
+        logger.info(f"阶段耗时统计: enabled={self.enabled}, sample_rate={self.sample_rate}")
+
+    def set_tiers(self, tiers: Dict[str, List[str]]) -> None:
+        """
+        设置币种层级
+
+        Args:
+            tiers: 层级名称到币种列表的映射
+        """
+        self._tiers = {symbol.upper(): tier for tier, symbols in tiers.items() for symbol in symbols}
+
+    def tier(self, symbol: Optional[str]) -> str:
+        """
+        获取币种所属层级
+
+        Args:
+            symbol: 币种或交易对，例如BTC或BTCUSDT
+
+        Returns:
+            层级名称
+        """
+        if not symbol:
+            return 'unknown'
+        base = symbol.upper()
+        if base.endswith('USDT') and len(base) > 4:
+            base = base[:-4]
+        return self._tiers.get(base, 'other')
+
+    def context(self, strategy: Optional[str] = None, symbol: Optional[str] = None):
+        """
+        设置当前分析的策略和币种，嵌套的span未指定时使用这些标签
+
+        Args:
+            strategy: 策略类型
+            symbol: 币种或交易对
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _LabelContext((strategy, symbol))
+
+    def span(self, stage: str, strategy: Optional[str] = None, symbol: Optional[str] = None):
+        """
+        创建阶段计时器
+
+        Args:
+            stage: 阶段名称，例如fetch.1h
+            strategy: 策略类型，默认继承context()
+            symbol: 币种或交易对，默认继承context()
+
+        Returns:
+            上下文管理器
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return _NOOP_SPAN
+        if strategy is None or symbol is None:
+            current_strategy, current_symbol = _current_labels.get()
+            strategy = strategy or current_strategy
+            symbol = symbol or current_symbol
+        return _Span(self, (stage, strategy or 'none', self.tier(symbol)))
+
+    def timed(self, stage: str):
+        """
+        计时装饰器
+
+        Args:
+            stage: 阶段名称
+
+        Returns:
+            装饰器
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, key: Tuple[str, str, str], seconds: float) -> None:
+        """
+        记录耗时
+
+        Args:
+            key: (阶段, 策略, 币种层级)
+            seconds: 耗时（秒）
+        """
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(key, LatencyHistogram())
+        histogram.record(seconds)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """
+        累加计数器
+
+        Args:
+            name: 计数器名称，例如commands_total
+            value: 增量
+            labels: 标签
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add(self, name: str, delta: float, **labels) -> None:
+        """
+        调整可增可减的瞬时值，例如正在执行的任务数
+
+        Args:
+            name: 名称
+            delta: 变化量
+            labels: 标签
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + delta
+
+    def record_request(self, symbol: str) -> None:
+        """
+        记录一次分析请求，用于统计每分钟请求数和热门币种
+
+        币种不作为Prometheus标签导出，避免用户输入造成标签数量无限增长
+
+        Args:
+            symbol: 请求分析的币种
+        """
+        now = time.time()
+        with self._lock:
+            self.symbol_requests[symbol.upper()] += 1
+            self._recent_requests.append(now)
+            while self._recent_requests and self._recent_requests[0] < now - RATE_WINDOW:
+                self._recent_requests.popleft()
+
+    def requests_per_minute(self) -> int:
+        """
+        统计最近一分钟的分析请求数
+
+        Returns:
+            请求数
+        """
+        cutoff = time.time() - RATE_WINDOW
+        with self._lock:
+            while self._recent_requests and self._recent_requests[0] < cutoff:
+                self._recent_requests.popleft()
+            return len(self._recent_requests)
+
+    def top_symbols(self, limit: int = 5) -> List[Tuple[str, int]]:
+        """
+        获取请求次数最多的币种
+
+        Args:
+            limit: 返回数量
+
+        Returns:
+            (币种, 次数)列表
+        """
+        with self._lock:
+            return self.symbol_requests.most_common(limit)
+
+    def stage_summary(self, stage: str) -> Dict[str, float]:
+        """
+        合并某阶段所有策略和层级的直方图并汇总
+
+        Args:
+            stage: 阶段名称
+
+        Returns:
+            汇总统计
+        """
+        merged = LatencyHistogram()
+        with self._lock:
+            histograms = [h for (name, _, _), h in self.histograms.items() if name == stage]
+        for histogram in histograms:
+            merged.merge(histogram)
+        return merged.snapshot()
+
+    def value(self, name: str) -> float:
+        """
+        获取可增可减的瞬时值（所有标签之和）
+
+        Args:
+            name: 名称
+
+        Returns:
+            数值
+        """
+        with self._lock:
+            return sum(v for (key, _), v in self.values.items() if key == name)
+
+    def cache_access(self, cache: str, hit: bool) -> None:
+        """
+        记录一次缓存访问
+
+        Args:
+            cache: 缓存名称
+            hit: 是否命中
+        """
+        self.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def cache_hit_ratio(self) -> Dict[str, float]:
+        """
+        计算各缓存的命中率
+
+        Returns:
+            缓存名称到命中率的映射
+        """
+        totals = {}
+        with self._lock:
+            items = list(self.counters.items())
+        for (name, labels), value in items:
+            if name != 'cache_requests_total':
+                continue
+            labels = dict(labels)
+            hits, total = totals.get(labels['cache'], (0, 0))
+            if labels['result'] == 'hit':
+                hits += value
+            totals[labels['cache']] = (hits, total + value)
+        return {cache: (hits / total if total else 0.0) for cache, (hits, total) in totals.items()}
+
+    def register_gauge(self, name: str, func, help_text: str = '') -> None:
+        """
+        注册在导出时计算的瞬时值
+
+        Args:
+            name: 名称
+            func: 无参函数，返回数值、None（跳过）或(标签字典, 数值)列表
+            help_text: 说明
+        """
+        with self._lock:
+            self.gauges[name] = (func, help_text)
+
+    def collect_gauges(self) -> List[Tuple[str, Dict[str, str], float]]:
+        """
+        计算所有已注册的瞬时值
+
+        Returns:
+            (名称, 标签, 数值)列表
+        """
+        with self._lock:
+            gauges = list(self.gauges.items())
+            samples = [(name, dict(labels), value) for (name, labels), value in sorted(self.values.items())]
+        for name, (func, _) in gauges:
+            try:
+                value = func()
+            except Exception as e:
+                logger.warning(f"计算指标{name}时出错: {str(e)}")
+                continue
+            if value is None:
+                continue
+            if isinstance(value, list):
+                samples.extend((name, labels, float(v)) for labels, v in value)
+            else:
+                samples.append((name, {}, float(value)))
+        return samples
+
+    def snapshot(self, stage_prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        导出所有直方图的汇总统计
+
+        Args:
+            stage_prefix: 只导出以该前缀开头的阶段
+
+        Returns:
+            按阶段、策略和层级排序的统计列表
+        """
+        with self._lock:
+            items = sorted(self.histograms.items())
+        result = []
+        for (stage, strategy, tier), histogram in items:
+            if stage_prefix and not stage.startswith(stage_prefix):
+                continue
+            row = {'stage': stage, 'strategy': strategy, 'tier': tier}
+            row.update(histogram.snapshot())
+            result.append(row)
+        return result
+
+    def render_text(self, stage_prefix: Optional[str] = None, limit: int = 40) -> str:
+        """
+        生成文本格式的统计表
+
+        Args:
+            stage_prefix: 只包含以该前缀开头的阶段
+            limit: 最多显示的行数
+
+        Returns:
+            统计表文本
+        """
+        rows = self.snapshot(stage_prefix)
+        if not rows:
+            return "暂无耗时统计数据"
+        lines = [f"{'阶段':<20} {'策略':<6} {'层级':<6} {'次数':>6} {'p50':>8} {'p99':>8} {'max':>8}"]
+        for row in rows[:limit]:
+            lines.append(
+                f"{row['stage']:<22} {row['strategy']:<8} {row['tier']:<8} {row['count']:>6} "
+                f"{row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+            )
+        if len(rows) > limit:
+            lines.append(f"... 共{len(rows)}项，仅显示前{limit}项")
+        return "\n".join(lines)
+
+    def render_summary(self) -> str:
+        """
+        生成运行状态摘要（供管理员/stats命令使用），只读取进程内的统计数据
+
+        Returns:
+            摘要文本
+        """
+        uptime = int(time.time() - self.started_at)
+        days, remainder = divmod(uptime, 86400)
+        hours, remainder = divmod(remainder, 3600)
+        minutes = remainder // 60
+        uptime_text = f"{days}天{hours}小时{minutes}分" if days else f"{hours}小时{minutes}分"
+
+        analyze = self.stage_summary('analyze_market')
+        gauges = {name: value for name, labels, value in self.collect_gauges() if not labels}
+        try:
+            # psutil在生成摘要时才导入，import bot不加载它
+            import psutil
+            rss_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+        except Exception:
+            rss_mb = 0.0
+
+        lines = [
+            "📊 运行状态",
+            f"⏱ 运行时间: {uptime_text}",
+            f"📨 请求: {self.requests_per_minute()}/分钟，累计{sum(self.symbol_requests.values())}",
+            f"⚡ 分析耗时: p50 {analyze['p50_ms']:.0f}ms / p95 {analyze['p95_ms']:.0f}ms（{analyze['count']}次）",
+            f"🔧 进行中任务: {self.value('analysis_workers_busy'):.0f}，"
+            f"排队 {gauges.get('thread_pool_queue_depth', 0):.0f}，"
+            f"待发送 {gauges.get('message_queue_depth', 0):.0f}",
+            f"🧵 线程池: {gauges.get('thread_pool_max_workers', 0):.0f}",
+            f"💾 内存: {rss_mb:.1f}MB"
+        ]
+
+        ratios = self.cache_hit_ratio()
+        if ratios:
+            lines.append("🗂 缓存命中率: " + "，".join(f"{cache} {ratio * 100:.0f}%" for cache, ratio in sorted(ratios.items())))
+
+        top = self.top_symbols()
+        if top:
+            lines.append("🔥 热门币种: " + "，".join(f"{symbol}({count})" for symbol, count in top))
+
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """清空所有直方图和计数器"""
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.symbol_requests = Counter()
+            self._recent_requests = deque()
+
+
+# 全局注册表
+metrics = MetricsRegistry()
@@ -0,0 +1,227 @@
+"""
+Prometheus指标导出模块
+
+在机器人已有的asyncio事件循环中启动一个本地HTTP端点(/metrics)，
+以Prometheus文本格式导出：
+- 命令请求计数、各缓存的命中/未命中计数和命中率
+- Binance接口已用权重
+- 消息队列深度、线程池占用率
+- 分阶段耗时直方图（含消息发送耗时telegram.send）
+- 进程内存(RSS)、CPU时间和线程数
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+
+from metrics import metrics as default_registry, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# 指标名称前缀
+PREFIX = 'tradingbot_'
+
+# 导出的耗时直方图桶上界（秒）
+HISTOGRAM_BUCKETS = [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# 当前进程的psutil对象，首次导出进程指标时创建（import bot不加载psutil）
+_process = None
+
+
+def _get_process():
+    """获取当前进程的psutil对象"""
+    global _process
+    if _process is None:
+        import psutil
+        _process = psutil.Process()
+    return _process
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    """格式化标签"""
+    if not labels:
+        return ''
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value: float) -> str:
+    """格式化数值"""
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(registry: Optional[MetricsRegistry] = None) -> str:
+    """
+    生成Prometheus文本格式的指标
+
+    Args:
+        registry: 指标注册表，默认为全局注册表
+
+    Returns:
+        指标文本
+    """
+    registry = registry or default_registry
+    lines = []
+
+    # 计数器
+    with registry._lock:
+        counters = sorted(registry.counters.items())
+    declared = set()
+    for (name, labels), value in counters:
+        metric = PREFIX + name
+        if metric not in declared:
+            lines.append(f"# TYPE {metric} counter")
+            declared.add(metric)
+        lines.append(f"{metric}{_format_labels(dict(labels))} {_format_value(value)}")
+
+    # 缓存命中率
+    ratios = registry.cache_hit_ratio()
+    if ratios:
+        lines.append(f"# TYPE {PREFIX}cache_hit_ratio gauge")
+        for cache, ratio in sorted(ratios.items()):
+            lines.append(f"{PREFIX}cache_hit_ratio{_format_labels({'cache': cache})} {_format_value(ratio)}")
+
+    # 瞬时值
+    for name, labels, value in registry.collect_gauges():
+        metric = PREFIX + name
+        if metric not in declared:
+            help_text = registry.gauges.get(name, (None, ''))[1]
+            if help_text:
+                lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            declared.add(metric)
+        lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+    # 进程资源
+    try:
+        process = _get_process()
+        memory = process.memory_info()
+        cpu = process.cpu_times()
+        lines.append(f"# TYPE {PREFIX}process_resident_memory_bytes gauge")
+        lines.append(f"{PREFIX}process_resident_memory_bytes {memory.rss}")
+        lines.append(f"# TYPE {PREFIX}process_cpu_seconds_total counter")
+        lines.append(f"{PREFIX}process_cpu_seconds_total {_format_value(cpu.user + cpu.system)}")
+        lines.append(f"# TYPE {PREFIX}process_threads gauge")
+        lines.append(f"{PREFIX}process_threads {process.num_threads()}")
+    except Exception as e:
+        logger.warning(f"获取进程资源信息时出错: {str(e)}")
+
+    # 分阶段耗时直方图
+    with registry._lock:
+        histograms = sorted(registry.histograms.items())
+    if histograms:
+        metric = PREFIX + 'stage_duration_seconds'
+        lines.append(f"# TYPE {metric} histogram")
+        for (stage, strategy, tier), histogram in histograms:
+            labels = {'stage': stage, 'strategy': strategy, 'tier': tier}
+            buckets = histogram.buckets()
+            cumulative = 0
+            index = 0
+            for bound in HISTOGRAM_BUCKETS:
+                while index < len(buckets) and buckets[index][0] / 1000.0 <= bound:
+                    cumulative += buckets[index][1]
+                    index += 1
+                lines.append(f"{metric}_bucket{_format_labels(dict(labels, le=bound))} {cumulative}")
+            lines.append(f"{metric}_bucket{_format_labels(dict(labels, le='+Inf'))} {histogram.count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(histogram.total / 1000000.0)}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def register_bot_gauges(thread_pool, message_queue, client=None,
+                        registry: Optional[MetricsRegistry] = None) -> None:
+    """
+    注册机器人运行时的瞬时值
+
+    Args:
+        thread_pool: 分析线程池(ThreadPoolExecutor)
+        message_queue: 待发送消息队列
+        client: Binance客户端，用于读取响应头中的已用权重
+        registry: 指标注册表，默认为全局注册表
+    """
+    registry = registry or default_registry
+    max_workers = thread_pool._max_workers
+
+    def pool_utilization():
+        busy = 0
+        with registry._lock:
+            for (name, _), value in registry.values.items():
+                if name == 'analysis_workers_busy':
+                    busy += value
+        return min(busy, max_workers) / max_workers if max_workers else 0.0
+
+    def binance_weight():
+        response = getattr(client, 'response', None)
+        if response is None:
+            return None
+        headers = getattr(response, 'headers', {}) or {}
+        value = headers.get('x-mbx-used-weight-1m') or headers.get('X-MBX-USED-WEIGHT-1M')
+        return float(value) if value else None
+
+    registry.register_gauge('message_queue_depth', message_queue.qsize, "待发送消息数")
+    registry.register_gauge('thread_pool_queue_depth', thread_pool._work_queue.qsize, "等待执行的分析任务数")
+    registry.register_gauge('thread_pool_max_workers', lambda: max_workers, "分析线程池大小")
+    registry.register_gauge('thread_pool_utilization', pool_utilization, "分析线程池占用率")
+    if client is not None:
+        registry.register_gauge('binance_used_weight_1m', binance_weight, "Binance接口最近1分钟已用权重")
+
+
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                          registry: MetricsRegistry) -> None:
+    """处理一个HTTP请求"""
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # 读取并丢弃请求头
+        while True:
+            line = await asyncio.wait_for(reader.readline(), timeout=5)
+            if not line or line in (b'\r\n', b'\n'):
+                break
+
+        parts = request_line.decode('latin-1').split()
+        path = parts[1].split('?')[0] if len(parts) >= 2 else ''
+        if len(parts) >= 2 and parts[0] == 'GET' and path in ('/metrics', '/'):
+            body = render_prometheus(registry).encode('utf-8')
+            status = '200 OK'
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = b'not found\n'
+            status = '404 Not Found'
+            content_type = 'text/plain; charset=utf-8'
+
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.warning(f"处理指标请求时出错: {str(e)}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str = '127.0.0.1', port: int = 9108,
+                               registry: Optional[MetricsRegistry] = None) -> asyncio.AbstractServer:
+    """
+    在当前事件循环中启动指标HTTP端点
+
+    Args:
+        host: 监听地址，默认只监听本机
+        port: 监听端口，0表示随机端口
+        registry: 指标注册表，默认为全局注册表
+
+    Returns:
+        asyncio服务器对象
+    """
+    registry = registry or default_registry
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_request(reader, writer, registry), host, port
+    )
+    address = server.sockets[0].getsockname()
+    logger.info(f"Prometheus指标端点已启动: http://{address[0]}:{address[1]}/metrics")
+    return server
@@ -0,0 +1,475 @@
+"""
+报告模板模块
+
+信号推送报告和完整分析报告的版式按语言保存在TEMPLATES中，报告中的固定措辞保存在PHRASES中，
+MarketAnalyzer只计算结构化的结果（数值、标签和措辞键），由ReportRenderer填入编译好的模板：
+- format_price(): 价格格式化（按数量级区间预先确定格式）
+- ReportTemplate: 编译后的模板，{name:price}字段按价格格式化，{name:phrase}字段按措辞键查找，
+  {name:notes}字段把措辞键列表渲染为逐行的提示
+- get_renderer(): 获取某种语言的渲染器（每种语言只编译一次）
+
+新增语言时只需在TEMPLATES和PHRASES中添加对应的条目
+"""
+
+import math
+import logging
+from bisect import bisect_right
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Mapping, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# 默认语言
+DEFAULT_LANGUAGE = 'zh'
+
+# 价格数量级区间：(上界, 小数位数, 是否去掉末尾的0并至少保留4位小数)
+PRICE_BUCKETS = (
+    (0.0001, 8, True),   # 极小值，像COS这样的代币
+    (0.01, 6, True),     # 小于1分钱
+    (1, 4, False),       # 小于1元
+    (math.inf, 2, False)
+)
+_BUCKET_BOUNDS = [bound for bound, _, _ in PRICE_BUCKETS]
+
+# 各区间的格式（千位分隔符和固定小数位）
+_BUCKET_FORMATS = tuple((f",.{decimals}f", trim) for _, decimals, trim in PRICE_BUCKETS)
+
+# 模板中特殊格式字段渲染后的字段名后缀
+_RENDERED_SUFFIX = {'price': '__price', 'phrase': '__phrase', 'notes': '__notes'}
+
+
+def _format_float(price: float) -> str:
+    """格式化有限的浮点数价格（格式只由价格所在的数量级区间决定）"""
+    if not math.isfinite(price):
+        raise ValueError(f"无效的价格: {price}")
+
+    # 针对非常接近0的值，但实际不为0的情况
+    if abs(price) < 0.0000001 and price != 0:
+        return "接近0"
+    if price == 0:
+        return "0"
+
+    # 根据价格所在的数量级区间确定精度，整数部分带千位分隔符
+    spec, trim_small = _BUCKET_FORMATS[bisect_right(_BUCKET_BOUNDS, price)]
+    integer_part, _, decimal_part = format(price, spec).partition('.')
+    if integer_part == '-0':
+        integer_part = '0'
+
+    if trim_small:
+        # 对于小值，保留足够的小数位但去除末尾的0（至少4位小数）
+        decimal_trimmed = decimal_part.rstrip('0')
+        if len(decimal_trimmed) < 4:
+            decimal_trimmed = decimal_part[:4]
+    elif len(decimal_part) > 2 and not decimal_part[2:].strip('0'):
+        # 对于较大的值，末尾都是0时只保留2位小数
+        decimal_trimmed = decimal_part[:2]
+    else:
+        decimal_trimmed = decimal_part
+    return f"{integer_part}.{decimal_trimmed}"
+
+
+def format_price(price: Any) -> str:
+    """
+    格式化价格显示
+
+    Args:
+        price: 价格（数值或可转换为浮点数的字符串）
+
+    Returns:
+        带千位分隔符的价格，小于0.01的价格保留4~8位有效小数，None返回N/A
+    """
+    try:
+        if price is None:
+            return "N/A"
+        return _format_float(float(price))
+    except Exception as e:
+        logger.error(f"价格格式化失败: {str(e)}")
+        return str(price)
+
+
+# 报告版式（{name:price}为价格，{name:phrase}为措辞键，{name:notes}为措辞键列表），
+# batch为多币种合并的简要报告，每个币种一段batch_row（获取失败时为batch_failed），
+# compare为多币种对比表，每个币种一段compare_row
+TEMPLATES = {
+    'zh': {
+        'market': """
+{symbol} {timeframe}周期市场分析报告
+--------------------------------
+📅 分析时间: {current_time}
+💰 当前价格: ${current_price:price}
+--------------------------------
+1. 策略分析:
+{strategy_analysis}
+
+2. 价格趋势分析:
+{price_trend}
+
+3. 成交量分析:
+{volume_analysis}
+
+4. 合约持仓分析:
+{futures_analysis}
+
+5. 筹码分布分析:
+{chip_distribution}
+
+6. 长期投资分析:
+{long_term_analysis}
+
+7. 交易建议:
+{trading_suggestion}
+
+8. 长期投资建议:
+{long_term_suggestion}
+--------------------------------
+""",
+        'short': """📊【短期波段策略信号推送】
+
+🕐 时间：{current_time}（系统自动分析）
+💰 当前价格：${current_price:price}
+
+🔹 策略模式：短线波段交易策略（均线动量体系）
+🔸 推荐方向：{direction:phrase}
+   * {direction_explanation:phrase}
+
+🎯 推荐操作（{direction:phrase}）：
+- 入场区间：${entry_low:price} ~ ${entry_high:price}
+- 止盈目标：${take_profit:price}
+- 止损建议：${stop_loss:price}
+- 建议仓位：控制在总资金的 {position}
+
+📊 详细指标分析：
+📈 RSI(14)：{rsi:.2f}（{rsi_zone}）
+📉 MACD(12,26,9)：{macd:.2f}，信号线：{macd_signal:.2f}，{macd_status}
+📊 EMA：EMA5={ema5:price}，EMA13={ema13:price}，{ema_trend}
+📦 成交量：当前={volume:price}，MA20={volume_ma20:price}，变化={volume_change:.2f}%，{volume_status}
+💰 Funding Rate：{funding_rate:.6f}%（{funding_status}）
+
+📈 移动均线详情：
+- MA20(1H)：{ma20_1h:price}，价格位于1小时MA20均线{ma20_1h_side:phrase}
+- MA50(1H)：{ma50_1h:price}，价格位于1小时MA50均线{ma50_1h_side:phrase}
+- MA20(4H)：{ma20_4h:price}，价格位于4小时MA20均线{ma20_4h_side:phrase}
+
+📊 合约情况：
+- 多空比：{long_short_ratio}（{long_short_status:phrase}）
+- 资金费率：{funding_rate:.6f}%（{funding_status}）
+
+📈 筹码分布：
+- 主力筹码集中在 {max_volume_price_range} 区间，占比 {max_volume_percentage:.2f}%
+- 获利盘比例: {profit_percentage:.2f}%（{profit_status:phrase}）
+
+⚠️ 风险提示：
+{risk_notes:notes}
+
+📬 如需切换至中期或长期策略，输入：
+/strategy mid 或 /strategy long""",
+        'mid': """📊【中期趋势策略信号推送】
+
+🕐 时间：{current_time}（系统自动分析）
+💰 当前价格：${current_price:price}
+
+🔹 策略模式：中期趋势策略（3-7日线）
+🔸 推荐方向：{direction:phrase}
+   * {direction_explanation:phrase}
+
+🎯 推荐操作（{direction:phrase}）：
+- 入场区间：${entry_low:price} ~ ${entry_high:price}
+- 止盈目标：${take_profit:price}
+- 止损建议：${stop_loss:price}
+- 建议仓位：控制在总资金的 {position}
+
+📊 详细指标分析：
+📈 RSI(14)：{rsi:.2f}（{rsi_zone:phrase}）
+📉 MACD(12,26,9)：{macd:.2f}，信号线：{macd_signal:.2f}，{macd_status:phrase}
+📊 趋势：日线={trend_1d}({trend_1d_strength})，4小时={trend_4h}({trend_4h_strength})
+💰 Funding Rate：{funding_rate:.6f}%（{funding_status:phrase}）
+
+📈 移动均线详情：
+- MA20(1D)：{ma20_1d:price}，价格位于日线MA20均线{ma20_1d_side:phrase}
+- MA50(1D)：{ma50_1d:price}，价格位于日线MA50均线{ma50_1d_side:phrase}
+- MA20(4H)：{ma20_4h:price}，价格位于4小时MA20均线{ma20_4h_side:phrase}
+
+📊 合约情况：
+- 多空比：{long_short_ratio}（{long_short_status:phrase}）
+- 资金费率：{funding_rate:.6f}%（{funding_status:phrase}）
+
+📈 筹码分布：
+- 主力筹码集中在 未知 区间，占比 0.00%
+- 获利盘比例: 0.00%（大部分持仓亏损）
+
+⚠️ 风险提示：
+- 筹码分布分散，价格波动可能较大；
+- 套牢盘比例较高，存在解套反弹可能；
+
+📬 如需切换至短期或长期策略，输入：
+/strategy short 或 /strategy long""",
+        'long': """📊【长期投资策略信号推送】
+
+🕐 时间：{current_time}（系统自动分析）
+💰 当前价格：${current_price:price}
+
+🔹 策略模式：长期投资策略（月度周期）
+🔸 推荐方向：{direction:phrase}
+   * 基于价值评估和长期趋势，信号强度：{signal_count}/5
+
+🎯 推荐操作（{direction:phrase}）：
+- 入场区间：${entry_low:price} ~ ${entry_high:price}
+- 止盈目标：${take_profit:price}
+- 止损建议：${stop_loss:price}
+- 建议仓位：控制在总资金的 {position}
+
+📊 详细指标分析：
+📈 MVRV-Z评分：{mvrv_z:price}（{mvrv_status:phrase}）
+📉 NVT比率：{nvt:price}（{nvt_status:phrase}）
+📊 趋势：周线={trend_1w}({trend_1w_strength})，日线={trend_1d}({trend_1d_strength})
+
+📈 长期价值评估：
+- MVRV-Z评分：{mvrv_z:price}（市值相对于实现价值的Z分数）
+  * {mvrv_interpretation:phrase}
+- NVT比率：{nvt:price}（网络价值与交易量比率）
+  * {nvt_interpretation:phrase}
+
+📈 移动均线详情：
+- MA50(1W)：{ma50_1w:price}，价格位于周线MA50均线{ma50_1w_side:phrase}
+- MA200(1D)：{ma200_1d:price}，价格位于日线MA200均线{ma200_1d_side:phrase}
+- MA50(1D)：{ma50_1d:price}，价格位于日线MA50均线{ma50_1d_side:phrase}
+
+⚠️ 投资建议：
+- {value_suggestion:phrase}
+- {chain_activity_suggestion:phrase}
+- 长期投资应注重价值评估，避免追高杀低，建议采用定投策略。
+
+📬 如需切换至短期或中期策略，输入：
+/strategy short 或 /strategy mid""",
+        'batch': """📊【多币种{strategy:phrase}信号汇总】
+
+🕐 时间：{current_time}（系统自动分析）
+
+{rows}
+📬 查看单个币种的完整报告，输入：
+/analyze 币种""",
+        'batch_row': """🔸 {symbol}：${current_price:price}，{direction:phrase}（仓位 {position}）
+- 入场：${entry_low:price} ~ ${entry_high:price}，止盈：${take_profit:price}，止损：${stop_loss:price}
+""",
+        'batch_failed': """🔸 {symbol}：⚠️ 获取市场数据失败，请稍后重试
+""",
+        'compare': """📊【多币种对比】短期信号（15分钟K线）
+
+🕐 时间：{current_time}
+
+{rows}
+📬 查看单个币种的完整报告，输入：
+/analyze 币种""",
+        'compare_row': """🔸 {symbol}：${current_price:price}
+- RSI {rsi:.1f}｜MACD {macd:phrase}｜EMA {ema:phrase}｜资金费率 {funding_rate:.4f}%｜多空比 {long_short_ratio:phrase}
+- 评分 {score:+.2f}，{direction:phrase}
+"""
+    }
+}
+
+# 报告措辞（键 -> 文本，文本中可以包含由措辞参数填充的字段）
+PHRASES = {
+    'zh': {
+        # 逐行提示的格式
+        'note_item': "- {note}；\n",
+        'above': "上方",
+        'below': "下方",
+        'long_short.long': "多头占优",
+        'long_short.short': "空头占优",
+        'long_short.balanced': "多空平衡",
+        'strategy.short': "短期波段策略",
+        'strategy.mid': "中期趋势策略",
+        'strategy.long': "长期投资策略",
+        'cross.golden': "金叉",
+        'cross.dead': "死叉",
+        'compare.ratio': "{ratio:.2f}",
+        'compare.ratio_missing': "N/A",
+        'profit.majority': "大部分持仓盈利",
+        'loss.majority': "大部分持仓亏损",
+
+        'short.direction.long': "📈 做多",
+        'short.direction.short': "📉 做空",
+        'short.direction.cautious_long': "📈 谨慎做多",
+        'short.direction.cautious_short': "📉 谨慎做空",
+        'short.direction.neutral': "⚖️ 观望",
+        'short.explanation.long': "短期技术指标整体偏多，以EMA和MACD指标最为突出",
+        'short.explanation.short': "短期技术指标整体偏空，以EMA和RSI指标最为突出",
+        'short.explanation.cautious_long': "短期趋势指标偏多，但其他指标信号不强，建议轻仓操作",
+        'short.explanation.cautious_short': "短期趋势指标偏空，但其他指标信号不强，建议轻仓操作",
+        'short.explanation.neutral': "技术指标呈中性状态，无明显交易优势，建议暂时观望",
+        'short.risk.funding': "当前资金费率异常，可能面临剧烈波动",
+        'short.risk.chip_concentrated': "筹码高度集中，价格可能在此区间震荡",
+        'short.risk.volume_surge': "成交量剧增，可能存在爆仓风险",
+        'short.risk.rsi_extreme': "RSI值处于极端区域({rsi:.1f})，可能面临短期反转",
+        'short.risk.pullback': "当前为技术回调，建议快进快出",
+        'short.risk.pullback_trap': "注意低位杀跌风险，适合短期交易者",
+        'short.risk.rebound': "当前为技术反弹，建议快进快出",
+        'short.risk.rebound_trap': "注意高位套牢风险，适合短期交易者",
+        'short.risk.no_direction': "市场缺乏明确方向，建议轻仓操作或观望",
+
+        'mid.direction.long': "📈 做多",
+        'mid.direction.short': "📉 做空",
+        'mid.direction.neutral': "⏹ 观望",
+        'mid.explanation.signal': "综合多项技术指标，信号强度：{strength:g}/7",
+        'mid.explanation.neutral': "技术指标分歧，无明确信号",
+        'mid.rsi.neutral': "中性区域",
+        'mid.rsi.overbought': "超买区域",
+        'mid.rsi.oversold': "超卖区域",
+        'mid.macd.golden': "金叉（中期动能转向多头）",
+        'mid.macd.dead': "死叉（中期动能转向空头）",
+        'mid.funding.long': "多头略占优",
+        'mid.funding.short': "空头略占优",
+        'mid.funding.balanced': "多空平衡",
+
+        'long.direction.neutral': "⏳ 观望",
+        'long.direction.long': "📈 长期做多",
+        'long.direction.short': "📉 长期做空",
+        'long.direction.cautious_long': "📈 谨慎做多",
+        'long.direction.cautious_short': "📉 谨慎做空",
+        'long.mvrv.deep_undervalued': "严重低估",
+        'long.mvrv.undervalued': "略低估",
+        'long.mvrv.deep_overvalued': "严重高估",
+        'long.mvrv.overvalued': "略高估",
+        'long.mvrv.fair': "合理",
+        'long.mvrv_interpretation.deep_undervalued': "-2~0区间为买入区",
+        'long.mvrv_interpretation.undervalued': "-1~0区间为低估区",
+        'long.mvrv_interpretation.deep_overvalued': "3以上为危险区",
+        'long.mvrv_interpretation.overvalued': "1~3区间为谨慎区",
+        'long.mvrv_interpretation.fair': "0~1区间为中性区",
+        'long.value.deep_undervalued': "当前处于长期价值低估区域，适合分批布局，建立长期头寸；",
+        'long.value.undervalued': "当前处于价值低估区域，适合轻仓布局；",
+        'long.value.deep_overvalued': "当前处于价值高估区域，不建议开仓，可考虑减持；",
+        'long.value.overvalued': "当前处于价值略高估区域，建议减少仓位，谨慎操作；",
+        'long.value.fair': "当前处于价值合理区域，可考虑轻仓参与；",
+        'long.nvt.active': "活跃（低估）",
+        'long.nvt.inactive': "不活跃（高估）",
+        'long.nvt.fair': "合理",
+        'long.nvt_interpretation.active': "<30表示链上活动活跃，价值低估",
+        'long.nvt_interpretation.inactive': ">90表示链上活动不足，价值高估",
+        'long.nvt_interpretation.fair': "30~90表示合理区间",
+        'long.chain.active': "链上活动活跃，长期价值支撑良好；",
+        'long.chain.inactive': "链上活动不足，长期价值支撑不足；",
+        'long.chain.fair': "链上活动处于正常水平；"
+    }
+}
+
+# 措辞值：措辞键，或(措辞键, 参数)
+Phrase = Union[str, Tuple[str, Mapping[str, Any]]]
+
+
+def render_phrase(phrases: Mapping[str, str], value: Phrase) -> str:
+    """
+    渲染措辞
+
+    Args:
+        phrases: 该语言的措辞
+        value: 措辞键，或(措辞键, 参数)
+
+    Returns:
+        措辞文本
+    """
+    if isinstance(value, tuple):
+        key, params = value
+        return phrases[key].format_map(params)
+    return phrases[value]
+
+
+class ReportTemplate:
+    """
+    编译后的报告模板
+
+    编译时解析一次模板中的字段，把price、phrase和notes格式的字段改写为普通字段，
+    渲染时只需填充这些字段后调用一次str.format_map
+    """
+
+    def __init__(self, text: str, phrases: Mapping[str, str]):
+        """
+        编译模板
+
+        Args:
+            text: 模板文本（str.format语法）
+            phrases: 该语言的措辞
+        """
+        self.phrases = phrases
+        self.fields = set()
+        self.special = []
+        parts = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            parts.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is None:
+                continue
+            self.fields.add(field)
+            if spec in _RENDERED_SUFFIX:
+                if (field, spec) not in self.special:
+                    self.special.append((field, spec))
+                field, spec = field + _RENDERED_SUFFIX[spec], ''
+            parts.append('{' + field + (f"!{conversion}" if conversion else '') + (f":{spec}" if spec else '') + '}')
+        self.text = ''.join(parts)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        渲染报告
+
+        Args:
+            values: 字段值（price字段为数值，phrase字段为措辞，notes字段为措辞列表）
+
+        Returns:
+            报告文本
+        """
+        values = dict(values)
+        for field, spec in self.special:
+            value = values[field]
+            if spec == 'price':
+                rendered = format_price(value)
+            elif spec == 'phrase':
+                rendered = render_phrase(self.phrases, value)
+            else:
+                item = self.phrases['note_item']
+                rendered = ''.join(item.format(note=render_phrase(self.phrases, note)) for note in value)
+            values[field + _RENDERED_SUFFIX[spec]] = rendered
+        return self.text.format_map(values)
+
+
+class ReportRenderer:
+    """某种语言的报告渲染器（各策略的模板在创建时编译）"""
+
+    def __init__(self, language: str = DEFAULT_LANGUAGE):
+        """
+        编译该语言的所有模板
+
+        Args:
+            language: 语言，需在TEMPLATES和PHRASES中存在
+        """
+        if language not in TEMPLATES:
+            raise ValueError(f"不支持的报告语言: {language}")
+        self.language = language
+        self.phrases = PHRASES[language]
+        self.templates = {name: ReportTemplate(text, self.phrases) for name, text in TEMPLATES[language].items()}
+
+    def render(self, name: str, values: Mapping[str, Any]) -> str:
+        """
+        渲染报告
+
+        Args:
+            name: 模板名称（market、short、mid、long）
+            values: 字段值
+
+        Returns:
+            报告文本
+        """
+        return self.templates[name].render(values)
+
+
+@lru_cache(maxsize=None)
+def get_renderer(language: str = DEFAULT_LANGUAGE) -> ReportRenderer:
+    """
+    获取某种语言的报告渲染器（每种语言只编译一次，可在多个线程中共用）
+
+    Args:
+        language: 语言
+
+    Returns:
+        ReportRenderer
+    """
+    return ReportRenderer(language)
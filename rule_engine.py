@@ -0,0 +1,528 @@
+"""
+信号规则引擎
+
+从配置（analysis.strategies）加载策略的信号规则，一次编译为向量化的求值函数：
+每个信号是一组按顺序匹配的条件（NumPy掩码），策略评分是各信号值的加权和。
+编译后的规则同时用于单个币种的报告、多币种扫描和回测，求值时不再解析规则
+
+规则格式:
+    "short": {
+        "weights": {"rsi": 0.15, ...},
+        "threshold": 0.3,          # 评分超过±threshold时做多/做空
+        "fallback": "ema",         # 评分在阈值内时按该信号的方向，不设置时为观望
+        "params": {"rsi_overbought": 70, ...},
+        "signals": {
+            "rsi": {
+                "rules": [{"when": "rsi > $rsi_overbought", "value": -1, "label": "超买区域"}, ...],
+                "default": {"value": 0, "label": "中性区域"}
+            }
+        }
+    }
+
+条件为用and连接的比较式，操作数可以是特征名、数字或$参数（前面可以加负号），
+第一个满足的规则决定信号的值和说明，都不满足时使用default
+"""
+
+import re
+import copy
+import logging
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 信号值对应的文字（与报告中的分析因素权重表一致）
+VALUE_LABELS = {
+    1.0: '看多',
+    0.5: '中性偏多',
+    0.0: '中性',
+    -0.5: '中性偏空',
+    -1.0: '看空'
+}
+
+# 默认策略规则（与原先MarketAnalyzer中信号推送报告的硬编码规则一致）
+DEFAULT_RULES = {
+    'short': {
+        'weights': {
+            'rsi': 0.15,
+            'macd': 0.20,
+            'ema': 0.25,
+            'volume': 0.15,
+            'funding': 0.10,
+            'chip': 0.15
+        },
+        'threshold': 0.3,
+        'fallback': 'ema',
+        'params': {
+            'rsi_oversold': 30,
+            'rsi_overbought': 70,
+            'volume_change': 30,
+            'funding_threshold': 0.01,
+            'chip_high': 70,
+            'chip_low': 30
+        },
+        'signals': {
+            'rsi': {
+                'rules': [
+                    {'when': 'rsi > $rsi_overbought', 'value': -1, 'label': '超买区域'},
+                    {'when': 'rsi < $rsi_oversold', 'value': 1, 'label': '超卖区域'}
+                ],
+                'default': {'value': 0, 'label': '中性区域'}
+            },
+            'macd': {
+                'rules': [
+                    {'when': 'macd > macd_signal', 'value': 1, 'label': '金叉（短期动能转向多头）'}
+                ],
+                'default': {'value': -1, 'label': '死叉（短期动能转向空头）'}
+            },
+            'ema': {
+                'rules': [
+                    {'when': 'ema5 > ema13', 'value': 1, 'label': 'EMA5 > EMA13（金叉，短期趋势向上）'}
+                ],
+                'default': {'value': -1, 'label': 'EMA5 < EMA13（死叉，短期趋势向下）'}
+            },
+            'volume': {
+                'rules': [
+                    {'when': 'volume_change > $volume_change and close > open', 'value': 1, 'label': '放量上涨'},
+                    {'when': 'volume_change > $volume_change and close < open', 'value': -1, 'label': '放量下跌'},
+                    {'when': 'volume_change < -$volume_change and close > open', 'value': -0.5, 'label': '缩量上涨'},
+                    {'when': 'volume_change < -$volume_change and close < open', 'value': 0.5, 'label': '缩量下跌'}
+                ],
+                'default': {'value': 0, 'label': '成交量正常'}
+            },
+            'funding': {
+                'rules': [
+                    {'when': 'funding_pct > $funding_threshold', 'value': -1, 'label': '多头略占优'},
+                    {'when': 'funding_pct < -$funding_threshold', 'value': 1, 'label': '空头略占优'}
+                ],
+                'default': {'value': 0, 'label': '多空平衡'}
+            },
+            'chip': {
+                'rules': [
+                    {'when': 'chip_profit > $chip_high', 'value': -1, 'label': '获利盘较多'},
+                    {'when': 'chip_profit < $chip_low', 'value': 1, 'label': '获利盘较少'}
+                ],
+                'default': {'value': 0, 'label': '获利盘适中'}
+            }
+        }
+    },
+    'mid': {
+        'weights': {
+            'trend_1d': 2,
+            'trend_4h': 1,
+            'macd': 1,
+            'rsi': 1,
+            'funding': 1
+        },
+        'threshold': 0,
+        'fallback': None,
+        'params': {
+            'rsi_mid': 50,
+            'rsi_oversold': 30,
+            'rsi_overbought': 70,
+            'funding_threshold': 0.01,
+            'range_pct': 0.01
+        },
+        'signals': {
+            'trend_1d': {
+                'rules': [
+                    {'when': '1d_trend > 0', 'value': 1, 'label': '日线趋势向上'},
+                    {'when': '1d_trend < 0', 'value': -1, 'label': '日线趋势向下'}
+                ],
+                'default': {'value': 0, 'label': '日线震荡'}
+            },
+            'trend_4h': {
+                'rules': [
+                    {'when': '4h_trend > 0', 'value': 1, 'label': '4小时趋势向上'},
+                    {'when': '4h_trend < 0', 'value': -1, 'label': '4小时趋势向下'}
+                ],
+                'default': {'value': 0, 'label': '4小时震荡'}
+            },
+            'macd': {
+                'rules': [
+                    {'when': '1d_macd > 1d_macd_signal', 'value': 1, 'label': '金叉（中期动能转向多头）'}
+                ],
+                'default': {'value': -1, 'label': '死叉（中期动能转向空头）'}
+            },
+            'rsi': {
+                'rules': [
+                    {'when': '1d_rsi > $rsi_mid', 'value': 1, 'label': 'RSI位于中轴上方'}
+                ],
+                'default': {'value': -1, 'label': 'RSI位于中轴下方'}
+            },
+            'funding': {
+                'rules': [
+                    {'when': 'funding_pct > $funding_threshold', 'value': 1, 'label': '多头略占优'}
+                ],
+                'default': {'value': 0, 'label': '多空平衡'}
+            }
+        }
+    }
+}
+
+# 配置中indicators使用的名称与信号名不同时的对应关系（一个名称可以对应多个信号）
+# volume同时包含成交量和由成交量分布计算的筹码信号，旧版配置的短期指标列表中没有chip
+INDICATOR_ALIASES = {
+    'funding_rate': ('funding',),
+    'volume': ('volume', 'chip'),
+    'volume_profile': ('chip',),
+    'chip_distribution': ('chip',)
+}
+
+_CLAUSE_PATTERN = re.compile(r'^\s*(\S+)\s*(>=|<=|==|!=|>|<)\s*(\S+)\s*$')
+
+_OPERATORS = {
+    '>': np.greater,
+    '<': np.less,
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal
+}
+
+
+def trend_direction(ema5, ema13, ema20, ema50, ema100):
+    """
+    向量化的TechnicalAnalysisRules.analyze_trend
+
+    Returns:
+        (方向, 强度)：方向为1/-1/0，强度为3(强)/2(中)/1(弱)
+    """
+    strong_bull = (ema5 > ema13) & (ema13 > ema20) & (ema13 > ema50) & (ema50 > ema100)
+    strong_bear = (ema5 < ema13) & (ema13 < ema20) & (ema13 < ema50) & (ema50 < ema100)
+    direction = np.where(strong_bull, 1, np.where(strong_bear, -1,
+                         np.where(ema5 > ema13, 1, np.where(ema5 < ema13, -1, 0))))
+    strength = np.where(strong_bull | strong_bear, 3, np.where(direction != 0, 2, 1))
+    return direction, strength
+
+
+def _derived_feature(name: str):
+    """
+    派生特征的依赖和计算函数，不是派生特征时返回None
+
+    - volume_change：成交量相对MA20的变化（%）
+    - funding_pct：资金费率（%）
+    - trend / <周期>_trend：EMA5/EMA13/MA20/MA50排列得到的趋势方向(1/-1/0)
+    """
+    if name == 'volume_change':
+        def volume_change(f):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return (f['volume'] / f['volume_ma20'] - 1) * 100
+        return ['volume', 'volume_ma20'], volume_change
+    if name == 'funding_pct':
+        return ['funding_rate'], lambda f: f['funding_rate'] * 100
+    if name == 'trend' or name.endswith('_trend'):
+        prefix = name[:-len('trend')]
+        columns = [f"{prefix}{column}" for column in ['ema5', 'ema13', 'ma20', 'ma50']]
+
+        def trend(f):
+            ema5, ema13, ma20, ma50 = (f[column] for column in columns)
+            return trend_direction(ema5, ema13, ma20, ma50, ma50)[0].astype(float)
+        return columns, trend
+    return None
+
+
+class CompiledStrategy:
+    """
+    编译后的策略规则
+
+    evaluate接受特征名 -> 数组（或标量）的字典，一次计算所有行的信号值、评分和推荐方向
+    """
+
+    def __init__(self, name: str, definition: Dict[str, Any]):
+        """
+        编译策略规则
+
+        Args:
+            name: 策略名称
+            definition: 策略规则（格式见模块说明）
+
+        Raises:
+            ValueError: 规则格式错误或引用了未定义的参数
+        """
+        self.name = name
+        self.params = dict(definition.get('params') or {})
+        self.threshold = float(definition.get('threshold', 0))
+        self.fallback = definition.get('fallback')
+        signals = definition.get('signals') or {}
+        weights = definition.get('weights') or {}
+        unknown = set(weights) - set(signals)
+        if unknown:
+            raise ValueError(f"策略{name}的权重中有未定义的信号: {sorted(unknown)}")
+        if self.fallback and self.fallback not in signals:
+            raise ValueError(f"策略{name}的fallback信号{self.fallback}未定义")
+
+        self.signal_names = list(signals)
+        self.weights = {signal: float(weights.get(signal, 0)) for signal in self.signal_names}
+        self.features = []
+        self._derived = []
+        self._signals = {}
+        self._labels = {}
+        for signal, spec in signals.items():
+            rules = spec.get('rules') or []
+            default = spec.get('default') or {'value': 0, 'label': ''}
+            conditions = [self._compile_condition(rule['when']) for rule in rules]
+            values = [float(rule['value']) for rule in rules]
+            self._signals[signal] = (conditions, values, float(default['value']))
+            self._labels[signal] = [rule.get('label', '') for rule in rules] + [default.get('label', '')]
+
+    def _feature(self, name: str):
+        """登记求值需要的特征，返回读取函数"""
+        if name not in self.features:
+            derived = _derived_feature(name)
+            if derived is not None:
+                columns, compute = derived
+                for column in columns:
+                    self._feature(column)
+                self._derived.append((name, compute))
+            self.features.append(name)
+        return lambda f: f[name]
+
+    def _operand(self, token: str):
+        """编译比较式的操作数"""
+        sign = 1.0
+        if token.startswith('-') and len(token) > 1 and not token[1].isdigit():
+            sign, token = -1.0, token[1:]
+        if token.startswith('$'):
+            param = token[1:]
+            if param not in self.params:
+                raise ValueError(f"策略{self.name}的规则引用了未定义的参数: {param}")
+            value = sign * float(self.params[param])
+            return lambda f: value
+        try:
+            value = sign * float(token)
+            return lambda f: value
+        except ValueError:
+            pass
+        getter = self._feature(token)
+        if sign < 0:
+            return lambda f: -getter(f)
+        return getter
+
+    def _compile_condition(self, expression: str) -> Callable:
+        """把用and连接的比较式编译为返回布尔数组的函数"""
+        clauses = []
+        for clause in re.split(r'\s+and\s+', expression.strip()):
+            match = _CLAUSE_PATTERN.match(clause)
+            if not match:
+                raise ValueError(f"策略{self.name}的规则条件无法解析: {clause}")
+            left, operator, right = match.groups()
+            clauses.append((self._operand(left), _OPERATORS[operator], self._operand(right)))
+
+        def condition(f):
+            mask = None
+            for left, operator, right in clauses:
+                result = operator(left(f), right(f))
+                mask = result if mask is None else mask & result
+            return mask
+        return condition
+
+    def evaluate(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        计算信号
+
+        Args:
+            features: 特征名 -> 数组或标量（派生特征会自动计算）
+
+        Returns:
+            values: 信号名 -> 信号值数组
+            matches: 信号名 -> 满足的规则序号数组（-1表示default）
+            score: 加权评分
+            direction: 推荐方向（1做多，-1做空，0观望）
+        """
+        f = {}
+        for name in self.features:
+            if name in features:
+                f[name] = np.asarray(features[name], dtype=float)
+        for name, compute in self._derived:
+            if name not in f:
+                f[name] = np.asarray(compute(f), dtype=float)
+        shape = np.broadcast_shapes(*(value.shape for value in f.values())) if f else ()
+
+        values, matches = {}, {}
+        score = np.zeros(shape)
+        for signal in self.signal_names:
+            conditions, choices, default = self._signals[signal]
+            masks = [np.broadcast_to(condition(f), shape) for condition in conditions]
+            values[signal] = np.select(masks, choices, default) if masks else np.full(shape, default)
+            matches[signal] = np.select(masks, range(len(masks)), -1) if masks else np.full(shape, -1)
+            if self.weights[signal]:
+                score = score + self.weights[signal] * values[signal]
+
+        direction = np.where(score > self.threshold, 1, np.where(score < -self.threshold, -1, 0))
+        if self.fallback:
+            undecided = direction == 0
+            direction = np.where(undecided, np.sign(values[self.fallback]).astype(int), direction)
+        return {'values': values, 'matches': matches, 'score': score, 'direction': direction}
+
+    def label(self, signal: str, match: int) -> str:
+        """规则序号对应的说明文字"""
+        return self._labels[signal][int(match)]
+
+    def evaluate_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        一次计算多行（例如多个币种的最新K线）的信号
+
+        Args:
+            rows: 每行为特征名 -> 数值的字典
+
+        Returns:
+            每行的结果：values/labels/signals（信号文字）/score/direction
+        """
+        if not rows:
+            return []
+        columns = {name: np.array([float(row[name]) for row in rows]) for name in self.features if name in rows[0]}
+        result = self.evaluate(columns)
+        output = []
+        for i in range(len(rows)):
+            values = {signal: float(result['values'][signal][i]) for signal in self.signal_names}
+            output.append({
+                'values': values,
+                'labels': {signal: self.label(signal, result['matches'][signal][i]) for signal in self.signal_names},
+                'signals': {signal: VALUE_LABELS.get(value, '中性') for signal, value in values.items()},
+                'score': float(result['score'][i]),
+                'direction': int(result['direction'][i])
+            })
+        return output
+
+    def evaluate_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        计算单行的信号（结果与evaluate_rows的单行结果相同）
+
+        报告生成时每次只计算一行，这里直接用NumPy标量逐条匹配规则，
+        省去构造数组和np.select的开销
+
+        Args:
+            row: 特征名 -> 数值
+
+        Returns:
+            values/labels/signals（信号文字）/score/direction
+        """
+        f = {name: np.float64(row[name]) for name in self.features if name in row}
+        for name, compute in self._derived:
+            if name not in f:
+                f[name] = np.float64(compute(f))
+
+        values, labels = {}, {}
+        score = 0.0
+        for signal in self.signal_names:
+            conditions, choices, default = self._signals[signal]
+            match = next((i for i, condition in enumerate(conditions) if condition(f)), -1)
+            values[signal] = choices[match] if match >= 0 else default
+            labels[signal] = self._labels[signal][match]
+            if self.weights[signal]:
+                score = score + self.weights[signal] * values[signal]
+
+        direction = 1 if score > self.threshold else -1 if score < -self.threshold else 0
+        if self.fallback and direction == 0:
+            direction = int(np.sign(values[self.fallback]))
+        return {
+            'values': values,
+            'labels': labels,
+            'signals': {signal: VALUE_LABELS.get(value, '中性') for signal, value in values.items()},
+            'score': float(score),
+            'direction': direction
+        }
+
+
+def merge_definition(base: Dict[str, Any], override: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    合并策略规则，override中的weights、params和signals按键覆盖
+
+    配置中的rsi_thresholds（oversold/overbought）映射为rsi_oversold/rsi_overbought参数，
+    indicators列出的信号之外的信号权重设为0；indicators中有未定义的名称时（例如旧版配置中期策略的
+    ma、obv、support_resistance）视为说明性的指标列表，不修改权重
+
+    Args:
+        base: 默认规则
+        override: 配置中的策略定义（analysis.strategies.<策略>）
+
+    Returns:
+        合并后的规则
+    """
+    merged = copy.deepcopy(base)
+    override = override or {}
+    for key in ['weights', 'params', 'signals']:
+        if override.get(key):
+            merged.setdefault(key, {}).update(copy.deepcopy(override[key]))
+    for key in ['threshold', 'fallback']:
+        if key in override:
+            merged[key] = override[key]
+
+    thresholds = override.get('rsi_thresholds') or {}
+    if 'oversold' in thresholds:
+        merged.setdefault('params', {})['rsi_oversold'] = thresholds['oversold']
+    if 'overbought' in thresholds:
+        merged.setdefault('params', {})['rsi_overbought'] = thresholds['overbought']
+
+    indicators = override.get('indicators')
+    if indicators:
+        signals = set(merged.get('signals', {}))
+        enabled = {signal for name in indicators for signal in INDICATOR_ALIASES.get(name, (name,))}
+        unknown = enabled - signals
+        if unknown:
+            logger.warning(f"indicators中有未定义的信号{sorted(unknown)}，保留默认权重")
+        else:
+            for signal in merged.get('weights', {}):
+                if signal not in enabled:
+                    merged['weights'][signal] = 0
+    return merged
+
+
+class RuleEngine:
+    """
+    策略规则集合
+
+    按配置合并默认规则后编译一次，之后通过strategy()获取编译后的规则
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化规则引擎
+
+        Args:
+            config: analysis.strategies配置，策略名 -> 策略定义（覆盖DEFAULT_RULES）
+        """
+        config = config or {}
+        self.definitions = {}
+        self.strategies = {}
+        for name in list(DEFAULT_RULES) + [name for name in config if name not in DEFAULT_RULES]:
+            if name not in DEFAULT_RULES and not (config[name] or {}).get('signals'):
+                # 没有信号规则的策略（例如long）仍使用MarketAnalyzer中的实现
+                continue
+            definition = merge_definition(DEFAULT_RULES.get(name, {}), config.get(name))
+            self.definitions[name] = definition
+            self.strategies[name] = CompiledStrategy(name, definition)
+        logger.info(f"规则引擎已编译策略: {', '.join(self.strategies)}")
+
+    def strategy(self, name: str) -> CompiledStrategy:
+        """获取编译后的策略规则"""
+        return self.strategies[name]
+
+    def momentum_thresholds(self, name: str = 'short') -> Dict[str, float]:
+        """TechnicalAnalysisRules.analyze_momentum使用的RSI阈值"""
+        params = self.strategies[name].params
+        return {'oversold': params.get('rsi_oversold', 30), 'overbought': params.get('rsi_overbought', 70)}
+
+
+def compile_strategy(name: str, params: Optional[Dict[str, Any]] = None,
+                     definition: Optional[Dict[str, Any]] = None) -> CompiledStrategy:
+    """
+    按参数编译策略规则（回测和参数搜索使用）
+
+    Args:
+        name: 策略名称
+        params: weights、threshold和其他规则参数（与backtest.rules.DEFAULT_PARAMS格式相同）
+        definition: 基础规则，默认为DEFAULT_RULES中的规则
+
+    Returns:
+        编译后的规则
+    """
+    override = {'params': {}}
+    for key, value in (params or {}).items():
+        if key in ('weights', 'threshold', 'fallback'):
+            override[key] = value
+        else:
+            override['params'][key] = value
+    return CompiledStrategy(name, merge_definition(definition or DEFAULT_RULES[name], override))
@@ -8,7 +8,7 @@ import asyncio
 import telegram
 from telegram.ext import Application, CommandHandler
 from dotenv import load_dotenv
-import requests
+from http_session import get_session
 import sys
 import traceback
 
@@ -44,7 +44,7 @@ def force_delete_webhook():
         
         # 使用直接HTTP请求删除webhook
         delete_webhook_url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook?drop_pending_updates=true"
-        response = requests.get(delete_webhook_url, timeout=30)
+        response = get_session().get(delete_webhook_url, timeout=30)
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
@@ -60,7 +60,7 @@ def force_delete_webhook():
         
         # 验证webhook已删除
         webhook_info_url = f"https://api.telegram.org/bot{BOT_TOKEN}/getWebhookInfo"
-        response = requests.get(webhook_info_url, timeout=30)
+        response = get_session().get(webhook_info_url, timeout=30)
         if response.status_code == 200:
             result = response.json()
             if result.get('ok'):
@@ -118,7 +118,7 @@ async def error_handler(update, context):
             try:
                 # 强制删除webhook并清除所有待处理更新
                 delete_url = f"https://api.telegram.org/bot{BOT_TOKEN}/deleteWebhook?drop_pending_updates=true"
-                response = requests.get(delete_url, timeout=30)
+                response = get_session().get(delete_url, timeout=30)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -6,11 +6,11 @@ import sys
 import time
 import logging
 import subprocess
-import requests
-import signal
-import psutil
+from http_session import get_session
 from dotenv import load_dotenv
 
+from supervisor import DEFAULT_SUPERVISOR_CONFIG, stop_running, find_bot_processes, wait_until
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -23,72 +23,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 def kill_existing_bots():
-    """强制终止所有可能正在运行的bot进程"""
-    logger.info("正在检查并终止所有可能的bot实例...")
-    
-    # 方法1: 使用psutil查找和终止所有包含"bot.py"或"simple_bot.py"的Python进程
-    killed_processes = []
-    current_pid = os.getpid()  # 获取当前进程的PID，避免终止自身
-    
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-        try:
-            # 跳过当前进程
-            if proc.info['pid'] == current_pid:
-                continue
-                
-            # 检查命令行参数中是否包含bot.py或simple_bot.py
-            if proc.info['cmdline'] and any(bot_file in ' '.join(proc.info['cmdline']) 
-                                            for bot_file in ['bot.py', 'simple_bot.py']):
-                logger.info(f"发现bot进程: PID={proc.info['pid']}, CMD={' '.join(proc.info['cmdline'])}")
-                # 发送SIGKILL信号强制终止进程
-                try:
-                    os.kill(proc.info['pid'], signal.SIGKILL)
-                    killed_processes.append(proc.info['pid'])
-                    logger.info(f"已终止进程 {proc.info['pid']}")
-                except Exception as e:
-                    logger.error(f"终止进程 {proc.info['pid']} 时出错: {str(e)}")
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    
-    # 方法2: 使用shell命令查找和终止进程
-    try:
-        # 查找并杀死所有python中包含bot.py的进程
-        subprocess.run("pkill -9 -f 'python.*bot\.py'", shell=True)
-        # 再次使用killall确保Python进程被终止
-        subprocess.run("killall -9 python python3 | true", shell=True)
-        logger.info("已执行额外的进程终止命令")
-    except Exception as e:
-        logger.error(f"执行shell终止命令时出错: {str(e)}")
-    
-    # 等待进程完全终止
-    if killed_processes:
-        logger.info(f"等待20秒确保所有进程已完全终止...")
-        time.sleep(20)
-        
-        # 验证进程是否已终止
-        still_running = []
-        for pid in killed_processes:
-            try:
-                # 如果进程仍然存在，os.kill将不会引发异常
-                os.kill(pid, 0)
-                still_running.append(pid)
-            except OSError:
-                # 进程不存在，正常情况
-                pass
-        
-        if still_running:
-            logger.warning(f"以下进程仍在运行: {still_running}")
-            # 再次尝试终止
-            for pid in still_running:
-                try:
-                    os.kill(pid, signal.SIGKILL)
-                    logger.info(f"再次尝试终止进程 {pid}")
-                except Exception:
-                    pass
-            # 最后等待一次
-            time.sleep(10)
-    else:
-        logger.info("未发现正在运行的bot进程")
+    """优雅停止所有正在运行的bot进程（SIGTERM，超时后才SIGKILL）"""
+    logger.info("正在检查并停止所有可能的bot实例...")
+    
+    # 旧实例收到SIGTERM后停止轮询、处理完进行中的任务并保存缓存，退出后立即返回
+    stopped = stop_running(os.getenv('PID_FILE', DEFAULT_SUPERVISOR_CONFIG['pid_file']))
+    if stopped:
+        logger.info(f"已停止bot进程: {stopped}")
+    
+    # 验证进程是否已终止
+    still_running = find_bot_processes()
+    if still_running:
+        logger.warning(f"以下进程仍在运行: {still_running}")
+        return False
     
     return True
 
@@ -116,7 +63,7 @@ def reset_telegram_connection():
     try:
         # 1. 检查当前webhook状态
         webhook_info_url = f"https://api.telegram.org/bot{BOT_TOKEN}/getWebhookInfo"
-        response = requests.get(webhook_info_url, proxies=proxies if proxies else None, timeout=30)
+        response = get_session().get(webhook_info_url, proxies=proxies if proxies else None, timeout=30)
         
         if response.status_code == 200:
             webhook_info = response.json()
@@ -138,7 +85,7 @@ def reset_telegram_connection():
         
         for i in range(max_retries):
             try:
-                response = requests.get(delete_webhook_url, proxies=proxies if proxies else None, timeout=30)
+                response = get_session().get(delete_webhook_url, proxies=proxies if proxies else None, timeout=30)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -168,31 +115,21 @@ def reset_telegram_connection():
             logger.error("删除webhook失败，达到最大重试次数")
             return False
         
-        # 3. 等待API完全处理请求
-        logger.info("等待60秒确保Telegram API完全处理请求...")
-        time.sleep(60)
+        # 3. 轮询验证webhook已被删除（最多60秒，删除生效后立即继续）
+        def webhook_deleted():
+            try:
+                response = get_session().get(webhook_info_url, proxies=proxies if proxies else None, timeout=30)
+                webhook_info = response.json() if response.status_code == 200 else {}
+                return webhook_info.get('ok', False) and not webhook_info.get('result', {}).get('url', '')
+            except Exception as e:
+                logger.error(f"验证webhook删除状态时出错: {str(e)}")
+                return False
         
-        # 4. 验证webhook已被删除
-        try:
-            response = requests.get(webhook_info_url, proxies=proxies if proxies else None, timeout=30)
-            
-            if response.status_code == 200:
-                webhook_info = response.json()
-                if webhook_info.get('ok'):
-                    webhook_url = webhook_info.get('result', {}).get('url', '')
-                    if not webhook_url:
-                        logger.info("验证成功: webhook已被完全删除")
-                        return True
-                    else:
-                        logger.warning(f"webhook未完全删除，当前URL仍为: {webhook_url}")
-                        return False
-            
-            logger.error("验证webhook删除状态失败")
-            return False
-            
-        except Exception as e:
-            logger.error(f"验证webhook删除状态时出错: {str(e)}")
-            return False
+        if wait_until(webhook_deleted, 60, interval=2):
+            logger.info("验证成功: webhook已被完全删除")
+            return True
+        logger.warning("webhook在60秒内未完全删除")
+        return False
     
     except Exception as e:
         logger.error(f"重置Telegram连接时出错: {str(e)}")
@@ -228,7 +165,7 @@ def main():
     """主函数"""
     logger.info("=== 开始安全启动Bot程序 ===")
     
-    # 步骤1: 终止所有现有的bot实例
+    # 步骤1: 优雅停止所有现有的bot实例
     if not kill_existing_bots():
         logger.error("终止现有bot实例失败，中止启动")
         return
@@ -236,9 +173,6 @@ def main():
     # 步骤2: 重置Telegram API连接
     if not reset_telegram_connection():
         logger.warning("重置Telegram API连接可能不完全，将继续尝试启动")
-        # 额外等待时间以防万一
-        logger.info("额外等待30秒...")
-        time.sleep(30)
     
     # 步骤3: 启动指定的bot
     bot_type = 'main'  # 默认启动main bot
@@ -6,24 +6,20 @@
 echo "=== 交易信号机器人启动脚本 ==="
 echo "$(date) - 开始执行启动流程"
 
-# 1. 停止所有 Python 进程
-echo "正在停止所有 Python 进程..."
-pkill -9 -f python
-sleep 5
-echo "等待进程完全终止..."
-sleep 3
-
-# 2. 激活虚拟环境
+# 1. 激活虚拟环境
 echo "正在激活虚拟环境..."
 source .venv/bin/activate
 
-# 3. 清理 Telegram webhook
+# 2. 优雅停止旧实例（SIGTERM，旧实例处理完进行中的任务并保存缓存后退出，超时才强制终止）
+echo "正在停止现有的 bot 实例..."
+python supervisor.py stop
+
+# 3. 清理 Telegram webhook（bot.py 启动时会轮询确认删除生效，无需在这里等待）
 echo "正在清理 Telegram webhook..."
 TELEGRAM_BOT_TOKEN=$(grep TELEGRAM_BOT_TOKEN .env | cut -d '=' -f2)
 echo "正在删除 webhook..."
 curl -s "https://api.telegram.org/bot$TELEGRAM_BOT_TOKEN/deleteWebhook?drop_pending_updates=true"
-echo -e "\nwebhook 已删除，等待 Telegram API 完全处理..."
-sleep 10
+echo -e "\nwebhook 已删除"
 
 # 4. 启动机器人
 echo "正在启动机器人..."
@@ -0,0 +1,90 @@
+"""
+启动加载模块
+
+机器人启动时，pandas、ta、binance等重量级模块的导入和Binance客户端的创建（需要访问网络）
+放到后台线程中进行，与Telegram连接的建立并行，不依赖市场数据的命令（/start、/help）可以立即回复，
+需要市场数据的命令在首次使用时等待加载完成
+"""
+
+import time
+import asyncio
+import logging
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Callable, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundLoader:
+    """
+    后台加载器
+
+    start()立即返回并在后台线程中调用factory()，get()和wait()等待加载完成后返回结果；
+    加载失败时异常会抛给等待方，下一次start()、get()或wait()重新加载
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        """
+        初始化后台加载器
+
+        Args:
+            name: 名称，用于日志和耗时统计（startup.<name>阶段）
+            factory: 创建对象的函数，在后台线程中调用
+        """
+        self.name = name
+        self.factory = factory
+        self.loaded_in = None
+        self._future = None
+        self._lock = Lock()
+
+    def start(self) -> Future:
+        """
+        开始加载（已在加载或已加载成功时不重复加载）
+
+        Returns:
+            加载结果的Future
+        """
+        with self._lock:
+            future = self._future
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._future = Future()
+                Thread(target=self._load, args=(future,), name=f"load-{self.name}", daemon=True).start()
+            return future
+
+    def _load(self, future: Future) -> None:
+        started = time.perf_counter()
+        try:
+            with metrics.span(f"startup.{self.name}"):
+                value = self.factory()
+        except Exception as e:
+            logger.error(f"加载{self.name}失败: {str(e)}")
+            future.set_exception(e)
+            return
+        self.loaded_in = time.perf_counter() - started
+        logger.info(f"{self.name}加载完成，耗时{self.loaded_in:.2f}秒")
+        future.set_result(value)
+
+    @property
+    def ready(self) -> bool:
+        """是否已加载成功"""
+        future = self._future
+        return future is not None and future.done() and future.exception() is None
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        获取加载结果（在线程中调用，必要时阻塞等待）
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            factory()的返回值
+        """
+        return self.start().result(timeout)
+
+    async def wait(self) -> Any:
+        """在事件循环中等待加载结果，不阻塞事件循环（等待方被取消时不取消加载，其他等待方不受影响）"""
+        return await asyncio.shield(asyncio.wrap_future(self.start()))
@@ -6,19 +6,11 @@
 echo "=== 交易信号机器人停止脚本 ==="
 echo "$(date) - 开始执行停止流程"
 
-# 1. 使用 pkill 停止 Python 进程
-echo "正在停止 Python 进程..."
-pkill -9 -f "python.*bot.py"
-pkill -9 -f "python.*simple_bot.py"
-echo "等待进程终止..."
-sleep 3
+# 1. 优雅停止：发送 SIGTERM，等待进行中的任务完成、缓存保存后退出，超时后才发送 SIGKILL
+echo "正在停止 bot 进程..."
+python supervisor.py stop
 
-# 2. 使用 pgrep + kill 终止进程
-echo "使用 kill 确保进程终止..."
-pgrep -f "python.*bot.py|python.*simple_bot.py" | xargs -I{} kill -9 {} 2>/dev/null || true
-sleep 3
-
-# 3. 检查是否仍有进程在运行
+# 2. 检查是否仍有进程在运行
 echo "验证进程是否已终止..."
 REMAINING=$(ps aux | grep 'python.*bot.py\|python.*simple_bot.py' | grep -v grep)
 if [ -z "$REMAINING" ]; then
@@ -42,7 +34,7 @@ else
     fi
 fi
 
-# 4. 清理 Telegram webhook
+# 3. 清理 Telegram webhook
 echo "正在清理 Telegram webhook..."
 TELEGRAM_BOT_TOKEN=$(grep TELEGRAM_BOT_TOKEN .env | cut -d '=' -f2)
 echo "正在删除 webhook..."
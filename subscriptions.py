@@ -0,0 +1,418 @@
+"""
+信号订阅推送模块
+
+用户通过/subscribe订阅(币种, 策略)，调度器在策略基准K线收盘后运行一次推送周期：
+每个(币种, 策略)只分析一次，再把同一份报告分发给所有订阅者
+（close模式每次收盘都推送，change模式只在推荐方向变化时推送），
+消息通过限速发送器排队发送，订阅数据保存在JSON文件中
+"""
+
+import os
+import json
+import logging
+from threading import Lock
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+
+from metrics import metrics
+from market_cache import STRATEGY_BASE_INTERVAL
+from cache_warmer import CRON_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 支持的策略和推送模式
+VALID_STRATEGIES = ['short', 'mid', 'long']
+VALID_MODES = ['close', 'change']
+
+# 默认订阅配置（与config.example.json中的subscriptions一致）
+DEFAULT_SUBSCRIPTION_CONFIG = {
+    'enabled': True,
+    'store_file': 'subscriptions.json',
+    'max_per_chat': 10,
+    'default_mode': 'close',
+    'delay_seconds': 5,
+    'report_chat_id': None,
+    'report_symbols': [],
+    'report_strategies': ['short']
+}
+
+# 策略名称
+STRATEGY_NAMES = {
+    'short': '短期',
+    'mid': '中期',
+    'long': '长期'
+}
+
+# 推送模式说明
+MODE_NAMES = {
+    'close': '每次收盘推送',
+    'change': '方向变化时推送'
+}
+
+
+def signal_direction(values: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    从报告的结构化结果中取推荐方向
+
+    Args:
+        values: MarketAnalyzer.analyze_signal返回的结构化结果，direction为措辞键（例如short.direction.cautious_long）
+
+    Returns:
+        long、short或neutral，没有结构化结果（例如分析失败）时返回None
+    """
+    if not values:
+        return None
+    direction = str(values.get('direction') or '').rsplit('.', 1)[-1]
+    if direction.endswith('long'):
+        return 'long'
+    if direction.endswith('short'):
+        return 'short'
+    return 'neutral'
+
+
+class SubscriptionStore:
+    """
+    订阅数据存储
+
+    保存(币种, 策略) -> {聊天ID: 推送模式}以及上次推送的方向，线程安全
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化订阅存储
+
+        Args:
+            path: JSON文件路径，为None时只保存在内存中
+        """
+        self.path = path
+        self._subscriptions = {}
+        self._directions = {}
+        self._lock = Lock()
+        self._load()
+
+    @staticmethod
+    def _key(symbol: str, strategy: str) -> str:
+        return f"{symbol}:{strategy}"
+
+    def _load(self) -> None:
+        """从文件加载订阅数据"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, chats in data.get('subscriptions', {}).items():
+                self._subscriptions[key] = {int(chat_id): mode for chat_id, mode in chats.items()}
+            self._directions = dict(data.get('directions', {}))
+            logger.info(f"已加载{len(self._subscriptions)}组订阅")
+        except Exception as e:
+            logger.error(f"加载订阅数据时出错: {str(e)}")
+
+    def _save(self) -> None:
+        """保存订阅数据到文件（调用方需持有锁）"""
+        if not self.path:
+            return
+        try:
+            data = {
+                'subscriptions': {key: {str(chat_id): mode for chat_id, mode in chats.items()}
+                                  for key, chats in self._subscriptions.items()},
+                'directions': self._directions
+            }
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"保存订阅数据时出错: {str(e)}")
+
+    def add(self, chat_id: int, symbol: str, strategy: str, mode: str) -> None:
+        """
+        添加或更新订阅
+
+        Args:
+            chat_id: 聊天ID
+            symbol: 币种
+            strategy: 策略类型
+            mode: 推送模式
+        """
+        with self._lock:
+            self._subscriptions.setdefault(self._key(symbol, strategy), {})[chat_id] = mode
+            self._save()
+
+    def remove(self, chat_id: int, symbol: Optional[str] = None, strategy: Optional[str] = None) -> int:
+        """
+        取消订阅
+
+        Args:
+            chat_id: 聊天ID
+            symbol: 币种，为None时取消该聊天的全部订阅
+            strategy: 策略类型，为None时取消该币种的全部策略
+
+        Returns:
+            取消的订阅数
+        """
+        removed = 0
+        with self._lock:
+            for key in list(self._subscriptions):
+                key_symbol, key_strategy = key.split(':')
+                if symbol is not None and key_symbol != symbol:
+                    continue
+                if strategy is not None and key_strategy != strategy:
+                    continue
+                chats = self._subscriptions[key]
+                if chats.pop(chat_id, None) is not None:
+                    removed += 1
+                if not chats:
+                    del self._subscriptions[key]
+                    self._directions.pop(key, None)
+            if removed:
+                self._save()
+        return removed
+
+    def for_chat(self, chat_id: int) -> List[Tuple[str, str, str]]:
+        """
+        获取聊天的所有订阅
+
+        Args:
+            chat_id: 聊天ID
+
+        Returns:
+            (币种, 策略, 推送模式)列表
+        """
+        with self._lock:
+            result = []
+            for key, chats in sorted(self._subscriptions.items()):
+                if chat_id in chats:
+                    symbol, strategy = key.split(':')
+                    result.append((symbol, strategy, chats[chat_id]))
+            return result
+
+    def groups(self, strategy: str) -> Dict[str, Dict[int, str]]:
+        """
+        获取某个策略下各币种的订阅者
+
+        Args:
+            strategy: 策略类型
+
+        Returns:
+            币种 -> {聊天ID: 推送模式}
+        """
+        with self._lock:
+            result = {}
+            for key, chats in self._subscriptions.items():
+                symbol, key_strategy = key.split(':')
+                if key_strategy == strategy and chats:
+                    result[symbol] = dict(chats)
+            return result
+
+    def last_direction(self, symbol: str, strategy: str) -> Optional[str]:
+        """获取上次推送周期的推荐方向"""
+        with self._lock:
+            return self._directions.get(self._key(symbol, strategy))
+
+    def set_direction(self, symbol: str, strategy: str, direction: str) -> None:
+        """记录本次推送周期的推荐方向"""
+        with self._lock:
+            key = self._key(symbol, strategy)
+            if self._directions.get(key) != direction:
+                self._directions[key] = direction
+                self._save()
+
+
+class SubscriptionManager:
+    """
+    订阅推送管理器
+
+    在后台线程中按K线收盘时间运行推送周期，通过deliver回调把报告交给限速发送器
+    """
+
+    def __init__(self, analyzer, deliver: Callable[[int, str], None],
+                 config: Optional[Dict[str, Any]] = None, store: Optional[SubscriptionStore] = None):
+        """
+        初始化订阅管理器
+
+        Args:
+            analyzer: MarketAnalyzer实例
+            deliver: 发送回调deliver(chat_id, text)，需要线程安全（例如TelegramSender.enqueue_threadsafe）
+            config: 订阅配置（见config.example.json中的subscriptions）
+            store: 订阅存储，默认按store_file创建
+        """
+        self.analyzer = analyzer
+        self.deliver = deliver
+        self.config = dict(DEFAULT_SUBSCRIPTION_CONFIG)
+        self.config.update(config or {})
+        self.store = store or SubscriptionStore(self.config['store_file'])
+        self.scheduler = None
+
+    def static_subscribers(self, strategy: str) -> Dict[str, Dict[int, str]]:
+        """
+        获取配置的固定推送目标（chat_id_for_reports）
+
+        Args:
+            strategy: 策略类型
+
+        Returns:
+            币种 -> {聊天ID: 推送模式}
+        """
+        chat_id = self.config['report_chat_id']
+        if chat_id is None or strategy not in self.config['report_strategies']:
+            return {}
+        return {symbol.upper(): {int(chat_id): 'close'} for symbol in self.config['report_symbols']}
+
+    def run_cycle(self, strategy: str) -> int:
+        """
+        运行一次推送周期：每个订阅的币种分析一次并分发给所有订阅者
+
+        Args:
+            strategy: 策略类型
+
+        Returns:
+            加入发送队列的消息数
+        """
+        groups = self.store.groups(strategy)
+        for symbol, chats in self.static_subscribers(strategy).items():
+            groups.setdefault(symbol, {}).update(chats)
+
+        pushed = 0
+        for symbol, chats in groups.items():
+            try:
+                with metrics.span('subscription.analyze', strategy=strategy, symbol=symbol):
+                    values, report = self.analyzer.analyze_signal(symbol, strategy)
+                metrics.inc('subscription_analyses_total', strategy=strategy)
+            except Exception as e:
+                logger.error(f"分析订阅的{symbol}的{strategy}报告时出错: {str(e)}")
+                continue
+
+            direction = signal_direction(values)
+            if direction is None:
+                logger.warning(f"{symbol}的{strategy}报告生成失败，本周期不推送")
+                continue
+            changed = direction != self.store.last_direction(symbol, strategy)
+            self.store.set_direction(symbol, strategy, direction)
+
+            for chat_id, mode in chats.items():
+                if mode == 'change' and not changed:
+                    continue
+                try:
+                    self.deliver(chat_id, report)
+                    pushed += 1
+                except Exception as e:
+                    logger.error(f"推送{symbol}报告到 {chat_id} 时出错: {str(e)}")
+
+        metrics.inc('subscription_pushes_total', pushed, strategy=strategy)
+        logger.info(f"{strategy}订阅推送周期完成：分析{len(groups)}个币种，推送{pushed}条消息")
+        return pushed
+
+    def handle_subscribe(self, chat_id: int, args: List[str]) -> str:
+        """
+        处理/subscribe命令
+
+        Args:
+            chat_id: 聊天ID
+            args: 命令参数：币种 [策略] [推送模式]
+
+        Returns:
+            回复文本
+        """
+        if not args:
+            return ("请指定要订阅的交易对，例如：/subscribe BTC short\n"
+                    "可选推送模式：close（每次收盘推送，默认）或 change（方向变化时推送），"
+                    "例如：/subscribe ETH mid change")
+        symbol = args[0].upper()
+        strategy = args[1].lower() if len(args) > 1 else 'short'
+        mode = args[2].lower() if len(args) > 2 else self.config['default_mode']
+        if strategy not in VALID_STRATEGIES:
+            return "无效的策略类型，请使用 short、mid 或 long"
+        if mode not in VALID_MODES:
+            return "无效的推送模式，请使用 close 或 change"
+        # 未上架的交易对每个周期都会分析失败，订阅前按交易对索引拒绝
+        symbol_index = getattr(getattr(self.analyzer, 'market_data', None), 'symbols', None)
+        rejection = symbol_index.reject_message([symbol]) if symbol_index is not None else None
+        if rejection:
+            return rejection
+
+        current = self.store.for_chat(chat_id)
+        exists = any(item[0] == symbol and item[1] == strategy for item in current)
+        if not exists and len(current) >= self.config['max_per_chat']:
+            return f"每个聊天最多订阅{self.config['max_per_chat']}组，请先使用 /unsubscribe 取消部分订阅"
+
+        self.store.add(chat_id, symbol, strategy, mode)
+        metrics.inc('subscriptions_changed_total', action='subscribe')
+        interval = STRATEGY_BASE_INTERVAL[strategy]
+        logger.info(f"聊天 {chat_id} 订阅了{symbol}的{strategy}报告，模式: {mode}")
+        return (f"已订阅 {symbol} 的{STRATEGY_NAMES[strategy]}信号（{MODE_NAMES[mode]}），"
+                f"将在每根{interval}K线收盘后检查")
+
+    def handle_unsubscribe(self, chat_id: int, args: List[str]) -> str:
+        """
+        处理/unsubscribe命令
+
+        Args:
+            chat_id: 聊天ID
+            args: 命令参数：币种 [策略]，或all取消全部
+
+        Returns:
+            回复文本
+        """
+        if not args:
+            return "请指定要取消的交易对，例如：/unsubscribe BTC short，或使用 /unsubscribe all 取消全部订阅"
+        if args[0].lower() == 'all':
+            removed = self.store.remove(chat_id)
+        else:
+            strategy = args[1].lower() if len(args) > 1 else None
+            removed = self.store.remove(chat_id, args[0].upper(), strategy)
+        if not removed:
+            return "没有找到对应的订阅"
+        metrics.inc('subscriptions_changed_total', removed, action='unsubscribe')
+        logger.info(f"聊天 {chat_id} 取消了{removed}个订阅")
+        return f"已取消{removed}个订阅"
+
+    def describe(self, chat_id: int) -> str:
+        """
+        生成订阅列表文本
+
+        Args:
+            chat_id: 聊天ID
+
+        Returns:
+            回复文本
+        """
+        items = self.store.for_chat(chat_id)
+        if not items:
+            return "当前没有订阅，使用 /subscribe BTC short 开始订阅"
+        lines = ["当前订阅："]
+        for symbol, strategy, mode in items:
+            lines.append(f"• {symbol} {STRATEGY_NAMES.get(strategy, strategy)}（{MODE_NAMES.get(mode, mode)}）")
+        return '\n'.join(lines)
+
+    def start(self) -> bool:
+        """
+        启动后台调度
+
+        Returns:
+            是否已启动
+        """
+        if not self.config['enabled']:
+            logger.info("订阅推送未启用")
+            return False
+
+        self.scheduler = BackgroundScheduler(daemon=True, timezone='UTC')
+        for strategy in VALID_STRATEGIES:
+            interval = STRATEGY_BASE_INTERVAL[strategy]
+            trigger = CronTrigger(second=self.config['delay_seconds'], timezone='UTC', **CRON_FIELDS[interval])
+            self.scheduler.add_job(
+                self.run_cycle, trigger, args=[strategy], id=f"subscription_{strategy}",
+                max_instances=1, coalesce=True, misfire_grace_time=60
+            )
+            logger.info(f"已添加{strategy}订阅推送任务，周期: {interval}")
+        self.scheduler.start()
+        return True
+
+    def stop(self) -> None:
+        """停止后台调度"""
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+            logger.info("订阅推送调度已停止")
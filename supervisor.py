@@ -0,0 +1,450 @@
+"""
+进程管理模块
+
+替代原来的kill -9加固定等待的重启方式：
+- PidFile: 带文件锁的PID文件，保证同一时间只有一个机器人实例在轮询Telegram
+- stop_running/stop_process: 向旧实例发送SIGTERM，等待其处理完进行中的任务后退出，超时才发送SIGKILL
+- install_shutdown_signals/drain_executor/drain_queue: 机器人收到SIGTERM后停止接收更新并排空任务
+- save_caches/load_caches/cache_registry: 退出时把未过期的缓存保存到磁盘，启动时重新加载
+
+用法:
+    python supervisor.py stop               # 优雅停止正在运行的bot.py
+    python supervisor.py restart            # 停止后在后台启动新的bot.py
+"""
+
+import os
+import sys
+import time
+import pickle
+import signal
+import asyncio
+import logging
+import argparse
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows上没有fcntl，只写入PID不加锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 默认配置（bot.py中可通过PID_FILE、CACHE_SNAPSHOT_FILE、SHUTDOWN_TIMEOUT环境变量覆盖）
+DEFAULT_SUPERVISOR_CONFIG = {
+    'pid_file': os.path.join(BASE_DIR, 'bot.pid'),
+    'cache_file': os.path.join(BASE_DIR, 'cache_snapshot.pkl'),
+    # 旧实例排空任务的最长时间（秒），超时后发送SIGKILL
+    'stop_timeout': 30,
+    # 收到SIGTERM后等待进行中的分析任务和待发送消息的最长时间（秒）
+    'drain_timeout': 20
+}
+
+# 没有PID文件时（例如旧版本启动的实例）按命令行匹配的脚本，main.py为BotManager启动的TelegramTradingBot
+BOT_SCRIPTS = ('bot.py', 'simple_bot.py', 'main.py')
+
+
+class PidFile:
+    """
+    带文件锁的PID文件
+
+    acquire()成功后持有排他锁直到release()或进程退出（进程被SIGKILL时锁由系统释放），
+    其他进程可以通过read()读取持有者的PID
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化PID文件
+
+        Args:
+            path: PID文件路径
+        """
+        self.path = path
+        self._file = None
+
+    def acquire(self) -> bool:
+        """
+        获取锁并写入当前进程的PID
+
+        Returns:
+            是否获取成功，其他进程持有锁时返回False
+        """
+        if self._file is not None:
+            return True
+        handle = open(self.path, 'a+')
+        if fcntl is not None:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                handle.close()
+                return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._file = handle
+        return True
+
+    def release(self) -> None:
+        """删除PID文件并释放锁"""
+        if self._file is None:
+            return
+        try:
+            if PidFile.read(self.path) == os.getpid():
+                os.remove(self.path)
+        except OSError:
+            pass
+        self._file.close()
+        self._file = None
+
+    @staticmethod
+    def read(path: str) -> Optional[int]:
+        """
+        读取PID文件
+
+        Args:
+            path: PID文件路径
+
+        Returns:
+            PID，文件不存在或内容无效时返回None
+        """
+        try:
+            with open(path, 'r') as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+
+def is_running(pid: int) -> bool:
+    """
+    检查进程是否仍在运行（僵尸进程视为已退出）
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        是否在运行
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except ImportError:
+        try:
+            os.kill(pid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+    except Exception:
+        return False
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float, interval: float = 0.1) -> bool:
+    """
+    轮询直到条件满足或超时（代替固定时长的等待）
+
+    Args:
+        predicate: 条件函数
+        timeout: 最长等待时间（秒）
+        interval: 轮询间隔（秒）
+
+    Returns:
+        条件是否满足
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        if predicate():
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def stop_process(pid: int, timeout: float = DEFAULT_SUPERVISOR_CONFIG['stop_timeout']) -> bool:
+    """
+    优雅停止进程：发送SIGTERM并等待退出，超时后发送SIGKILL
+
+    Args:
+        pid: 进程ID
+        timeout: 等待进程自行退出的最长时间（秒）
+
+    Returns:
+        进程是否已退出
+    """
+    if pid == os.getpid() or not is_running(pid):
+        return True
+    started = time.monotonic()
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return True
+    except Exception as e:
+        logger.error(f"向进程 {pid} 发送SIGTERM失败: {str(e)}")
+        return False
+    return wait_or_kill(pid, timeout, started)
+
+
+def wait_or_kill(pid: int, timeout: float, started: Optional[float] = None) -> bool:
+    """
+    等待已收到SIGTERM的进程退出，超时后发送SIGKILL（不再重复发送SIGTERM）
+
+    Args:
+        pid: 进程ID
+        timeout: 等待进程自行退出的最长时间（秒）
+        started: 发送SIGTERM的时间（time.monotonic()），用于记录退出耗时
+
+    Returns:
+        进程是否已退出
+    """
+    started = time.monotonic() if started is None else started
+    if wait_until(lambda: not is_running(pid), timeout):
+        logger.info(f"进程 {pid} 已退出，耗时{time.monotonic() - started:.1f}秒")
+        return True
+
+    logger.warning(f"进程 {pid} 在{timeout}秒内未退出，发送SIGKILL")
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        return True
+    except Exception as e:
+        logger.error(f"向进程 {pid} 发送SIGKILL失败: {str(e)}")
+        return False
+    return wait_until(lambda: not is_running(pid), 5)
+
+
+def find_bot_processes(scripts=BOT_SCRIPTS) -> List[int]:
+    """
+    按命令行查找机器人进程（不包括当前进程和父进程）
+
+    Args:
+        scripts: 脚本文件名
+
+    Returns:
+        进程ID列表
+    """
+    import psutil
+
+    excluded = {os.getpid(), os.getppid()}
+    pids = []
+    for proc in psutil.process_iter(['pid', 'cmdline']):
+        try:
+            cmdline = proc.info['cmdline'] or []
+            if proc.info['pid'] in excluded or not cmdline or 'python' not in os.path.basename(cmdline[0]):
+                continue
+            if any(os.path.basename(arg) in scripts for arg in cmdline[1:]):
+                pids.append(proc.info['pid'])
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
+    return pids
+
+
+def stop_running(pid_file: str = DEFAULT_SUPERVISOR_CONFIG['pid_file'],
+                 timeout: float = DEFAULT_SUPERVISOR_CONFIG['stop_timeout'],
+                 scripts=BOT_SCRIPTS) -> List[int]:
+    """
+    优雅停止正在运行的机器人实例
+
+    优先停止PID文件中记录的进程；scripts不为空时再按命令行查找其他机器人进程（旧版本启动的实例），
+    所有进程同时收到SIGTERM，总等待时间不超过timeout
+
+    Args:
+        pid_file: PID文件路径
+        timeout: 等待进程退出的最长时间（秒）
+        scripts: 按命令行匹配的脚本文件名，为空时只停止PID文件中的进程
+
+    Returns:
+        已停止的进程ID列表
+    """
+    pids = []
+    pid = PidFile.read(pid_file)
+    if pid is not None and pid != os.getpid() and is_running(pid):
+        pids.append(pid)
+    if scripts:
+        try:
+            pids.extend(item for item in find_bot_processes(scripts) if item not in pids)
+        except Exception as e:
+            logger.error(f"查找机器人进程时出错: {str(e)}")
+    if not pids:
+        logger.info("未发现正在运行的机器人实例")
+        return []
+
+    logger.info(f"正在优雅停止机器人实例: {pids}")
+    started = time.monotonic()
+    deadline = started + timeout
+    signalled = []
+    for item in pids:
+        try:
+            os.kill(item, signal.SIGTERM)
+            signalled.append(item)
+        except ProcessLookupError:
+            signalled.append(item)
+        except Exception as e:
+            logger.error(f"向进程 {item} 发送SIGTERM失败: {str(e)}")
+    # 所有进程已收到SIGTERM，这里只等待退出，超时才发送SIGKILL
+    stopped = []
+    for item in signalled:
+        if wait_or_kill(item, max(0.0, deadline - time.monotonic()), started):
+            stopped.append(item)
+    return stopped
+
+
+def install_shutdown_signals(loop: asyncio.AbstractEventLoop) -> asyncio.Event:
+    """
+    在事件循环中注册SIGTERM和SIGINT处理函数
+
+    Args:
+        loop: 事件循环（需在主线程中运行）
+
+    Returns:
+        收到信号时被设置的事件
+    """
+    event = asyncio.Event()
+
+    def handle(sig):
+        logger.info(f"收到{sig.name}信号，开始优雅关闭")
+        event.set()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, handle, sig)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Windows或非主线程中不支持，SIGINT仍会触发KeyboardInterrupt
+            pass
+    return event
+
+
+async def drain_executor(executor, timeout: float) -> bool:
+    """
+    停止线程池接收新任务并等待已提交的任务完成
+
+    Args:
+        executor: concurrent.futures线程池
+        timeout: 最长等待时间（秒）
+
+    Returns:
+        是否在超时前完成
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.wait_for(loop.run_in_executor(None, executor.shutdown, True), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+async def drain_queue(queue, timeout: float, interval: float = 0.05) -> bool:
+    """
+    等待queue.Queue中的任务全部处理完（task_done）
+
+    Args:
+        queue: 队列
+        timeout: 最长等待时间（秒）
+        interval: 检查间隔（秒）
+
+    Returns:
+        是否在超时前处理完
+    """
+    deadline = time.monotonic() + timeout
+    while queue.unfinished_tasks:
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+
+def save_caches(path: str, caches: Dict[str, Any]) -> int:
+    """
+    把缓存中未过期的条目保存到磁盘（先写临时文件再替换）
+
+    Args:
+        path: 快照文件路径
+        caches: 缓存名称到TTLCache的映射
+
+    Returns:
+        保存的条目数
+    """
+    try:
+        snapshot = {name: cache.snapshot() for name, cache in caches.items() if cache is not None}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'saved_at': time.time(), 'caches': snapshot}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        count = sum(len(items) for items in snapshot.values())
+        logger.info(f"已保存缓存快照 {path}，共{count}条")
+        return count
+    except Exception as e:
+        logger.error(f"保存缓存快照失败: {str(e)}")
+        return 0
+
+
+def load_caches(path: str, caches: Dict[str, Any]) -> int:
+    """
+    从磁盘加载缓存快照，已过期的条目被跳过
+
+    快照使用pickle格式，只应加载本机机器人自己写入的文件
+
+    Args:
+        path: 快照文件路径
+        caches: 缓存名称到TTLCache的映射
+
+    Returns:
+        加载的条目数
+    """
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path, 'rb') as f:
+            snapshot = pickle.load(f)
+        count = 0
+        for name, items in snapshot.get('caches', {}).items():
+            if caches.get(name) is not None:
+                count += caches[name].restore(items)
+        logger.info(f"已从 {path} 加载缓存快照，共{count}条")
+        return count
+    except Exception as e:
+        logger.error(f"加载缓存快照失败: {str(e)}")
+        return 0
+
+
+def cache_registry(market_data, market_analyzer) -> Dict[str, Any]:
+    """
+    重启时需要保存和加载的缓存
+
+    Args:
+        market_data: 市场数据实例
+        market_analyzer: 市场分析器实例
+
+    Returns:
+        缓存名称到TTLCache的映射，没有对应缓存时为None
+    """
+    return {
+        'klines': getattr(market_data, 'kline_cache', None),
+        'reports': getattr(market_analyzer, 'report_cache', None),
+        'snapshots': getattr(market_analyzer, 'snapshot_cache', None)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='机器人进程管理')
+    parser.add_argument('action', choices=['stop', 'restart'], help='stop: 优雅停止；restart: 停止后在后台启动')
+    parser.add_argument('--pid-file', default=os.getenv('PID_FILE', DEFAULT_SUPERVISOR_CONFIG['pid_file']))
+    parser.add_argument('--timeout', type=float, default=DEFAULT_SUPERVISOR_CONFIG['stop_timeout'],
+                        help='等待旧实例退出的最长时间（秒）')
+    parser.add_argument('--script', default='bot.py', help='restart时启动的脚本')
+    parser.add_argument('--log-file', default=os.path.join(BASE_DIR, 'bot_output.log'), help='restart时的输出日志')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stop_running(args.pid_file, args.timeout)
+    if args.action == 'restart':
+        with open(args.log_file, 'a') as log:
+            process = subprocess.Popen([sys.executable, os.path.join(BASE_DIR, args.script)], cwd=BASE_DIR,
+                                       stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        logger.info(f"机器人已在后台启动，PID: {process.pid}")
+
+
+if __name__ == '__main__':
+    main()
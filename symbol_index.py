@@ -0,0 +1,209 @@
+"""
+交易对元数据索引
+
+用一次现货exchangeInfo请求（永续合约市场另有一次）在内存中建立交易对索引，按refresh_seconds定期刷新：
+- 每个交易对的基础币种、计价币种、价格精度（tickSize），以及现货/永续合约是否可交易
+- 未上架的交易对在本地即可拒绝，并用difflib给出拼写相近的币种建议，不再经过K线接口的重试和退避
+- 没有现货的交易对直接使用CMC备用数据源，没有永续合约的交易对跳过合约接口
+索引尚未加载成功（例如无法连接Binance）时不拒绝、不跳过任何交易对
+"""
+
+import time
+import logging
+import difflib
+from threading import Lock, Thread
+from typing import Any, Dict, Iterable, List, Optional
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认索引配置（与config.example.json中market_data.symbol_index一致）
+DEFAULT_SYMBOL_INDEX_CONFIG = {
+    'enabled': True,
+    # 刷新间隔（秒），到期后下一次查询在后台刷新，刷新完成前继续使用旧索引
+    'refresh_seconds': 3600,
+    # 刷新失败后的重试间隔（秒）
+    'retry_seconds': 60,
+    # 用户输入的币种默认拼接的计价币种
+    'quote_asset': 'USDT',
+    # 未上架时最多给出的建议数
+    'max_suggestions': 3
+}
+
+
+def _tick_size(item: Dict[str, Any]) -> Optional[float]:
+    """exchangeInfo中交易对条目的价格精度（PRICE_FILTER的tickSize）"""
+    for price_filter in item.get('filters') or []:
+        if price_filter.get('filterType') == 'PRICE_FILTER':
+            return float(price_filter['tickSize'])
+    return None
+
+
+class SymbolIndex:
+    """
+    交易对元数据索引
+
+    查询只读取内存中的字典，可在任意线程（包括事件循环）中调用；
+    刷新在构造时同步执行一次，之后到期时由后台线程执行
+    """
+
+    def __init__(self, client, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化索引并加载一次
+
+        Args:
+            client: Binance客户端（需要get_exchange_info，futures_exchange_info可选）
+            config: 索引配置，见DEFAULT_SYMBOL_INDEX_CONFIG
+        """
+        settings = dict(DEFAULT_SYMBOL_INDEX_CONFIG)
+        settings.update(config or {})
+        self.client = client
+        self.enabled = bool(settings['enabled']) and hasattr(client, 'get_exchange_info')
+        self.refresh_seconds = settings['refresh_seconds']
+        self.retry_seconds = settings['retry_seconds']
+        self.quote_asset = settings['quote_asset']
+        self.max_suggestions = settings['max_suggestions']
+        self.symbols = {}
+        self.loaded_at = None
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = Lock()
+        if self.enabled:
+            self.refresh()
+
+    @property
+    def ready(self) -> bool:
+        """索引是否已成功加载"""
+        return self.loaded_at is not None
+
+    def refresh(self) -> bool:
+        """
+        请求exchangeInfo并重建索引，失败时保留旧索引
+
+        Returns:
+            是否刷新成功
+        """
+        try:
+            with metrics.span('symbol_index.refresh'):
+                symbols = {}
+                for item in self.client.get_exchange_info().get('symbols', []):
+                    symbols[item['symbol']] = {
+                        'symbol': item['symbol'],
+                        'base': item['baseAsset'],
+                        'quote': item['quoteAsset'],
+                        'tick_size': _tick_size(item),
+                        'spot': item.get('status') == 'TRADING',
+                        'futures': False
+                    }
+                if hasattr(self.client, 'futures_exchange_info'):
+                    for item in self.client.futures_exchange_info().get('symbols', []):
+                        if item.get('contractType') != 'PERPETUAL':
+                            continue
+                        entry = symbols.setdefault(item['symbol'], {
+                            'symbol': item['symbol'],
+                            'base': item['baseAsset'],
+                            'quote': item['quoteAsset'],
+                            'tick_size': _tick_size(item),
+                            'spot': False,
+                            'futures': False
+                        })
+                        entry['futures'] = item.get('status') == 'TRADING'
+            self.symbols = symbols
+            self.loaded_at = time.time()
+            self._next_refresh = self.loaded_at + self.refresh_seconds
+            logger.info(f"交易对索引已加载，共{len(symbols)}个交易对")
+            return True
+        except Exception as e:
+            self._next_refresh = time.time() + self.retry_seconds
+            logger.error(f"加载交易对索引失败: {str(e)}")
+            return False
+        finally:
+            self._refreshing = False
+
+    def _maybe_refresh(self) -> None:
+        """索引到期时在后台线程刷新（同一时间只有一个刷新线程）"""
+        if not self.enabled or time.time() < self._next_refresh:
+            return
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        Thread(target=self.refresh, name='symbol-index-refresh', daemon=True).start()
+
+    def trading_symbol(self, symbol: str) -> str:
+        """用户输入的币种转换为交易对，例如btc -> BTCUSDT"""
+        symbol = symbol.strip().upper()
+        return symbol if symbol.endswith(self.quote_asset) and len(symbol) > len(self.quote_asset) \
+            else f"{symbol}{self.quote_asset}"
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """
+        查询交易对的元数据
+
+        Args:
+            symbol: 币种或交易对，例如BTC、BTCUSDT
+
+        Returns:
+            包含symbol、base、quote、tick_size、spot、futures的字典，未上架时返回None
+        """
+        self._maybe_refresh()
+        return self.symbols.get(self.trading_symbol(symbol))
+
+    def is_listed(self, symbol: str) -> bool:
+        """交易对是否在现货或永续合约市场可交易（索引未加载时为True）"""
+        if not self.ready:
+            return True
+        info = self.get(symbol)
+        return info is not None and (info['spot'] or info['futures'])
+
+    def has_spot(self, symbol: str) -> bool:
+        """交易对是否有可交易的现货（索引未加载时为True）"""
+        if not self.ready:
+            return True
+        info = self.get(symbol)
+        return info is not None and info['spot']
+
+    def has_futures(self, symbol: str) -> bool:
+        """交易对是否有可交易的永续合约（索引未加载时为True）"""
+        if not self.ready:
+            return True
+        info = self.get(symbol)
+        return info is not None and info['futures']
+
+    def suggest(self, symbol: str) -> List[str]:
+        """
+        拼写相近的已上架币种
+
+        Args:
+            symbol: 币种或交易对
+
+        Returns:
+            按相似度排序的基础币种列表（计价币种为quote_asset的交易对）
+        """
+        base = self.trading_symbol(symbol)[:-len(self.quote_asset)]
+        candidates = [info['base'] for info in self.symbols.values()
+                      if info['quote'] == self.quote_asset and (info['spot'] or info['futures'])]
+        return difflib.get_close_matches(base, candidates, n=self.max_suggestions, cutoff=0.6)
+
+    def reject_message(self, symbols: Iterable[str]) -> Optional[str]:
+        """
+        检查用户输入的币种，生成未上架币种的提示
+
+        Args:
+            symbols: 币种列表
+
+        Returns:
+            提示文本（附带拼写相近的币种），全部已上架时返回None
+        """
+        lines = []
+        for symbol in symbols:
+            if self.is_listed(symbol):
+                continue
+            metrics.inc('symbols_rejected_total')
+            line = f"未找到交易对 {self.trading_symbol(symbol)}"
+            suggestions = self.suggest(symbol)
+            if suggestions:
+                line += f"，您是不是要找：{'、'.join(suggestions)}？"
+            lines.append(line)
+        return '\n'.join(lines) if lines else None
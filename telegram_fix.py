@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-import requests
+from http_session import get_session
 import os
 import time
 import logging
@@ -36,7 +36,7 @@ def get_webhook_info():
     logger.info("获取当前webhook信息...")
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getWebhookInfo"
     try:
-        response = requests.get(url, proxies=proxies, timeout=30)
+        response = get_session().get(url, proxies=proxies, timeout=30)
         data = response.json()
         if data.get("ok"):
             webhook_url = data.get("result", {}).get("url", "")
@@ -59,7 +59,7 @@ def delete_webhook():
     max_retries = 3
     for retry in range(max_retries):
         try:
-            response = requests.get(url, proxies=proxies, timeout=30)
+            response = get_session().get(url, proxies=proxies, timeout=30)
             data = response.json()
             
             if data.get("ok"):
@@ -85,7 +85,7 @@ def set_temp_webhook():
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/setWebhook?url={temp_url}"
     
     try:
-        response = requests.get(url, proxies=proxies, timeout=30)
+        response = get_session().get(url, proxies=proxies, timeout=30)
         data = response.json()
         
         if data.get("ok"):
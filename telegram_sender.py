@@ -0,0 +1,256 @@
+"""
+限速消息发送模块
+
+按Telegram的发送限制排队发送消息：
+- 全局：每秒最多global_rate条
+- 私聊：同一聊天每private_interval秒最多1条
+- 群组/频道（chat_id为负数）：同一聊天每group_interval秒最多1条（默认3秒，即每分钟20条）
+每个聊天有独立的队列，一个聊天受限时不会阻塞其他聊天的消息；
+同一聊天排队中参数相同（包括回复的消息ID）的多条消息会合并成一条发送；
+收到RetryAfter(429)时按retry_after暂停发送，网络错误按指数退避加随机抖动重试
+"""
+
+import time
+import heapq
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Dict, Any, Optional
+
+from telegram.error import RetryAfter, BadRequest, Forbidden, NetworkError
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认发送限制（参考Telegram Bot API的限制说明）
+DEFAULT_SENDER_CONFIG = {
+    'global_rate': 30,
+    'private_interval': 1.0,
+    'group_interval': 3.0,
+    'max_retries': 3,
+    'retry_base_delay': 1.0,
+    'merge': True,
+    'max_message_length': 4096
+}
+
+# 合并消息时的分隔符
+MERGE_SEPARATOR = '\n\n'
+
+
+class TelegramSender:
+    """
+    限速消息发送器
+
+    在机器人的事件循环中运行，enqueue可在事件循环内调用，
+    enqueue_threadsafe可在其他线程（例如分析线程、调度任务）中调用
+    """
+
+    def __init__(self, bot, config: Optional[Dict[str, Any]] = None):
+        """
+        初始化发送器
+
+        Args:
+            bot: telegram.Bot实例（需要提供send_message协程方法）
+            config: 发送配置，见DEFAULT_SENDER_CONFIG
+        """
+        settings = dict(DEFAULT_SENDER_CONFIG)
+        settings.update(config or {})
+        self.bot = bot
+        self.global_interval = 1.0 / settings['global_rate']
+        self.private_interval = settings['private_interval']
+        self.group_interval = settings['group_interval']
+        self.max_retries = settings['max_retries']
+        self.retry_base_delay = settings['retry_base_delay']
+        self.merge = settings['merge']
+        self.max_message_length = settings['max_message_length']
+        self.loop = None
+        self.sent = 0
+        self.failed = 0
+        self.merged = 0
+        self._queues = {}
+        self._ready = []
+        self._next_ready = {}
+        self._next_global = 0.0
+        self._in_flight = set()
+        self._tasks = set()
+        self._seq = 0
+        self._wakeup = None
+        self._running = False
+
+    def _chat_interval(self, chat_id: int) -> float:
+        """获取聊天的最小发送间隔"""
+        return self.group_interval if chat_id < 0 else self.private_interval
+
+    def pending(self) -> int:
+        """
+        获取待发送的消息数
+
+        Returns:
+            消息数（包括正在发送的消息）
+        """
+        return sum(len(queue) for queue in self._queues.values()) + len(self._in_flight)
+
+    def enqueue(self, chat_id: int, text: str, **kwargs) -> None:
+        """
+        将消息加入发送队列（需在事件循环中调用）
+
+        Args:
+            chat_id: 聊天ID
+            text: 消息文本
+            kwargs: 传给send_message的其他参数
+        """
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = deque()
+        queue.append([text, kwargs, time.perf_counter(), 0])
+        if len(queue) == 1 and chat_id not in self._in_flight:
+            self._schedule(chat_id)
+        self._wake()
+
+    def enqueue_threadsafe(self, chat_id: int, text: str, **kwargs) -> None:
+        """
+        从其他线程将消息加入发送队列
+
+        Args:
+            chat_id: 聊天ID
+            text: 消息文本
+            kwargs: 传给send_message的其他参数
+        """
+        if self.loop is None:
+            raise RuntimeError("发送器尚未启动")
+        self.loop.call_soon_threadsafe(lambda: self.enqueue(chat_id, text, **kwargs))
+
+    def pause(self, seconds: float) -> None:
+        """
+        暂停所有发送（例如其他代码收到RetryAfter时调用，需在事件循环中调用）
+
+        Args:
+            seconds: 暂停时间（秒）
+        """
+        self._next_global = max(self._next_global, time.monotonic() + seconds)
+        logger.warning(f"发送器暂停{seconds}秒")
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _schedule(self, chat_id: int) -> None:
+        """把聊天按其下次可发送时间放入就绪堆"""
+        self._seq += 1
+        heapq.heappush(self._ready, (self._next_ready.get(chat_id, 0.0), self._seq, chat_id))
+
+    def _take(self, chat_id: int):
+        """取出聊天队首的消息，并合并后续参数相同的消息（回复不同命令的消息不合并）"""
+        queue = self._queues[chat_id]
+        item = queue.popleft()
+        if self.merge and item[3] == 0:
+            while queue and queue[0][1] == item[1] and queue[0][3] == 0 and \
+                    len(item[0]) + len(MERGE_SEPARATOR) + len(queue[0][0]) <= self.max_message_length:
+                item[0] = item[0] + MERGE_SEPARATOR + queue.popleft()[0]
+                self.merged += 1
+                metrics.inc('messages_merged_total')
+        return item
+
+    async def _send(self, chat_id: int, item) -> None:
+        """发送一条消息，失败时按错误类型重新排队或丢弃"""
+        text, kwargs, queued_at, attempts = item
+        if metrics.enabled and attempts == 0:
+            metrics.record(('telegram.queue_wait', 'none', metrics.tier(None)), time.perf_counter() - queued_at)
+        retry_delay = None
+        try:
+            with metrics.span('telegram.send'):
+                await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            self.sent += 1
+            metrics.inc('messages_sent_total', result='ok')
+        except RetryAfter as e:
+            # 429：按服务器要求的时间暂停全部发送，该消息稍后原样重发
+            retry_after = e.retry_after
+            retry_delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            self._next_global = max(self._next_global, time.monotonic() + retry_delay)
+            metrics.inc('messages_sent_total', result='retry_after')
+            logger.warning(f"向 {chat_id} 发送消息触发限流，{retry_delay}秒后重试")
+        except (BadRequest, Forbidden) as e:
+            # 参数错误或被用户屏蔽，重试没有意义
+            self.failed += 1
+            metrics.inc('messages_sent_total', result='error')
+            logger.error(f"向 {chat_id} 发送消息失败: {str(e)}")
+        except NetworkError as e:
+            if attempts < self.max_retries:
+                # 指数退避加随机抖动，避免大量消息同时重试
+                retry_delay = self.retry_base_delay * (2 ** attempts) * random.uniform(0.5, 1.5)
+                item[3] = attempts + 1
+                metrics.inc('messages_sent_total', result='retry')
+                logger.warning(f"向 {chat_id} 发送消息时网络错误，{retry_delay:.2f}秒后第{attempts + 1}次重试: {str(e)}")
+            else:
+                self.failed += 1
+                metrics.inc('messages_sent_total', result='error')
+                logger.error(f"向 {chat_id} 发送消息重试{attempts}次后仍失败: {str(e)}")
+        except Exception as e:
+            self.failed += 1
+            metrics.inc('messages_sent_total', result='error')
+            logger.error(f"向 {chat_id} 发送消息时出错: {str(e)}")
+
+        if retry_delay is not None:
+            self._queues.setdefault(chat_id, deque()).appendleft(item)
+            self._next_ready[chat_id] = max(self._next_ready.get(chat_id, 0.0), time.monotonic() + retry_delay)
+        self._in_flight.discard(chat_id)
+        if self._queues.get(chat_id):
+            self._schedule(chat_id)
+        else:
+            self._queues.pop(chat_id, None)
+        self._wake()
+
+    async def run(self) -> None:
+        """发送循环，直到stop()被调用且所有消息发送完"""
+        self.loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        logger.info("限速消息发送器启动")
+        while self._running or self._ready or self._in_flight:
+            if not self._ready:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            ready_at = max(self._ready[0][0], self._next_global)
+            if ready_at > now:
+                # 等待最早可发送的时间，期间有新消息或发送完成时重新检查
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=ready_at - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            if chat_id in self._in_flight or not self._queues.get(chat_id):
+                continue
+            item = self._take(chat_id)
+            now = time.monotonic()
+            self._next_global = now + self.global_interval
+            self._next_ready[chat_id] = now + self._chat_interval(chat_id)
+            # 不同聊天的消息并发发送，同一聊天在上一条完成前不会再发送
+            self._in_flight.add(chat_id)
+            task = asyncio.create_task(self._send(chat_id, item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        logger.info("限速消息发送器已停止")
+
+    def stop(self) -> None:
+        """停止发送循环（已排队的消息会继续发送完），可在其他线程中调用"""
+        if self.loop is not None and self.loop.is_running():
+            try:
+                current = asyncio.get_running_loop()
+            except RuntimeError:
+                current = None
+            if current is not self.loop:
+                self.loop.call_soon_threadsafe(self._stop)
+                return
+        self._stop()
+
+    def _stop(self) -> None:
+        self._running = False
+        self._wake()
@@ -0,0 +1,145 @@
+import os
+import time
+import random
+import logging
+import tempfile
+
+from alerts import AlertManager, AlertStore, ThresholdIndex, parse_alert
+from benchmarks.fakes import create_offline_market_data
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_parse_alert():
+    """测试解析/alert命令参数"""
+    assert parse_alert(['btc', '>', '70000']) == {
+        'symbol': 'BTC', 'field': 'price', 'op': '>', 'threshold': 70000.0, 'interval': None
+    }
+    assert parse_alert(['ETHUSDT', 'price>=3500.5'])['op'] == '>='
+    condition = parse_alert(['ETH', 'RSI<30'])
+    assert (condition['field'], condition['op'], condition['threshold'], condition['interval']) == ('rsi', '<', 30.0, '15m')
+    assert parse_alert(['SOL', 'ema5', '<=', '140', '1h'])['interval'] == '1h'
+
+    for args in [['BTC'], ['BTC', '=', '1'], ['BTC', 'foo<1'], ['BTC', 'rsi<30', '3m'], ['BTC', '>', '1', '1h']]:
+        try:
+            parse_alert(args)
+            assert False, f"应当拒绝参数: {args}"
+        except ValueError:
+            pass
+
+def test_threshold_index_matches_scan():
+    """测试二分索引触发的提醒与逐个比较的结果一致"""
+    rng = random.Random(0)
+    index = ThresholdIndex()
+    alerts = {}
+    for alert_id in range(2000):
+        op = rng.choice(['>', '>=', '<', '<='])
+        threshold = float(rng.randint(0, 200))
+        alerts[alert_id] = (op, threshold)
+        index.add(alert_id, op, threshold)
+
+    checks = {'>': lambda v, t: v > t, '>=': lambda v, t: v >= t, '<': lambda v, t: v < t, '<=': lambda v, t: v <= t}
+    # 删除部分提醒
+    for alert_id in range(0, 2000, 7):
+        assert index.remove(alert_id, *alerts.pop(alert_id))
+    assert not index.remove(0, '>', 0.0)
+
+    price = 100.0
+    for _ in range(50):
+        price = max(0.0, min(200.0, price + rng.choice([-1, 1]) * rng.randint(0, 10)))
+        expected = {alert_id for alert_id, (op, threshold) in alerts.items() if checks[op](price, threshold)}
+        triggered = index.pop_triggered(price)
+        assert set(triggered) == expected, price
+        for alert_id in triggered:
+            del alerts[alert_id]
+        assert len(index) == len(alerts)
+
+def test_manager_triggers_once_and_only_for_symbol():
+    """测试提醒只在对应币种更新时检查，触发一次后删除"""
+    delivered = []
+    manager = AlertManager(None, lambda chat_id, text: delivered.append((chat_id, text)), store=AlertStore())
+    assert manager.handle_alert(1, ['BTC', '>', '70000']).startswith("已添加提醒 #1")
+    manager.handle_alert(2, ['BTC', '<', '60000'])
+    manager.handle_alert(1, ['ETH', 'rsi<30', '1h'])
+    assert manager.handle_alert(1, ['BTC', '=', '1']).startswith("无法识别")
+
+    assert manager.on_price('ETHUSDT', 80000) == 0
+    assert manager.on_price('BTCUSDT', 65000) == 0
+    assert manager.on_price('BTCUSDT', 70001) == 1
+    assert delivered[0][0] == 1 and 'BTC 价格 > 70000' in delivered[0][1]
+    assert manager.on_price('BTCUSDT', 70002) == 0
+
+    # 只检查对应周期的指标
+    assert manager.on_candle('ETH', '15m', {'rsi': 20.0, 'close': 3000.0}) == 0
+    assert manager.on_candle('ETH', '1h', {'rsi': 25.0, 'close': 3000.0}) == 1
+    assert 'ETH 1h RSI < 30' in delivered[-1][1]
+
+    assert manager.describe(1) == "当前没有提醒，使用 /alert BTC > 70000 添加提醒"
+    assert '#2 BTC 价格 < 60000' in manager.describe(2)
+    assert manager.handle_unalert(2, ['1']) == "没有找到对应的提醒"
+    assert manager.handle_unalert(2, ['#2']) == "已删除1个提醒"
+    assert manager.on_price('BTC', 50000) == 0
+
+def test_store_persists_alerts():
+    """测试提醒保存到文件，重新加载后索引可用且ID不重复"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'alerts.json')
+        store = AlertStore(path)
+        store.add(42, parse_alert(['BTC', '<', '60000']))
+        store.add(42, parse_alert(['ETH', 'macd>0', '4h']))
+
+        reloaded = AlertStore(path)
+        assert [alert['id'] for alert in reloaded.for_chat(42)] == [1, 2]
+        assert reloaded.watched() == {'BTC': ['price']}
+        assert reloaded.watched('4h') == {'ETH': ['macd']}
+        assert reloaded.add(42, parse_alert(['SOL', '>', '1']))['id'] == 3
+        assert len(reloaded.trigger('BTC', {'price': 59000.0})) == 1
+        assert [alert['id'] for alert in AlertStore(path).for_chat(42)] == [2, 3]
+
+def test_poll_and_candle_checks():
+    """测试批量获取价格和收盘K线指标的检查"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    delivered = []
+    manager = AlertManager(market_data, lambda chat_id, text: delivered.append(chat_id), store=AlertStore())
+    for chat_id in range(1, 6):
+        manager.handle_alert(chat_id, ['BTC', '>', '1'])
+    manager.handle_alert(6, ['ETH', '<', '1'])
+    manager.handle_alert(7, ['SOL', 'rsi', '>=', '0', '15m'])
+    manager.handle_alert(8, ['SOL', 'rsi', '<', '0', '15m'])
+
+    assert manager.poll_prices() == 5
+    assert market_data.client.calls['get_symbol_ticker'] == 1
+    assert manager.poll_prices() == 0
+
+    assert manager.check_candles('1h') == 0
+    assert manager.check_candles('15m') == 1
+    assert sorted(delivered) == [1, 2, 3, 4, 5, 7]
+
+    # 未上架的交易对不保存
+    assert manager.handle_alert(9, ['ETHH', '>', '1']) == "未找到交易对 ETHHUSDT，您是不是要找：ETH？"
+    assert manager.store.for_chat(9) == []
+
+def test_update_cost_independent_of_alert_count():
+    """测试20万个提醒时每次更新仍然很快"""
+    store = AlertStore()
+    rng = random.Random(1)
+    for _ in range(200000):
+        op = rng.choice(['>', '<'])
+        # 阈值离当前价格较远，更新时不会触发
+        threshold = 100000 + rng.random() * 1000 if op == '>' else 1000 * rng.random()
+        store.add(1, {'symbol': 'BTC', 'field': 'price', 'op': op, 'threshold': threshold, 'interval': None})
+    started = time.perf_counter()
+    for i in range(10000):
+        assert store.trigger('BTC', {'price': 50000.0 + i}) == []
+    elapsed = time.perf_counter() - started
+    assert elapsed < 1, elapsed
+
+if __name__ == '__main__':
+    test_parse_alert()
+    test_threshold_index_matches_scan()
+    test_manager_triggers_once_and_only_for_symbol()
+    test_store_persists_alerts()
+    test_poll_and_candle_checks()
+    test_update_cost_independent_of_alert_count()
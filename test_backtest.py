@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from market_data import MarketData
+from backtest.data import load_klines, load_timeframes, resample_klines
+from backtest.rules import prepare_features, evaluate_signals, chip_profit_percentage
+from backtest.engine import simulate_trades, select_sequential, run_backtest, EXIT_TAKE_PROFIT, EXIT_STOP_LOSS
+from backtest.sweep import generate_combinations, to_params, run_sweep, rank_results
+from benchmarks.fakes import synthesize_klines, create_offline_market_data
+from subscriptions import signal_direction
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _write_klines(directory, name, klines):
+    """把K线写入Binance格式的CSV文件"""
+    path = os.path.join(directory, name)
+    pd.DataFrame(klines).to_csv(path, header=False, index=False)
+    return path
+
+def _load_rows(klines, intervals=('15m',)):
+    """把K线列表写入临时文件后加载"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'klines.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(klines, f)
+        return load_timeframes(path, '15m', list(intervals))
+
+def test_load_and_resample():
+    """测试加载分月的CSV文件并重采样出完整的高周期K线"""
+    klines = synthesize_klines('BTCUSDT', '15m', limit=1000)
+    with tempfile.TemporaryDirectory() as directory:
+        _write_klines(directory, 'part1.csv', klines[:600])
+        _write_klines(directory, 'part2.csv', klines[500:])
+        df = load_klines(directory)
+
+    assert len(df) == 1000
+    assert df['timestamp'].is_monotonic_increasing
+
+    hourly = resample_klines(df, '1h')
+    assert len(hourly) == 250
+    first = df.iloc[:4]
+    assert hourly['open'].iloc[0] == first['open'].iloc[0]
+    assert hourly['high'].iloc[0] == first['high'].max()
+    assert hourly['close'].iloc[0] == first['close'].iloc[-1]
+    assert abs(hourly['volume'].iloc[0] - first['volume'].sum()) < 1e-6
+
+def test_chip_profit_matches_volume_profile():
+    """测试向量化的获利盘比例与MarketData.calculate_volume_profile一致"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    df = _load_rows(synthesize_klines('ETHUSDT', '15m', limit=300))['15m']
+    profit = chip_profit_percentage(df['close'].to_numpy(), df['volume'].to_numpy())
+    assert np.isnan(profit[:99]).all()
+
+    for i in [99, 150, 299]:
+        window = df.iloc[i - 99:i + 1]
+        current_price = float(window['close'].iloc[-1])
+        profile = market_data.calculate_volume_profile(window)
+        below = sum(volume for price_range, volume in profile.items()
+                    if float(price_range.split('-')[1]) <= current_price)
+        expected = below / sum(profile.values()) * 100
+        assert abs(profit[i] - expected) < 1e-6, (i, profit[i], expected)
+
+def test_short_signals_match_report():
+    """测试向量化的短期信号方向与短期信号推送报告的推荐方向一致"""
+    from market_analyzer import MarketAnalyzer
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, {'enabled': False})
+    data = _load_rows(synthesize_klines('BTCUSDT', '15m', limit=1500), ['15m', '1h', '4h'])
+    features = prepare_features(data, 'short')
+    signals = evaluate_signals(features, 'short')
+
+    base = data['15m']
+    for i in range(400, 1500, 73):
+        window = MarketData.calculate_indicators(base.iloc[:i + 1].copy())
+        current_price = float(window['close'].iloc[-1])
+        analysis_data = {
+            'klines': {
+                '15m': window,
+                '1h': MarketData.calculate_indicators(resample_klines(base.iloc[:i + 1], '1h')),
+                '4h': MarketData.calculate_indicators(resample_klines(base.iloc[:i + 1], '4h'))
+            },
+            'futures_data': {'funding_rate': 0},
+            'volume_profile': market_data.calculate_volume_profile(window.iloc[-100:])
+        }
+        values = analyzer._short_term_values(analysis_data, current_price)
+        expected = {'long': 1, 'short': -1, 'neutral': 0}[signal_direction(values)]
+        assert signals['direction'][i] == expected, (i, values['direction'])
+
+def test_mid_signals_match_report():
+    """测试向量化的中期信号方向与中期信号推送报告的推荐方向一致（高周期使用最近一根已收盘的K线）"""
+    from market_analyzer import MarketAnalyzer
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, {'enabled': False})
+    data = _load_rows(synthesize_klines('ETHUSDT', '15m', limit=7000), ['15m', '1h', '4h', '1d'])
+    features = prepare_features(data, 'mid')
+    signals = evaluate_signals(features, 'mid')
+
+    base = data['15m']
+    hourly = data['1h']
+    for j in range(1300, len(hourly), 97):
+        closed = base[base['timestamp'] < hourly['timestamp'].iloc[j] + pd.Timedelta('1h')]
+        klines = {interval: MarketData.calculate_indicators(resample_klines(closed, interval))
+                  for interval in ['1h', '4h', '1d']}
+        current_price = float(klines['1h']['close'].iloc[-1])
+        values = analyzer._mid_term_values({'klines': klines, 'futures_data': {'funding_rate': 0}}, current_price)
+        expected = {'long': 1, 'short': -1, 'neutral': 0}[signal_direction(values)]
+        assert signals['direction'][j] == expected, (j, values['direction'])
+
+def test_simulate_trades():
+    """测试挂单成交、止盈止损的先后顺序和跳空处理"""
+    # 第0根K线发出做多信号：入场区间99~101，止盈110，止损95
+    features = {
+        'open': np.array([100, 103, 100, 104, 108, 96, 94], dtype=float),
+        'high': np.array([100, 104, 101, 106, 111, 97, 95], dtype=float),
+        'low': np.array([99, 102, 99, 103, 107, 93, 90], dtype=float),
+        'close': np.array([100, 103, 100, 105, 110, 94, 92], dtype=float)
+    }
+    n = len(features['close'])
+    signals = {key: np.zeros(n) for key in ['side', 'entry_low', 'entry_high', 'take_profit', 'stop_loss']}
+    signals['side'] = np.zeros(n, dtype=int)
+    signals['side'][[0, 4]] = [1, -1]
+    signals['entry_low'][[0, 4]] = [99, 97]
+    signals['entry_high'][[0, 4]] = [101, 100]
+    signals['take_profit'][[0, 4]] = [110, 90]
+    signals['stop_loss'][[0, 4]] = [95, 105]
+
+    trades = simulate_trades(features, signals, entry_bars=3, max_hold_bars=5)
+    # 做多：第1根未触及入场区间，第2根成交于开盘价100，第4根触及止盈
+    assert trades['entry_index'][0] == 2
+    assert trades['entry_price'][0] == 100
+    assert trades['exit_index'][0] == 4
+    assert trades['exit_reason'][0] == EXIT_TAKE_PROFIT
+    assert abs(trades['return'][0] - 0.10) < 1e-9
+    # 做空：第5根跳空开盘96，成交价限制在入场区间下沿97，第6根触及止盈90
+    assert trades['entry_index'][1] == 5
+    assert trades['entry_price'][1] == 97
+    assert trades['exit_reason'][1] == EXIT_TAKE_PROFIT
+    assert abs(trades['return'][1] - 7 / 97) < 1e-9
+    # 第二个信号在第一笔交易平仓的K线上发出，可以继续交易
+    assert list(select_sequential(trades)) == [0, 1]
+
+    # 同一根K线同时触及止盈和止损时按止损处理
+    signals['stop_loss'][0] = 103.5
+    trades = simulate_trades(features, signals, entry_bars=3, max_hold_bars=5)
+    assert trades['exit_index'][0] == 3
+    assert trades['exit_reason'][0] == EXIT_STOP_LOSS
+    assert trades['exit_price'][0] == 103.5
+
+def test_run_backtest_year_of_15m():
+    """测试一年的15分钟K线可以在数秒内完成三个策略的回测"""
+    data = _load_rows(synthesize_klines('BTCUSDT', '15m', limit=365 * 96),
+                      ['15m', '1h', '4h', '1d', '1w'])
+    started = time.perf_counter()
+    results = {strategy: run_backtest(data, strategy) for strategy in ['short', 'mid', 'long']}
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 10, elapsed
+    assert results['short']['bars'] == 365 * 96
+    for result in results.values():
+        json.dumps({key: value for key, value in result.items() if key != 'trades'})
+        summary = result['summary']
+        assert summary['trades'] == len(result['trades'])
+        assert 0 <= summary['max_drawdown'] <= 1
+        assert 0 <= summary['hit_rate'] <= 1
+    assert results['short']['summary']['trades'] > 0
+
+def test_generate_combinations():
+    """测试网格搜索和随机搜索的参数组合"""
+    space = {'weights.rsi': [0.1, 0.2], 'threshold': {'min': 0.2, 'max': 0.4, 'step': 0.1}, 'rsi_oversold': [25, 30]}
+    grid = generate_combinations(space)
+    assert len(grid) == 12
+    assert {combo['threshold'] for combo in grid} == {0.2, 0.3, 0.4}
+    assert to_params(grid[0]) == {'weights': {'rsi': 0.1}, 'threshold': 0.2, 'rsi_oversold': 25}
+
+    space['rsi_oversold'] = {'min': 20, 'max': 40}
+    first = generate_combinations(space, 'random', samples=20, seed=1)
+    assert first == generate_combinations(space, 'random', samples=20, seed=1)
+    assert len(first) == 20
+    assert all(isinstance(combo['rsi_oversold'], int) for combo in first)
+
+def test_sweep_matches_backtest_and_resumes():
+    """测试并行搜索的结果与单次回测一致，并且可以从检查点继续"""
+    data = _load_rows(synthesize_klines('SOLUSDT', '15m', limit=6000), ['15m', '1h', '4h', '1d'])
+    features = prepare_features(data, 'mid')
+    combos = generate_combinations({'rsi_mid': [45, 55], 'range_pct': [0.005, 0.01], 'weights.trend_4h': [0, 1]})
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = os.path.join(directory, 'sweep.jsonl')
+        results = run_sweep(features, 'mid', combos[:5], workers=2, batch_size=2, checkpoint=checkpoint)
+        assert len(results) == 5
+
+        # 第二次运行只计算剩余的组合
+        results = run_sweep(features, 'mid', combos, workers=2, batch_size=2, checkpoint=checkpoint)
+        assert len(results) == len(combos)
+        with open(checkpoint, 'r', encoding='utf-8') as f:
+            assert len(f.readlines()) == len(combos) + 1
+
+        # 回测设置不同时拒绝使用该检查点
+        try:
+            run_sweep(features, 'mid', combos, simulation={'fee': 0.001}, checkpoint=checkpoint)
+            assert False, "应当拒绝设置不一致的检查点"
+        except ValueError:
+            pass
+
+    for record in results:
+        expected = run_backtest(data, 'mid', to_params(record['params']), features=features)
+        for key, value in expected['summary'].items():
+            assert abs(record[key] - value) < 1e-9, (record['params'], key)
+        assert abs(record['signal_hit_rate'] - expected['signals']['hit_rate']) < 1e-9
+
+    table = rank_results(results, 'profit_factor')
+    assert list(table['rank']) == list(range(1, len(combos) + 1))
+    assert table['profit_factor'].is_monotonic_decreasing
+
+if __name__ == '__main__':
+    test_load_and_resample()
+    test_chip_profit_matches_volume_profile()
+    test_short_signals_match_report()
+    test_mid_signals_match_report()
+    test_simulate_trades()
+    test_run_backtest_year_of_15m()
+    test_generate_combinations()
+    test_sweep_matches_backtest_and_resumes()
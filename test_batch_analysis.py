@@ -0,0 +1,91 @@
+import os
+import time
+import asyncio
+import logging
+from types import SimpleNamespace
+
+from market_analyzer import MarketAnalyzer
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.load_telegram import StubBot, _build_update
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_batch_shares_fetches_and_caches_reports():
+    """测试多币种分析并发获取数据、CMC报价只请求一次，完整报告写入缓存"""
+    market_data = create_offline_market_data(latency=0.05)
+    analyzer = MarketAnalyzer(market_data)
+    fetch = market_data.get_market_analysis
+    market_data.get_market_analysis = lambda symbol, timeframe: None if symbol == 'BAD' else fetch(symbol, timeframe)
+
+    started = time.perf_counter()
+    report = analyzer.analyze_batch(['btc', 'ETH', 'SOL', 'BAD', 'BTC'], 'short')
+    elapsed = time.perf_counter() - started
+
+    assert report.startswith('📊【多币种短期波段策略信号汇总】')
+    for symbol in ['BTC', 'ETH', 'SOL']:
+        assert f"🔸 {symbol}：$" in report
+    assert '🔸 BAD：⚠️ 获取市场数据失败' in report
+    assert report.count('🔸 BTC') == 1
+    assert market_data.cmc_data.calls['get_market_data_batch'] == 1
+    assert market_data.client.calls['get_klines'] == 9
+    # 只在初始化时测试一次连接，获取K线前不再逐次ping
+    assert market_data.client.calls['ping'] == 1
+    # 各币种的请求并发执行，总耗时明显少于逐个请求的模拟延迟之和
+    sequential = (sum(market_data.client.calls.values()) + sum(market_data.cmc_data.calls.values())) * 0.05
+    assert elapsed < sequential * 0.6, (elapsed, sequential)
+
+    # 之后单独分析某个币种直接使用缓存的完整报告
+    cached = analyzer.report_cache.get(('ETH', 'short'))
+    assert cached.startswith('📊【短期波段策略信号推送】')
+    assert analyzer.analyze_market('ETH', 'short') == cached
+
+def test_analyze_command_multiple_symbols():
+    """测试/analyze的多个交易对作为一个任务执行并只回复一条汇总报告"""
+    from bots.telegram_bot import TelegramTradingBot
+
+    bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR',
+                              'analysis': {'batch': {'max_symbols': 3}}},
+                             market_data=create_offline_market_data())
+    sent = []
+    stub = StubBot(lambda chat_id, text, sent_at: sent.append(text))
+
+    async def command(update_id, text):
+        context = SimpleNamespace(args=text.split()[1:], user_data={})
+        await bot._analyze_command(_build_update(stub, update_id, 7, text), context)
+
+    async def drain():
+        while not bot.message_queue.empty():
+            await bot.message_queue.get()()
+
+    async def run():
+        await command(1, '/analyze btc eth SOL mid')
+        # 同一用户的任务未完成时拒绝新的请求
+        await command(2, '/analyze XRP')
+        bot.thread_pool.submit(lambda: None).result()
+        while bot.user_task_locks:
+            await asyncio.sleep(0.01)
+        await drain()
+        await command(3, '/analyze BTC ETH SOL BNB')
+        await command(4, '/analyze BTC foo')
+        await command(5, '/analyze btc eth')
+        while bot.user_task_locks:
+            await asyncio.sleep(0.01)
+        await drain()
+
+    asyncio.run(run())
+    bot.thread_pool.shutdown()
+    assert sent[0] == "🔍 正在分析 BTC、ETH、SOL 的中期市场数据，请稍候..."
+    assert sent[1].startswith("您有一个正在进行的分析任务")
+    assert sent[2].startswith('📊【多币种中期趋势策略信号汇总】') and '🔸 SOL：$' in sent[2]
+    assert sent[3] == "一次最多分析3个交易对，请减少交易对数量后重试。"
+    # 不是策略类型的参数按交易对检查，大小写不影响解析
+    assert sent[4] == "未找到交易对 FOOUSDT\n（如果'foo'是策略类型，可用：short/mid/long）"
+    assert sent[5] == "🔍 正在分析 BTC、ETH 的短期市场数据，请稍候..."
+    assert sent[6].startswith('📊【多币种短期波段策略信号汇总】')
+
+if __name__ == '__main__':
+    test_batch_shares_fetches_and_caches_reports()
+    test_analyze_command_multiple_symbols()
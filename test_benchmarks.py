@@ -0,0 +1,112 @@
+import logging
+import json
+
+from benchmarks.fakes import FakeBinanceClient, create_offline_market_data
+from benchmarks.bench_market import run_benchmark, compare_results
+from benchmarks.load_telegram import run_load_test
+from benchmarks.bench_synthetic import run_benchmark as run_synthetic_benchmark
+from benchmarks.bench_indicators import run_benchmark as run_indicator_benchmark
+from benchmarks.bench_klines import run_benchmark as run_kline_benchmark
+from benchmarks.bench_decode import run_benchmark as run_decode_benchmark
+from benchmarks.bench_render import run_benchmark as run_render_benchmark
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_fake_client_is_deterministic():
+    """测试模拟客户端返回确定性的K线数据"""
+    first = FakeBinanceClient().get_klines(symbol='BTCUSDT', interval='1h', limit=50)
+    second = FakeBinanceClient().get_klines(symbol='BTCUSDT', interval='1h', limit=50)
+    assert first == second
+    assert len(first) == 50
+
+    # 没有录制数据的交易对也能生成数据
+    unknown = FakeBinanceClient().get_klines(symbol='XYZUSDT', interval='15m', limit=100)
+    assert len(unknown) == 100
+
+def test_offline_market_analysis():
+    """测试注入模拟数据源后可以离线获取市场分析数据"""
+    market_data = create_offline_market_data()
+    analysis_data = market_data.get_market_analysis('BTC', 'short')
+    assert analysis_data is not None
+    assert sorted(analysis_data['klines'].keys()) == ['15m', '1h', '4h']
+    assert analysis_data['futures_data']['funding_rate'] is not None
+    assert market_data.client.calls['get_klines'] == 3
+
+def test_run_benchmark_outputs_json():
+    """测试基准测试输出可序列化的结果"""
+    result = run_benchmark(['BTC'], ['short'], iterations=1)
+    json.dumps(result)
+    assert 'fetch.15m' in result['stages']
+    assert 'indicators' in result['stages']
+    assert 'volume_profile' in result['stages']
+    assert 'render.short' in result['stages']
+    assert result['end_to_end']['short']['throughput_per_s'] > 0
+
+    # 与自身比较不应出现退化
+    slower = json.loads(json.dumps(result))
+    slower['stages']['indicators']['mean_ms'] *= 2
+    assert compare_results(result, result) == []
+    assert compare_results(result, slower) == ['stages.indicators']
+
+def test_load_test_accounts_for_every_request():
+    """测试压力测试中每个请求都得到回复或被拒绝"""
+    result = run_load_test(total_requests=10, users=3, rate=0, timeout=30)
+    json.dumps(result)
+    outcomes = result['outcomes']
+    assert outcomes['timeout'] == 0
+    assert outcomes['completed'] + outcomes['rejected'] + outcomes['error'] == 10
+    # 同一用户在任务完成前的重复请求会被拒绝
+    assert outcomes['rejected'] > 0
+    assert result['unmatched_replies'] == 0
+    assert result['reply_latency']['count'] == outcomes['completed']
+    assert result['peak_rss_mb'] > 0
+
+def test_synthetic_benchmark():
+    """测试模拟K线生成基准测试输出两种实现的耗时"""
+    result = run_synthetic_benchmark(symbol_count=3, rows=1000, iterations=1)
+    assert set(result['stages']) == {'legacy', 'vectorized', 'ohlcv_arrays'}
+    assert result['stages']['vectorized']['count'] == 1
+    json.dumps(result)
+
+def test_indicator_benchmark():
+    """测试技术指标流水线基准测试覆盖两种数据源"""
+    result = run_indicator_benchmark(rows=200, iterations=1)
+    assert set(result['volume_profile_speedup']) == {'binance', 'cmc'}
+    assert result['stages']['volume_profile.cmc']['count'] == 1
+    json.dumps(result)
+
+def test_kline_benchmark():
+    """测试K线解析基准测试输出各解析方式的耗时和内存占用"""
+    result = run_kline_benchmark(rows=200, iterations=1)
+    assert set(result['stages']) == set(result['memory']) == {'legacy', 'typed', 'typed_float32'}
+    assert result['memory']['typed']['raw_bytes'] < result['memory']['legacy']['raw_bytes']
+    json.dumps(result)
+
+def test_decode_benchmark():
+    """测试响应体解码基准测试覆盖各K线数量和解码方式"""
+    result = run_decode_benchmark(sizes=[100, 1000], iterations=1)
+    assert set(result['sizes']) == {'100', '1000'}
+    assert set(result['sizes']['100']['stages']) == {'legacy', 'stdlib', 'fast'}
+    json.dumps(result)
+
+def test_render_benchmark():
+    """测试报告渲染基准测试覆盖各策略和价格格式化方式"""
+    result = run_render_benchmark(['BTC'], iterations=1)
+    assert set(result['reports']) == {'short', 'mid', 'long'}
+    assert set(result['format_price_per_report']) == {'legacy', 'bucketed'}
+    json.dumps(result)
+
+if __name__ == "__main__":
+    test_fake_client_is_deterministic()
+    test_offline_market_analysis()
+    test_run_benchmark_outputs_json()
+    test_load_test_accounts_for_every_request()
+    test_synthetic_benchmark()
+    test_indicator_benchmark()
+    test_kline_benchmark()
+    test_decode_benchmark()
+    test_render_benchmark()
+    logger.warning("基准测试模块测试通过")
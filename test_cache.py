@@ -0,0 +1,84 @@
+import logging
+from datetime import datetime, timezone
+
+from market_cache import TTLCache, next_candle_close
+from cache_warmer import CacheWarmer, RateBudget
+from metrics import metrics
+from benchmarks.fakes import create_offline_market_data
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_next_candle_close():
+    """测试K线收盘时间与Binance的周期对齐方式一致"""
+    now = datetime(2025, 1, 1, 10, 7, 30, tzinfo=timezone.utc).timestamp()  # 周三
+    assert datetime.fromtimestamp(next_candle_close('15m', now), timezone.utc) == datetime(2025, 1, 1, 10, 15, tzinfo=timezone.utc)
+    assert datetime.fromtimestamp(next_candle_close('4h', now), timezone.utc) == datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+    # 周K线在周一00:00(UTC)收盘
+    assert datetime.fromtimestamp(next_candle_close('1w', now), timezone.utc) == datetime(2025, 1, 6, 0, 0, tzinfo=timezone.utc)
+
+def test_ttl_cache_expiry_and_eviction():
+    """测试缓存过期和LRU淘汰"""
+    cache = TTLCache('test', ttl_seconds=60, max_items=2)
+    cache.set('a', 1)
+    cache.set('b', 2, expires_at=0)  # 已过期
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    cache.set('c', 3)
+    cache.set('d', 4)  # 淘汰最久未使用的a
+    assert cache.get('a') is None
+    assert cache.get('c') == 3 and cache.get('d') == 4
+
+    disabled = TTLCache('test', enabled=False)
+    disabled.set('a', 1)
+    assert disabled.get('a') is None
+
+def test_analyzer_reuses_cached_report():
+    """测试同一币种和策略的重复请求直接命中缓存"""
+    from market_analyzer import MarketAnalyzer
+
+    market_data = create_offline_market_data()
+    analyzer = MarketAnalyzer(market_data)
+    first = analyzer.analyze_market('BTC', 'short')
+    second = analyzer.analyze_market('BTC', 'short')
+    assert first == second
+    assert market_data.client.calls['get_klines'] == 3
+
+    # 中期策略复用已缓存的1h和4h K线，只需获取1d
+    analyzer.analyze_market('BTC', 'mid')
+    assert market_data.client.calls['get_klines'] == 4
+
+def test_cache_warmer_refreshes_hot_symbols():
+    """测试预热任务刷新配置的币种和请求最多的币种"""
+    from market_analyzer import MarketAnalyzer
+
+    metrics.reset()
+    metrics.record_request('SOL')
+    market_data = create_offline_market_data()
+    analyzer = MarketAnalyzer(market_data)
+    warmer = CacheWarmer(analyzer, {'symbols': ['btc'], 'learn_top_n': 3, 'requests_per_minute': 6000})
+    assert warmer.hot_symbols() == ['BTC', 'SOL']
+    assert warmer.refresh_interval('short') == '15m'
+    assert warmer.refresh_interval('long') == '1h'  # 不超过缓存有效期
+
+    assert warmer.refresh('short') == 2
+    calls = market_data.client.calls['get_klines']
+    analyzer.analyze_market('SOL', 'short')
+    assert market_data.client.calls['get_klines'] == calls
+
+def test_rate_budget_stops():
+    """测试请求额度不足时等待，停止后立即返回"""
+    budget = RateBudget(60, burst=1)
+    assert budget.acquire(1)
+    budget.stop_event.set()
+    assert not budget.acquire(1)
+
+if __name__ == "__main__":
+    test_next_candle_close()
+    test_ttl_cache_expiry_and_eviction()
+    test_analyzer_reuses_cached_report()
+    test_cache_warmer_refreshes_hot_symbols()
+    test_rate_budget_stops()
+    logger.warning("缓存模块测试通过")
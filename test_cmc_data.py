@@ -0,0 +1,73 @@
+import logging
+import threading
+
+import numpy as np
+
+from cmc_data import CMCData, synthesize_ohlcv, synthetic_seed
+from test_cmc_quotes import FakeQuotesAPI
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_synthesize_matches_random_walk():
+    """测试向量化结果与逐个追加的随机漫步一致，且不修改全局随机状态"""
+    np.random.seed(7)
+    expected_global = np.random.random()
+    np.random.seed(7)
+
+    ohlcv = synthesize_ohlcv([100.0, 2.0], [5.0, 0.1], [1e6, 2e6], 500, seeds=[1, 2])
+    assert np.random.random() == expected_global
+
+    for row, (price, volatility, seed) in enumerate([(100.0, 0.05, 1), (2.0, 0.01, 2)]):
+        rng = np.random.default_rng(seed)
+        returns = rng.standard_normal(500) * volatility
+        closes = []
+        current = price
+        for value in returns:
+            current *= 1 + value
+            closes.append(current)
+        assert np.allclose(ohlcv['close'][row], closes, rtol=1e-12)
+
+    close, high, low, open_ = ohlcv['close'], ohlcv['high'], ohlcv['low'], ohlcv['open']
+    assert (high >= close).all() and (low <= close).all()
+    assert (open_[:, 1:] == close[:, :-1]).all() and (open_[:, 0] <= close[:, 0]).all()
+    assert ((ohlcv['volume'][1] >= 0.5 * 2e6 / 500) & (ohlcv['volume'][1] <= 1.5 * 2e6 / 500)).all()
+
+def test_synthesize_is_reproducible_across_threads():
+    """测试同一币种和周期在多个线程中生成相同的数据"""
+    seed = synthetic_seed('BTCUSDT', '1h')
+    assert seed == synthetic_seed('btcusdt', '1h') and seed != synthetic_seed('BTCUSDT', '4h')
+    expected = synthesize_ohlcv([65000.0], [2.0], [1e9], 10000, seeds=[seed])['close']
+    results = []
+
+    def worker():
+        for _ in range(5):
+            results.append(synthesize_ohlcv([65000.0], [2.0], [1e9], 10000, seeds=[seed])['close'])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert len(results) == 20 and all((item == expected).all() for item in results)
+
+def test_historical_data_batch():
+    """测试批量生成多个币种的模拟K线只请求一次报价，与单币种结果一致"""
+    api = FakeQuotesAPI()
+    cmc = CMCData(quote_config={'window_seconds': 0})
+    cmc.quotes.fetch = api
+    frames = cmc.get_historical_data_batch(['BTCUSDT', 'ETHUSDT', 'BADUSDT'], '1h', limit=300)
+    assert sorted(frames) == ['BTCUSDT', 'ETHUSDT'] and len(api.batches) == 1
+    assert list(frames['BTCUSDT'].columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+    assert len(frames['ETHUSDT']) == 300
+
+    single = cmc.get_historical_data('ETHUSDT', '1h', limit=300)
+    assert len(api.batches) == 1
+    assert (single['close'].values == frames['ETHUSDT']['close'].values).all()
+
+if __name__ == '__main__':
+    test_synthesize_matches_random_walk()
+    test_synthesize_is_reproducible_across_threads()
+    test_historical_data_batch()
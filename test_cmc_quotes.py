@@ -0,0 +1,127 @@
+import json
+import time
+import logging
+import threading
+from types import SimpleNamespace
+from unittest import mock
+
+from cmc_quotes import QuoteBatcher, cmc_symbol, parse_quote
+from cmc_data import CMCData
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _coin(price):
+    return {'quote': {'USD': {
+        'price': price, 'volume_24h': price * 1e6, 'percent_change_1h': 0.1, 'percent_change_24h': 1.5,
+        'percent_change_7d': 4.0, 'market_cap': price * 2e7, 'last_updated': '2025-01-01T00:00:00.000Z'
+    }}}
+
+class FakeQuotesAPI:
+    """模拟quotes/latest：记录每次请求的币种，未知币种被跳过（skip_invalid）"""
+
+    def __init__(self, latency=0.0, fail=False):
+        self.batches = []
+        self.latency = latency
+        self.fail = fail
+        self._lock = threading.Lock()
+
+    def __call__(self, symbols):
+        with self._lock:
+            self.batches.append(list(symbols))
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError('HTTP 429')
+        return {symbol: _coin(float(len(symbol))) for symbol in symbols if not symbol.startswith('BAD')}
+
+def test_symbol_and_quote_parsing():
+    """测试币种代码转换和报价解析"""
+    assert cmc_symbol('btcusdt') == 'BTC' and cmc_symbol(' eth ') == 'ETH' and cmc_symbol('USDT') == 'USDT'
+    assert parse_quote(_coin(2.0))['price'] == 2.0
+    assert parse_quote([_coin(3.0), _coin(4.0)])['price'] == 3.0
+    assert parse_quote(None) is None and parse_quote({'quote': {}}) is None
+
+def test_concurrent_requests_share_one_call():
+    """测试窗口内的并发请求合并为一次请求，结果写入共享缓存"""
+    api = FakeQuotesAPI(latency=0.02)
+    batcher = QuoteBatcher(api, {'window_seconds': 0.1})
+    symbols = [f"C{index}USDT" for index in range(40)] + ['BTCUSDT', 'BTC', 'BADCOIN']
+    results = {}
+
+    def worker(symbol):
+        results[symbol] = batcher.get(symbol)
+
+    threads = [threading.Thread(target=worker, args=(symbol,)) for symbol in symbols]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(api.batches) == 1
+    assert sorted(api.batches[0]) == sorted({cmc_symbol(symbol) for symbol in symbols})
+    assert results['BTCUSDT']['price'] == 3.0 and results['BTC'] == results['BTCUSDT']
+    assert results['BADCOIN'] is None
+
+    # 缓存命中不再请求，无效币种下次重新请求
+    assert batcher.get_many(['C1', 'C2USDT'])['C2']['price'] == 2.0
+    assert len(api.batches) == 1
+    assert batcher.get('BADCOIN') is None
+    assert api.batches[-1] == ['BADCOIN']
+
+def test_batches_split_at_api_limit():
+    """测试超过max_symbols的扫描按上限分批请求"""
+    api = FakeQuotesAPI()
+    batcher = QuoteBatcher(api, {'window_seconds': 5, 'max_symbols': 10})
+    started = time.monotonic()
+    quotes = batcher.get_many([f"S{index}" for index in range(25)])
+    # 达到上限时立即请求，不等待窗口结束
+    assert time.monotonic() - started < 1
+    assert [len(batch) for batch in api.batches] == [10, 10, 5]
+    assert all(quote is not None for quote in quotes.values()) and len(quotes) == 25
+
+def test_failed_request_returns_none():
+    """测试请求失败时所有等待的调用方得到None，且不缓存失败结果"""
+    api = FakeQuotesAPI(fail=True)
+    batcher = QuoteBatcher(api, {'window_seconds': 0})
+    assert batcher.get_many(['BTC', 'ETH']) == {'BTC': None, 'ETH': None}
+    api.fail = False
+    assert batcher.get('ETH')['price'] == 3.0
+    assert len(api.batches) == 2
+
+def test_cmc_data_uses_batched_endpoint():
+    """测试CMCData的单币种和批量接口都通过一次逗号分隔的请求获取"""
+    calls = []
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, symbols):
+            self.symbols = symbols
+
+        def json(self):
+            return {'data': {symbol: _coin(1.0) for symbol in self.symbols}}
+
+        @property
+        def content(self):
+            return json.dumps(self.json()).encode()
+
+    def fake_get(url, headers=None, params=None, proxies=None, timeout=None):
+        calls.append(params)
+        return Response(params['symbol'].split(','))
+
+    with mock.patch('cmc_data.get_session', return_value=SimpleNamespace(get=fake_get)):
+        cmc = CMCData(quote_config={'window_seconds': 0.05})
+        quotes = cmc.get_market_data_batch(['BTCUSDT', 'ETHUSDT', 'SOL'])
+        assert set(quotes) == {'BTC', 'ETH', 'SOL'}
+        assert cmc.get_market_data('ETHUSDT')['price'] == 1.0
+    assert len(calls) == 1
+    assert calls[0]['symbol'] == 'BTC,ETH,SOL' and calls[0]['skip_invalid'] == 'true'
+
+if __name__ == '__main__':
+    test_symbol_and_quote_parsing()
+    test_concurrent_requests_share_one_call()
+    test_batches_split_at_api_limit()
+    test_failed_request_returns_none()
+    test_cmc_data_uses_batched_endpoint()
@@ -0,0 +1,113 @@
+import os
+import asyncio
+import logging
+from types import SimpleNamespace
+from unittest import mock
+
+from market_analyzer import MarketAnalyzer
+from rule_engine import CompiledStrategy
+from report_templates import format_price
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.load_telegram import StubBot, _build_update
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_compare_reads_snapshots_in_one_pass():
+    """测试对比表读取报告写入的快照、只获取未缓存的币种，所有币种的信号一次计算"""
+    market_data = create_offline_market_data()
+    analyzer = MarketAnalyzer(market_data)
+    reports = {symbol: analyzer.analyze_market(symbol, 'short') for symbol in ['BTC', 'ETH']}
+    before = dict(market_data.client.calls)
+
+    fetch = market_data.get_multi_timeframe_data
+    market_data.get_multi_timeframe_data = lambda symbol, timeframes: None if symbol == 'BADUSDT' else fetch(symbol, timeframes)
+    with mock.patch.object(CompiledStrategy, 'evaluate_rows', autospec=True,
+                           side_effect=CompiledStrategy.evaluate_rows) as evaluate_rows:
+        table = analyzer.compare(['btc', 'ETH', 'SOL', 'BAD'])
+    assert evaluate_rows.call_count == 1
+    assert len(evaluate_rows.call_args[0][1]) == 3
+
+    # 只有SOL需要获取数据，并且只获取15分钟K线和合约数据
+    assert market_data.client.calls['get_klines'] - before['get_klines'] == 1
+    assert market_data.client.calls['futures_funding_rate'] - before['futures_funding_rate'] == 1
+    assert table.startswith('📊【多币种对比】')
+    assert '🔸 BAD：⚠️ 获取市场数据失败' in table
+
+    # 对比表中的价格和方向与完整报告一致
+    rows = table.split('🔸 ')
+    for symbol, report in reports.items():
+        row = next(row for row in rows if row.startswith(f"{symbol}："))
+        assert f"${format_price(analyzer.snapshot_cache.get(symbol)['price'])}" in row
+        direction = row.rsplit('，', 1)[1].strip()
+        assert direction in report, (symbol, direction)
+
+    # 快照未过期时再次对比不再请求数据
+    calls = dict(market_data.client.calls)
+    analyzer.compare(['BTC', 'ETH', 'SOL'])
+    assert dict(market_data.client.calls) == calls
+
+def test_compare_command():
+    """测试/compare在线程池中生成对比表并回复，超过上限时直接提示"""
+    from bots.telegram_bot import TelegramTradingBot
+
+    bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR',
+                              'analysis': {'batch': {'max_compare_symbols': 3}}},
+                             market_data=create_offline_market_data())
+    sent = []
+    stub = StubBot(lambda chat_id, text, sent_at: sent.append(text))
+
+    async def command(update_id, text):
+        context = SimpleNamespace(args=text.split()[1:], user_data={})
+        await bot._compare_command(_build_update(stub, update_id, 7, text), context)
+
+    async def run():
+        await command(1, '/compare')
+        await command(2, '/compare BTC ETH SOL BNB')
+        await command(3, '/compare btc eth sol')
+        bot.thread_pool.shutdown()
+        while not bot.message_queue.empty():
+            await bot.message_queue.get()()
+
+    asyncio.run(run())
+    assert sent[0].startswith("请指定要对比的交易对")
+    assert sent[1] == "一次最多对比3个交易对，请减少交易对数量后重试。"
+    assert sent[2].startswith('📊【多币种对比】')
+    assert all(f"🔸 {symbol}：$" in sent[2] for symbol in ['BTC', 'ETH', 'SOL'])
+    assert not bot.user_task_locks
+
+def test_compare_command_dedup_and_lock():
+    """测试/compare忽略重复投递的更新，用户有进行中的任务时不再提交对比任务"""
+    from bots.telegram_bot import TelegramTradingBot
+
+    bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR'},
+                             market_data=create_offline_market_data())
+    sent = []
+    stub = StubBot(lambda chat_id, text, sent_at: sent.append(text))
+    submitted = []
+    bot.thread_pool.submit = lambda *args: submitted.append(args)
+
+    async def run():
+        update = _build_update(stub, 1, 7, '/compare BTC ETH')
+        for _ in range(2):
+            await bot._compare_command(update, SimpleNamespace(args=['BTC', 'ETH'], user_data={}))
+        # 用户7的任务尚未完成
+        await bot._compare_command(_build_update(stub, 2, 7, '/compare SOL'), SimpleNamespace(args=['SOL'], user_data={}))
+
+    asyncio.run(run())
+    assert len(submitted) == 1 and submitted[0][1:3] == (['BTC', 'ETH'], 7)
+    assert sent == ["您有一个正在进行的分析任务，请等待其完成后再发起新的请求。"]
+    assert bot.user_task_locks == {7: True}
+
+    # 任务结束后释放任务锁
+    task, symbols, user_id, message = submitted[0]
+    bot.sender = None
+    task(symbols, user_id, message)
+    assert not bot.user_task_locks
+
+if __name__ == '__main__':
+    test_compare_reads_snapshots_in_one_pass()
+    test_compare_command()
+    test_compare_command_dedup_and_lock()
@@ -0,0 +1,138 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_session
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class _Server:
+    """本地HTTP/1.1服务器，记录建立的连接数和同时处理的最大请求数"""
+
+    def __init__(self, delay=0.0):
+        state = self
+        self.connections = set()
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with state.lock:
+                    state.connections.add(self.client_address)
+                    state.active += 1
+                    state.peak = max(state.peak, state.active)
+                time.sleep(delay)
+                body = json.dumps({'ok': True, 'result': {'url': ''}}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with state.lock:
+                    state.active -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/bot0/getWebhookInfo"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def test_sync_session_reuses_connections():
+    """测试同步会话在多次请求和多个线程之间复用keep-alive连接"""
+    server = _Server()
+    http_session.configure({'pool_size': 2, 'proxy': None})
+    try:
+        session = http_session.get_session()
+        assert http_session.get_session() is session
+        for _ in range(10):
+            assert session.get(server.url).json()['ok']
+        assert len(server.connections) == 1
+
+        threads = [threading.Thread(target=lambda: [session.get(server.url) for _ in range(5)]) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        # 连接池大小为2，并发请求超出的部分使用临时连接，池中最多保留2个
+        assert len(session.get_adapter(server.url).poolmanager.pools) == 1
+    finally:
+        http_session.close_session()
+        server.close()
+
+def test_binance_client_uses_shared_pool():
+    """测试Binance REST客户端的会话与共享会话复用同一个连接池，API key请求头不进入共享会话"""
+    from market_data import BinanceClient
+
+    server = _Server()
+    http_session.configure({'proxy': None})
+    try:
+        client = BinanceClient(api_key='test-key', ping=False)
+        shared = http_session.get_session()
+        assert client.session is not shared
+        assert client.session.get_adapter(server.url) is shared.get_adapter(server.url)
+        assert client.session.headers['X-MBX-APIKEY'] == 'test-key'
+        assert 'X-MBX-APIKEY' not in shared.headers
+
+        assert shared.get(server.url).json()['ok']
+        assert client.session.get(server.url, timeout=client.REQUEST_TIMEOUT).json()['ok']
+        assert len(server.connections) == 1
+    finally:
+        http_session.close_session()
+        server.close()
+
+def test_async_client_per_host_limit():
+    """测试异步客户端复用连接并限制单个主机的并发请求数"""
+    server = _Server(delay=0.05)
+    http_session.configure({'per_host_limit': 2, 'proxy': None})
+
+    async def run():
+        client = http_session.get_async_client()
+        assert http_session.get_async_client() is client
+        responses = await asyncio.gather(*[client.get(server.url) for _ in range(8)])
+        assert all(response.json()['ok'] for response in responses)
+        await http_session.close_async_client()
+
+    try:
+        asyncio.run(run())
+        assert server.peak <= 2
+        assert len(server.connections) <= 2
+    finally:
+        server.close()
+        http_session.configure()
+
+def test_pool_size_from_config():
+    """测试从telegram配置读取连接池大小和代理"""
+    settings = http_session.http_config_from({'telegram': {
+        'connection_pool_size': 16,
+        'proxy': {'enabled': True, 'http_proxy': 'http://localhost:7890', 'https_proxy': 'http://localhost:7891'}
+    }})
+    assert settings == {'pool_size': 16, 'per_host_limit': 16, 'proxy': 'http://localhost:7891'}
+    assert http_session.http_config_from({'telegram': {'proxy': {'enabled': False, 'http_proxy': 'x'}}}) == {}
+
+    http_session.configure(settings)
+    try:
+        assert http_session.telegram_pool_size() == 16
+        assert http_session.get_session().proxies['https'] == 'http://localhost:7891'
+    finally:
+        http_session.configure()
+
+if __name__ == '__main__':
+    test_sync_session_reuses_connections()
+    test_binance_client_uses_shared_pool()
+    test_async_client_per_host_limit()
+    test_pool_size_from_config()
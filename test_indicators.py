@@ -0,0 +1,56 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorPipeline, dummy_volume_profile
+from cmc_data import CMCData
+from benchmarks.bench_indicators import legacy_volume_profile, source_frames
+from benchmarks.fakes import create_offline_market_data
+from test_cmc_quotes import FakeQuotesAPI
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_volume_profile_matches_row_scan():
+    """测试向量化的筹码分布与原来逐行遍历的结果完全一致"""
+    for source, df in source_frames(500).items():
+        for window in [df, df.iloc[-100:], df.iloc[:37]]:
+            assert IndicatorPipeline.volume_profile(window) == legacy_volume_profile(window), source
+
+    # 价格集中在少数几个值、落在区间边界上
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({'close': rng.choice([1.0, 1.5, 2.0, 3.7, 11.0], 200), 'volume': rng.random(200)})
+    assert IndicatorPipeline.volume_profile(df) == legacy_volume_profile(df)
+
+    assert IndicatorPipeline.volume_profile(pd.DataFrame({'close': [], 'volume': []})) == dummy_volume_profile()
+    flat = pd.DataFrame({'close': [5.0] * 10, 'volume': [1.0] * 10})
+    assert IndicatorPipeline.volume_profile(flat) == dummy_volume_profile(5.0)
+
+def test_both_sources_share_pipeline():
+    """测试Binance路径和CMC备用路径使用同一个流水线和缓存"""
+    market_data = create_offline_market_data()
+    cmc = CMCData(quote_config={'window_seconds': 0}, indicators=market_data.indicators)
+    cmc.quotes.fetch = FakeQuotesAPI()
+    # 合约、链上和项目数据与本测试无关，避免访问网络
+    cmc.get_futures_data = cmc.get_onchain_data = cmc.get_project_info = lambda symbol: None
+    assert market_data.kline_cache is market_data.indicators.cache is cmc.indicators.cache
+
+    # CMC路径计算的指标与MarketData.calculate_indicators一致，并写入共享缓存
+    analysis = cmc.get_market_analysis('ETH', '1h')
+    cached = market_data.indicators.cached('ETHUSDT', '1h')
+    assert cached is analysis['klines']['1h']
+    raw = cached[['timestamp', 'open', 'high', 'low', 'close', 'volume']].copy()
+    expected = market_data.calculate_indicators(raw)
+    assert np.allclose(cached['macd_diff'], expected['macd_diff'], equal_nan=True)
+    assert analysis['volume_profile'] == market_data.calculate_volume_profile(cached)
+
+    # Binance路径命中CMC路径写入的缓存，不再请求K线
+    assert market_data.get_multi_timeframe_data('ETHUSDT', ['1h'])['1h'] is cached
+    assert market_data.client.calls['get_klines'] == 0
+
+if __name__ == '__main__':
+    test_volume_profile_matches_row_scan()
+    test_both_sources_share_pipeline()
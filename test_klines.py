@@ -0,0 +1,112 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import numpy as np
+from binance.exceptions import BinanceAPIException
+
+import fast_json
+from market_data import KLINE_FIELDS, BinanceClient, parse_klines, parse_kline_payload
+from benchmarks.bench_klines import legacy_klines_to_frame
+from benchmarks.fakes import create_offline_market_data, synthesize_klines
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_parse_matches_legacy_frame():
+    """测试类型化解析与原来的DataFrame数值一致，且只保留时间戳和OHLCV"""
+    klines = synthesize_klines('ETHUSDT', '15m', limit=300)
+    frame = parse_klines(klines)
+    legacy = legacy_klines_to_frame(klines)
+    assert list(frame.columns) == KLINE_FIELDS
+    assert (frame['timestamp'] == legacy['timestamp']).all()
+    for column in KLINE_FIELDS[1:]:
+        assert frame[column].dtype == np.float64
+        assert (frame[column].to_numpy() == legacy[column].to_numpy()).all()
+    assert frame.memory_usage(deep=True).sum() * 4 < legacy.memory_usage(deep=True).sum()
+    assert parse_klines([]).empty and list(parse_klines([]).columns) == KLINE_FIELDS
+
+def test_float32_volume_mode():
+    """测试float32成交量模式贯穿MarketData的获取和指标计算"""
+    klines = synthesize_klines('BTCUSDT', '1h', limit=100)
+    frame = parse_klines(klines, 'float32')
+    assert frame['volume'].dtype == np.float32 and frame['close'].dtype == np.float64
+    assert np.allclose(frame['volume'], parse_klines(klines)['volume'], rtol=1e-6)
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    market_data.volume_dtype = 'float32'
+    data = market_data.get_multi_timeframe_data('BTCUSDT', ['1h'])
+    assert data['1h']['volume'].dtype == np.float32
+    assert not data['1h']['rsi'].iloc[-20:].isna().any()
+
+def test_payload_decoding_with_and_without_orjson():
+    """测试原始响应体的解码结果与逐行解析一致，未安装orjson时回退到标准库"""
+    klines = synthesize_klines('BTCUSDT', '4h', limit=100)
+    payload = json.dumps(klines).encode()
+    expected = parse_klines(klines)
+    assert parse_kline_payload(payload).equals(expected)
+    with mock.patch.object(fast_json, 'HAS_ORJSON', False):
+        assert parse_kline_payload(payload).equals(expected)
+        assert fast_json.loads('{"a": [1, "2"]}') == {'a': [1, '2']}
+
+def test_binance_client_raw_payload():
+    """测试BinanceClient直接读取K线接口的响应体，MarketData使用该路径获取K线"""
+    klines = synthesize_klines('ETHUSDT', '1h', limit=120)
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            status, body = (200, json.dumps(klines)) if 'ETHUSDT' in self.path else (400, '{"code":-1121}')
+            body = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = BinanceClient(ping=False)
+        assert BinanceClient.RAW_KLINES_SUPPORTED
+        client.API_URL = f"http://127.0.0.1:{server.server_address[1]}/api"
+        payload = client.get_klines_payload(symbol='ETHUSDT', interval='1h', limit=120)
+        assert requests[-1].startswith('/api/v3/klines?') and 'limit=120' in requests[-1]
+        assert parse_kline_payload(payload).equals(parse_klines(klines))
+        try:
+            client.get_klines_payload(symbol='BADUSDT', interval='1h')
+            assert False, '应抛出BinanceAPIException'
+        except BinanceAPIException as e:
+            assert e.status_code == 400
+
+        market_data = create_offline_market_data(cache_config={'enabled': False})
+        market_data.client = client
+        client.ping = lambda: {}
+        df = market_data.get_historical_data('ETHUSDT', '1h', limit=120)
+        assert df.equals(parse_klines(klines))
+
+        # python-binance缺少内部接口时改用get_klines，结果相同
+        count = len(requests)
+        with mock.patch.object(BinanceClient, 'RAW_KLINES_SUPPORTED', False):
+            assert client.get_klines_payload(symbol='ETHUSDT', interval='1h') is None
+            assert len(requests) == count
+            df = market_data.get_historical_data('ETHUSDT', '1h', limit=120)
+        assert len(requests) == count + 1
+        assert df.equals(parse_klines(klines))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == '__main__':
+    test_parse_matches_legacy_frame()
+    test_float32_volume_mode()
+    test_payload_decoding_with_and_without_orjson()
+    test_binance_client_raw_payload()
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import tempfile
+import threading
+
+from market_data import MarketData
+from market_stream import (MarketStream, ReplayStreamSource, BinanceStreamSource, KlineBuffer,
+                           kline_message, parse_message)
+from alerts import AlertManager, AlertStore
+from benchmarks.fakes import create_offline_market_data, synthesize_klines, INTERVAL_MS
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STEP = INTERVAL_MS['15m']
+
+def _next_rows(count, skip=0):
+    """生成紧接在模拟客户端K线之后的K线（skip根之后开始）"""
+    rows = synthesize_klines('BTCUSDT', '15m', count, seed=1)
+    shift = (count + skip) * STEP
+    return [[row[0] + shift] + row[1:6] + [row[6] + shift] + row[7:] for row in rows]
+
+def _write_replay(directory, messages):
+    path = os.path.join(directory, 'replay.jsonl')
+    with open(path, 'w', encoding='utf-8') as f:
+        for message in messages:
+            f.write(json.dumps(message) + '\n')
+    return path
+
+def _replay(market_data, messages, **config):
+    """回放消息并等待回放结束"""
+    with tempfile.TemporaryDirectory() as directory:
+        source = ReplayStreamSource(_write_replay(directory, messages))
+        stream = MarketStream(market_data, source, dict({'enabled': True, 'symbols': ['BTC'], 'intervals': ['15m'],
+                                                         'mark_price': True}, **config))
+        stream.start()
+        stream.thread.join(10)
+    return stream
+
+def test_parse_kline_message():
+    """测试K线消息与REST格式互相转换"""
+    row = synthesize_klines('ETHUSDT', '1h', 1)[0]
+    event = parse_message(kline_message('ETH', '1h', row))
+    assert event['type'] == 'kline' and event['symbol'] == 'ETHUSDT' and event['closed']
+    assert event['row'][:11] == row[:11]
+    event = parse_message({'stream': 'ethusdt@markPrice@1s', 'data': {
+        'e': 'markPriceUpdate', 'E': 1, 's': 'ETHUSDT', 'p': '3200.5', 'r': '0.0001', 'T': 2}})
+    assert event == {'type': 'mark_price', 'symbol': 'ETHUSDT', 'mark_price': 3200.5,
+                     'funding_rate': 0.0001, 'event_time': 1}
+    assert parse_message({'data': {'e': 'trade'}}) is None
+
+def test_replay_keeps_buffers_without_rest():
+    """测试回放推送后缓冲区与REST数据一致，报告读取K线不再请求REST"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    seeded = synthesize_klines('BTCUSDT', '15m', 100)
+    rows = _next_rows(30)
+    messages = []
+    for row in rows:
+        # 未收盘的推送随后被收盘推送覆盖
+        messages.append(kline_message('BTC', '15m', row[:4] + [row[1]] + row[5:], closed=False))
+        messages.append(kline_message('BTC', '15m', row))
+    messages.append({'stream': 'btcusdt@markPrice@1s', 'data': {
+        'e': 'markPriceUpdate', 'E': 1, 's': 'BTCUSDT', 'p': '65000', 'r': '-0.0003', 'T': 2}})
+    messages.append(kline_message('ETH', '15m', rows[0]))
+    stream = _replay(market_data, messages)
+    assert market_data.client.calls['get_klines'] == 1
+
+    expected = MarketData.calculate_indicators(MarketData.klines_to_frame(seeded[30:] + rows))
+    frame = stream.get_klines('BTC', '15m')
+    assert len(frame) == 100
+    assert frame['close'].tolist() == expected['close'].tolist()
+    assert abs(frame['rsi'].iloc[-1] - expected['rsi'].iloc[-1]) < 1e-9
+    assert stream.get_klines('BTC', '15m') is frame
+
+    # MarketData优先读取行情流中的数据
+    data = market_data.get_multi_timeframe_data('BTCUSDT', ['15m', '1h'])
+    assert data['15m'] is frame
+    assert market_data.client.calls['get_klines'] == 2
+    assert market_data.get_latest_prices(['BTCUSDT']) == {'BTCUSDT': float(rows[-1][4])}
+    assert market_data.client.calls['get_symbol_ticker'] == 0
+    assert market_data.get_futures_data('BTCUSDT')['funding_rate'] == -0.0003
+    assert market_data.client.calls['futures_funding_rate'] == 0
+
+    stream.stop()
+    assert market_data.stream is None
+
+def test_gap_and_stale_buffers():
+    """测试K线缺口时用REST补齐，长时间没有推送时回退到REST"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    messages = [kline_message('BTC', '15m', row) for row in _next_rows(5, skip=2)]
+    # 推送与初始K线之间缺少2根，补齐（模拟客户端返回的仍是旧数据）后仍不连续
+    stream = _replay(market_data, messages[:1], reseed_seconds=0)
+    assert market_data.client.calls['get_klines'] == 2
+    assert not stream.buffers[('BTCUSDT', '15m')].ready
+    assert stream.get_klines('BTC', '15m') is None
+
+    # reseed_seconds内不重复补齐
+    stream = _replay(market_data, messages)
+    assert market_data.client.calls['get_klines'] == 3
+
+    buffer = KlineBuffer('15m', 3)
+    buffer.seed(synthesize_klines('BTCUSDT', '15m', 5))
+    assert len(buffer.rows) == 3
+    assert buffer.update(_next_rows(1)[0]) and len(buffer.rows) == 3
+
+    stream = _replay(market_data, [], stale_seconds=0)
+    time.sleep(0.01)
+    assert stream.get_klines('BTC', '15m') is None
+    stream.stop()
+
+def test_stream_drives_alerts():
+    """测试行情推送直接触发价格和收盘指标提醒"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    delivered = []
+    manager = AlertManager(market_data, lambda chat_id, text: delivered.append(chat_id), store=AlertStore())
+    manager.handle_alert(1, ['BTC', '>', '1'])
+    manager.handle_alert(2, ['BTC', 'rsi', '>=', '0', '15m'])
+    manager.handle_alert(3, ['BTC', 'rsi', '>=', '0', '1h'])
+
+    rows = _next_rows(2)
+    with tempfile.TemporaryDirectory() as directory:
+        source = ReplayStreamSource(_write_replay(directory, [kline_message('BTC', '15m', row) for row in rows]))
+        stream = MarketStream(market_data, source, {'enabled': True, 'symbols': ['BTC'], 'intervals': ['15m']})
+        manager.attach_stream(stream)
+        stream.start()
+        stream.thread.join(10)
+    assert sorted(delivered) == [1, 2]
+    # 行情流关注的周期不再参与定时检查
+    assert manager.check_candles('15m') == 0
+    assert manager.poll_prices() == 0
+    stream.stop()
+
+def test_binance_source_reconnects():
+    """测试Binance数据源在服务端断开后重连，并录制收到的消息"""
+    import websockets
+
+    rows = _next_rows(3)
+    connections = []
+    ready = threading.Event()
+    state = {}
+
+    async def handler(websocket, *args):
+        connections.append(1)
+        for row in rows:
+            await websocket.send(json.dumps(kline_message('BTC', '15m', row)))
+        await websocket.close()
+
+    async def serve():
+        async with websockets.serve(handler, '127.0.0.1', 0) as server:
+            state['port'] = list(server.sockets)[0].getsockname()[1]
+            state['stop'] = asyncio.get_running_loop().create_future()
+            state['loop'] = asyncio.get_running_loop()
+            ready.set()
+            await state['stop']
+
+    server_thread = threading.Thread(target=lambda: asyncio.run(serve()), daemon=True)
+    server_thread.start()
+    ready.wait(5)
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    with tempfile.TemporaryDirectory() as directory:
+        record_file = os.path.join(directory, 'record.jsonl')
+        url = f"ws://127.0.0.1:{state['port']}/stream"
+        source = BinanceStreamSource(url, url, reconnect_delay=0.05, record_file=record_file)
+        stream = MarketStream(market_data, source, {'enabled': True, 'symbols': ['BTC'], 'intervals': ['15m'],
+                                                    'mark_price': False})
+        stream.start()
+        deadline = time.time() + 10
+        while len(connections) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        stream.stop()
+        state['loop'].call_soon_threadsafe(state['stop'].set_result, None)
+        server_thread.join(5)
+
+        assert len(connections) >= 2
+        # 每次连接都重新补齐K线
+        assert market_data.client.calls['get_klines'] >= 2
+        assert stream.buffers[('BTCUSDT', '15m')].rows[-1][0] == rows[-1][0]
+        with open(record_file, 'r', encoding='utf-8') as f:
+            assert len(f.readlines()) >= 3
+
+if __name__ == '__main__':
+    test_parse_kline_message()
+    test_replay_keeps_buffers_without_rest()
+    test_gap_and_stale_buffers()
+    test_stream_drives_alerts()
+    test_binance_source_reconnects()
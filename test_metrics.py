@@ -0,0 +1,172 @@
+import logging
+import time
+import os
+import asyncio
+import concurrent.futures
+from types import SimpleNamespace
+from queue import Queue
+
+from metrics import MetricsRegistry, LatencyHistogram, metrics
+from metrics_server import render_prometheus, register_bot_gauges, start_metrics_server
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.load_telegram import StubBot, _build_update
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_histogram_percentiles():
+    """测试直方图分位数的相对误差在子桶精度以内"""
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i / 1000.0)  # 1ms到1000ms
+    stats = histogram.snapshot()
+    assert stats['count'] == 1000
+    assert abs(stats['p50_ms'] - 500) / 500 < 0.07
+    assert abs(stats['p99_ms'] - 990) / 990 < 0.07
+    assert stats['max_ms'] == 1000
+    assert stats['min_ms'] == 1
+
+def test_span_labels_and_sampling():
+    """测试span继承上下文标签，禁用时不记录"""
+    registry = MetricsRegistry()
+    with registry.context(strategy='short', symbol='BTC'):
+        with registry.span('fetch.1h'):
+            pass
+    with registry.span('render.mid', strategy='mid', symbol='PEPEUSDT'):
+        pass
+    keys = sorted(registry.histograms.keys())
+    assert keys == [('fetch.1h', 'short', 'major'), ('render.mid', 'mid', 'other')]
+
+    registry.configure({'enabled': False})
+    with registry.span('fetch.1h', strategy='short', symbol='BTC'):
+        pass
+    assert registry.histograms[('fetch.1h', 'short', 'major')].count == 1
+
+    registry.configure({'enabled': True, 'sample_rate': 0.0})
+    with registry.span('fetch.1h', strategy='short', symbol='BTC'):
+        pass
+    assert registry.histograms[('fetch.1h', 'short', 'major')].count == 1
+
+def test_disabled_span_overhead():
+    """测试禁用时每个span的开销低于1微秒"""
+    registry = MetricsRegistry(enabled=False)
+    iterations = 20000
+    best = None
+    # 取多轮中的最小值，减少调度抖动的影响
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with registry.span('indicators'):
+                pass
+        per_span = (time.perf_counter() - start) / iterations
+        best = per_span if best is None else min(best, per_span)
+    assert best < 1e-6
+
+def test_analyze_market_records_stages():
+    """测试离线分析后记录了各阶段耗时"""
+    from market_analyzer import MarketAnalyzer
+
+    metrics.reset()
+    analyzer = MarketAnalyzer(create_offline_market_data())
+    analyzer.analyze_market('ETH', 'short')
+    stages = {(row['stage'], row['strategy'], row['tier']) for row in metrics.snapshot()}
+    for stage in ['fetch.15m', 'fetch.1h', 'fetch.4h', 'indicators', 'volume_profile', 'render.short', 'analyze_market']:
+        assert (stage, 'short', 'major') in stages
+    assert 'render.short' in metrics.render_text()
+
+def test_prometheus_endpoint():
+    """测试指标端点以Prometheus文本格式导出计数器、瞬时值和直方图"""
+    registry = MetricsRegistry()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    queue = Queue()
+    queue.put(None)
+    register_bot_gauges(pool, queue, registry=registry)
+    registry.inc('commands_total', command='analyze')
+    registry.cache_access('processed_commands', hit=False)
+    registry.cache_access('processed_commands', hit=True)
+    registry.add('analysis_workers_busy', 1)
+    registry.record(('fetch.1h', 'short', 'major'), 0.02)
+
+    async def scrape():
+        server = await start_metrics_server('127.0.0.1', 0, registry=registry)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b"GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response.decode('utf-8')
+
+    response = asyncio.run(scrape())
+    pool.shutdown()
+    assert response.startswith('HTTP/1.1 200 OK')
+    assert 'tradingbot_commands_total{command="analyze"} 1' in response
+    assert 'tradingbot_cache_hit_ratio{cache="processed_commands"} 0.5' in response
+    assert 'tradingbot_message_queue_depth 1' in response
+    assert 'tradingbot_thread_pool_utilization 0.5' in response
+    assert 'tradingbot_process_resident_memory_bytes' in response
+    assert 'tradingbot_stage_duration_seconds_bucket{le="0.025",stage="fetch.1h",strategy="short",tier="major"} 1' in response
+    assert 'tradingbot_stage_duration_seconds_bucket{le="0.01",stage="fetch.1h",strategy="short",tier="major"} 0' in response
+    assert render_prometheus(registry).endswith('\n')
+
+def test_stats_command_admin_only():
+    """测试/stats仅对管理员返回运行状态摘要"""
+    from bots.telegram_bot import TelegramTradingBot
+
+    metrics.reset()
+    bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR',
+                              'telegram': {'admin_ids': [42]}},
+                             market_data=create_offline_market_data())
+    sent = []
+    stub = StubBot(lambda chat_id, text, sent_at: sent.append((chat_id, text)))
+    metrics.record_request('BTC')
+    metrics.record_request('btc')
+    metrics.record_request('ETH')
+    metrics.record(('analyze_market', 'short', 'major'), 0.2)
+
+    async def run():
+        context = SimpleNamespace(args=[], user_data={})
+        await bot._stats_command(_build_update(stub, 1, 7, '/stats'), context)
+        await bot._stats_command(_build_update(stub, 2, 42, '/stats'), context)
+
+    asyncio.run(run())
+    bot.thread_pool.shutdown()
+    assert sent[0] == (7, "该命令仅限管理员使用。")
+    chat_id, summary = sent[1]
+    assert chat_id == 42
+    assert '3/分钟' in summary
+    assert 'BTC(2)' in summary
+    assert 'p50 200ms' in summary
+
+def test_bot_admin_ids_from_config():
+    """测试bot.py与TelegramTradingBot一样读取配置文件中的telegram.admin_ids，环境变量ADMIN_IDS作为备用"""
+    import json
+    import tempfile
+    from unittest import mock
+
+    import bot
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'config.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'telegram': {'admin_ids': [42]}}, f)
+        with mock.patch.dict(os.environ, {'ANALYSIS_CONFIG': path, 'ADMIN_IDS': '7,8'}):
+            assert bot.load_admin_ids() == {42}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'telegram': {}}, f)
+        with mock.patch.dict(os.environ, {'ANALYSIS_CONFIG': path, 'ADMIN_IDS': '7, 8'}):
+            assert bot.load_admin_ids() == {7, 8}
+
+if __name__ == "__main__":
+    test_histogram_percentiles()
+    test_span_labels_and_sampling()
+    test_disabled_span_overhead()
+    test_analyze_market_records_stages()
+    test_prometheus_endpoint()
+    test_stats_command_admin_only()
+    test_bot_admin_ids_from_config()
+    logger.warning("耗时统计模块测试通过")
@@ -0,0 +1,72 @@
+import logging
+from string import Formatter
+from unittest import mock
+
+import report_templates
+from report_templates import PHRASES, TEMPLATES, ReportRenderer, format_price, get_renderer
+from market_analyzer import MarketAnalyzer
+from benchmarks.bench_render import STRATEGY_RENDERERS, legacy_format_price
+from benchmarks.fakes import create_offline_market_data
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_format_price_matches_legacy():
+    """测试按数量级区间格式化的价格与原来的实现一致"""
+    values = [None, 0, 1e-8, -1e-8, 5e-5, 0.0045, 0.00999, 0.01, 0.5, 0.512, 0.99999, 1, 1.005,
+              9999.999, 65000, 1234567.891, -0.5, -0.004, -1234.5, float('nan'), float('inf'), 'abc', '12.5']
+    for value in values:
+        assert format_price(value) == legacy_format_price(value), value
+    assert format_price(0.0045) == '0.0045'
+    assert format_price(1234567.891) == '1,234,567.89'
+
+def test_templates_compile_once():
+    """测试每种语言的模板只编译一次，特殊格式字段都被改写"""
+    renderer = get_renderer()
+    assert get_renderer() is renderer
+    for name, template in renderer.templates.items():
+        for field, spec in template.special:
+            assert spec in ('price', 'phrase', 'notes'), (name, field)
+        for _, field, spec, _ in Formatter().parse(TEMPLATES['zh'][name]):
+            assert field is None or field.isidentifier(), (name, field)
+    try:
+        ReportRenderer('xx')
+        assert False, '应抛出ValueError'
+    except ValueError:
+        pass
+
+def test_new_language_only_needs_templates():
+    """测试新增语言只需添加模板和措辞，分析器的代码不变"""
+    english = {name: f"{name}: {{current_price:price}} {{direction:phrase}}" for name in TEMPLATES['zh']}
+    english['market'] = "{symbol} {current_price:price}"
+    phrases = {key: key.upper() for key in PHRASES['zh']}
+    with mock.patch.dict(TEMPLATES, {'en': english}), mock.patch.dict(PHRASES, {'en': phrases}):
+        market_data = create_offline_market_data(cache_config={'enabled': False})
+        analyzer = MarketAnalyzer(market_data, cache_config={'enabled': False})
+        analyzer.renderer = ReportRenderer('en')
+        for strategy, (method, interval) in STRATEGY_RENDERERS.items():
+            data = market_data.get_market_analysis('ETH', strategy)
+            price = float(data['klines'][interval]['close'].iloc[-1])
+            report = getattr(analyzer, method)('ETH', data, price)
+            assert report.startswith(f"{strategy}: {format_price(price)} {strategy.upper()}.DIRECTION."), report
+
+def test_signal_push_reports_render():
+    """测试三种策略的信号推送报告都能用默认模板完整渲染"""
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, cache_config={'enabled': False})
+    for symbol in ['BTC', 'COS']:
+        for strategy, (method, interval) in STRATEGY_RENDERERS.items():
+            data = market_data.get_market_analysis(symbol, strategy)
+            price = float(data['klines'][interval]['close'].iloc[-1])
+            report = getattr(analyzer, method)(symbol, data, price)
+            assert report.startswith('📊【') and '失败' not in report, report
+            assert f"当前价格：${format_price(price)}" in report
+            assert '{' not in report and '}' not in report
+
+if __name__ == '__main__':
+    test_format_price_matches_legacy()
+    test_templates_compile_once()
+    test_new_language_only_needs_templates()
+    test_signal_push_reports_render()
@@ -0,0 +1,163 @@
+import logging
+
+import numpy as np
+
+from rule_engine import RuleEngine, CompiledStrategy, DEFAULT_RULES, compile_strategy, merge_definition
+from market_analysis_rules import TechnicalAnalysisRules, TrendDirection
+from benchmarks.fakes import create_offline_market_data
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROW = {
+    'rsi': 75.0,
+    'macd': 1.0,
+    'macd_signal': 0.5,
+    'ema5': 101.0,
+    'ema13': 100.0,
+    'volume': 150.0,
+    'volume_ma20': 100.0,
+    'open': 100.0,
+    'close': 102.0,
+    'funding_rate': 0.0002,
+    'chip_profit': 50.0
+}
+
+def test_default_short_rules():
+    """测试默认短期规则的信号、说明和加权评分"""
+    result = RuleEngine().strategy('short').evaluate_row(ROW)
+    assert result['labels']['rsi'] == '超买区域'
+    assert result['signals']['rsi'] == '看空'
+    assert result['labels']['volume'] == '放量上涨'
+    assert result['labels']['funding'] == '多头略占优'
+    assert result['signals']['chip'] == '中性'
+    # -0.15 + 0.20 + 0.25 + 0.15 - 0.10 + 0
+    assert abs(result['score'] - 0.35) < 1e-9
+    assert result['direction'] == 1
+
+    # 评分在阈值内时按EMA方向
+    row = dict(ROW, volume=100.0)
+    result = RuleEngine().strategy('short').evaluate_row(row)
+    assert abs(result['score'] - 0.2) < 1e-9
+    assert result['direction'] == 1
+
+def test_config_overrides():
+    """测试配置中的rsi_thresholds、indicators和weights"""
+    engine = RuleEngine({
+        'short': {
+            'indicators': ['rsi', 'macd', 'ema', 'funding_rate'],
+            'rsi_thresholds': {'oversold': 20, 'overbought': 80},
+            'weights': {'ema': 0.5}
+        },
+        'long': {'timeframes': ['1d', '1w']}
+    })
+    rules = engine.strategy('short')
+    assert rules.weights['chip'] == 0 and rules.weights['volume'] == 0
+    assert rules.weights['ema'] == 0.5
+    assert engine.momentum_thresholds() == {'oversold': 20, 'overbought': 80}
+    assert 'long' not in engine.strategies
+
+    result = rules.evaluate_row(dict(ROW, chip_profit=10.0))
+    assert result['labels']['rsi'] == '中性区域'
+    assert abs(result['score'] - (0.20 + 0.5 - 0.10)) < 1e-9
+
+    # 默认规则不受影响
+    assert DEFAULT_RULES['short']['weights']['chip'] == 0.15
+    assert merge_definition(DEFAULT_RULES['short'], None) == DEFAULT_RULES['short']
+
+def test_legacy_example_config():
+    """测试旧版config.example.json中的策略定义保持默认权重"""
+    import os
+    import json
+
+    legacy = {
+        'short': {
+            'timeframes': ['15m', '1h'],
+            'indicators': ['rsi', 'macd', 'ema', 'volume', 'funding_rate'],
+            'rsi_thresholds': {'oversold': 30, 'overbought': 70}
+        },
+        'mid': {
+            'timeframes': ['4h', '1d'],
+            'indicators': ['ma', 'obv', 'rsi', 'support_resistance'],
+            'ma_periods': [20, 50]
+        },
+        'long': {
+            'timeframes': ['1d', '1w'],
+            'indicators': ['mvrv', 'nvt', 'tvl', 'token_unlocks'],
+            'trend_confirmation_days': 14
+        }
+    }
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.example.json'), encoding='utf-8') as f:
+        example = json.load(f)['analysis']['strategies']
+    for strategies in (legacy, example):
+        engine = RuleEngine(strategies)
+        for name in ['short', 'mid']:
+            assert engine.strategy(name).weights == DEFAULT_RULES[name]['weights'], name
+
+def test_invalid_rules():
+    """测试规则错误在编译时报告"""
+    for definition in [
+        {'signals': {'rsi': {'rules': [{'when': 'rsi > $missing', 'value': 1}]}}},
+        {'signals': {'rsi': {'rules': [{'when': 'rsi >> 70', 'value': 1}]}}},
+        {'weights': {'unknown': 1}, 'signals': {}},
+        {'fallback': 'ema', 'signals': {}}
+    ]:
+        try:
+            CompiledStrategy('test', definition)
+            assert False, f"应当拒绝规则: {definition}"
+        except ValueError:
+            pass
+
+def test_vectorized_matches_rows():
+    """测试一次计算多行与逐行计算的结果一致"""
+    rng = np.random.default_rng(0)
+    n = 500
+    features = {
+        'rsi': rng.uniform(10, 90, n),
+        'macd': rng.normal(0, 1, n),
+        'macd_signal': rng.normal(0, 1, n),
+        'ema5': rng.normal(100, 1, n),
+        'ema13': rng.normal(100, 1, n),
+        'volume': rng.uniform(50, 200, n),
+        'volume_ma20': np.full(n, 100.0),
+        'open': rng.normal(100, 1, n),
+        'close': rng.normal(100, 1, n),
+        'funding_rate': rng.normal(0, 0.0002, n),
+        'chip_profit': rng.uniform(0, 100, n)
+    }
+    rules = compile_strategy('short', {'threshold': 0.25, 'rsi_oversold': 35})
+    result = rules.evaluate(features)
+    rows = rules.evaluate_rows([{name: values[i] for name, values in features.items()} for i in range(n)])
+    for i in [0, 17, 250, n - 1]:
+        single = rules.evaluate_row({name: values[i] for name, values in features.items()})
+        assert single == rows[i]
+        assert single['direction'] == result['direction'][i]
+        assert abs(single['score'] - result['score'][i]) < 1e-12
+    assert set(np.unique(result['direction'])) <= {-1, 1}
+
+def test_momentum_thresholds():
+    """测试analyze_momentum使用配置的RSI阈值"""
+    direction, _ = TechnicalAnalysisRules.analyze_momentum(25, 1.0, 1.0)
+    assert direction == TrendDirection.BULLISH
+    direction, _ = TechnicalAnalysisRules.analyze_momentum(25, 1.0, 1.0, oversold=20, overbought=80)
+    assert direction == TrendDirection.NEUTRAL
+
+def test_analyzer_uses_configured_rules():
+    """测试MarketAnalyzer按配置的规则生成短期报告"""
+    from market_analyzer import MarketAnalyzer
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, {'enabled': False}, {'short': {'threshold': 10}})
+    report = analyzer.analyze_market('BTC', 'short')
+    assert '推荐方向：📈 谨慎做多' in report or '推荐方向：📉 谨慎做空' in report
+
+if __name__ == '__main__':
+    test_default_short_rules()
+    test_config_overrides()
+    test_legacy_example_config()
+    test_invalid_rules()
+    test_vectorized_matches_rows()
+    test_momentum_thresholds()
+    test_analyzer_uses_configured_rules()
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import tempfile
+import threading
+import subprocess
+
+from startup import BackgroundLoader
+from benchmarks.bench_startup import measure_import, measure_first_reply, parse_importtime
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_background_loader():
+    """测试后台加载器只加载一次，加载失败后重新加载"""
+    calls = []
+    release = threading.Event()
+
+    def factory():
+        calls.append(1)
+        release.wait(5)
+        if len(calls) == 1:
+            raise RuntimeError('网络不可用')
+        return {'loaded': len(calls)}
+
+    loader = BackgroundLoader('test', factory)
+    assert not calls and not loader.ready
+    future = loader.start()
+    assert loader.start() is future
+    release.set()
+    try:
+        loader.get(5)
+        assert False, "加载失败时应当抛出异常"
+    except RuntimeError:
+        pass
+    assert not loader.ready
+
+    # 失败后重新加载，事件循环中等待不阻塞
+    assert asyncio.run(loader.wait()) == {'loaded': 2}
+    assert loader.ready and loader.loaded_in is not None
+    assert loader.get() == {'loaded': 2} and len(calls) == 2
+
+def test_import_bot_is_light():
+    """测试import bot不加载pandas、binance、psutil等重量级模块，也不创建Binance客户端"""
+    code = ("import sys, bot; "
+            "print(json.dumps([name for name in ('pandas', 'numpy', 'ta', 'binance', 'psutil', 'market_data') "
+            "if name in sys.modules]))")
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, TELEGRAM_BOT_TOKEN='0:test', SUBSCRIPTIONS_FILE=os.path.join(directory, 's.json'))
+        result = subprocess.run([sys.executable, '-c', 'import json; ' + code], env=env,
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+def test_telegram_bot_is_light():
+    """测试main.py使用的TelegramTradingBot在导入和创建时不加载重量级模块，服务在首次使用时加载"""
+    code = ("import sys; from bots import TelegramTradingBot; "
+            "bot = TelegramTradingBot({'token': '0:test'}); "
+            "heavy = [name for name in ('pandas', 'numpy', 'ta', 'binance', 'psutil', 'market_data') "
+            "if name in sys.modules]; "
+            "from benchmarks.fakes import create_offline_market_data; "
+            "bot = TelegramTradingBot({'token': '0:test'}, market_data=create_offline_market_data()); "
+            "print(json.dumps([heavy, bot.services.ready, bot.market_analyzer.market_data is bot.market_data, "
+            "bot.services.ready]))")
+    with tempfile.TemporaryDirectory() as directory:
+        # 在临时目录中运行，机器人的日志文件不写入仓库
+        env = dict(os.environ, SUBSCRIPTIONS_FILE=os.path.join(directory, 's.json'),
+                   PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, '-c', 'import json; ' + code], env=env, cwd=directory,
+                                capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == [[], False, True, True]
+
+def test_startup_benchmark():
+    """测试启动基准测试：/start在服务加载完成前回复，首份分析报告等待服务加载"""
+    modules = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                               "import time:       120 |        300 | bot\n"
+                               "import time:        80 |        180 |   telegram\n")
+    assert [item['depth'] for item in modules] == [0, 1]
+    assert modules[1]['cumulative'] == 0.00018
+
+    with tempfile.TemporaryDirectory() as directory:
+        assert measure_import(directory)['heavy_loaded'] == []
+        startup = measure_first_reply(directory, timeout=60)
+    assert startup['first_analysis'] is not None
+    assert startup['first_reply'] < startup['first_analysis']
+
+if __name__ == '__main__':
+    test_background_loader()
+    test_import_bot_is_light()
+    test_telegram_bot_is_light()
+    test_startup_benchmark()
@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+import logging
+import tempfile
+from types import SimpleNamespace
+
+from subscriptions import SubscriptionManager, SubscriptionStore, signal_direction
+from telegram_sender import TelegramSender
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.load_telegram import StubBot
+from telegram.error import RetryAfter, TimedOut
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def test_signal_direction():
+    """测试从报告的结构化结果中取推荐方向，与报告的语言和措辞无关"""
+    assert signal_direction({'direction': 'short.direction.cautious_long'}) == 'long'
+    assert signal_direction({'direction': 'long.direction.short'}) == 'short'
+    assert signal_direction({'direction': 'mid.direction.neutral'}) == 'neutral'
+    assert signal_direction(None) is None
+
+def test_cycle_analyzes_once_per_symbol():
+    """测试每个(币种, 策略)每个周期只分析一次，change模式只在方向变化时推送"""
+    from market_analyzer import MarketAnalyzer
+
+    market_data = create_offline_market_data(cache_config={'enabled': False})
+    analyzer = MarketAnalyzer(market_data, {'enabled': False})
+    delivered = []
+    manager = SubscriptionManager(analyzer, lambda chat_id, text: delivered.append(chat_id),
+                                  {'report_chat_id': -100, 'report_symbols': ['btc']},
+                                  store=SubscriptionStore())
+    for chat_id in (1, 2, 3):
+        manager.handle_subscribe(chat_id, ['btc', 'short'])
+    manager.handle_subscribe(4, ['BTC', 'short', 'change'])
+    assert manager.handle_subscribe(5, ['BTC', 'weekly']).startswith("无效的策略类型")
+    assert manager.handle_subscribe(5, ['SOLL']) == "未找到交易对 SOLLUSDT，您是不是要找：SOL？"
+    assert manager.store.for_chat(5) == []
+
+    assert manager.run_cycle('short') == 5
+    assert sorted(delivered) == [-100, 1, 2, 3, 4]
+    assert market_data.client.calls['get_klines'] == 3
+
+    # 方向未变化时change模式的订阅者不会收到推送
+    delivered.clear()
+    manager.run_cycle('short')
+    assert sorted(delivered) == [-100, 1, 2, 3]
+    assert manager.run_cycle('mid') == 0
+
+    # 方向取自结构化结果，报告的语言和措辞不影响推送
+    direction = manager.store.last_direction('BTC', 'short')
+    analyzer.renderer = SimpleNamespace(render=lambda name, values: f"{name} report")
+    delivered.clear()
+    assert manager.run_cycle('short') == 4
+    assert manager.store.last_direction('BTC', 'short') == direction
+
+def test_store_persists_subscriptions():
+    """测试订阅数据保存到文件并可重新加载"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'subscriptions.json')
+        store = SubscriptionStore(path)
+        store.add(42, 'ETH', 'mid', 'change')
+        store.add(42, 'BTC', 'short', 'close')
+        store.set_direction('ETH', 'mid', 'long')
+
+        reloaded = SubscriptionStore(path)
+        assert reloaded.for_chat(42) == [('BTC', 'short', 'close'), ('ETH', 'mid', 'change')]
+        assert reloaded.last_direction('ETH', 'mid') == 'long'
+        assert reloaded.remove(42) == 2
+        assert SubscriptionStore(path).for_chat(42) == []
+
+def test_sender_respects_per_chat_interval():
+    """测试同一聊天的发送间隔，以及受限的聊天不会阻塞其他聊天"""
+    sends = []
+    stub = StubBot(lambda chat_id, text, sent_at: sends.append((chat_id, sent_at)))
+    sender = TelegramSender(stub, {'global_rate': 1000, 'private_interval': 0.05, 'group_interval': 0.1,
+                                   'merge': False})
+
+    async def run():
+        task = asyncio.create_task(sender.run())
+        await asyncio.sleep(0)
+        for index in range(3):
+            sender.enqueue(1, f"private {index}")
+        sender.enqueue(-1, "group 0")
+        sender.enqueue(-1, "group 1")
+        sender.enqueue(2, "other")
+        sender.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run())
+    assert sender.sent == 6 and sender.pending() == 0
+    times = {}
+    for chat_id, sent_at in sends:
+        times.setdefault(chat_id, []).append(sent_at)
+    assert all(b - a >= 0.045 for a, b in zip(times[1], times[1][1:]))
+    assert times[-1][1] - times[-1][0] >= 0.095
+    # 其他聊天的消息不需要等待聊天1的队列发送完
+    assert times[2][0] < times[1][-1]
+
+def test_sender_merges_and_retries():
+    """测试同一聊天排队的消息合并发送，RetryAfter按要求等待，网络错误重试"""
+    sends = []
+    errors = [RetryAfter(1), TimedOut()]
+
+    class FlakyBot(StubBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            if chat_id == 1 and errors:
+                raise errors.pop(0)
+            return await super().send_message(chat_id, text, **kwargs)
+
+    stub = FlakyBot(lambda chat_id, text, sent_at: sends.append((chat_id, text, sent_at)))
+    sender = TelegramSender(stub, {'global_rate': 1000, 'private_interval': 0.01, 'retry_base_delay': 0.01})
+
+    async def run():
+        task = asyncio.create_task(sender.run())
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        for index in range(3):
+            sender.enqueue(1, f"report {index}")
+        sender.stop()
+        await asyncio.wait_for(task, timeout=5)
+        return started
+
+    started = asyncio.run(run())
+    assert [text for _, text, _ in sends] == ["report 0\n\nreport 1\n\nreport 2"]
+    assert sender.sent == 1 and sender.merged == 2 and sender.failed == 0
+    # RetryAfter(1)：至少等待1秒后才重发
+    assert sends[0][2] - started >= 1.0
+
+def test_sender_merges_only_same_reply_target():
+    """测试群组中回复不同命令的消息分别发送，回复同一命令的消息合并"""
+    sends = []
+
+    class RecordingBot(StubBot):
+        async def send_message(self, chat_id, text, **kwargs):
+            sends.append((text, kwargs))
+            return await super().send_message(chat_id, text, **kwargs)
+
+    sender = TelegramSender(RecordingBot(lambda chat_id, text, sent_at: None),
+                            {'global_rate': 1000, 'group_interval': 0.01})
+
+    async def run():
+        task = asyncio.create_task(sender.run())
+        await asyncio.sleep(0)
+        sender.enqueue(-1, "report B", reply_to_message_id=11)
+        sender.enqueue(-1, "report C", reply_to_message_id=12)
+        sender.enqueue(-1, "report C2", reply_to_message_id=12)
+        sender.stop()
+        await asyncio.wait_for(task, timeout=5)
+
+    asyncio.run(run())
+    assert sends == [("report B", {'reply_to_message_id': 11}),
+                     ("report C\n\nreport C2", {'reply_to_message_id': 12})]
+    assert sender.merged == 1
+
+if __name__ == "__main__":
+    test_signal_direction()
+    test_cycle_analyzes_once_per_symbol()
+    test_store_persists_subscriptions()
+    test_sender_respects_per_chat_interval()
+    test_sender_merges_and_retries()
+    test_sender_merges_only_same_reply_target()
+    logger.warning("订阅推送测试通过")
@@ -0,0 +1,215 @@
+import os
+import sys
+import time
+import queue
+import asyncio
+import logging
+import tempfile
+import threading
+import subprocess
+import concurrent.futures
+from types import SimpleNamespace
+
+from market_cache import TTLCache
+from supervisor import (PidFile, stop_process, stop_running, drain_executor, drain_queue,
+                        save_caches, load_caches, is_running)
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 收到SIGTERM后模拟排空任务（0.2秒）再退出的子进程
+GRACEFUL_CHILD = (
+    "import signal, sys, time\n"
+    "def handle(*args):\n"
+    "    time.sleep(0.2)\n"
+    "    sys.exit(0)\n"
+    "signal.signal(signal.SIGTERM, handle)\n"
+    "print('ready', flush=True)\n"
+    "time.sleep(60)\n"
+)
+
+# 忽略SIGTERM的子进程
+STUBBORN_CHILD = (
+    "import signal, time\n"
+    "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+    "print('ready', flush=True)\n"
+    "time.sleep(60)\n"
+)
+
+# 记录收到的SIGTERM次数，收到第一个后0.3秒退出的子进程
+COUNTING_CHILD = (
+    "import signal, sys, time\n"
+    "received = []\n"
+    "def handle(*args):\n"
+    "    received.append(time.monotonic())\n"
+    "    print('term', flush=True)\n"
+    "signal.signal(signal.SIGTERM, handle)\n"
+    "print('ready', flush=True)\n"
+    "while not received or time.monotonic() - received[0] < 0.3:\n"
+    "    time.sleep(0.01)\n"
+    "sys.exit(0)\n"
+)
+
+def _spawn(code):
+    process = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True)
+    assert process.stdout.readline().strip() == 'ready'
+    return process
+
+def test_cache_snapshot_round_trip():
+    """测试缓存保存到磁盘后由新实例加载，过期条目被跳过"""
+    cache = TTLCache('klines', ttl_seconds=3600)
+    cache.set(('BTCUSDT', '15m'), [1, 2, 3])
+    cache.set(('ETHUSDT', '15m'), 'expired', expires_at=time.time() - 1)
+    cache.set(('SOLUSDT', '1h'), {'close': 150.0})
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot.pkl')
+        assert save_caches(path, {'klines': cache, 'reports': None}) == 2
+
+        restored = TTLCache('klines', ttl_seconds=3600)
+        assert load_caches(path, {'klines': restored, 'reports': TTLCache('reports')}) == 2
+        assert restored.get(('BTCUSDT', '15m')) == [1, 2, 3]
+        assert restored.get(('ETHUSDT', '15m')) is None
+        assert restored.expires_at(('SOLUSDT', '1h')) == cache.expires_at(('SOLUSDT', '1h'))
+
+        # 快照损坏或不存在时不影响启动
+        with open(path, 'wb') as f:
+            f.write(b'broken')
+        assert load_caches(path, {'klines': TTLCache('klines')}) == 0
+        assert load_caches(os.path.join(directory, 'missing.pkl'), {'klines': TTLCache('klines')}) == 0
+
+def test_pid_file_lock():
+    """测试PID文件锁只允许一个持有者，释放后删除文件"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bot.pid')
+        first = PidFile(path)
+        assert first.acquire()
+        assert PidFile.read(path) == os.getpid()
+        assert not PidFile(path).acquire()
+        first.release()
+        assert not os.path.exists(path)
+        second = PidFile(path)
+        assert second.acquire()
+        second.release()
+
+def test_graceful_stop():
+    """测试SIGTERM后等待进程自行退出，忽略SIGTERM的进程在超时后被强制终止"""
+    process = _spawn(GRACEFUL_CHILD)
+    started = time.monotonic()
+    assert stop_process(process.pid, timeout=10)
+    assert process.wait(5) == 0
+    assert time.monotonic() - started < 5
+
+    process = _spawn(STUBBORN_CHILD)
+    assert stop_process(process.pid, timeout=0.5)
+    assert process.wait(5) == -9
+
+    # 按PID文件停止旧实例
+    process = _spawn(GRACEFUL_CHILD)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bot.pid')
+        with open(path, 'w') as f:
+            f.write(str(process.pid))
+        assert stop_running(path, timeout=10, scripts=()) == [process.pid]
+    process.wait(5)
+    assert not is_running(process.pid)
+
+def test_stop_running_signals_once():
+    """测试stop_running只发送一次SIGTERM，之后只等待退出"""
+    process = _spawn(COUNTING_CHILD)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bot.pid')
+        with open(path, 'w') as f:
+            f.write(str(process.pid))
+        assert stop_running(path, timeout=10, scripts=()) == [process.pid]
+    assert process.wait(5) == 0
+    assert process.stdout.read().split() == ['term']
+
+def test_telegram_bot_graceful_shutdown():
+    """测试TelegramTradingBot（main.py）的stop()触发优雅关闭：排空进行中的分析任务和回复，保存缓存快照"""
+    from bots.telegram_bot import TelegramTradingBot
+    from telegram_sender import TelegramSender
+    from benchmarks.fakes import create_offline_market_data
+    from benchmarks.load_telegram import StubBot
+
+    with tempfile.TemporaryDirectory() as directory:
+        bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR',
+                                  'subscriptions': {'store_file': os.path.join(directory, 'subscriptions.json')},
+                                  'alerts': {'store_file': os.path.join(directory, 'alerts.json')}},
+                                 market_data=create_offline_market_data())
+        bot.cache_snapshot_file = os.path.join(directory, 'cache_snapshot.pkl')
+        sent = []
+        message = SimpleNamespace(chat_id=7, message_id=3)
+
+        async def scenario():
+            bot.running = True
+            bot.sender = TelegramSender(StubBot(lambda chat_id, text, sent_at: sent.append((chat_id, text))))
+            bot.loop = asyncio.get_running_loop()
+            bot.shutdown_event = asyncio.Event()
+            tasks = {
+                'message': asyncio.create_task(bot._message_processor()),
+                'sender': asyncio.create_task(bot.sender.run()),
+                'services': asyncio.create_task(bot._start_services()),
+                'polling': asyncio.create_task(asyncio.sleep(60))
+            }
+            # 收到停止信号时分析任务仍在进行
+            bot.user_task_locks[1] = True
+            bot.thread_pool.submit(bot._analyze_market_data_task, 'BTC', 'short', 1, message)
+            threading.Thread(target=bot.stop).start()
+            await asyncio.wait_for(bot.shutdown_event.wait(), 5)
+            await bot._shutdown(tasks)
+            return tasks
+
+        tasks = asyncio.run(scenario())
+        assert all(task.done() for task in tasks.values())
+        assert not bot.running and not bot.user_task_locks
+        assert [chat_id for chat_id, _ in sent] == [7] and '短期波段策略信号推送' in sent[0][1]
+
+        # 新实例加载保存的缓存
+        restored = create_offline_market_data()
+        assert load_caches(bot.cache_snapshot_file, {'klines': restored.kline_cache}) > 0
+
+def test_drain_jobs_and_queue():
+    """测试关闭时等待进行中的任务和待发送消息"""
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    messages = queue.Queue()
+    done = []
+
+    def job(index):
+        time.sleep(0.1)
+        done.append(index)
+        messages.put(index)
+
+    for index in range(4):
+        pool.submit(job, index)
+
+    async def consume():
+        while True:
+            if not messages.empty():
+                messages.get()
+                messages.task_done()
+            await asyncio.sleep(0.01)
+
+    async def run():
+        consumer = asyncio.create_task(consume())
+        drained = await drain_executor(pool, 5)
+        sent = await drain_queue(messages, 5)
+        consumer.cancel()
+        return drained, sent
+
+    assert asyncio.run(run()) == (True, True)
+    assert sorted(done) == [0, 1, 2, 3] and messages.unfinished_tasks == 0
+
+    stuck = queue.Queue()
+    stuck.put(1)
+    assert not asyncio.run(drain_queue(stuck, 0.1))
+
+if __name__ == '__main__':
+    test_cache_snapshot_round_trip()
+    test_pid_file_lock()
+    test_graceful_stop()
+    test_stop_running_signals_once()
+    test_drain_jobs_and_queue()
+    test_telegram_bot_graceful_shutdown()
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import logging
+from collections import Counter
+from types import SimpleNamespace
+
+from symbol_index import SymbolIndex
+from benchmarks.fakes import create_offline_market_data
+from benchmarks.load_telegram import StubBot, _build_update
+
+# 配置日志
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _item(symbol, status='TRADING', tick_size='0.01000000', **extra):
+    item = {'symbol': symbol, 'status': status, 'baseAsset': symbol[:-4], 'quoteAsset': 'USDT',
+            'filters': [{'filterType': 'LOT_SIZE'}, {'filterType': 'PRICE_FILTER', 'tickSize': tick_size}]}
+    item.update(extra)
+    return item
+
+class ExchangeInfoClient:
+    """只实现exchangeInfo接口的模拟客户端"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = Counter()
+
+    def get_exchange_info(self):
+        self.calls['get_exchange_info'] += 1
+        if self.fail:
+            raise ConnectionError('offline')
+        return {'symbols': [_item('BTCUSDT'), _item('ETHUSDT'), _item('COSUSDT', tick_size='0.00000100'),
+                            _item('LUNAUSDT', status='BREAK'),
+                            _item('ETHBTC', baseAsset='ETH', quoteAsset='BTC')]}
+
+    def futures_exchange_info(self):
+        self.calls['futures_exchange_info'] += 1
+        return {'symbols': [_item('BTCUSDT', contractType='PERPETUAL'), _item('ETHUSDT', contractType='PERPETUAL'),
+                            _item('BTCUSDT_250328', contractType='CURRENT_QUARTER'),
+                            _item('1000PEPEUSDT', tick_size='0.00000010', contractType='PERPETUAL')]}
+
+def test_index_lookup_and_suggestions():
+    """测试索引的元数据、现货/永续合约判断和拼写建议"""
+    client = ExchangeInfoClient()
+    index = SymbolIndex(client)
+    assert client.calls == {'get_exchange_info': 1, 'futures_exchange_info': 1}
+
+    assert index.get('btc') == {'symbol': 'BTCUSDT', 'base': 'BTC', 'quote': 'USDT', 'tick_size': 0.01,
+                                'spot': True, 'futures': True}
+    assert index.get('COSUSDT')['tick_size'] == 0.000001
+    assert index.has_spot('COS') and not index.has_futures('COS')
+    assert index.is_listed('1000PEPE') and not index.has_spot('1000PEPE')
+    assert not index.is_listed('LUNA') and not index.is_listed('XYZ')
+
+    assert index.suggest('BTCC') == ['BTC']
+    assert index.suggest('ETC') == ['ETH', 'BTC']
+    assert index.reject_message(['BTC', 'ETH']) is None
+    assert index.reject_message(['BTCC', 'QQQQQ']) == "未找到交易对 BTCCUSDT，您是不是要找：BTC？\n未找到交易对 QQQQQUSDT"
+
+    # 查询只读取内存中的字典
+    started = time.perf_counter()
+    for _ in range(10000):
+        index.is_listed('XYZ')
+    assert (time.perf_counter() - started) / 10000 < 0.00005
+
+def test_refresh_failure_is_permissive():
+    """测试索引加载失败时不拒绝任何交易对，到期后在后台重新加载"""
+    client = ExchangeInfoClient(fail=True)
+    index = SymbolIndex(client, {'retry_seconds': 0})
+    assert not index.ready
+    assert index.is_listed('XYZ') and index.has_spot('XYZ') and index.has_futures('XYZ')
+    assert index.reject_message(['XYZ']) is None
+
+    client.fail = False
+    index.get('BTC')
+    for _ in range(100):
+        if index.ready:
+            break
+        time.sleep(0.01)
+    assert index.ready and not index.is_listed('XYZ')
+
+    # 刷新失败时保留旧索引
+    client.fail = True
+    assert not index.refresh()
+    assert index.has_futures('BTC')
+
+def test_market_data_skips_unlisted_symbols():
+    """测试未上架现货的交易对不请求K线接口，没有永续合约的交易对不请求合约接口"""
+    market_data = create_offline_market_data()
+    market_data.symbols.symbols['COSUSDT']['futures'] = False
+    client = market_data.client
+    assert client.calls['get_exchange_info'] == 1
+
+    futures = market_data.get_futures_data('COSUSDT')
+    assert client.calls['futures_open_interest'] == 0
+    assert market_data.cmc_data.calls['get_futures_data'] == 1
+    assert futures['long_short_ratio'] is None
+
+    started = time.perf_counter()
+    df = market_data.get_historical_data('XYZUSDT', '15m')
+    assert time.perf_counter() - started < 1
+    assert client.calls['get_klines'] == 0
+    assert market_data.cmc_data.calls['get_historical_data'] == 1
+    assert df is not None and not df.empty
+
+def test_analyze_command_rejects_unknown_symbol():
+    """测试/analyze和/compare中未上架的交易对直接拒绝并给出建议，不提交分析任务"""
+    from bots.telegram_bot import TelegramTradingBot
+
+    bot = TelegramTradingBot({'token': 'test-token', 'log_file': os.devnull, 'log_level': 'ERROR'},
+                             market_data=create_offline_market_data())
+    sent = []
+    stub = StubBot(lambda chat_id, text, sent_at: sent.append(text))
+
+    async def run():
+        context = SimpleNamespace(args=['BTC', 'ETHH', 'mid'], user_data={})
+        await bot._analyze_command(_build_update(stub, 1, 7, '/analyze BTC ETHH mid'), context)
+        context = SimpleNamespace(args=['SOLL'], user_data={})
+        await bot._compare_command(_build_update(stub, 2, 7, '/compare SOLL'), context)
+
+    asyncio.run(run())
+    bot.thread_pool.shutdown()
+    assert sent == ["未找到交易对 ETHHUSDT，您是不是要找：ETH？", "未找到交易对 SOLLUSDT，您是不是要找：SOL？"]
+    assert not bot.user_task_locks
+    assert bot.market_data.client.calls['get_klines'] == 0
+
+if __name__ == '__main__':
+    test_index_lookup_and_suggestions()
+    test_refresh_failure_is_permissive()
+    test_market_data_skips_unlisted_symbols()
+    test_analyze_command_rejects_unknown_symbol()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 import os
 import sys
-import requests
+from http_session import get_session
 from dotenv import load_dotenv
 import time
 import logging
@@ -39,7 +39,7 @@ def main():
     # 1. 检查网络连接
     logger.info("正在检查网络连接...")
     try:
-        response = requests.get("https://api.telegram.org", proxies=proxies, timeout=10)
+        response = get_session().get("https://api.telegram.org", proxies=proxies, timeout=10)
         logger.info(f"Telegram API可访问性: {response.status_code}")
     except Exception as e:
         logger.error(f"无法访问Telegram API，请检查网络/代理设置: {str(e)}")
@@ -49,7 +49,7 @@ def main():
     logger.info("正在获取机器人信息...")
     try:
         url = f"https://api.telegram.org/bot{token}/getMe"
-        response = requests.get(url, proxies=proxies, timeout=10)
+        response = get_session().get(url, proxies=proxies, timeout=10)
         result = response.json()
         
         if result.get("ok"):
@@ -68,7 +68,7 @@ def main():
     logger.info("正在获取webhook状态...")
     try:
         url = f"https://api.telegram.org/bot{token}/getWebhookInfo"
-        response = requests.get(url, proxies=proxies, timeout=10)
+        response = get_session().get(url, proxies=proxies, timeout=10)
         result = response.json()
         
         if result.get("ok"):
@@ -83,7 +83,7 @@ def main():
                 # 提示删除webhook
                 logger.info("正在删除webhook以便使用polling模式...")
                 delete_url = f"https://api.telegram.org/bot{token}/deleteWebhook?drop_pending_updates=true"
-                delete_response = requests.get(delete_url, proxies=proxies, timeout=10)
+                delete_response = get_session().get(delete_url, proxies=proxies, timeout=10)
                 delete_result = delete_response.json()
                 
                 if delete_result.get("ok"):